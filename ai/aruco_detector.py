@@ -5,6 +5,40 @@ Detects and decodes ArUco markers for secondary authentication
 import cv2
 import numpy as np
 
+from utils import metrics
+
+
+ARUCO_DETECT_SECONDS = metrics.histogram("aruco_detect_seconds", "ArUco marker detection latency per frame")
+
+# Supported ArUco dictionaries (the number is how many marker IDs each has)
+ARUCO_DICTIONARIES = {
+    "DICT_4X4_50": cv2.aruco.DICT_4X4_50,
+    "DICT_4X4_100": cv2.aruco.DICT_4X4_100,
+    "DICT_4X4_250": cv2.aruco.DICT_4X4_250,
+    "DICT_4X4_1000": cv2.aruco.DICT_4X4_1000,
+    "DICT_5X5_50": cv2.aruco.DICT_5X5_50,
+    "DICT_5X5_100": cv2.aruco.DICT_5X5_100,
+    "DICT_5X5_250": cv2.aruco.DICT_5X5_250,
+    "DICT_5X5_1000": cv2.aruco.DICT_5X5_1000,
+    "DICT_6X6_50": cv2.aruco.DICT_6X6_50,
+    "DICT_6X6_100": cv2.aruco.DICT_6X6_100,
+    "DICT_6X6_250": cv2.aruco.DICT_6X6_250,
+    "DICT_6X6_1000": cv2.aruco.DICT_6X6_1000,
+}
+
+
+def get_aruco_dictionary(name):
+    """
+    Get a predefined ArUco dictionary
+    
+    Args:
+        name: Dictionary name (unknown names fall back to DICT_4X4_50)
+        
+    Returns:
+        cv2.aruco.Dictionary
+    """
+    return cv2.aruco.getPredefinedDictionary(ARUCO_DICTIONARIES.get(name, cv2.aruco.DICT_4X4_50))
+
 
 class ArucoDetector:
     """Detects ArUco markers from camera frames"""
@@ -16,18 +50,7 @@ class ArucoDetector:
         Args:
             dictionary: ArUco dictionary type
         """
-        # Get ArUco dictionary
-        aruco_dict_mapping = {
-            "DICT_4X4_50": cv2.aruco.DICT_4X4_50,
-            "DICT_4X4_100": cv2.aruco.DICT_4X4_100,
-            "DICT_5X5_50": cv2.aruco.DICT_5X5_50,
-            "DICT_5X5_100": cv2.aruco.DICT_5X5_100,
-            "DICT_6X6_50": cv2.aruco.DICT_6X6_50,
-            "DICT_6X6_100": cv2.aruco.DICT_6X6_100,
-        }
-        
-        dict_type = aruco_dict_mapping.get(dictionary, cv2.aruco.DICT_4X4_50)
-        self.aruco_dict = cv2.aruco.getPredefinedDictionary(dict_type)
+        self.aruco_dict = get_aruco_dictionary(dictionary)
         self.aruco_params = cv2.aruco.DetectorParameters()
         self.detector = cv2.aruco.ArucoDetector(self.aruco_dict, self.aruco_params)
         
@@ -41,11 +64,12 @@ class ArucoDetector:
         Returns:
             List of detected marker IDs
         """
-        # Convert to grayscale
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # Detect markers
-        corners, ids, rejected = self.detector.detectMarkers(gray)
+        with ARUCO_DETECT_SECONDS.time():
+            # Convert to grayscale
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            
+            # Detect markers
+            corners, ids, rejected = self.detector.detectMarkers(gray)
         
         # Extract marker IDs
         marker_ids = []
@@ -0,0 +1,162 @@
+"""
+Embedding Cache
+Reuses the embedding of a face crop that looks the same as one embedded a
+moment ago. While a person stands still in front of the kiosk, recognition
+retries see near-identical crops; looking them up costs a resize and a hash
+instead of a model forward pass.
+
+Crops are compared by a difference hash (dHash): the crop is reduced to a
+small grayscale thumbnail and each bit records whether a pixel is brighter
+than its right-hand neighbour. The hash ignores size and overall brightness,
+and camera noise only flips a few bits, so a crop matches a cached one when
+their hashes differ in at most max_distance bits. Entries are also scoped by
+a track ID (a continuous presence of one face) when the caller has one, and
+expire after a TTL, so a different person is never served a cached embedding
+from a similar-looking crop long after.
+"""
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+
+import cv2
+import numpy as np
+
+from utils import metrics
+
+
+EMBEDDING_CACHE_REQUESTS = metrics.counter("embedding_cache_requests_total", "Embedding cache lookups",
+                                           labels=("result",))
+EMBEDDING_CACHE_ENTRIES = metrics.gauge("embedding_cache_entries", "Embeddings in the cache")
+
+HASH_SIZE = 16  # 16x16 = 256-bit hash
+
+
+def perceptual_hash(face_img, hash_size=HASH_SIZE):
+    """
+    Difference hash of a face crop
+
+    Args:
+        face_img: Face image (BGR or grayscale)
+        hash_size: Hash is hash_size x hash_size bits
+
+    Returns:
+        Boolean array of hash_size * hash_size bits
+    """
+    gray = face_img if face_img.ndim == 2 else cv2.cvtColor(face_img, cv2.COLOR_BGR2GRAY)
+    thumbnail = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    return (thumbnail[:, 1:] > thumbnail[:, :-1]).ravel()
+
+
+class EmbeddingCache:
+    """Thread-safe LRU cache of embeddings keyed by perceptual hash, with a TTL"""
+
+    def __init__(self, max_entries=32, ttl=10.0, max_distance=12, clock=None):
+        """
+        Initialize cache
+
+        Args:
+            max_entries: Embeddings kept (least recently used are evicted)
+            ttl: Seconds an embedding is reused at most
+            max_distance: Most differing hash bits (of 256) for a crop to match
+            clock: Time source (default: time.monotonic)
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.clock = clock or time.monotonic
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self._next_key = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def _lookup(self, bits, track_id, now):
+        """Key of the closest fresh entry within max_distance (caller holds the lock)"""
+        best_key, best_distance = None, self.max_distance + 1
+        for key, (entry_track, entry_bits, _, expires) in list(self.entries.items()):
+            if expires <= now:
+                del self.entries[key]
+                continue
+            if entry_track != track_id:
+                continue
+            distance = np.count_nonzero(entry_bits != bits)
+            if distance < best_distance:
+                best_key, best_distance = key, distance
+        return best_key
+
+    def _get(self, bits, track_id):
+        """Cached embedding for a hash, or None (counts the hit or miss)"""
+        with self.lock:
+            key = self._lookup(bits, track_id, self.clock())
+            if key is not None:
+                self.entries.move_to_end(key)
+                EMBEDDING_CACHE_REQUESTS.labels("hit").inc()
+                return self.entries[key][2]
+        EMBEDDING_CACHE_REQUESTS.labels("miss").inc()
+        return None
+
+    def _put(self, bits, embedding, track_id):
+        """Cache an embedding under a hash"""
+        with self.lock:
+            self.entries[self._next_key] = (track_id, bits, embedding, self.clock() + self.ttl)
+            self._next_key += 1
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+            EMBEDDING_CACHE_ENTRIES.set(len(self.entries))
+
+    def get_or_compute(self, face_img, compute, track_id=None):
+        """
+        Cached embedding for a crop, or compute and cache it
+
+        Args:
+            face_img: Face image
+            compute: Function generating the embedding from the image
+            track_id: Optional ID of the face track the crop belongs to
+
+        Returns:
+            Embedding (or None if compute failed; failures are not cached)
+        """
+        bits = perceptual_hash(face_img)
+        embedding = self._get(bits, track_id)
+        if embedding is not None:
+            return embedding
+
+        embedding = compute(face_img)
+        if embedding is not None:
+            self._put(bits, embedding, track_id)
+        return embedding
+
+    def get_or_submit(self, face_img, submit, track_id=None):
+        """
+        Cached embedding for a crop as a future, or submit it and cache the result
+
+        Args:
+            face_img: Face image
+            submit: Function starting the embedding of the image, returning a Future
+            track_id: Optional ID of the face track the crop belongs to
+
+        Returns:
+            Future resolving to the embedding (already resolved on a hit)
+        """
+        bits = perceptual_hash(face_img)
+        embedding = self._get(bits, track_id)
+        if embedding is not None:
+            future = Future()
+            future.set_result(embedding)
+            return future
+
+        def store(done):
+            if not done.cancelled() and done.exception() is None and done.result() is not None:
+                self._put(bits, done.result(), track_id)
+
+        future = submit(face_img)
+        future.add_done_callback(store)
+        return future
+
+    def clear(self):
+        """Drop all entries"""
+        with self.lock:
+            self.entries.clear()
+            EMBEDDING_CACHE_ENTRIES.set(0)
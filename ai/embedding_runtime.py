@@ -0,0 +1,156 @@
+"""
+Embedding Runtimes
+Runs an exported face model with ONNX Runtime or TensorFlow Lite instead of
+the Keras model through DeepFace. Neither runtime imports TensorFlow (TFLite
+uses tflite_runtime when it is installed), so loading takes a fraction of
+the time and memory, and inference is several times faster on a Pi's CPU.
+
+Models are exported from the DeepFace weights by convert_model.py. Crops
+are prepared the way DeepFace prepares them for the Keras model: resized to
+the model's input keeping the aspect ratio, zero-padded, scaled to 0-1 and
+kept in BGR order. The face is not detected again inside the crop, as the
+"deepface" runtime does with the configured detector backend;
+benchmarks/embedding_parity.py measures how close the two runtimes'
+embeddings are.
+"""
+import os
+import threading
+
+import cv2
+import numpy as np
+
+
+RUNTIMES = ("deepface", "onnx", "tflite")
+
+
+def preprocess(face_img, size):
+    """
+    Face crop as the model input
+
+    Args:
+        face_img: Face image (BGR, uint8)
+        size: Model input (height, width)
+
+    Returns:
+        float32 array (height, width, 3) in 0-1
+    """
+    height, width = size
+    factor = min(height / face_img.shape[0], width / face_img.shape[1])
+    resized = cv2.resize(face_img, (int(face_img.shape[1] * factor), int(face_img.shape[0] * factor)))
+    pad_y, pad_x = height - resized.shape[0], width - resized.shape[1]
+    padded = np.pad(resized, ((pad_y // 2, pad_y - pad_y // 2), (pad_x // 2, pad_x - pad_x // 2), (0, 0)))
+    if padded.shape[:2] != (height, width):
+        padded = cv2.resize(padded, (width, height))
+    return padded.astype(np.float32) / 255.0
+
+
+class OnnxEmbedder:
+    """Face model exported to ONNX, run by ONNX Runtime"""
+
+    def __init__(self, model_path, threads=0):
+        """
+        Load model
+
+        Args:
+            model_path: .onnx file (NHWC float input, as exported from Keras)
+            threads: Intra-op threads (0 = one per core)
+        """
+        import onnxruntime
+
+        options = onnxruntime.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = onnxruntime.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.size = tuple(int(d) for d in model_input.shape[1:3])
+
+    def embed(self, face_img):
+        """
+        Embed a face crop
+
+        Args:
+            face_img: Face image (BGR)
+
+        Returns:
+            float64 embedding array
+        """
+        batch = preprocess(face_img, self.size)[None]
+        output = self.session.run(None, {self.input_name: batch})[0]
+        return output[0].astype(np.float64)
+
+
+class TFLiteEmbedder:
+    """Face model converted to TensorFlow Lite (float or int8-quantized)"""
+
+    def __init__(self, model_path, threads=0):
+        """
+        Load model
+
+        Args:
+            model_path: .tflite file
+            threads: Interpreter threads (0 = one per core)
+        """
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+
+        self.interpreter = Interpreter(model_path=model_path, num_threads=threads or os.cpu_count())
+        self.interpreter.allocate_tensors()
+        self.input = self.interpreter.get_input_details()[0]
+        self.output = self.interpreter.get_output_details()[0]
+        self.size = tuple(int(d) for d in self.input["shape"][1:3])
+        self.lock = threading.Lock()  # an interpreter runs one inference at a time
+
+    def embed(self, face_img):
+        """
+        Embed a face crop
+
+        Args:
+            face_img: Face image (BGR)
+
+        Returns:
+            float64 embedding array
+        """
+        batch = preprocess(face_img, self.size)[None]
+        scale, zero_point = self.input["quantization"]
+        if self.input["dtype"] != np.float32:
+            # Fully integer model: quantize the input with the model's parameters
+            batch = np.clip(np.rint(batch / scale + zero_point),
+                            np.iinfo(self.input["dtype"]).min, np.iinfo(self.input["dtype"]).max)
+            batch = batch.astype(self.input["dtype"])
+
+        with self.lock:
+            self.interpreter.set_tensor(self.input["index"], batch)
+            self.interpreter.invoke()
+            output = self.interpreter.get_tensor(self.output["index"])[0]
+
+        scale, zero_point = self.output["quantization"]
+        if self.output["dtype"] != np.float32:
+            return (output.astype(np.float64) - zero_point) * scale
+        return output.astype(np.float64)
+
+
+def load_embedder(runtime, model_path, threads=0):
+    """
+    Load an exported model
+
+    Args:
+        runtime: "onnx" or "tflite"
+        model_path: Model file from convert_model.py
+        threads: Inference threads (0 = one per core)
+
+    Returns:
+        OnnxEmbedder or TFLiteEmbedder
+
+    Raises:
+        ValueError: Unknown runtime
+        FileNotFoundError: Missing model file
+    """
+    embedders = {"onnx": OnnxEmbedder, "tflite": TFLiteEmbedder}
+    if runtime not in embedders:
+        raise ValueError(f"Unknown embedding runtime: {runtime} (choose from {', '.join(RUNTIMES)})")
+    if not model_path or not os.path.exists(model_path):
+        raise FileNotFoundError(f"No {runtime} model at {model_path} (export one with convert_model.py)")
+    return embedders[runtime](model_path, threads)
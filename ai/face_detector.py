@@ -7,20 +7,30 @@ import numpy as np
 import sys
 import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import MIN_BRIGHTNESS, MIN_CONTRAST, MIN_SHARPNESS
+from config import MIN_BRIGHTNESS, MIN_CONTRAST, MIN_SHARPNESS, FACE_ALIGNMENT, FACE_ALIGNMENT_MODEL_PATH
+from ai.face_aligner import FaceAligner
+from utils import metrics
+
+
+FACE_DETECT_SECONDS = metrics.histogram("face_detect_seconds", "Face detection latency per frame")
+FACES_DETECTED = metrics.counter("faces_detected_total", "Faces found by the detector")
 
 
 class FaceDetector:
     """Detects faces from camera frames using OpenCV"""
     
-    def __init__(self, backend="opencv"):
+    def __init__(self, backend="opencv", alignment=FACE_ALIGNMENT):
         """
         Initialize face detector
         
         Args:
             backend: Detection backend ("opencv", "dlib", "mtcnn", etc.)
+            alignment: Face alignment before embedding ("none", "eyes", "yunet")
         """
         self.backend = backend
+        self.aligner = None
+        if alignment != "none":
+            self.aligner = FaceAligner(alignment, model_path=FACE_ALIGNMENT_MODEL_PATH)
         
         if backend == "opencv":
             # Load Haar Cascade classifier
@@ -62,24 +72,28 @@ class FaceDetector:
         Returns:
             List of face bounding boxes [(x, y, w, h), ...]
         """
-        # Convert to grayscale for detection
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # Detect faces
-        faces = self.detector.detectMultiScale(
-            gray,
-            scaleFactor=1.1,
-            minNeighbors=5,
-            minSize=(80, 80),
-            flags=cv2.CASCADE_SCALE_IMAGE
-        )
-        
+        with FACE_DETECT_SECONDS.time():
+            # Convert to grayscale for detection
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            
+            # Detect faces
+            faces = self.detector.detectMultiScale(
+                gray,
+                scaleFactor=1.1,
+                minNeighbors=5,
+                minSize=(80, 80),
+                flags=cv2.CASCADE_SCALE_IMAGE
+            )
+        
+        FACES_DETECTED.inc(len(faces))
         return faces
         
     def get_single_face(self, frame):
         """
         Detect and return single face from frame
-        Ensures only one face is present for security
+        Ensures only one face is present for security; with alignment on,
+        the crop is the face warped upright (the margin crop if its eyes
+        are not found)
         
         Args:
             frame: Input image frame (BGR)
@@ -109,6 +123,11 @@ class FaceDetector:
         if face_roi.shape[0] < 80 or face_roi.shape[1] < 80:
             return None, None
             
+        if self.aligner is not None:
+            aligned = self.aligner.align(frame, (x, y, w, h))
+            if aligned is not None:
+                face_roi = aligned
+            
         return face_roi, (x, y, w, h)
         
     def draw_faces(self, frame, faces):
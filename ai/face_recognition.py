@@ -4,23 +4,182 @@ Generates face embeddings and performs recognition
 """
 import cv2
 import numpy as np
-from deepface import DeepFace
 import os
+import threading
+import time
+from concurrent.futures import Future
+
+from ai.embedding_runtime import load_embedder
+from ai.gallery import Gallery
+from utils import metrics
+from utils.logger import get_logger
+
+
+log = get_logger("recognizer")
+
+
+EMBEDDING_SECONDS = metrics.histogram("embedding_seconds", "Face embedding generation latency")
+EMBEDDING_FAILURES = metrics.counter("embedding_failures_total", "Failed embedding generations")
+
+_deepface = None
+_deepface_lock = threading.Lock()
+
+
+def _get_deepface():
+    """
+    Import DeepFace on first use
+
+    DeepFace pulls in TensorFlow, which takes seconds to import on a
+    Raspberry Pi, so it is deferred until an embedding is actually needed
+    (or the model is warmed up in the background).
+
+    Returns:
+        The DeepFace module
+    """
+    global _deepface
+    if _deepface is None:
+        with _deepface_lock:
+            if _deepface is None:
+                from deepface import DeepFace
+                _deepface = DeepFace
+    return _deepface
+
+
+def close_candidates(candidates, margin):
+    """
+    Candidates too close to the best one to tell apart by face alone
+    
+    Args:
+        candidates: recognize_topk() result, best first
+        margin: Similarity gap the best candidate needs over the others
+        
+    Returns:
+        List of candidates within the margin of the best (just the best when
+        it wins clearly, empty when there are no candidates)
+    """
+    if not candidates:
+        return []
+    best = candidates[0]
+    return [best] + [c for c in candidates[1:] if best[3] - c[3] < margin]
 
 
 class FaceRecognizer:
     """Generates face embeddings and compares faces"""
     
-    def __init__(self, model_name="Facenet", backend="opencv"):
+    # Whether generate_embedding() may run on several threads at once
+    concurrent = False
+    
+    def __init__(self, model_name="Facenet", backend="opencv", gallery_precision="float32", rerank=5,
+                 embedding_cache=None, runtime="deepface", model_path=None, threads=0):
         """
         Initialize face recognizer
         
         Args:
             model_name: Model to use ("Facenet", "VGG-Face", "OpenFace", "Facenet512", "ArcFace")
             backend: Detection backend for DeepFace
+            gallery_precision: Gallery matrix storage ("float32", "float16", "int8")
+            rerank: Gallery candidates scored again at full precision
+            embedding_cache: Optional EmbeddingCache reused by recognition
+                             (enrollment always generates fresh embeddings)
+            runtime: "deepface" (Keras model), "onnx" or "tflite" (model_name
+                     exported by convert_model.py)
+            model_path: Exported model file for the onnx and tflite runtimes
+            threads: Inference threads for onnx and tflite (0 = one per core)
         """
         self.model_name = model_name
         self.backend = backend
+        self.runtime = runtime
+        self.model_path = model_path
+        self.threads = threads
+        self._embedder = None
+        self._embedder_lock = threading.Lock()
+        self.gallery_precision = gallery_precision
+        self.rerank = rerank
+        self._gallery = None
+        self.embedding_cache = embedding_cache
+        self.ready = threading.Event()
+        self.warmup_timings = {}
+        
+    def warmup(self):
+        """
+        Import DeepFace, build the model and run one dummy inference
+        
+        The first represent() call also builds the TensorFlow graph, so
+        running it here moves that cost off the first real recognition.
+        The onnx and tflite runtimes load the exported model instead.
+        
+        Returns:
+            Dict of step durations in seconds ("import", "build_model",
+            "inference"; "load_model" and "inference" for onnx and tflite)
+        """
+        timings = {}
+        
+        if self.runtime == "deepface":
+            start = time.perf_counter()
+            DeepFace = _get_deepface()
+            timings["import"] = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            DeepFace.build_model(self.model_name)
+            timings["build_model"] = time.perf_counter() - start
+        else:
+            start = time.perf_counter()
+            self._get_embedder()
+            timings["load_model"] = time.perf_counter() - start
+        
+        start = time.perf_counter()
+        self._represent(np.zeros((160, 160, 3), dtype=np.uint8))
+        timings["inference"] = time.perf_counter() - start
+        
+        self.warmup_timings = timings
+        self.ready.set()
+        log.info("Model %s ready", self.model_name,
+                 extra={"data": {k: round(v, 3) for k, v in timings.items()}})
+        return timings
+        
+    def warmup_async(self):
+        """
+        Warm up the model on a background thread
+        
+        Returns:
+            Started thread; errors are logged and leave ``ready`` unset
+        """
+        def run():
+            try:
+                self.warmup()
+            except Exception as e:
+                log.error("Model warmup failed: %s", e)
+        
+        thread = threading.Thread(target=run, name="model-warmup", daemon=True)
+        thread.start()
+        return thread
+        
+    def _get_embedder(self):
+        """Exported model of the onnx or tflite runtime, loaded on first use"""
+        if self._embedder is None:
+            with self._embedder_lock:
+                if self._embedder is None:
+                    self._embedder = load_embedder(self.runtime, self.model_path, self.threads)
+                    log.info("Loaded %s model %s", self.runtime, self.model_path)
+        return self._embedder
+        
+    def _represent(self, face_img):
+        """Embedding from the configured runtime (None if DeepFace returned none)"""
+        if self.runtime != "deepface":
+            return self._get_embedder().embed(face_img)
+        
+        DeepFace = _get_deepface()
+        # DeepFace.represent returns a list of embeddings
+        embedding_objs = DeepFace.represent(
+            img_path=face_img,
+            model_name=self.model_name,
+            enforce_detection=False,
+            detector_backend=self.backend
+        )
+        if embedding_objs and len(embedding_objs) > 0:
+            # Extract the embedding vector
+            return np.array(embedding_objs[0]["embedding"])
+        return None
         
     def generate_embedding(self, face_img):
         """
@@ -33,23 +192,16 @@ class FaceRecognizer:
             Numpy array of face embedding or None if failed
         """
         try:
-            # DeepFace.represent returns a list of embeddings
-            embedding_objs = DeepFace.represent(
-                img_path=face_img,
-                model_name=self.model_name,
-                enforce_detection=False,
-                detector_backend=self.backend
-            )
-            
-            if embedding_objs and len(embedding_objs) > 0:
-                # Extract the embedding vector
-                embedding = np.array(embedding_objs[0]["embedding"])
-                return embedding
-            else:
-                return None
+            with EMBEDDING_SECONDS.time():
+                embedding = self._represent(face_img)
+            
+            if embedding is None:
+                EMBEDDING_FAILURES.inc()
+            return embedding
                 
         except Exception as e:
-            print(f"Error generating embedding: {e}")
+            log.error("Error generating embedding: %s", e)
+            EMBEDDING_FAILURES.inc()
             return None
             
     def compare_embeddings(self, embedding1, embedding2, threshold=0.6):
@@ -74,41 +226,133 @@ class FaceRecognizer:
         
         return is_match, similarity
         
-    def recognize_face(self, face_img, database_embeddings, threshold=0.6):
+    def embed(self, face_img, track_id=None):
+        """
+        Face embedding for recognition, through the embedding cache if any
+        
+        Args:
+            face_img: Face image (BGR or RGB)
+            track_id: Optional ID of the face track the crop belongs to
+            
+        Returns:
+            Numpy array of face embedding or None if failed
+        """
+        if self.embedding_cache is None:
+            return self.generate_embedding(face_img)
+        return self.embedding_cache.get_or_compute(face_img, self.generate_embedding, track_id)
+        
+    def submit_embedding(self, face_img, track_id=None):
+        """
+        Start embedding a face for recognition
+        
+        The embedding runs in the caller's thread, so the future is already
+        resolved; PoolRecognizer returns one that resolves in a worker.
+        
+        Args:
+            face_img: Face image (BGR or RGB)
+            track_id: Optional ID of the face track the crop belongs to
+            
+        Returns:
+            Future resolving to the embedding (or None if failed)
+        """
+        future = Future()
+        try:
+            future.set_result(self.embed(face_img, track_id))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+        
+    def recognize_face(self, face_img, database_embeddings, threshold=0.6, track_id=None):
         """
         Recognize a face against a database of embeddings
         
         Args:
             face_img: Face image to recognize
-            database_embeddings: List of tuples (student_id, name, aruco_id, embedding)
+            database_embeddings: Gallery, or list of tuples (student_id, name, aruco_id, embedding)
             threshold: Similarity threshold
+            track_id: Optional face track ID (scopes the embedding cache)
             
         Returns:
             Tuple: (student_id, name, aruco_id, similarity) or (None, None, None, 0)
         """
         # Generate embedding for input face
-        query_embedding = self.generate_embedding(face_img)
+        query_embedding = self.embed(face_img, track_id)
         
         if query_embedding is None:
             return None, None, None, 0.0
             
-        # Compare with all database embeddings
-        best_match = None
-        best_similarity = 0.0
+        return self.gallery(database_embeddings).match(query_embedding, threshold)
+        
+    def recognize_topk(self, face_img, database_embeddings, k=3, threshold=0.6, track_id=None):
+        """
+        Best matching students for a face, from one pass over the gallery
         
-        for student_id, name, aruco_id, db_embedding in database_embeddings:
-            is_match, similarity = self.compare_embeddings(
-                query_embedding, db_embedding, threshold
-            )
+        Args:
+            face_img: Face image to recognize
+            database_embeddings: Gallery, or list of tuples (student_id, name, aruco_id, embedding)
+            k: Most candidates to return
+            threshold: Similarity threshold
+            track_id: Optional face track ID (scopes the embedding cache)
             
-            if is_match and similarity > best_similarity:
-                best_similarity = similarity
-                best_match = (student_id, name, aruco_id, similarity)
-                
-        if best_match:
-            return best_match
-        else:
-            return None, None, None, 0.0
+        Returns:
+            List of tuples (student_id, name, aruco_id, similarity), best first
+            (empty if nobody is above the threshold or the embedding failed)
+        """
+        return self.match_topk(self.embed(face_img, track_id), database_embeddings, k, threshold)
+        
+    def match_topk(self, query_embedding, database_embeddings, k=3, threshold=0.6):
+        """
+        Best matching students for an embedding (see recognize_topk)
+        
+        Args:
+            query_embedding: Face embedding, e.g. from a submit_embedding future
+            database_embeddings: Gallery, or list of tuples (student_id, name, aruco_id, embedding)
+            k: Most candidates to return
+            threshold: Similarity threshold
+            
+        Returns:
+            List of tuples (student_id, name, aruco_id, similarity), best first
+        """
+        if query_embedding is None:
+            return []
+            
+        return self.gallery(database_embeddings).topk(query_embedding, k, threshold)
+        
+    def load_gallery(self, students):
+        """
+        Gallery for a student list, to keep in place of the list
+        
+        The gallery does not hold the embeddings, so the list (and its
+        float64 embeddings) can be freed once it is built.
+        
+        Args:
+            students: List of tuples (student_id, name, aruco_id, embedding)
+            
+        Returns:
+            Gallery
+        """
+        return Gallery(students, self.gallery_precision, self.rerank)
+        
+    def gallery(self, database_embeddings):
+        """
+        Gallery matrix for a student list, built once per list
+        
+        A Gallery from load_gallery() is used as it is. For a plain list, a
+        different list object (or a changed length) rebuilds the matrix.
+        
+        Args:
+            database_embeddings: Gallery, or list of tuples (student_id, name, aruco_id, embedding)
+            
+        Returns:
+            Gallery
+        """
+        if isinstance(database_embeddings, Gallery):
+            return database_embeddings
+        source, gallery = self._gallery or (None, None)
+        if source is not database_embeddings or len(gallery) != len(database_embeddings):
+            gallery = self.load_gallery(database_embeddings)
+            self._gallery = (database_embeddings, gallery)
+        return gallery
             
     def preprocess_face(self, face_img, target_size=(160, 160)):
         """
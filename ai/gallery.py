@@ -0,0 +1,163 @@
+"""
+Face Gallery
+The enrolled students' embeddings as one matrix, matched against a query in
+a single product instead of one comparison per student.
+
+The gallery keeps only the students' IDs, names and ArUco IDs next to the
+matrix, so callers can drop the embeddings once it is built.
+
+The matrix can be stored quantized (utils/quantization.py). Quantized scores
+only pick the candidates: the best few are scored again from float32 copies
+of the embeddings, so the returned similarity (and the threshold decision)
+is the same as full precision unless the true match falls outside them.
+The float32 copies go to a memory-mapped temporary file; re-ranking reads a
+handful of rows, so the OS keeps only those pages in memory.
+"""
+import sys
+import tempfile
+
+import numpy as np
+
+from utils import metrics
+from utils.logger import get_logger
+from utils.quantization import QuantizedMatrix
+
+
+log = get_logger("recognizer")
+
+GALLERY_BYTES = metrics.gauge("gallery_bytes", "Memory used by the gallery (matrix and student list)")
+
+
+def _unit_rows(vectors):
+    """Rows scaled to unit length (zero rows stay zero) and their norms"""
+    norms = np.linalg.norm(vectors, axis=1)
+    safe = np.where(norms > 0, norms, 1.0)
+    return vectors / safe[:, None], norms
+
+
+def _spill(vectors):
+    """float32 rows in a temporary file, mapped read-only"""
+    with tempfile.TemporaryFile() as f:
+        vectors.astype(np.float32).tofile(f)
+        f.flush()
+        # The mapping keeps the (already unlinked) file alive after it is closed
+        return np.memmap(f, dtype=np.float32, mode="r", shape=vectors.shape)
+
+
+def _list_bytes(students):
+    """Memory used by a list of tuples of scalars"""
+    return sys.getsizeof(students) + sum(sys.getsizeof(t) + sum(sys.getsizeof(v) for v in t)
+                                         for t in students)
+
+
+class Gallery:
+    """Enrolled embeddings matched by cosine similarity"""
+
+    def __init__(self, students, precision="float32", rerank=5):
+        """
+        Build gallery
+
+        Args:
+            students: List of tuples (student_id, name, aruco_id, embedding)
+                      (not kept; only the first three fields are copied)
+            precision: Matrix storage, "float32", "float16" or "int8"
+            rerank: Candidates scored again at float32
+                    (0 returns the quantized scores as they are)
+        """
+        self.students = [tuple(s[:3]) for s in students]
+        self.precision = precision
+        self.rerank = rerank
+
+        if students:
+            vectors = np.stack([np.asarray(s[3], dtype=np.float32).ravel() for s in students])
+        else:
+            vectors = np.zeros((0, 0), dtype=np.float32)
+        unit, norms = _unit_rows(vectors)
+        self.valid = norms > 0
+        self.matrix = QuantizedMatrix(unit, precision)
+        # A float32 matrix is its own re-ranking copy
+        self.exact_rows = _spill(unit) if precision != "float32" and rerank and len(unit) else None
+        GALLERY_BYTES.set(self.nbytes)
+        log.debug("Gallery of %d students (%s, %d bytes)", len(students), precision, self.nbytes)
+
+    def __len__(self):
+        # Rows built, even if the student list has grown since
+        return len(self.matrix)
+
+    @property
+    def nbytes(self):
+        """Memory used by the matrix, validity mask and student list (mapped rows are on disk)"""
+        return self.matrix.nbytes + self.valid.nbytes + _list_bytes(self.students)
+
+    def scores(self, query):
+        """
+        Similarity of a query to every student, from the stored matrix
+
+        Args:
+            query: Embedding vector
+
+        Returns:
+            float32 array of similarities (0-1, same scale as cosine_similarity)
+        """
+        query = np.asarray(query, dtype=np.float32).ravel()
+        norm = np.linalg.norm(query)
+        if norm == 0 or not len(self):
+            return np.zeros(len(self), dtype=np.float32)
+        similarity = (self.matrix.dot(query / norm) + 1) / 2
+        similarity[~self.valid] = 0.0
+        return similarity
+
+    def _exact(self, query, indices):
+        """float32-precision similarities of the given students"""
+        query = np.asarray(query, dtype=np.float64).ravel()
+        norm = np.linalg.norm(query)
+        if norm == 0:
+            return np.zeros(len(indices))
+        rows = self.matrix.codes if self.exact_rows is None else self.exact_rows
+        candidates = np.asarray(rows[indices], dtype=np.float64)
+        return np.where(self.valid[indices], (candidates @ (query / norm) + 1) / 2, 0.0)
+
+    def topk(self, query, k=3, threshold=0.0):
+        """
+        Best matching students, best first
+
+        Args:
+            query: Embedding vector
+            k: Most students to return
+            threshold: Similarity threshold (0-1)
+
+        Returns:
+            List of tuples (student_id, name, aruco_id, similarity) above the threshold
+        """
+        if not len(self) or k <= 0:
+            return []
+
+        scores = self.scores(query)
+        count = min(max(k, self.rerank), len(self))
+        candidates = np.argpartition(-scores, count - 1)[:count]
+        exact = self._exact(query, candidates) if self.rerank else scores[candidates].astype(np.float64)
+        # Ties resolve to the earlier student, like a linear scan
+        order = np.lexsort((candidates, -exact))[:k]
+
+        results = []
+        for position in order:
+            similarity = float(exact[position])
+            if similarity < threshold:
+                break
+            student_id, name, aruco_id = self.students[int(candidates[position])]
+            results.append((student_id, name, aruco_id, similarity))
+        return results
+
+    def match(self, query, threshold=0.6):
+        """
+        Best matching student above a threshold
+
+        Args:
+            query: Embedding vector
+            threshold: Similarity threshold (0-1)
+
+        Returns:
+            Tuple: (student_id, name, aruco_id, similarity) or (None, None, None, 0.0)
+        """
+        best = self.topk(query, 1, threshold)
+        return best[0] if best else (None, None, None, 0.0)
@@ -0,0 +1,462 @@
+"""
+Inference Pool - face embeddings on worker processes
+Each worker is a spawned process that loads the face model once and embeds
+the crops it is sent, so TensorFlow runs outside the caller's interpreter:
+OpenCV detection, the preview and the web server keep their GIL while a
+face is embedded, and several workers embed on several cores.
+
+Crops are passed through one shared-memory block divided into fixed-size
+slots instead of being pickled: the caller copies the crop into a free
+slot and sends only (request ID, slot, shape, dtype). The slot is freed
+when the worker's result comes back, so a worker never reads a slot that
+is being refilled. Each worker has its own task queue; the parent knows
+what every worker holds, so a crashed worker fails only its own requests
+and is restarted. Results come back on a pipe per worker: a worker killed
+mid-write can only break its own pipe, which is replaced with the process.
+"""
+import itertools
+import multiprocessing
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import connection, shared_memory
+
+import numpy as np
+
+from ai.face_recognition import FaceRecognizer, EMBEDDING_SECONDS, EMBEDDING_FAILURES
+from utils import metrics
+from utils.logger import get_logger
+
+
+log = get_logger("inference")
+
+INFERENCE_REQUEST_SECONDS = metrics.histogram("inference_request_seconds",
+                                              "Inference pool request latency, queueing included")
+INFERENCE_INFLIGHT = metrics.gauge("inference_inflight", "Inference pool requests in flight")
+INFERENCE_WORKER_RESTARTS = metrics.counter("inference_worker_restarts_total",
+                                            "Inference workers restarted after dying")
+
+
+class InferenceError(RuntimeError):
+    """Raised for requests lost with a worker or a stopped pool"""
+
+
+def _worker_main(worker_id, model_name, backend, runtime, shm_name, slot_bytes, tasks, results):
+    """
+    Worker process: load the model, then embed crops until told to stop
+
+    Results are ("ready", worker_id, timings), ("failed", worker_id, error)
+    or ("done", request_id, embedding list or None).
+    """
+    recognizer = FaceRecognizer(model_name=model_name, backend=backend, **runtime)
+    try:
+        timings = recognizer.warmup()
+    except Exception as e:
+        results.send(("failed", worker_id, str(e)))
+        return
+    shm = shared_memory.SharedMemory(name=shm_name)
+    results.send(("ready", worker_id, timings))
+
+    try:
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            request_id, slot, shape, dtype, data = task
+            if slot is None:
+                image = data
+            else:
+                image = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=slot * slot_bytes)
+            try:
+                embedding = recognizer.generate_embedding(image)
+            except Exception:
+                embedding = None
+            image = None  # release the view before the block can be closed
+            results.send(("done", request_id, None if embedding is None else embedding.tolist()))
+    finally:
+        shm.close()
+        results.close()
+
+
+class _Worker:
+    """Parent-side handle of a worker process"""
+
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+        self.process = None
+        self.tasks = None
+        self.results = None  # reading end of the worker's result pipe
+        self.pending = set()
+        self.ready = False
+        self.failed = False
+        self.load_restarts = 0  # restarts since the model last loaded
+
+
+class InferencePool:
+    """Spawned worker processes holding the face model, fed through shared memory"""
+
+    def __init__(self, model_name="Facenet", backend="opencv", workers=2, slot_bytes=640 * 480 * 3,
+                 slots=None, runtime="deepface", model_path=None, threads=0, load_restarts=3):
+        """
+        Initialize pool (processes start with start())
+
+        Args:
+            model_name: Face model loaded by every worker
+            backend: Detection backend for DeepFace
+            workers: Worker processes (each holds its own copy of the model)
+            slot_bytes: Largest crop passed through shared memory (larger
+                        crops are pickled instead)
+            slots: Crops in flight at most (default: two per worker)
+            runtime: Embedding runtime of the workers' FaceRecognizer
+            model_path: Exported model file for the onnx and tflite runtimes
+            threads: Inference threads per worker for onnx and tflite
+            load_restarts: Restarts of a worker that dies before loading the
+                           model (killed or crashed) before it is given up
+        """
+        self.model_name = model_name
+        self.backend = backend
+        self.runtime = {"runtime": runtime, "model_path": model_path, "threads": threads}
+        self.workers = [_Worker(i) for i in range(max(1, workers))]
+        self.slot_bytes = slot_bytes
+        self.slot_count = slots or 2 * len(self.workers)
+        self.load_restarts = load_restarts
+
+        self.settled = threading.Event()  # every worker loaded the model or failed to
+        self.failure = None
+        self.warmup_timings = {}
+        self.shm = None
+        self.free_slots = queue.Queue()
+        self.requests = {}  # request_id -> (future, slot, worker, start)
+        self.lock = threading.Lock()
+        self.ids = itertools.count(1)
+        self.running = False
+        self._context = multiprocessing.get_context("spawn")
+        self._collector = None
+
+    def start(self):
+        """Create the shared memory block and start the workers"""
+        if self.running:
+            return
+        self.shm = shared_memory.SharedMemory(create=True, size=self.slot_bytes * self.slot_count)
+        self.free_slots = queue.Queue()
+        for slot in range(self.slot_count):
+            self.free_slots.put(slot)
+        self.running = True
+        for worker in self.workers:
+            self._spawn(worker)
+        self._collector = threading.Thread(target=self._collect, name="inference-results", daemon=True)
+        self._collector.start()
+        log.info("Inference pool started: %d workers, %d slots of %d KB",
+                 len(self.workers), self.slot_count, self.slot_bytes // 1024)
+
+    def _spawn(self, worker):
+        # spawn: the services are multi-threaded, and forking them is unsafe
+        worker.tasks = self._context.Queue()
+        worker.results, writer = self._context.Pipe(duplex=False)
+        worker.ready = False
+        worker.process = self._context.Process(
+            target=_worker_main, name=f"inference-{worker.worker_id}", daemon=True,
+            args=(worker.worker_id, self.model_name, self.backend, self.runtime, self.shm.name,
+                  self.slot_bytes, worker.tasks, writer))
+        worker.process.start()
+        writer.close()  # the worker holds the only writing end, so its death reads as EOF
+
+    def stop(self, timeout=5.0):
+        """Stop the workers and free the shared memory; pending requests fail"""
+        if not self.running:
+            return
+        self.running = False
+        for worker in self.workers:
+            worker.tasks.put(None)
+        for worker in self.workers:
+            worker.process.join(timeout)
+            if worker.process.is_alive():
+                worker.process.terminate()
+                worker.process.join(1.0)
+        self._collector.join(timeout)
+        for worker in self.workers:
+            worker.tasks.close()
+            worker.results.close()
+
+        with self.lock:
+            requests, self.requests = self.requests, {}
+            for worker in self.workers:
+                worker.pending.clear()
+        for future, _, _, _ in requests.values():
+            future.set_exception(InferenceError("Inference pool stopped"))
+        INFERENCE_INFLIGHT.set(0)
+
+        self.shm.close()
+        self.shm.unlink()
+        self.shm = None
+        log.info("Inference pool stopped")
+
+    def submit(self, face_img, timeout=None):
+        """
+        Queue a crop for embedding
+
+        Args:
+            face_img: Face image (uint8, BGR or RGB)
+            timeout: Seconds to wait for a free slot (None: wait)
+
+        Returns:
+            Future resolving to the embedding array, or None if embedding
+            failed; raises InferenceError if the worker died or the pool stopped
+        """
+        if not self.running:
+            raise InferenceError("Inference pool not started")
+        face_img = np.ascontiguousarray(face_img)
+
+        slot = None
+        if face_img.nbytes <= self.slot_bytes:
+            try:
+                slot = self.free_slots.get(timeout=timeout)
+            except queue.Empty:
+                raise InferenceError("No free inference slot") from None
+            view = np.ndarray(face_img.shape, dtype=face_img.dtype,
+                              buffer=self.shm.buf, offset=slot * self.slot_bytes)
+            view[...] = face_img
+            del view
+
+        future = Future()
+        request_id = next(self.ids)
+        with self.lock:
+            # Least busy worker (a restarting one still queues its tasks)
+            workers = [w for w in self.workers if not w.failed]
+            if not workers:
+                if slot is not None:
+                    self.free_slots.put(slot)
+                raise InferenceError(f"No inference worker could load the model: {self.failure}")
+            worker = min(workers, key=lambda w: len(w.pending))
+            worker.pending.add(request_id)
+            self.requests[request_id] = (future, slot, worker, time.perf_counter())
+            INFERENCE_INFLIGHT.set(len(self.requests))
+            worker.tasks.put((request_id, slot, face_img.shape, face_img.dtype.str,
+                              None if slot is not None else face_img))
+        return future
+
+    def embed(self, face_img, timeout=None):
+        """
+        Embed a crop and wait for the result
+
+        Args:
+            face_img: Face image
+            timeout: Seconds to wait (None: wait)
+
+        Returns:
+            Embedding array, or None if embedding failed
+        """
+        return self.submit(face_img, timeout).result(timeout)
+
+    def _finish(self, request_id):
+        """Remove a request and free its slot; returns its future (or None)"""
+        with self.lock:
+            request = self.requests.pop(request_id, None)
+            if request is None:
+                return None
+            future, slot, worker, start = request
+            worker.pending.discard(request_id)
+            INFERENCE_INFLIGHT.set(len(self.requests))
+        if slot is not None:
+            self.free_slots.put(slot)
+        INFERENCE_REQUEST_SECONDS.observe(time.perf_counter() - start)
+        return future
+
+    def _collect(self):
+        """Result thread: complete futures, track readiness, restart dead workers"""
+        while self.running:
+            live = [w for w in self.workers if not w.failed]
+            channels = {w.results: w for w in live}
+            sentinels = {w.process.sentinel: w for w in live}
+            for ready in connection.wait(list(channels) + list(sentinels), timeout=0.5):
+                if ready in channels:
+                    self._receive(channels[ready])
+            for worker in sentinels.values():
+                if self.running and not worker.process.is_alive():
+                    self._restart(worker)
+            if all(w.ready or w.failed for w in self.workers):
+                self.settled.set()
+
+    def _receive(self, worker):
+        """Handle every message waiting on a worker's pipe"""
+        try:
+            while worker.results.poll():
+                self._handle(*worker.results.recv())
+        except (EOFError, OSError):
+            pass  # the worker exited; its sentinel restarts it
+
+    def _handle(self, kind, key, value):
+        """Handle one worker message"""
+        if kind == "done":
+            future = self._finish(key)
+            if future is not None:
+                future.set_result(None if value is None else np.array(value))
+        elif kind == "ready":
+            self.workers[key].ready = True
+            self.workers[key].load_restarts = 0
+            for step, seconds in value.items():
+                self.warmup_timings[step] = max(seconds, self.warmup_timings.get(step, 0.0))
+            log.info("Inference worker %d ready", key,
+                     extra={"data": {k: round(v, 3) for k, v in value.items()}})
+        elif kind == "failed":
+            # Not restarted: loading the model again would fail the same way
+            log.error("Inference worker %d failed to load the model: %s", key, value)
+            self.failure = value
+            self.workers[key].failed = True
+            self._fail_worker(self.workers[key], "Inference worker failed to load the model")
+
+    def _fail_worker(self, worker, reason):
+        """Fail the requests a worker holds"""
+        with self.lock:
+            request_ids = list(worker.pending)
+        for request_id in request_ids:
+            future = self._finish(request_id)
+            if future is not None:
+                future.set_exception(InferenceError(reason))
+
+    def _restart(self, worker):
+        """Fail the requests of a dead worker and start it again"""
+        self._receive(worker)  # results it sent before dying
+        if worker.failed:
+            return
+        if not worker.ready:
+            # Died loading the model without a "failed" message (OOM killer,
+            # segfault): give up after a few tries instead of looping forever
+            worker.load_restarts += 1
+            if worker.load_restarts > self.load_restarts:
+                log.error("Inference worker %d died loading the model %d times (exit code %s), giving up",
+                          worker.worker_id, worker.load_restarts, worker.process.exitcode)
+                self.failure = f"worker died loading the model (exit code {worker.process.exitcode})"
+                worker.failed = True
+                self._fail_worker(worker, "Inference worker could not load the model")
+                return
+        log.error("Inference worker %d died (exit code %s), restarting",
+                  worker.worker_id, worker.process.exitcode)
+        INFERENCE_WORKER_RESTARTS.inc()
+        worker.results.close()
+        with self.lock:
+            # New tasks go to the new process's queue from here on
+            worker.tasks.close()
+            self._spawn(worker)
+            lost = list(worker.pending)
+        for request_id in lost:
+            future = self._finish(request_id)
+            if future is not None:
+                future.set_exception(InferenceError("Inference worker died"))
+
+
+class PoolRecognizer(FaceRecognizer):
+    """FaceRecognizer whose embeddings are generated by an InferencePool"""
+
+    concurrent = True
+
+    def __init__(self, pool, model_name="Facenet", backend="opencv", gallery_precision="float32", rerank=5,
+                 embedding_cache=None, timeout=30.0, warmup_timeout=300.0):
+        """
+        Initialize pool recognizer
+
+        Args:
+            pool: InferencePool (started by warmup() if it is not running)
+            model_name: Model name (must match the pool's model)
+            backend: Detection backend (informational; the pool's is used)
+            gallery_precision: Gallery matrix storage (matching runs here)
+            rerank: Gallery candidates scored again at full precision
+            embedding_cache: Optional EmbeddingCache
+            timeout: Seconds to wait for an embedding
+            warmup_timeout: Seconds warmup() waits for the workers to load the model
+        """
+        super().__init__(model_name=model_name, backend=backend,
+                         gallery_precision=gallery_precision, rerank=rerank,
+                         embedding_cache=embedding_cache)
+        self.pool = pool
+        self.timeout = timeout
+        self.warmup_timeout = warmup_timeout
+
+    def warmup(self):
+        """
+        Start the pool and wait until every worker has loaded the model
+
+        Waits warmup_timeout seconds at most; the pool serves with the
+        workers that are ready by then.
+
+        Returns:
+            Dict of step durations in seconds (slowest worker per step)
+
+        Raises:
+            InferenceError: If no worker loaded the model
+        """
+        start = time.perf_counter()
+        self.pool.start()
+        settled = self.pool.settled.wait(self.warmup_timeout)
+        if not any(w.ready for w in self.pool.workers):
+            if not settled:
+                raise InferenceError(f"No inference worker loaded the model in {self.warmup_timeout:.0f}s")
+            raise InferenceError(f"No inference worker could load the model: {self.pool.failure}")
+        if not settled:
+            log.warning("Some inference workers are still loading the model after %.0fs", self.warmup_timeout)
+        self.warmup_timings = dict(self.pool.warmup_timings, pool_ready=time.perf_counter() - start)
+        self.ready.set()
+        return self.warmup_timings
+
+    def submit_embedding(self, face_img, track_id=None):
+        """
+        Start embedding a crop on a pool worker without waiting
+
+        The caller keeps processing frames and collects the result once
+        the future is done (an embedding cache hit resolves at once).
+
+        Args:
+            face_img: Face image (BGR or RGB)
+            track_id: Optional ID of the face track the crop belongs to
+
+        Returns:
+            Future resolving to the embedding array, or None if embedding failed
+        """
+        if self.embedding_cache is None:
+            return self._submit(face_img)
+        return self.embedding_cache.get_or_submit(face_img, self._submit, track_id)
+
+    def _submit(self, face_img):
+        """Queue a crop on the pool; the future resolves to None on failure"""
+        result = Future()
+        start = time.perf_counter()
+
+        def resolve(future):
+            try:
+                embedding = future.result()
+            except Exception as e:
+                log.error("Inference pool request failed: %s", e)
+                embedding = None
+            EMBEDDING_SECONDS.observe(time.perf_counter() - start)
+            if embedding is None:
+                EMBEDDING_FAILURES.inc()
+            result.set_result(embedding)
+
+        try:
+            future = self.pool.submit(face_img, self.timeout)
+        except Exception as e:
+            future = Future()
+            future.set_exception(e)
+        future.add_done_callback(resolve)
+        return result
+
+    def generate_embedding(self, face_img):
+        """
+        Generate face embedding on a pool worker
+
+        Args:
+            face_img: Face image (BGR or RGB)
+
+        Returns:
+            Numpy array of face embedding or None if failed
+        """
+        try:
+            with EMBEDDING_SECONDS.time():
+                embedding = self.pool.embed(face_img, self.timeout)
+        except Exception as e:
+            log.error("Inference pool request failed: %s", e)
+            embedding = None
+        if embedding is None:
+            EMBEDDING_FAILURES.inc()
+        return embedding
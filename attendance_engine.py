@@ -6,6 +6,21 @@ import cv2
 import time
 from datetime import datetime
 
+from ai.face_recognition import close_candidates
+from config import ULTRASONIC_ENABLED, RECOGNITION_TOP_K, RECOGNITION_MARGIN, INFERENCE_TIMEOUT
+from database.attendance_cache import MarkedTodayCache
+from utils import metrics
+from utils.logger import get_logger
+
+
+log = get_logger("engine")
+
+
+ENGINE_STATE_SECONDS = metrics.histogram("engine_state_seconds",
+                                         "Frame processing latency per engine state", labels=("state",))
+ENGINE_RESULTS = metrics.counter("engine_results_total", "Frame results per engine outcome", labels=("result",))
+GALLERY_SIZE = metrics.gauge("gallery_students", "Students loaded for recognition")
+
 
 class AttendanceEngine:
     """
@@ -20,7 +35,9 @@ class AttendanceEngine:
     """
     
     def __init__(self, db_manager, face_detector, face_recognizer, aruco_detector,
-                 ultrasonic_sensor1, ultrasonic_sensor2, lcd, buzzer, threshold=0.6):
+                 ultrasonic_sensor1, ultrasonic_sensor2, lcd, buzzer, threshold=0.6,
+                 clock=None, sleep=None, preview=None, marked_today=None,
+                 top_k=RECOGNITION_TOP_K, margin=RECOGNITION_MARGIN):
         """
         Initialize attendance engine
         
@@ -34,6 +51,13 @@ class AttendanceEngine:
             lcd: LCD display instance
             buzzer: Buzzer instance
             threshold: Face recognition threshold
+            clock: Time source (default: time.time); replay injects a virtual clock
+            sleep: Sleep function (default: time.sleep)
+            preview: Optional PreviewPublisher receiving every processed frame
+            marked_today: MarkedTodayCache (default: one over db_manager)
+            top_k: Candidates considered per face
+            margin: Similarity gap the best candidate needs to be accepted
+                    alone; closer candidates are told apart by their ArUco
         """
         self.db = db_manager
         self.face_detector = face_detector
@@ -44,6 +68,12 @@ class AttendanceEngine:
         self.lcd = lcd
         self.buzzer = buzzer
         self.threshold = threshold
+        self.top_k = top_k
+        self.margin = margin
+        self.clock = clock or time.time
+        self.sleep = sleep or time.sleep
+        self.preview = preview
+        self.ultrasonic_enabled = ULTRASONIC_ENABLED
         
         # State management for step-by-step process
         self.current_state = "IDLE"  # Start in IDLE, activate when presence detected
@@ -52,10 +82,12 @@ class AttendanceEngine:
         self.display_message_frame = None  # Store frame for display
         self.displaying_message = False  # Flag to skip presence check during message display
         self.message_display_time = 5.0  # Time to show success/error messages
-        self.state_start_time = time.time()
+        self.state_start_time = self.clock()
         self.face_wait_time = 5.0  # Seconds to wait before detecting face
         self.aruco_wait_time = 5.0  # Seconds to wait before detecting ArUco
         self.detection_start_time = None  # When actual detection started
+        self.pending_embedding = None  # Future of the face being embedded (frames keep flowing meanwhile)
+        self.embedding_timeout = INFERENCE_TIMEOUT  # Seconds to wait for it
         
         # Presence tracking for idle timeout
         self.last_presence_time = None  # Last time presence was detected
@@ -63,6 +95,7 @@ class AttendanceEngine:
         self.presence_distance = 45  # Detection distance in cm
         
         # Face stability tracking
+        self.face_track = 0  # Changes whenever the face is lost (scopes the embedding cache)
         self.face_stable_start = None  # When stable face detection started
         self.last_face_position = None  # Last detected face position (x, y, w, h)
         self.face_stability_threshold = 2.5  # Seconds face must be stable
@@ -73,8 +106,12 @@ class AttendanceEngine:
         self.max_aruco_retries = 3  # Allow 3 attempts before full reset
         
         # Load all students from database
-        self.students_db = db_manager.get_all_students()
-        print(f"[Engine] Loaded {len(self.students_db)} students from database")
+        self.students_db = face_recognizer.load_gallery(db_manager.get_all_students())
+        GALLERY_SIZE.set(len(self.students_db))
+        log.info("Loaded %d students from database", len(self.students_db))
+        
+        # Students already marked today (repeat check-ins stop after recognition)
+        self.marked_today = marked_today or MarkedTodayCache(db_manager)
         
     def check_presence(self, min_distance=30, max_distance=100):
         """
@@ -83,11 +120,8 @@ class AttendanceEngine:
         Returns:
             True if presence detected within valid range
         """
-        # Import config to check if ultrasonic is enabled
-        from config import ULTRASONIC_ENABLED
-        
         # If ultrasonic sensors are disabled, always return True (presence assumed)
-        if not ULTRASONIC_ENABLED:
+        if not self.ultrasonic_enabled:
             return True
         
         # Check both sensors
@@ -113,12 +147,37 @@ class AttendanceEngine:
             self.displaying_message = False
             self.face_stable_start = None
             self.last_face_position = None
+            # The next person may already be in frame (no face-less frame in
+            # between): don't let them share the previous one's embeddings
+            self.face_track += 1
         else:
             # Partial reset - go back to ArUco waiting (keep recognized student)
             self.current_state = "WAITING_FOR_ARUCO"
             
-        self.state_start_time = time.time()
+        self.state_start_time = self.clock()
         self.detection_start_time = None
+        self.pending_embedding = None
+        
+    def _submit_embedding(self, face_roi):
+        """Start embedding a face crop; the result is collected by a later frame"""
+        self.pending_embedding = self.face_recognizer.submit_embedding(face_roi, track_id=self.face_track)
+        
+    def _take_embedding(self):
+        """
+        Collect the pending embedding once it is ready
+        
+        Returns:
+            (done, embedding): done is False while the embedding is still
+            being generated; embedding is None if it failed
+        """
+        if not self.pending_embedding.done():
+            return False, None
+        future, self.pending_embedding = self.pending_embedding, None
+        try:
+            return True, future.result()
+        except Exception as e:
+            log.error("Embedding failed: %s", e)
+            return True, None
         
     def process_frame(self, frame):
         """
@@ -131,7 +190,7 @@ class AttendanceEngine:
             Tuple: (success, message, processed_frame)
         """
         display_frame = frame.copy()
-        current_time = time.time()
+        current_time = self.clock()
         
         # STATE 0: IDLE (System sleeping, waiting for presence)
         if self.current_state == "IDLE":
@@ -186,6 +245,7 @@ class AttendanceEngine:
                             # Face has been stable for 5 seconds - start recognition
                             self.current_state = "DETECTING_FACE"
                             self.detection_start_time = current_time
+                            self._submit_embedding(face_roi)
                             cv2.putText(display_frame, "Starting recognition...", (10, 50),
                                        cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 0), 2)
                     else:
@@ -205,6 +265,8 @@ class AttendanceEngine:
                 self.last_face_position = (x, y, w, h)
             else:
                 # No face detected
+                if self.last_face_position is not None:
+                    self.face_track += 1
                 self.face_stable_start = None
                 self.last_face_position = None
                 cv2.putText(display_frame, "Attendance System Ready", (10, 50),
@@ -231,13 +293,28 @@ class AttendanceEngine:
                 
                 # Quality check removed - proceed directly to recognition
                 # Let cosine similarity determine if face quality is sufficient
+                if self.pending_embedding is None:
+                    self._submit_embedding(face_roi)
+                
+                # Keep showing frames while the embedding is generated
+                done, embedding = self._take_embedding()
+                if not done:
+                    cv2.putText(display_frame, "Recognizing...", (x, y-10),
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 255), 2)
+                    if elapsed > self.face_wait_time + self.embedding_timeout:
+                        log.warning("Embedding not ready after %.0fs, starting over", self.embedding_timeout)
+                        self.reset_state(full_reset=True)
+                        return False, "face_timeout", display_frame
+                    return False, "recognizing", display_frame
                 
-                # Recognize face
-                student_id, name, expected_aruco, similarity = self.face_recognizer.recognize_face(
-                    face_roi, self.students_db, self.threshold
+                # Recognize face: the best candidates, and those too close to
+                # the best to tell apart by face alone
+                candidates = close_candidates(
+                    self.face_recognizer.match_topk(embedding, self.students_db, self.top_k, self.threshold),
+                    self.margin
                 )
                 
-                if student_id is None:
+                if not candidates:
                     cv2.putText(display_frame, "Face not recognized", (x, y-10),
                                cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 2)
                     
@@ -246,24 +323,40 @@ class AttendanceEngine:
                         self.reset_state(full_reset=True)
                     return False, "not_recognized", display_frame
                 
-                # Face recognized! Move to next state
-                cv2.putText(display_frame, f"Welcome {name}!", (x, y-10),
-                           cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+                student_id, name, expected_aruco, similarity = candidates[0]
+                
+                # Already checked in today: no need for the ArUco step
+                if all(self.marked_today.is_marked(c[0]) for c in candidates):
+                    cv2.putText(display_frame, f"{name}: already marked today!", (10, 150),
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 0, 0), 2)
+                    return self._show_already_marked(display_frame, current_time)
+                
+                # Face recognized! Move to next state; with several close
+                # candidates the ArUco marker decides which one it is
+                if len(candidates) == 1:
+                    cv2.putText(display_frame, f"Welcome {name}!", (x, y-10),
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+                else:
+                    cv2.putText(display_frame, "Show your ArUco to confirm", (x, y-10),
+                               cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
                 
                 self.recognized_student = {
                     'id': student_id,
                     'name': name,
                     'expected_aruco': expected_aruco,
-                    'similarity': similarity
+                    'similarity': similarity,
+                    'candidates': candidates
                 }
                 self.current_state = "WAITING_FOR_ARUCO"
                 self.state_start_time = current_time
                 self.detection_start_time = None
                 self.aruco_retry_count = 0  # Reset retry counter
                 
-                return False, "face_recognized", display_frame
+                return False, "face_recognized" if len(candidates) == 1 else "face_ambiguous", display_frame
             else:
-                # No face detected
+                # No face detected (an embedding in progress was of the lost face)
+                self.face_track += 1
+                self.pending_embedding = None
                 faces = self.face_detector.detect_faces(frame)
                 if len(faces) > 1:
                     cv2.putText(display_frame, "Multiple faces! Only one person", (10, 100),
@@ -286,7 +379,7 @@ class AttendanceEngine:
             # Show instruction for 5 seconds
             cv2.putText(display_frame, f"Show your ArUco marker", (10, 50),
                        cv2.FONT_HERSHEY_SIMPLEX, 1.0, (0, 255, 255), 2)
-            cv2.putText(display_frame, f"Student: {self.recognized_student['name']}", (10, 100),
+            cv2.putText(display_frame, f"Student: {self._candidate_label(1)}", (10, 100),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
             
             # Show retry count if retrying
@@ -311,7 +404,7 @@ class AttendanceEngine:
             
             cv2.putText(display_frame, "Detecting ArUco marker...", (10, 50),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.9, (0, 255, 0), 2)
-            cv2.putText(display_frame, f"Expected ID: {self.recognized_student['expected_aruco']}", (10, 100),
+            cv2.putText(display_frame, f"Expected ID: {self._candidate_label(2)}", (10, 100),
                        cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
             
             # Detect ArUco markers
@@ -329,9 +422,11 @@ class AttendanceEngine:
                 detected_aruco = marker_ids[0]
             
             if detected_aruco is not None:
-                # Verify ArUco matches student
-                if detected_aruco != self.recognized_student['expected_aruco']:
-                    cv2.putText(display_frame, f"Wrong ArUco! Expected: {self.recognized_student['expected_aruco']}, Got: {detected_aruco}",
+                # Verify ArUco matches the student (one of the close candidates)
+                candidate = next((c for c in self.recognized_student['candidates']
+                                  if c[2] == detected_aruco), None)
+                if candidate is None:
+                    cv2.putText(display_frame, f"Wrong ArUco! Expected: {self._candidate_label(2)}, Got: {detected_aruco}",
                                (10, 150), cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
                     
                     # Timeout - retry ArUco only
@@ -345,16 +440,16 @@ class AttendanceEngine:
                             self.reset_state(full_reset=False)
                     return False, "mismatch", display_frame
                 
-                # ArUco matches! Check if already marked today
-                if self.db.check_attendance_today(self.recognized_student['id']):
+                # ArUco matches! Mark attendance (unless marked meanwhile)
+                student_id, name, expected_aruco, similarity = candidate
+                self.recognized_student.update(id=student_id, name=name,
+                                               expected_aruco=expected_aruco, similarity=similarity)
+                success = self.marked_today.mark(self.recognized_student['id'])
+                
+                if not success and self.marked_today.is_marked(self.recognized_student['id']):
                     cv2.putText(display_frame, "Already marked today!", (10, 150),
                                cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 0, 0), 2)
-                    time.sleep(2)
-                    self.reset_state(full_reset=True)
-                    return False, "already_marked", display_frame
-                
-                # Mark attendance
-                success = self.db.mark_attendance(self.recognized_student['id'])
+                    return self._show_already_marked(display_frame, current_time)
                 
                 if success:
                     cv2.putText(display_frame, f"Attendance Checked", (10, 150),
@@ -435,6 +530,18 @@ class AttendanceEngine:
         
         return False, "unknown_state", display_frame
             
+    def _candidate_label(self, field):
+        """Names (field 1) or ArUco IDs (field 2) of the recognized candidates, for display"""
+        return " / ".join(str(c[field]) for c in self.recognized_student['candidates'])
+        
+    def _show_already_marked(self, display_frame, current_time):
+        """Show the "already marked" frame for the error display time, then start over"""
+        self.display_message_frame = display_frame.copy()
+        self.displaying_message = True
+        self.current_state = "SHOW_ERROR"
+        self.state_start_time = current_time
+        return False, "already_marked", display_frame
+            
     def run_attendance_check(self, frame):
         """
         Main attendance check pipeline
@@ -445,12 +552,21 @@ class AttendanceEngine:
         Returns:
             Tuple: (success, message, processed_frame)
         """
-        current_time = time.time()
+        success, message, display_frame = self._run_attendance_check(frame)
+        
+        if self.preview is not None:
+            self.preview.publish(display_frame)
+        
+        return success, message, display_frame
+        
+    def _run_attendance_check(self, frame):
+        """Pipeline body of run_attendance_check"""
+        current_time = self.clock()
         
         # If displaying messages, just continue showing them (don't process new frames)
         if self.displaying_message:
             if self.current_state == "SHOW_SUCCESS":
-                elapsed = time.time() - self.state_start_time
+                elapsed = self.clock() - self.state_start_time
                 if elapsed < self.message_display_time:
                     return False, "showing_success", self.display_message_frame
                 else:
@@ -458,7 +574,7 @@ class AttendanceEngine:
                     self.reset_state(full_reset=True)
                     return False, "success_displayed", frame
             elif self.current_state == "SHOW_ERROR":
-                elapsed = time.time() - self.state_start_time
+                elapsed = self.clock() - self.state_start_time
                 if elapsed < 3.0:
                     return False, "showing_error", self.display_message_frame
                 else:
@@ -479,7 +595,7 @@ class AttendanceEngine:
                     idle_elapsed = current_time - self.last_presence_time
                     if idle_elapsed > self.idle_timeout:
                         # No presence for 10 seconds - go to IDLE
-                        print(f"\n[System] No presence detected for {self.idle_timeout}s - Going to standby mode")
+                        log.info("No presence detected for %ss - going to standby mode", self.idle_timeout)
                         self.current_state = "IDLE"
                         self.reset_state(full_reset=True)
                         self.current_state = "IDLE"  # Override reset to stay in IDLE
@@ -487,4 +603,9 @@ class AttendanceEngine:
                         return False, "entering_idle", frame
             
         # Process frame for attendance
-        return self.process_frame(frame)
\ No newline at end of file
+        state = self.current_state
+        with ENGINE_STATE_SECONDS.labels(state).time():
+            success, message, display_frame = self.process_frame(frame)
+        
+        ENGINE_RESULTS.labels("marked" if success else message).inc()
+        return success, message, display_frame
\ No newline at end of file
@@ -0,0 +1 @@
+# Benchmarks Module
\ No newline at end of file
@@ -0,0 +1,145 @@
+"""
+Face alignment benchmark
+Rotates face photos by increasing head tilts and reports, per tilt, how
+often the eyes are found and what alignment costs. With --embed it also
+embeds each tilted face with and without alignment and compares it with
+the same face upright (the enrollment), on FaceRecognizer's 0-1 scale:
+the mean similarity and the share above FACE_RECOGNITION_THRESHOLD, i.e.
+the faces recognized on the first attempt.
+
+Usage:
+    python -m benchmarks.alignment --images photos/                # cost and landmark hit rate
+    python -m benchmarks.alignment --images photos/ --embed --method yunet
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.face_aligner import FaceAligner
+from ai.face_detector import FaceDetector
+from benchmarks.common import summarize_latencies, environment_info, write_json
+from benchmarks.micro import RESULTS_DIR
+from config import (FACE_DETECTION_BACKEND, FACE_MODEL, FACE_RECOGNITION_THRESHOLD, FACE_ALIGNMENT_MODEL_PATH,
+                    EMBEDDING_RUNTIME, EMBEDDING_MODEL_PATH, EMBEDDING_THREADS)
+from utils.similarity import cosine_similarity
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def rotate(image, angle):
+    """Image rotated about its centre (edges replicated, size kept)"""
+    height, width = image.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(image, matrix, (width, height), borderMode=cv2.BORDER_REPLICATE)
+
+
+def crops(detector, aligner, image):
+    """
+    Margin crop and aligned crop of the single face in an image
+
+    Returns:
+        Tuple: (margin crop or None, aligned crop or None, alignment seconds)
+    """
+    face_roi, bbox = detector.get_single_face(image)
+    if face_roi is None:
+        return None, None, None
+    start = time.perf_counter()
+    aligned = aligner.align(image, bbox)
+    return face_roi, aligned, time.perf_counter() - start
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Face alignment cost and tilt robustness")
+    parser.add_argument("--images", required=True, help="Folder of photos with one face each")
+    parser.add_argument("--angles", default="0,5,10,15,20", help="Head tilts in degrees (default: %(default)s)")
+    parser.add_argument("--method", default="eyes", choices=("eyes", "yunet"),
+                        help="Landmark source (default: %(default)s)")
+    parser.add_argument("--embed", action="store_true", help="Also compare embeddings (loads the face model)")
+    parser.add_argument("--output", help="Results JSON (default: benchmarks/results/alignment-<time>.json)")
+    args = parser.parse_args()
+
+    names = sorted(n for n in os.listdir(args.images) if n.lower().endswith(IMAGE_EXTENSIONS))
+    images = [img for img in (cv2.imread(os.path.join(args.images, n)) for n in names) if img is not None]
+    angles = [float(a) for a in args.angles.split(",")]
+    detector = FaceDetector(backend=FACE_DETECTION_BACKEND, alignment="none")
+    aligner = FaceAligner(args.method, model_path=FACE_ALIGNMENT_MODEL_PATH)
+
+    recognizer = None
+    if args.embed:
+        from ai.face_recognition import FaceRecognizer
+        recognizer = FaceRecognizer(model_name=FACE_MODEL, backend=FACE_DETECTION_BACKEND,
+                                    runtime=EMBEDDING_RUNTIME, model_path=EMBEDDING_MODEL_PATH,
+                                    threads=EMBEDDING_THREADS)
+        recognizer.warmup()
+
+    # Enrollment: each face upright, through both pipelines
+    enrolled = []
+    for image in images:
+        face_roi, aligned, _ = crops(detector, aligner, image)
+        if face_roi is None:
+            continue
+        if recognizer is None:
+            enrolled.append((image, None, None))
+        elif aligned is not None:
+            enrolled.append((image, recognizer.generate_embedding(face_roi), recognizer.generate_embedding(aligned)))
+    print(f"[Benchmark] {len(enrolled)} of {len(images)} photos with one detected face, method {args.method}")
+
+    results = []
+    for angle in angles:
+        detected = found = 0
+        timings, plain_scores, aligned_scores = [], [], []
+        for image, plain_reference, aligned_reference in enrolled:
+            face_roi, aligned, seconds = crops(detector, aligner, rotate(image, angle))
+            if face_roi is None:
+                continue
+            detected += 1
+            timings.append(seconds)
+            if aligned is None:
+                continue
+            found += 1
+            if recognizer is not None and plain_reference is not None and aligned_reference is not None:
+                plain_scores.append(cosine_similarity(plain_reference, recognizer.generate_embedding(face_roi)))
+                aligned_scores.append(cosine_similarity(aligned_reference, recognizer.generate_embedding(aligned)))
+
+        result = {"angle": angle, "faces": detected, "landmarks_found": found,
+                  "align": summarize_latencies(timings)}
+        if plain_scores:
+            for key, scores in (("unaligned", plain_scores), ("aligned", aligned_scores)):
+                result[key] = {"mean_similarity": float(np.mean(scores)),
+                               "first_attempt": float(np.mean(np.array(scores) >= FACE_RECOGNITION_THRESHOLD))}
+        results.append(result)
+
+    print(f"\n  {'tilt':>5s} {'faces':>5s} {'eyes':>6s} {'align p50':>10s}"
+          + (f" {'unaligned':>17s} {'aligned':>17s}" if args.embed else ""))
+    for r in results:
+        found = f"{r['landmarks_found'] / r['faces'] * 100:5.0f}%" if r["faces"] else "    -"
+        line = f"  {r['angle']:5.0f} {r['faces']:5d} {found:>6s} {r['align']['p50_ms']:8.2f}ms"
+        for key in ("unaligned", "aligned"):
+            if key in r:
+                line += f"  {r[key]['mean_similarity']:.3f} ({r[key]['first_attempt'] * 100:4.0f}%)"
+        print(line)
+    if args.embed:
+        print(f"  (mean similarity to the upright face, and share >= {FACE_RECOGNITION_THRESHOLD})")
+
+    data = {
+        "environment": environment_info(),
+        "method": args.method,
+        "photos": len(images),
+        "threshold": FACE_RECOGNITION_THRESHOLD,
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"alignment-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    write_json(output, data)
+
+
+if __name__ == "__main__":
+    main()
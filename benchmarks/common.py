@@ -0,0 +1,157 @@
+"""
+Shared helpers for the benchmark scripts
+Timing proxies, latency summaries and JSON result files
+"""
+import json
+import os
+import platform
+import time
+from datetime import datetime
+
+import numpy as np
+
+
+def summarize_latencies(samples):
+    """
+    Summarize latency samples
+
+    Args:
+        samples: List of durations in seconds
+
+    Returns:
+        Dict with count, mean, p50, p90, p99 and max in milliseconds
+    """
+    if not samples:
+        return {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0,
+                "p90_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+
+    ms = np.asarray(samples, dtype=np.float64) * 1000.0
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {
+        "count": int(ms.size),
+        "mean_ms": round(float(ms.mean()), 3),
+        "p50_ms": round(float(p50), 3),
+        "p90_ms": round(float(p90), 3),
+        "p99_ms": round(float(p99), 3),
+        "max_ms": round(float(ms.max()), 3),
+    }
+
+
+class StageRecorder:
+    """Collects latency samples per named stage"""
+
+    def __init__(self):
+        """Initialize empty recorder"""
+        self.samples = {}
+
+    def record(self, stage, duration):
+        """
+        Record one sample
+
+        Args:
+            stage: Stage name
+            duration: Duration in seconds
+        """
+        self.samples.setdefault(stage, []).append(duration)
+
+    def summary(self):
+        """
+        Summarize all stages
+
+        Returns:
+            Dict mapping stage name to latency summary
+        """
+        return {stage: summarize_latencies(values)
+                for stage, values in sorted(self.samples.items())}
+
+
+class TimedProxy:
+    """
+    Wraps an object and times calls to selected methods
+
+    Attribute access is forwarded to the wrapped object, so the proxy can be
+    handed to code that expects the real component.
+    """
+
+    def __init__(self, target, prefix, recorder, methods):
+        """
+        Initialize proxy
+
+        Args:
+            target: Object to wrap
+            prefix: Stage name prefix (e.g. "face_detector")
+            recorder: StageRecorder receiving the samples
+            methods: Names of the methods to time
+        """
+        self._target = target
+        self._prefix = prefix
+        self._recorder = recorder
+        self._methods = set(methods)
+
+    def __getattr__(self, name):
+        attr = getattr(self._target, name)
+        if name not in self._methods:
+            return attr
+
+        stage = f"{self._prefix}.{name}"
+        recorder = self._recorder
+
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                recorder.record(stage, time.perf_counter() - start)
+
+        return timed
+
+
+def time_call(func, repeat=20, warmup=2):
+    """
+    Time repeated calls of a zero-argument function
+
+    Args:
+        func: Callable to time
+        repeat: Number of timed calls
+        warmup: Number of untimed calls first
+
+    Returns:
+        Latency summary dict
+    """
+    for _ in range(warmup):
+        func()
+
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+
+    return summarize_latencies(samples)
+
+
+def environment_info():
+    """Describe the machine a benchmark ran on"""
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+    }
+
+
+def write_json(path, data):
+    """
+    Write benchmark results as JSON
+
+    Args:
+        path: Output file path
+        data: JSON-serializable results
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+    print(f"[Benchmark] Results written to {path}")
@@ -0,0 +1,210 @@
+"""
+Attendance query benchmark, schema before and after the migrations
+Builds a populated database at schema version 1 (text date and time, the
+original indexes), copies it and migrates the copy to the latest version,
+then times the application's attendance queries and a single mark on both
+and prints each query plan, so index changes can be checked against real
+queries before they ship.
+
+Usage:
+    python -m benchmarks.db_queries                      # 1000 students, 180 days
+    python -m benchmarks.db_queries --students 300 --days 30
+"""
+import argparse
+import os
+import pickle
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks import fixtures
+from benchmarks.common import time_call, environment_info, write_json
+from benchmarks.micro import RESULTS_DIR
+from database.migrations import SCHEMA_VERSION, migrate, schema_version
+
+
+def _queries(students, yesterday, month_ago):
+    """(name, SQL, parameters) for the attendance queries the services run"""
+    return (
+        # MarkedTodayCache
+        ("marked_ids_by_date",
+         "SELECT student_id FROM attendance WHERE date = ?",
+         (yesterday,)),
+        # DatabaseManager.get_attendance_by_date
+        ("attendance_by_date",
+         """SELECT s.name, a.time, a.status FROM attendance a
+            JOIN students s ON a.student_id = s.id
+            WHERE a.date = ? ORDER BY a.time""",
+         (yesterday,)),
+        # Attendance page, default sort
+        ("attendance_page",
+         """SELECT s.id, s.name, s.aruco_id, a.time, a.status FROM attendance a
+            JOIN students s ON a.student_id = s.id
+            WHERE a.date = ? ORDER BY a.time ASC, a.id ASC LIMIT 50 OFFSET 0""",
+         (yesterday,)),
+        # Check-in lookup (manage_students.py, the web delete)
+        ("student_on_date",
+         "SELECT id, time FROM attendance WHERE student_id = ? AND date = ?",
+         (students // 2, yesterday)),
+        # A student's history
+        ("student_history",
+         "SELECT date, time, status FROM attendance WHERE student_id = ? ORDER BY date DESC",
+         (students // 2,)),
+        # AttendanceReports.iter_records (CSV/Excel export)
+        ("records_30_days",
+         """SELECT a.date, a.time, s.id, s.name, s.aruco_id, a.status FROM attendance a
+            JOIN students s ON a.student_id = s.id
+            WHERE a.date BETWEEN ? AND ? ORDER BY a.date, a.time""",
+         (month_ago, yesterday)),
+        # AttendanceReports.student_summary, first page
+        ("student_summary_30_days",
+         """SELECT s.id, s.name, s.aruco_id, COUNT(a.id), MIN(a.date), MAX(a.date)
+            FROM students s
+            LEFT JOIN attendance a ON a.student_id = s.id AND a.date BETWEEN ? AND ?
+            GROUP BY s.id ORDER BY s.name COLLATE NOCASE, s.id LIMIT 50 OFFSET 0""",
+         (month_ago, yesterday)),
+    )
+
+
+def build_legacy_database(path, students, days):
+    """
+    Create a populated database at schema version 1
+
+    Args:
+        path: Database file path
+        students: Number of students
+        days: Days of attendance history
+
+    Returns:
+        Number of attendance rows
+    """
+    rng = np.random.default_rng(0)
+    conn = sqlite3.connect(path)
+    migrate(conn, target=1)
+    conn.isolation_level = ""
+    conn.executemany(
+        "INSERT INTO students (name, aruco_id, face_embedding) VALUES (?, ?, ?)",
+        ((f"Student {i + 1}", i, pickle.dumps(fixtures.random_embedding(rng)))
+         for i in range(students)))
+    rows = fixtures.attendance_history(students, days)
+    conn.executemany("INSERT INTO attendance (student_id, date, time, status) VALUES (?, ?, ?, ?)",
+                     rows)
+    conn.commit()
+    conn.execute("ANALYZE")
+    conn.close()
+    return len(rows)
+
+
+def query_plan(conn, sql, params):
+    """EXPLAIN QUERY PLAN as one line"""
+    return "; ".join(row[-1] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params))
+
+
+def bench_database(path, queries, students, repeat):
+    """
+    Time the queries and a committed mark on one database
+
+    Args:
+        path: Database file path
+        queries: Sequence of (name, SQL, parameters)
+        students: Number of students
+        repeat: Timed calls per query
+
+    Returns:
+        Dict: schema version, file size, per-query latency and plan
+    """
+    conn = sqlite3.connect(path)
+    results = {}
+    for name, sql, params in queries:
+        summary = time_call(lambda: conn.execute(sql, params).fetchall(), repeat=repeat)
+        summary["plan"] = query_plan(conn, sql, params)
+        results[name] = summary
+
+    # One committed insert per call, like DatabaseManager.mark_attendance
+    version = schema_version(conn)
+    ids = iter(range(1, students + 1))
+    date_str = (datetime.now().date() + timedelta(days=1)).strftime("%Y-%m-%d")
+    if version >= 2:
+        sql = "INSERT INTO attendance (student_id, date, time, status, ts, device) VALUES (?, ?, ?, ?, ?, ?)"
+        row = lambda: (next(ids), date_str, "08:00:00", "Present", int(time.time()), "bench")
+    else:
+        sql = "INSERT INTO attendance (student_id, date, time, status) VALUES (?, ?, ?, ?)"
+        row = lambda: (next(ids), date_str, "08:00:00", "Present")
+
+    def mark():
+        conn.execute(sql, row())
+        conn.commit()
+
+    results["mark_attendance"] = time_call(mark, repeat=min(repeat, students - 2))
+    conn.close()
+    return {"schema_version": version, "size_bytes": os.path.getsize(path), "queries": results}
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Attendance queries before and after the schema migrations")
+    parser.add_argument("--students", type=int, default=1000, help="Students (default: %(default)s)")
+    parser.add_argument("--days", type=int, default=180, help="Days of history (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=30, help="Timed calls per query (default: %(default)s)")
+    parser.add_argument("--output", help="Results JSON (default: benchmarks/results/db-queries-<time>.json)")
+    args = parser.parse_args()
+
+    today = datetime.now().date()
+    yesterday = (today - timedelta(days=1)).strftime("%Y-%m-%d")
+    month_ago = (today - timedelta(days=30)).strftime("%Y-%m-%d")
+    queries = _queries(args.students, yesterday, month_ago)
+
+    with tempfile.TemporaryDirectory(prefix="bench_db_queries_") as tmp:
+        before_path = os.path.join(tmp, "before.db")
+        after_path = os.path.join(tmp, "after.db")
+
+        print(f"[Benchmark] Building a version 1 database: {args.students} students, {args.days} days")
+        rows = build_legacy_database(before_path, args.students, args.days)
+        shutil.copy(before_path, after_path)
+
+        conn = sqlite3.connect(after_path)
+        start = time.perf_counter()
+        migrate(conn)
+        migration_seconds = time.perf_counter() - start
+        conn.execute("ANALYZE")
+        conn.close()
+        print(f"[Benchmark] Migrated {rows} attendance rows to version {SCHEMA_VERSION} "
+              f"in {migration_seconds:.2f} s")
+
+        before = bench_database(before_path, queries, args.students, args.repeat)
+        after = bench_database(after_path, queries, args.students, args.repeat)
+
+    print(f"\n  {'query':26s} {'before p50':>11s} {'after p50':>11s} {'change':>8s}")
+    for name, summary in before["queries"].items():
+        old_ms, new_ms = summary["p50_ms"], after["queries"][name]["p50_ms"]
+        change = (new_ms / old_ms - 1) * 100 if old_ms else 0.0
+        print(f"  {name:26s} {old_ms:9.3f}ms {new_ms:9.3f}ms {change:+7.1f}%")
+    print(f"  {'file size':26s} {before['size_bytes'] / 1e6:9.2f}MB {after['size_bytes'] / 1e6:9.2f}MB")
+
+    print("\n[Benchmark] Query plans (before -> after)")
+    for name, _, _ in queries:
+        print(f"  {name}:\n    {before['queries'][name]['plan']}\n    {after['queries'][name]['plan']}")
+
+    data = {
+        "environment": environment_info(),
+        "students": args.students,
+        "days": args.days,
+        "attendance_rows": rows,
+        "migration_seconds": round(migration_seconds, 3),
+        "before": before,
+        "after": after,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"db-queries-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    write_json(output, data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Embedding runtime parity check
+Embeds the same face crops with DeepFace's Keras model and with a model
+exported by convert_model.py, and checks that the two agree: the cosine
+similarity of each crop's two embeddings, and how much the 0-1 match score
+between any two crops (what FACE_RECOGNITION_THRESHOLD is compared with)
+moves when the exported model replaces the Keras one. Also times both.
+
+DeepFace embeds with detector_backend="skip" by default, so both sides see
+the same crop and only the model is compared; --backend opencv adds the
+face detection the "deepface" runtime runs inside each crop in the service.
+
+Usage:
+    python -m benchmarks.embedding_parity --model models/facenet.onnx --images photos/
+    python -m benchmarks.embedding_parity --model models/facenet-int8.tflite --tolerance 0.98
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.face_recognition import FaceRecognizer
+from benchmarks.common import time_call, environment_info, write_json
+from benchmarks.fixtures import face_like_frame
+from benchmarks.micro import RESULTS_DIR
+from config import FACE_MODEL, EMBEDDING_MODEL_PATH, EMBEDDING_THREADS
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def load_crops(folder, count):
+    """
+    Face crops to compare on
+
+    Args:
+        folder: Folder of face photos, or None for synthetic face-like crops
+        count: Crops at most
+
+    Returns:
+        List of BGR images
+    """
+    if folder is None:
+        crops = []
+        for seed in range(count):
+            frame = face_like_frame(seed=seed)
+            crops.append(frame[100 + seed % 40:300 + seed % 40, 220:420].copy())
+        return crops
+
+    names = sorted(n for n in os.listdir(folder) if n.lower().endswith(IMAGE_EXTENSIONS))
+    crops = [cv2.imread(os.path.join(folder, n)) for n in names[:count]]
+    return [c for c in crops if c is not None]
+
+
+def unit_rows(embeddings):
+    """Embeddings as unit-length rows"""
+    matrix = np.stack(embeddings).astype(np.float64)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Compare an exported face model with DeepFace's")
+    parser.add_argument("--model", default=EMBEDDING_MODEL_PATH, help="Exported model (default: %(default)s)")
+    parser.add_argument("--runtime", choices=("onnx", "tflite"),
+                        help="Runtime (default: from the model's file extension)")
+    parser.add_argument("--face-model", default=FACE_MODEL, help="DeepFace model exported (default: %(default)s)")
+    parser.add_argument("--images", help="Folder of face photos (default: synthetic face-like crops)")
+    parser.add_argument("--count", type=int, default=50, help="Crops compared (default: %(default)s)")
+    parser.add_argument("--backend", default="skip",
+                        help="DeepFace detector run inside each crop (default: %(default)s)")
+    parser.add_argument("--threads", type=int, default=EMBEDDING_THREADS,
+                        help="Exported model threads (default: %(default)s)")
+    parser.add_argument("--tolerance", type=float, default=0.99,
+                        help="Lowest per-crop cosine similarity accepted (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=20, help="Timed embeddings per runtime (default: %(default)s)")
+    parser.add_argument("--output", help="Results JSON (default: benchmarks/results/embedding_parity-<time>.json)")
+    args = parser.parse_args()
+
+    runtime = args.runtime or ("tflite" if args.model.endswith(".tflite") else "onnx")
+    crops = load_crops(args.images, args.count)
+    if len(crops) < 2:
+        raise SystemExit("Need at least two face crops")
+
+    reference = FaceRecognizer(model_name=args.face_model, backend=args.backend)
+    exported = FaceRecognizer(model_name=args.face_model, runtime=runtime, model_path=args.model,
+                              threads=args.threads)
+    timings = {"deepface": reference.warmup(), runtime: exported.warmup()}
+    print(f"[Benchmark] {len(crops)} crops, {args.face_model} via DeepFace ({args.backend}) "
+          f"vs {runtime} {args.model}")
+
+    pairs = [(reference.generate_embedding(c), exported.generate_embedding(c)) for c in crops]
+    pairs = [(a, b) for a, b in pairs if a is not None and b is not None]
+    if len(pairs) < 2:
+        raise SystemExit("Too few crops embedded by both runtimes")
+    expected, actual = unit_rows([a for a, _ in pairs]), unit_rows([b for _, b in pairs])
+
+    cosine = (expected * actual).sum(axis=1)
+    # Match scores between different crops, on FaceRecognizer's 0-1 scale
+    off_diagonal = ~np.eye(len(pairs), dtype=bool)
+    score_shift = np.abs((expected @ expected.T - actual @ actual.T) / 2)[off_diagonal]
+
+    latency = {
+        "deepface": time_call(lambda: reference.generate_embedding(crops[0]), repeat=args.repeat),
+        runtime: time_call(lambda: exported.generate_embedding(crops[0]), repeat=args.repeat),
+    }
+    speedup = latency["deepface"]["p50_ms"] / latency[runtime]["p50_ms"]
+    passed = bool(cosine.min() >= args.tolerance)
+
+    print(f"\n  cosine similarity   min {cosine.min():.5f}  mean {cosine.mean():.5f}")
+    print(f"  match score shift   max {score_shift.max():.5f}  mean {score_shift.mean():.5f}")
+    print(f"  embedding p50       deepface {latency['deepface']['p50_ms']:.1f} ms, "
+          f"{runtime} {latency[runtime]['p50_ms']:.1f} ms ({speedup:.1f}x)")
+    print(f"\n  {'PASS' if passed else 'FAIL'}: lowest cosine similarity {cosine.min():.5f} "
+          f"({'>=' if passed else '<'} {args.tolerance})")
+
+    data = {
+        "environment": environment_info(),
+        "face_model": args.face_model,
+        "runtime": runtime,
+        "model": args.model,
+        "backend": args.backend,
+        "crops": len(pairs),
+        "cosine_min": float(cosine.min()),
+        "cosine_mean": float(cosine.mean()),
+        "score_shift_max": float(score_shift.max()),
+        "score_shift_mean": float(score_shift.mean()),
+        "warmup": timings,
+        "latency": latency,
+        "speedup": speedup,
+        "tolerance": args.tolerance,
+        "passed": passed,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"embedding_parity-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    write_json(output, data)
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == "__main__":
+    main()
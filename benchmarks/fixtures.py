@@ -0,0 +1,154 @@
+"""
+Synthetic fixtures for the micro-benchmarks
+Random embedding galleries, generated ArUco frames, face-like frames and
+populated SQLite databases
+"""
+import os
+import random
+from datetime import datetime, timedelta
+
+import cv2
+import numpy as np
+
+
+def random_embedding(rng, dim=128):
+    """Random float64 embedding, like np.array(DeepFace.represent(...))"""
+    return rng.normal(size=dim)
+
+
+def random_gallery(size, dim=128, seed=0):
+    """
+    Build a random gallery in the format returned by get_all_students
+
+    Args:
+        size: Number of students
+        dim: Embedding dimension (Facenet: 128, Facenet512/ArcFace: 512)
+        seed: Random seed
+
+    Returns:
+        List of tuples: (student_id, name, aruco_id, embedding)
+    """
+    rng = np.random.default_rng(seed)
+    return [(i + 1, f"Student {i + 1}", i, random_embedding(rng, dim))
+            for i in range(size)]
+
+
+def aruco_frame(aruco_detector, marker_ids=(7,), width=640, height=480, marker_size=160):
+    """
+    Frame containing generated ArUco markers on a white background
+
+    Args:
+        aruco_detector: ArucoDetector used to generate the markers
+        marker_ids: Marker IDs to place side by side
+        width: Frame width
+        height: Frame height
+        marker_size: Marker size in pixels
+
+    Returns:
+        BGR frame
+    """
+    frame = np.full((height, width, 3), 255, dtype=np.uint8)
+    gap = 40
+    x = gap
+    y = (height - marker_size) // 2
+
+    for marker_id in marker_ids:
+        marker = aruco_detector.generate_marker(marker_id, size=marker_size)
+        frame[y:y + marker_size, x:x + marker_size] = cv2.cvtColor(marker, cv2.COLOR_GRAY2BGR)
+        x += marker_size + gap
+
+    return frame
+
+
+def face_like_frame(width=640, height=480, seed=0):
+    """
+    Noisy frame with a drawn face-like pattern in the middle
+
+    The pattern (skin-tone oval, dark eyes and mouth) exercises the Haar
+    cascade over a realistic image size; whether it is detected as a face
+    does not matter for timing.
+
+    Args:
+        width: Frame width
+        height: Frame height
+        seed: Random seed for the background noise
+
+    Returns:
+        BGR frame
+    """
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(60, 120, size=(height, width, 3), dtype=np.uint8)
+
+    cx, cy = width // 2, height // 2
+    cv2.ellipse(frame, (cx, cy), (90, 120), 0, 0, 360, (140, 170, 210), -1)
+    cv2.circle(frame, (cx - 35, cy - 30), 12, (40, 40, 40), -1)
+    cv2.circle(frame, (cx + 35, cy - 30), 12, (40, 40, 40), -1)
+    cv2.line(frame, (cx, cy - 10), (cx, cy + 25), (110, 130, 170), 4)
+    cv2.ellipse(frame, (cx, cy + 55), (35, 12), 0, 0, 180, (60, 60, 120), 4)
+
+    return frame
+
+
+def attendance_history(students, days, seed=0):
+    """
+    Attendance rows for past days (about 90% of students present each day)
+
+    Args:
+        students: Number of students (IDs 1..students)
+        days: Days of history, ending yesterday
+        seed: Random seed
+
+    Returns:
+        List of tuples (student_id, date, time, status), oldest day last
+    """
+    picker = random.Random(seed)
+    today = datetime.now().date()
+    rows = []
+    for day in range(1, days + 1):
+        date_str = (today - timedelta(days=day)).strftime("%Y-%m-%d")
+        for student_id in range(1, students + 1):
+            if picker.random() < 0.9:
+                time_str = f"08:{picker.randrange(60):02d}:{picker.randrange(60):02d}"
+                rows.append((student_id, date_str, time_str, "Present"))
+    return rows
+
+
+def populated_database(path, students=1000, days=30, dim=128, seed=0):
+    """
+    Create a database with students and attendance history
+
+    Args:
+        path: Database file path (replaced if it exists)
+        students: Number of students
+        days: Days of attendance history (most students present each day)
+        dim: Embedding dimension
+        seed: Random seed
+
+    Returns:
+        DatabaseManager for the new database
+    """
+    import pickle
+    import sqlite3
+    from database.db_manager import DatabaseManager
+    from database.migrations import epoch_seconds
+
+    if os.path.exists(path):
+        os.remove(path)
+
+    db = DatabaseManager(path)
+    rng = np.random.default_rng(seed)
+
+    conn = sqlite3.connect(path)
+    conn.executemany(
+        "INSERT INTO students (name, aruco_id, face_embedding) VALUES (?, ?, ?)",
+        ((f"Student {i + 1}", i, pickle.dumps(random_embedding(rng, dim)))
+         for i in range(students)))
+
+    rows = [row + (epoch_seconds(row[1], row[2]),)
+            for row in attendance_history(students, days, seed)]
+    conn.executemany(
+        "INSERT INTO attendance (student_id, date, time, status, ts) VALUES (?, ?, ?, ?, ?)", rows)
+    conn.commit()
+    conn.close()
+
+    return db
@@ -0,0 +1,156 @@
+"""
+Inference pool benchmark
+Embeds the same face crops in the process (FaceRecognizer) and through an
+InferencePool of each worker count, from several client threads at once,
+and reports embeddings/sec, request latency and how much work a pure-Python
+thread still gets done meanwhile (the share of the GIL left to detection,
+the preview and the web server).
+
+Needs DeepFace: the model is loaded once per worker, so start-up takes a
+while on a Pi.
+
+Usage:
+    python -m benchmarks.inference_pool                   # 1, 2 and 4 workers
+    python -m benchmarks.inference_pool --workers 1,2 --requests 50 --clients 2
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.face_recognition import FaceRecognizer
+from ai.inference_pool import InferencePool, PoolRecognizer
+from benchmarks.common import summarize_latencies, environment_info, write_json
+from benchmarks.fixtures import face_like_frame
+from benchmarks.micro import RESULTS_DIR
+from config import FACE_MODEL, FACE_DETECTION_BACKEND
+
+
+def python_ticks(stop):
+    """
+    Count iterations of a pure-Python loop until stopped
+
+    Args:
+        stop: Event ending the loop
+
+    Returns:
+        Function returning (iterations, seconds) once the loop ended
+    """
+    result = {}
+
+    def run():
+        count = 0
+        start = time.perf_counter()
+        while not stop.is_set():
+            for _ in range(1000):
+                count += 1
+        result["ticks"] = (count, time.perf_counter() - start)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+
+    def finish():
+        thread.join()
+        return result["ticks"]
+
+    return finish
+
+
+def run_case(recognizer, crops, clients):
+    """
+    Embed every crop from several client threads
+
+    Args:
+        recognizer: Warmed-up FaceRecognizer or PoolRecognizer
+        crops: Face crops
+        clients: Concurrent client threads
+
+    Returns:
+        Dict with throughput, latency summary and Python ticks/sec
+    """
+    def embed(crop):
+        start = time.perf_counter()
+        recognizer.generate_embedding(crop)
+        return time.perf_counter() - start
+
+    stop = threading.Event()
+    ticks = python_ticks(stop)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        latencies = list(executor.map(embed, crops))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    count, seconds = ticks()
+
+    return {
+        "embeddings_per_sec": len(crops) / elapsed,
+        "latency": summarize_latencies(latencies),
+        "python_ticks_per_sec": count / seconds,
+    }
+
+
+def idle_ticks(seconds=1.0):
+    """Python ticks/sec with nothing else running"""
+    stop = threading.Event()
+    ticks = python_ticks(stop)
+    time.sleep(seconds)
+    stop.set()
+    count, elapsed = ticks()
+    return count / elapsed
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="In-process versus worker-process embedding")
+    parser.add_argument("--workers", default="1,2,4", help="Pool sizes to run (default: %(default)s)")
+    parser.add_argument("--requests", type=int, default=100, help="Crops embedded per case (default: %(default)s)")
+    parser.add_argument("--clients", type=int, default=4, help="Concurrent client threads (default: %(default)s)")
+    parser.add_argument("--output", help="Results JSON (default: benchmarks/results/inference_pool-<time>.json)")
+    args = parser.parse_args()
+
+    frame = face_like_frame()
+    crops = [frame[120 + i % 20:280 + i % 20, 240:400].copy() for i in range(args.requests)]
+    results = {"idle": {"python_ticks_per_sec": idle_ticks()}}
+
+    print(f"[Benchmark] {args.requests} crops, {args.clients} clients, model {FACE_MODEL}")
+    recognizer = FaceRecognizer(model_name=FACE_MODEL, backend=FACE_DETECTION_BACKEND)
+    recognizer.warmup()
+    results["in_process"] = run_case(recognizer, crops, args.clients)
+
+    for workers in (int(w) for w in args.workers.split(",")):
+        pool = InferencePool(model_name=FACE_MODEL, backend=FACE_DETECTION_BACKEND, workers=workers)
+        recognizer = PoolRecognizer(pool, model_name=FACE_MODEL, backend=FACE_DETECTION_BACKEND)
+        try:
+            recognizer.warmup()
+            results[f"pool_{workers}"] = run_case(recognizer, crops, args.clients)
+        finally:
+            pool.stop()
+
+    idle = results["idle"]["python_ticks_per_sec"]
+    print(f"\n  {'case':12s} {'emb/s':>8s} {'p50':>9s} {'p90':>9s} {'python':>7s}")
+    for name, r in results.items():
+        if name == "idle":
+            continue
+        print(f"  {name:12s} {r['embeddings_per_sec']:8.1f} {r['latency']['p50_ms']:7.1f}ms "
+              f"{r['latency']['p90_ms']:7.1f}ms {r['python_ticks_per_sec'] / idle * 100:6.1f}%")
+    print("  (python: pure-Python thread progress while embedding, relative to idle)")
+
+    data = {
+        "environment": environment_info(),
+        "model": FACE_MODEL,
+        "requests": args.requests,
+        "clients": args.clients,
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"inference_pool-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    write_json(output, data)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,309 @@
+"""
+Load test for the web manager
+Simulates phones on the hotspot: each client thread keeps one keep-alive
+connection and requests the main pages in a loop. Runs a series of
+concurrency steps against a running server and reports throughput and
+latency per step, and the most clients served within the latency target.
+
+Each step runs twice by default: once with page requests only, and once
+with every client also holding the dashboard's live view (/stream) open,
+as phones that tapped Show Live View do. Each open stream holds one of the
+server's WEB_THREADS, so the second run is the capacity to plan for when
+viewers are expected.
+
+Start the server first (python web_manager.py, or the service), then:
+
+Usage:
+    python -m benchmarks.load_test                      # 1..40 clients, 15 s each
+    python -m benchmarks.load_test --clients 5,10,20 --duration 30
+    python -m benchmarks.load_test --url http://10.42.0.1:4000 --think 2
+    python -m benchmarks.load_test --revalidate          # send If-None-Match like a browser
+    python -m benchmarks.load_test --live-view off       # page requests only
+"""
+import argparse
+import http.client
+import os
+import random
+import socket
+import sys
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlsplit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import StageRecorder, summarize_latencies, environment_info, write_json
+from benchmarks.micro import RESULTS_DIR
+
+
+# (path, weight): what a phone on the dashboard mostly asks for
+ROUTES = (
+    ("/", 4),
+    ("/students", 2),
+    ("/attendance", 2),
+    ("/api/attendance", 3),
+    ("/api/students", 1),
+    ("/reports", 1),
+    ("/api/reports/daily", 1),
+)
+
+DEFAULT_CLIENTS = (1, 5, 10, 20, 40)
+
+LIVE_VIEW_MODES = {"off": (False,), "on": (True,), "both": (False, True)}
+
+
+class Client(threading.Thread):
+    """One simulated phone with a keep-alive connection"""
+
+    def __init__(self, host, port, routes, deadline, recorder, lock, think=0.0, revalidate=False):
+        """
+        Initialize client
+
+        Args:
+            host: Server host
+            port: Server port
+            routes: Sequence of (path, weight)
+            deadline: time.monotonic() at which to stop
+            recorder: Shared StageRecorder (samples per route)
+            lock: Lock guarding the recorder and counters
+            think: Seconds to pause between requests
+            revalidate: Send If-None-Match with the last ETag per route
+        """
+        super().__init__(daemon=True)
+        self.host = host
+        self.port = port
+        self.paths = [path for path, _ in routes]
+        self.weights = [weight for _, weight in routes]
+        self.deadline = deadline
+        self.recorder = recorder
+        self.lock = lock
+        self.think = think
+        self.revalidate = revalidate
+        self.etags = {}
+        self.requests = 0
+        self.errors = 0
+        self.not_modified = 0
+        self.bytes = 0
+
+    def _connect(self):
+        return http.client.HTTPConnection(self.host, self.port, timeout=30)
+
+    def run(self):
+        conn = self._connect()
+        while time.monotonic() < self.deadline:
+            path = random.choices(self.paths, self.weights)[0]
+            headers = {}
+            if self.revalidate and path in self.etags:
+                headers["If-None-Match"] = self.etags[path]
+
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=headers)
+                response = conn.getresponse()
+                body = response.read()
+                ok = response.status in (200, 304)
+                if response.status == 304:
+                    self.not_modified += 1
+                elif response.getheader("ETag"):
+                    self.etags[path] = response.getheader("ETag")
+            except (OSError, http.client.HTTPException):
+                ok, body = False, b""
+                conn.close()
+                conn = self._connect()
+            duration = time.perf_counter() - start
+
+            self.requests += 1
+            self.bytes += len(body)
+            if ok:
+                with self.lock:
+                    self.recorder.record(path, duration)
+                    self.recorder.record("all", duration)
+            else:
+                self.errors += 1
+
+            if self.think:
+                time.sleep(random.uniform(0.5, 1.5) * self.think)
+        conn.close()
+
+
+class StreamViewer(threading.Thread):
+    """One phone's open live view, read until the deadline"""
+
+    def __init__(self, host, port, deadline):
+        """
+        Initialize viewer
+
+        Args:
+            host: Server host
+            port: Server port
+            deadline: time.monotonic() at which to close the stream
+        """
+        super().__init__(daemon=True)
+        self.host = host
+        self.port = port
+        self.deadline = deadline
+        self.status = None  # stays None while the server holds the stream before its first frame
+        self.failed = False
+        self.stopping = False
+        self.bytes = 0
+        self.conn = http.client.HTTPConnection(host, port, timeout=30)
+
+    @property
+    def held(self):
+        """Whether the server kept the stream open (rather than refusing or failing it)"""
+        return not self.failed and self.status in (None, 200)
+
+    def run(self):
+        try:
+            self.conn.request("GET", "/stream")
+            response = self.conn.getresponse()
+            self.status = response.status
+            while self.status == 200 and time.monotonic() < self.deadline:
+                chunk = response.read1(65536)
+                if not chunk:
+                    break
+                self.bytes += len(chunk)
+        except (OSError, http.client.HTTPException):
+            self.failed = not self.stopping
+        finally:
+            self.conn.close()
+
+    def stop(self):
+        """Close the stream (a read waiting for the next frame returns at once)"""
+        self.stopping = True
+        sock = self.conn.sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+def run_step(host, port, clients, duration, think=0.0, revalidate=False, live_view=False):
+    """
+    Run one concurrency step
+
+    Args:
+        host: Server host
+        port: Server port
+        clients: Concurrent clients
+        duration: Seconds to run
+        think: Seconds each client pauses between requests
+        revalidate: Send If-None-Match like a browser
+        live_view: Each client also holds a /stream connection open
+
+    Returns:
+        Dict with throughput, error rate, overall and per-route latency
+    """
+    recorder = StageRecorder()
+    lock = threading.Lock()
+    deadline = time.monotonic() + duration
+    threads = [Client(host, port, ROUTES, deadline, recorder, lock, think, revalidate)
+               for _ in range(clients)]
+    viewers = [StreamViewer(host, port, deadline) for _ in range(clients if live_view else 0)]
+
+    start = time.perf_counter()
+    for viewer in viewers:
+        viewer.start()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    for viewer in viewers:
+        viewer.stop()
+        viewer.join(timeout=5)
+
+    requests = sum(thread.requests for thread in threads)
+    errors = sum(thread.errors for thread in threads)
+    routes = recorder.summary()
+    return {
+        "clients": clients,
+        "live_view": live_view,
+        "streams_opened": sum(viewer.held for viewer in viewers),
+        "stream_megabytes_per_second": round(sum(viewer.bytes for viewer in viewers) / elapsed / 1e6, 3),
+        "requests": requests,
+        "errors": errors,
+        "error_rate": round(errors / requests, 4) if requests else 0.0,
+        "not_modified": sum(thread.not_modified for thread in threads),
+        "requests_per_second": round(requests / elapsed, 2),
+        "megabytes_per_second": round(sum(thread.bytes for thread in threads) / elapsed / 1e6, 3),
+        "latency": routes.pop("all", summarize_latencies([])),
+        "routes": routes,
+    }
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Web manager load test")
+    parser.add_argument("--url", default="http://127.0.0.1:4000", help="Server URL (default: %(default)s)")
+    parser.add_argument("--clients", default=",".join(str(n) for n in DEFAULT_CLIENTS),
+                        help="Comma-separated concurrency steps (default: %(default)s)")
+    parser.add_argument("--duration", type=float, default=15, help="Seconds per step (default: %(default)s)")
+    parser.add_argument("--think", type=float, default=0.0,
+                        help="Average seconds between a client's requests (default: 0, flat out)")
+    parser.add_argument("--revalidate", action="store_true", help="Send If-None-Match with cached ETags")
+    parser.add_argument("--live-view", choices=tuple(LIVE_VIEW_MODES), default="both",
+                        help="Clients also hold /stream open: off, on, or both runs (default: %(default)s)")
+    parser.add_argument("--max-p90-ms", type=float, default=500.0,
+                        help="Latency target for the capacity estimate (default: %(default)s)")
+    parser.add_argument("--output", help="Results JSON (default: benchmarks/results/load-<time>.json)")
+    args = parser.parse_args()
+
+    url = urlsplit(args.url)
+    host, port = url.hostname, url.port or 80
+    steps = [int(n) for n in args.clients.split(",")]
+
+    try:
+        conn = http.client.HTTPConnection(host, port, timeout=5)
+        conn.request("GET", "/")
+        conn.getresponse().read()
+        conn.close()
+    except (OSError, http.client.HTTPException) as e:
+        print(f"[Benchmark] Cannot reach {args.url}: {e} (is web_manager.py running?)")
+        sys.exit(2)
+
+    print(f"[Benchmark] Load test against {args.url}, {args.duration:g} s per step")
+    results = []
+    capacity = {}
+    for live_view in LIVE_VIEW_MODES[args.live_view]:
+        mode = "with_live_view" if live_view else "pages_only"
+        print(f"\n  {mode.replace('_', ' ')}")
+        print(f"  {'clients':>7s} {'req/s':>9s} {'p50 ms':>9s} {'p90 ms':>9s} {'p99 ms':>9s} {'errors':>7s}"
+              + (f" {'streams':>7s}" if live_view else ""))
+        capacity[mode] = 0
+        for clients in steps:
+            step = run_step(host, port, clients, args.duration, args.think, args.revalidate, live_view)
+            results.append(step)
+            latency = step["latency"]
+            print(f"  {clients:7d} {step['requests_per_second']:9.1f} {latency['p50_ms']:9.1f} "
+                  f"{latency['p90_ms']:9.1f} {latency['p99_ms']:9.1f} {step['errors']:7d}"
+                  + (f" {step['streams_opened']:7d}" if live_view else ""))
+            if live_view and not step["streams_opened"]:
+                print("  (no stream opened: is PREVIEW_ENABLED on?)")
+            if latency["p90_ms"] <= args.max_p90_ms and step["error_rate"] < 0.01:
+                capacity[mode] = max(capacity[mode], clients)
+
+    print(f"\n[Benchmark] Most clients with p90 <= {args.max_p90_ms:g} ms and < 1% errors:")
+    for mode, clients in capacity.items():
+        print(f"  {mode.replace('_', ' '):15s} {clients or 'none'}")
+
+    data = {
+        "environment": environment_info(),
+        "url": args.url,
+        "duration": args.duration,
+        "think": args.think,
+        "revalidate": args.revalidate,
+        "live_view": args.live_view,
+        "max_p90_ms": args.max_p90_ms,
+        "capacity": capacity,
+        "steps": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"load-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    write_json(output, data)
+
+
+if __name__ == "__main__":
+    main()
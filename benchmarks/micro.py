@@ -0,0 +1,301 @@
+"""
+Micro-benchmarks for the matcher, detector, aligner, ArUco and database hot paths
+Times each hot path on synthetic fixtures, stores results as JSON and
+compares them against a saved baseline to flag regressions
+
+Usage:
+    python -m benchmarks.micro                          # run everything
+    python -m benchmarks.micro --only matcher,db --quick
+    python -m benchmarks.micro --save-baseline          # record benchmarks/baseline.json
+    python -m benchmarks.micro --compare                # fail on regressions vs baseline
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import time_call, environment_info, write_json
+from benchmarks import fixtures
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+BASELINE_PATH = os.path.join(BENCH_DIR, "baseline.json")
+
+GALLERY_SIZES = (100, 1000, 10000, 100000)
+QUICK_GALLERY_SIZES = (100, 1000, 10000)
+
+
+def bench_similarity(args):
+    """utils.similarity functions on single embedding pairs"""
+    import numpy as np
+    from utils.similarity import cosine_similarity, euclidean_distance, normalize_embedding
+
+    rng = np.random.default_rng(0)
+    a = fixtures.random_embedding(rng)
+    b = fixtures.random_embedding(rng)
+
+    yield "similarity.cosine_similarity", lambda: cosine_similarity(a, b), 2000
+    yield "similarity.euclidean_distance", lambda: euclidean_distance(a, b), 2000
+    yield "similarity.normalize_embedding", lambda: normalize_embedding(a), 2000
+
+
+def bench_matcher(args):
+    """FaceRecognizer.recognize_face/recognize_topk against galleries of increasing size"""
+    import numpy as np
+    from ai.face_recognition import FaceRecognizer
+    from ai.gallery import Gallery
+
+    query = fixtures.random_embedding(np.random.default_rng(42))
+
+    class FixedQueryRecognizer(FaceRecognizer):
+        """Skips the embedding model so only matching is timed"""
+
+        def generate_embedding(self, face_img):
+            return query
+
+    recognizers = {precision: FixedQueryRecognizer(gallery_precision=precision)
+                   for precision in ("float32", "float16", "int8")}
+    sizes = QUICK_GALLERY_SIZES if args.quick else GALLERY_SIZES
+
+    for size in sizes:
+        gallery = fixtures.random_gallery(size)
+        repeat = max(3, min(50, 200000 // size))
+        # The gallery matrix is built on the first call and reused while the list is
+        for precision, recognizer in recognizers.items():
+            suffix = "" if precision == "float32" else f",{precision}"
+            yield (f"matcher.recognize_face[{size}{suffix}]",
+                   lambda g=gallery, r=recognizer: r.recognize_face(None, g, 0.6), repeat)
+        yield (f"matcher.recognize_topk[{size}]",
+               lambda g=gallery: recognizers["float32"].recognize_topk(None, g, 3, 0.6), repeat)
+        yield (f"matcher.gallery_build[{size},int8]",
+               lambda g=gallery: Gallery(g, "int8"), max(3, repeat // 5))
+
+
+def bench_embedding_cache(args):
+    """EmbeddingCache hash and lookup on a face-sized crop"""
+    import numpy as np
+    from ai.embedding_cache import EmbeddingCache, perceptual_hash
+
+    crop = np.ascontiguousarray(fixtures.face_like_frame()[140:340, 220:420])
+    embedding = fixtures.random_embedding(np.random.default_rng(0))
+    cache = EmbeddingCache(max_entries=32)
+    for track_id in range(32):
+        cache.get_or_compute(crop, lambda img: embedding, track_id)
+
+    yield "embedding_cache.perceptual_hash[200x200]", lambda: perceptual_hash(crop), 500
+    yield "embedding_cache.hit[32 entries]", lambda: cache.get_or_compute(crop, lambda img: embedding, 31), 500
+
+
+def bench_detector(args):
+    """FaceDetector on synthetic face-like frames"""
+    from ai.face_detector import FaceDetector
+    from config import FACE_DETECTION_BACKEND
+
+    detector = FaceDetector(backend=FACE_DETECTION_BACKEND)
+    frame = fixtures.face_like_frame()
+
+    yield "detector.detect_faces[640x480]", lambda: detector.detect_faces(frame), 30
+    yield "detector.get_single_face[640x480]", lambda: detector.get_single_face(frame), 30
+
+
+def bench_aligner(args):
+    """FaceAligner landmark search and warp, and detection with alignment on"""
+    import numpy as np
+    from ai.face_aligner import FaceAligner
+    from ai.face_detector import FaceDetector
+    from config import FACE_DETECTION_BACKEND
+
+    aligner = FaceAligner("eyes")
+    detector = FaceDetector(backend=FACE_DETECTION_BACKEND, alignment="eyes")
+    frame = fixtures.face_like_frame()
+    box = (195, 114, 251, 251)  # where the Haar cascade finds the fixture's face
+    eyes = np.array([[285.0, 214.0], [355.0, 220.0]])
+
+    yield "aligner.landmarks[eyes,251x251]", lambda: aligner.landmarks(frame, box), 100
+    yield "aligner.warp[160x160]", lambda: aligner.warp(frame, eyes), 500
+    yield "detector.get_single_face[640x480,eyes]", lambda: detector.get_single_face(frame), 30
+
+
+def bench_aruco(args):
+    """ArucoDetector.detect_markers on generated marker frames"""
+    from ai.aruco_detector import ArucoDetector
+    from config import ARUCO_DICT
+
+    detector = ArucoDetector(dictionary=ARUCO_DICT)
+    single = fixtures.aruco_frame(detector, marker_ids=(7,))
+    multiple = fixtures.aruco_frame(detector, marker_ids=(3, 9, 21))
+    empty = fixtures.face_like_frame()
+
+    yield "aruco.detect_markers[single]", lambda: detector.detect_markers(single), 50
+    yield "aruco.detect_markers[multiple]", lambda: detector.detect_markers(multiple), 50
+    yield "aruco.detect_markers[none]", lambda: detector.detect_markers(empty), 50
+
+
+def bench_db(args):
+    """Each DatabaseManager method on a populated database"""
+    with tempfile.TemporaryDirectory(prefix="bench_db_") as tmp:
+        yield from _db_cases(args, os.path.join(tmp, "attendance.db"))
+
+
+def _db_cases(args, path):
+    """Benchmark cases for bench_db on a database at path"""
+    import numpy as np
+    from database.attendance_cache import MarkedTodayCache
+    from database.attendance_journal import AttendanceJournal
+
+    students = 500 if args.quick else 2000
+    db = fixtures.populated_database(path, students=students, days=30)
+    rng = np.random.default_rng(1)
+    today = datetime.now().strftime("%Y-%m-%d")
+    counter = iter(range(10 ** 6, 10 ** 7))
+
+    yield (f"db.add_student[{students}]",
+           lambda: db.add_student("New Student", next(counter), fixtures.random_embedding(rng)), 30)
+    yield f"db.get_all_students[{students}]", db.get_all_students, 10
+    yield "db.get_student_by_id", lambda: db.get_student_by_id(students // 2), 100
+    yield "db.get_student_by_aruco", lambda: db.get_student_by_aruco(students // 2), 100
+
+    ids = iter(range(1, students + 1))
+    yield "db.mark_attendance", lambda: db.mark_attendance(next(ids)), 50
+    journal = AttendanceJournal(db, os.path.join(os.path.dirname(path), "attendance.journal"))
+    yield "journal.append", lambda: journal.append(students // 2), 50
+    yield "db.check_attendance_today", lambda: db.check_attendance_today(students // 2), 100
+    marked_today = MarkedTodayCache(db)
+    yield "marked_today.is_marked", lambda: marked_today.is_marked(students // 2), 100
+    yield "db.get_attendance_by_date", lambda: db.get_attendance_by_date(today), 50
+    yield "db.get_student_count", db.get_student_count, 100
+
+
+SUITES = {
+    "similarity": bench_similarity,
+    "matcher": bench_matcher,
+    "embedding_cache": bench_embedding_cache,
+    "detector": bench_detector,
+    "aligner": bench_aligner,
+    "aruco": bench_aruco,
+    "db": bench_db,
+}
+
+
+def run_suites(args):
+    """
+    Run the selected suites
+
+    Args:
+        args: Parsed command line arguments
+
+    Returns:
+        Dict mapping benchmark name to latency summary
+    """
+    selected = args.only.split(",") if args.only else list(SUITES)
+    results = {}
+
+    for suite in selected:
+        if suite not in SUITES:
+            raise ValueError(f"Unknown suite: {suite} (choose from {', '.join(SUITES)})")
+
+        print(f"\n[Benchmark] Suite: {suite}")
+        try:
+            for name, func, repeat in SUITES[suite](args):
+                summary = time_call(func, repeat=repeat)
+                results[name] = summary
+                print(f"  {name:45s} p50 {summary['p50_ms']:10.3f} ms   "
+                      f"p90 {summary['p90_ms']:10.3f} ms   (n={summary['count']})")
+        except ImportError as e:
+            print(f"  Skipped: {e}")
+
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance, min_delta_ms=0.05):
+    """
+    Compare results against a baseline
+
+    A benchmark regresses when its median is more than ``tolerance`` slower
+    than the baseline median and the slowdown exceeds ``min_delta_ms`` (so
+    microsecond-level noise is not flagged).
+
+    Args:
+        results: Dict of current latency summaries
+        baseline: Dict of baseline latency summaries
+        tolerance: Allowed relative slowdown (0.2 = 20%)
+        min_delta_ms: Ignore absolute changes smaller than this
+
+    Returns:
+        List of (name, baseline_ms, current_ms, ratio) for regressions
+    """
+    regressions = []
+
+    print("\n" + "=" * 80)
+    print(f"{'benchmark':45s} {'baseline':>10s} {'current':>10s} {'change':>9s}")
+    print("=" * 80)
+
+    for name, summary in sorted(results.items()):
+        if name not in baseline:
+            print(f"{name:45s} {'-':>10s} {summary['p50_ms']:10.3f}       new")
+            continue
+
+        base_ms = baseline[name]["p50_ms"]
+        current_ms = summary["p50_ms"]
+        ratio = current_ms / base_ms if base_ms > 0 else 1.0
+        flag = ""
+        if abs(current_ms - base_ms) < min_delta_ms:
+            pass
+        elif ratio > 1.0 + tolerance:
+            flag = "  REGRESSION"
+            regressions.append((name, base_ms, current_ms, ratio))
+        elif ratio < 1.0 - tolerance:
+            flag = "  faster"
+
+        print(f"{name:45s} {base_ms:10.3f} {current_ms:10.3f} {(ratio - 1) * 100:+8.1f}%{flag}")
+
+    return regressions
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Hot-path micro-benchmarks")
+    parser.add_argument("--only", help=f"Comma-separated suites ({','.join(SUITES)})")
+    parser.add_argument("--quick", action="store_true", help="Smaller galleries and databases")
+    parser.add_argument("--output", help="Results JSON (default: benchmarks/results/micro-<time>.json)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON path")
+    parser.add_argument("--save-baseline", action="store_true", help="Store results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="Compare against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="Allowed median slowdown before flagging (default: 0.2)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="Ignore median changes smaller than this (default: 0.05 ms)")
+    args = parser.parse_args()
+
+    results = run_suites(args)
+    data = {"environment": environment_info(), "results": results}
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"micro-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    write_json(output, data)
+
+    if args.save_baseline:
+        write_json(args.baseline, data)
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"[Benchmark] No baseline at {args.baseline}; run with --save-baseline first")
+            sys.exit(2)
+
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+        regressions = compare_to_baseline(results, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\n[Benchmark] {len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            sys.exit(1)
+        print("\n[Benchmark] No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""
+Gallery quantization accuracy report
+Matches the same probes against the gallery stored at each precision, with
+and without full-precision re-ranking, and compares every result with exact
+float64 cosine matching: top-1 agreement, threshold decisions that flip,
+worst score error, identification accuracy and impostor rejection, memory
+(against the student list with float64 embeddings) and match latency.
+
+The synthetic gallery has one enrollment per identity; genuine probes are
+the same identity with fresh noise, impostor probes are identities that
+were never enrolled. --db uses the enrolled students instead, probing each
+with a noisy copy of its own embedding.
+
+Usage:
+    python -m benchmarks.quantization                     # 10000 students, 128-dim
+    python -m benchmarks.quantization --students 1000 --dim 512
+    python -m benchmarks.quantization --db database/attendance.db
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ai.gallery import Gallery
+from benchmarks.common import time_call, environment_info, write_json
+from benchmarks.micro import RESULTS_DIR
+from utils.quantization import PRECISIONS
+
+
+def synthetic_probes(students, dim, probes, noise, seed=0):
+    """
+    Gallery and probes drawn around random identity centres
+
+    Args:
+        students: Enrolled identities
+        dim: Embedding dimension
+        probes: Probes (half genuine, half impostors)
+        noise: Per-dimension noise relative to the centres' spread
+        seed: Random seed
+
+    Returns:
+        Tuple: (gallery list, probe matrix, expected student index per probe or -1)
+    """
+    rng = np.random.default_rng(seed)
+    centres = rng.normal(size=(students, dim))
+    gallery = [(i + 1, f"Student {i + 1}", i, centres[i] + rng.normal(scale=noise, size=dim))
+               for i in range(students)]
+
+    genuine = probes // 2
+    expected = rng.integers(0, students, size=genuine)
+    queries = centres[expected] + rng.normal(scale=noise, size=(genuine, dim))
+    impostors = rng.normal(size=(probes - genuine, dim)) + rng.normal(scale=noise, size=(probes - genuine, dim))
+    return gallery, np.vstack([queries, impostors]), np.concatenate([expected, np.full(probes - genuine, -1)])
+
+
+def database_probes(db_path, probes, noise, seed=0):
+    """
+    Enrolled students and noisy copies of their embeddings as probes
+
+    Args:
+        db_path: Attendance database
+        probes: Probes
+        noise: Noise relative to each embedding's per-dimension spread
+        seed: Random seed
+
+    Returns:
+        Tuple: (gallery list, probe matrix, expected student index per probe)
+    """
+    from database.db_manager import DatabaseManager
+
+    gallery = DatabaseManager(db_path).get_all_students()
+    if not gallery:
+        raise SystemExit(f"No students in {db_path}")
+    rng = np.random.default_rng(seed)
+    expected = rng.integers(0, len(gallery), size=probes)
+    base = np.stack([np.asarray(gallery[i][3], dtype=np.float64).ravel() for i in expected])
+    spread = base.std(axis=1, keepdims=True)
+    return gallery, base + rng.normal(size=base.shape) * spread * noise, expected
+
+
+def exact_scores(gallery, queries):
+    """float64 cosine similarities (0-1 scale), probes x students"""
+    matrix = np.stack([np.asarray(s[3], dtype=np.float64).ravel() for s in gallery])
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    queries = queries / np.linalg.norm(queries, axis=1, keepdims=True)
+    return (queries @ matrix.T + 1) / 2
+
+
+def evaluate(gallery, queries, expected, reference, threshold, precision, rerank, repeat):
+    """
+    Match every probe with one gallery configuration
+
+    Args:
+        gallery: Student list
+        queries: Probe matrix
+        expected: Expected student index per probe (-1: impostor)
+        reference: exact_scores() for the same probes
+        threshold: Similarity threshold
+        precision: Gallery precision
+        rerank: Re-ranked candidates (0: off)
+        repeat: Timed matches
+
+    Returns:
+        Dict of accuracy, memory and latency figures (the accuracy figures
+        depend on the probes and threshold; agreement and flips on the precision)
+    """
+    matcher = Gallery(gallery, precision, rerank)
+    impostors = int((expected < 0).sum())
+    ids = np.array([s[0] for s in gallery])
+
+    best = reference.argmax(axis=1)
+    best_score = reference[np.arange(len(queries)), best]
+    reference_ids = np.where(best_score >= threshold, ids[best], -1)
+
+    agree = flips = correct = rejected = 0
+    max_error = 0.0
+    for i, query in enumerate(queries):
+        student_id, _, _, similarity = matcher.match(query, threshold)
+        student_id = -1 if student_id is None else student_id
+        agree += student_id == reference_ids[i]
+        flips += (student_id == -1) != (reference_ids[i] == -1)
+        if expected[i] >= 0:
+            correct += student_id == ids[expected[i]]
+        else:
+            rejected += student_id == -1
+        max_error = max(max_error, float(np.abs(matcher.scores(query) - reference[i]).max()))
+
+    return {
+        "precision": precision,
+        "rerank": rerank,
+        "bytes": matcher.nbytes,
+        "top1_agreement": agree / len(queries),
+        "decision_flips": int(flips),
+        "genuine_accuracy": correct / int((expected >= 0).sum()),
+        "impostor_rejection": rejected / impostors if impostors else None,
+        "max_score_error": max_error,
+        "match": time_call(lambda: matcher.match(queries[0], threshold), repeat=repeat, warmup=3),
+    }
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Gallery quantization accuracy versus full precision")
+    parser.add_argument("--students", type=int, default=10000, help="Synthetic students (default: %(default)s)")
+    parser.add_argument("--dim", type=int, default=128, help="Embedding dimension (default: %(default)s)")
+    parser.add_argument("--probes", type=int, default=500, help="Probe faces (default: %(default)s)")
+    parser.add_argument("--noise", type=float, default=0.8, help="Probe noise (default: %(default)s)")
+    parser.add_argument("--threshold", type=float, default=0.6, help="Similarity threshold (default: %(default)s)")
+    parser.add_argument("--rerank", type=int, default=5, help="Re-ranked candidates (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=30, help="Timed matches (default: %(default)s)")
+    parser.add_argument("--db", help="Use the students of this database instead of a synthetic gallery")
+    parser.add_argument("--output", help="Results JSON (default: benchmarks/results/quantization-<time>.json)")
+    args = parser.parse_args()
+
+    if args.db:
+        gallery, queries, expected = database_probes(args.db, args.probes, args.noise)
+    else:
+        gallery, queries, expected = synthetic_probes(args.students, args.dim, args.probes, args.noise)
+    reference = exact_scores(gallery, queries)
+    # The student list as loaded from the database (float64 embeddings), which the gallery replaces
+    float64_bytes = sys.getsizeof(gallery) + sum(sys.getsizeof(t) + sum(sys.getsizeof(v) for v in t)
+                                                 for t in gallery)
+    print(f"[Benchmark] {len(gallery)} students, {queries.shape[1]}-dim, {len(queries)} probes, "
+          f"threshold {args.threshold}")
+
+    results = []
+    for precision in PRECISIONS:
+        for rerank in (0, args.rerank):
+            results.append(evaluate(gallery, queries, expected, reference, args.threshold,
+                                    precision, rerank, args.repeat))
+
+    print(f"\n  {'precision':9s} {'rerank':>6s} {'memory':>9s} {'vs f64':>6s} {'top-1':>7s} "
+          f"{'flips':>5s} {'genuine':>7s} {'reject':>7s} {'max err':>8s} {'p50':>9s}")
+    for r in results:
+        rejection = "-" if r["impostor_rejection"] is None else f"{r['impostor_rejection'] * 100:.1f}%"
+        print(f"  {r['precision']:9s} {r['rerank']:6d} {r['bytes'] / 1e6:7.2f}MB "
+              f"{float64_bytes / r['bytes']:5.1f}x {r['top1_agreement'] * 100:6.2f}% {r['decision_flips']:5d} "
+              f"{r['genuine_accuracy'] * 100:6.1f}% {rejection:>7s} {r['max_score_error']:8.5f} {r['match']['p50_ms']:7.3f}ms")
+
+    data = {
+        "environment": environment_info(),
+        "students": len(gallery),
+        "dim": int(queries.shape[1]),
+        "probes": len(queries),
+        "source": args.db or "synthetic",
+        "threshold": args.threshold,
+        "float64_bytes": float64_bytes,
+        "results": results,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"quantization-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    write_json(output, data)
+
+
+if __name__ == "__main__":
+    main()
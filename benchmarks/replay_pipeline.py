@@ -0,0 +1,283 @@
+"""
+End-to-end pipeline benchmark on recorded sessions
+Replays a recorded video or image sequence through AttendanceEngine and
+reports per-stage latency, frames/sec, time-to-decision and people/minute
+
+Usage:
+    python -m benchmarks.replay_pipeline recordings/rush_hour.mp4
+    python -m benchmarks.replay_pipeline recordings/frames/ --trace recordings/distance.csv
+    python -m benchmarks.replay_pipeline session.mp4 --realtime --json results/replay.json
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (DATABASE_PATH, FACE_DETECTION_BACKEND, FACE_MODEL, ARUCO_DICT,
+                    FACE_RECOGNITION_THRESHOLD, GALLERY_PRECISION, GALLERY_RERANK,
+                    EMBEDDING_CACHE_ENABLED, EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_TTL,
+                    EMBEDDING_CACHE_MAX_DISTANCE)
+from benchmarks.common import (StageRecorder, TimedProxy, summarize_latencies,
+                               environment_info, write_json)
+
+
+# Engine states in which a person is being processed
+ACTIVE_STATES = ("DETECTING_FACE", "WAITING_FOR_ARUCO", "DETECTING_ARUCO")
+
+
+class DecisionTracker:
+    """
+    Follows the engine state machine to measure time-to-decision per person
+
+    A person's attempt starts on the first frame a face is seen while the
+    engine waits for a face, and ends when the engine marks attendance,
+    rejects the attempt, or falls back to waiting for a face.
+    """
+
+    def __init__(self):
+        """Initialize tracker"""
+        self.started_at = None
+        self.decisions = []
+
+    def update(self, engine, state_before, success, message, now):
+        """
+        Update tracking after one processed frame
+
+        Args:
+            engine: AttendanceEngine instance
+            state_before: Engine state before the frame was processed
+            success: Success flag returned by the engine
+            message: Message returned by the engine
+            now: Replay time of the frame
+        """
+        state_after = engine.current_state
+
+        if self.started_at is None:
+            if state_before == "WAITING_FOR_FACE" and engine.last_face_position is not None:
+                self.started_at = now
+            return
+
+        if success:
+            self._finish("marked", now)
+        elif message == "already_marked":
+            self._finish("already_marked", now)
+        elif state_after == "SHOW_ERROR" and state_before != "SHOW_ERROR":
+            self._finish(message, now)
+        elif state_after in ("WAITING_FOR_FACE", "IDLE"):
+            if state_before in ACTIVE_STATES:
+                self._finish(message, now)
+            elif engine.last_face_position is None:
+                # Person walked away before recognition started
+                self.started_at = None
+
+    def _finish(self, outcome, now):
+        """Record a finished attempt"""
+        self.decisions.append({"outcome": outcome, "seconds": now - self.started_at})
+        self.started_at = None
+
+    def summary(self, replay_seconds, wall_seconds):
+        """
+        Summarize decisions
+
+        Args:
+            replay_seconds: Recorded duration covered by the replay
+            wall_seconds: Wall-clock time the replay took
+
+        Returns:
+            Dict with outcome counts, time-to-decision and people/minute
+        """
+        outcomes = {}
+        for decision in self.decisions:
+            outcomes[decision["outcome"]] = outcomes.get(decision["outcome"], 0) + 1
+
+        marked = outcomes.get("marked", 0)
+        return {
+            "attempts": len(self.decisions),
+            "outcomes": outcomes,
+            "time_to_decision": summarize_latencies(
+                [d["seconds"] for d in self.decisions]),
+            "time_to_mark": summarize_latencies(
+                [d["seconds"] for d in self.decisions if d["outcome"] == "marked"]),
+            "people_per_minute": round(marked / (replay_seconds / 60.0), 2) if replay_seconds else 0.0,
+            "people_per_minute_wall": round(marked / (wall_seconds / 60.0), 2) if wall_seconds else 0.0,
+        }
+
+
+def build_engine(args, recorder, clock):
+    """
+    Build an AttendanceEngine with timed components
+
+    Args:
+        args: Parsed command line arguments
+        recorder: StageRecorder for component latencies
+        clock: ReplayClock driving the engine
+
+    Returns:
+        Tuple: (engine, camera)
+    """
+    from attendance_engine import AttendanceEngine
+    from database.db_manager import DatabaseManager
+    from ai.face_detector import FaceDetector
+    from ai.embedding_cache import EmbeddingCache
+    from ai.face_recognition import FaceRecognizer
+    from ai.aruco_detector import ArucoDetector
+    from hardware.replay import ReplayCamera, SimulatedUltrasonicSensor, load_ultrasonic_trace
+
+    camera = ReplayCamera(args.source, fps=args.fps, realtime=args.realtime,
+                          loop=False, clock=clock)
+
+    sensors = [None, None]
+    if args.trace:
+        trace = load_ultrasonic_trace(args.trace)
+        columns = list(trace.keys())
+        for i in range(2):
+            times, distances = trace[columns[min(i, len(columns) - 1)]]
+            sensors[i] = SimulatedUltrasonicSensor(times, distances, clock)
+
+    db = TimedProxy(DatabaseManager(args.db), "db", recorder,
+                    ["get_marked_student_ids", "mark_attendance"])
+    face_detector = TimedProxy(FaceDetector(backend=FACE_DETECTION_BACKEND), "face_detector",
+                               recorder, ["get_single_face", "detect_faces"])
+    embedding_cache = None
+    if EMBEDDING_CACHE_ENABLED:
+        # TTL on the replay clock, like a live session
+        embedding_cache = EmbeddingCache(max_entries=EMBEDDING_CACHE_SIZE, ttl=EMBEDDING_CACHE_TTL,
+                                         max_distance=EMBEDDING_CACHE_MAX_DISTANCE, clock=clock.time)
+    face_recognizer = TimedProxy(FaceRecognizer(model_name=FACE_MODEL, backend=FACE_DETECTION_BACKEND,
+                                                gallery_precision=GALLERY_PRECISION, rerank=GALLERY_RERANK,
+                                                embedding_cache=embedding_cache),
+                                 "face_recognizer", recorder, ["submit_embedding", "match_topk"])
+    aruco_detector = TimedProxy(ArucoDetector(dictionary=ARUCO_DICT), "aruco_detector",
+                                recorder, ["detect_markers"])
+
+    engine = AttendanceEngine(db, face_detector, face_recognizer, aruco_detector,
+                              sensors[0], sensors[1], None, None,
+                              threshold=args.threshold,
+                              clock=clock.time,
+                              sleep=time.sleep if args.realtime else clock.sleep)
+    engine.ultrasonic_enabled = bool(args.trace)
+    if not args.trace:
+        # No trace: presence is assumed, start active like the live system
+        engine.current_state = "WAITING_FOR_FACE"
+
+    return engine, camera
+
+
+def run_replay(args):
+    """
+    Replay a recorded session and collect measurements
+
+    Args:
+        args: Parsed command line arguments
+
+    Returns:
+        Results dict
+    """
+    from hardware.replay import ReplayClock
+
+    recorder = StageRecorder()
+    clock = ReplayClock()
+    engine, camera = build_engine(args, recorder, clock)
+    tracker = DecisionTracker()
+
+    frames = 0
+    replay_start = clock.time()
+    wall_start = time.perf_counter()
+
+    while args.max_frames is None or frames < args.max_frames:
+        start = time.perf_counter()
+        frame = camera.read_frame()
+        recorder.record("camera.read_frame", time.perf_counter() - start)
+        if frame is None:
+            break
+
+        state_before = engine.current_state
+        start = time.perf_counter()
+        success, message, _ = engine.run_attendance_check(frame)
+        elapsed = time.perf_counter() - start
+        recorder.record("engine.total", elapsed)
+        recorder.record(f"engine.state.{state_before}", elapsed)
+
+        tracker.update(engine, state_before, success, message, clock.time())
+        frames += 1
+
+    wall_seconds = time.perf_counter() - wall_start
+    # Recorded time covered, including frames skipped while the engine slept
+    replay_seconds = clock.time() - replay_start
+    camera.release()
+
+    return {
+        "source": args.source,
+        "trace": args.trace,
+        "mode": "realtime" if args.realtime else "fast",
+        "environment": environment_info(),
+        "frames": frames,
+        "frames_skipped": camera.frames_skipped,
+        "wall_seconds": round(wall_seconds, 3),
+        "replay_seconds": round(replay_seconds, 3),
+        "fps": round(frames / wall_seconds, 2) if wall_seconds else 0.0,
+        "stages": recorder.summary(),
+        "decisions": tracker.summary(replay_seconds, wall_seconds),
+    }
+
+
+def print_report(results):
+    """Print a human-readable report"""
+    print("\n" + "=" * 72)
+    print("PIPELINE REPLAY BENCHMARK")
+    print("=" * 72)
+    print(f"Source: {results['source']} ({results['mode']})")
+    print(f"Frames: {results['frames']} ({results['frames_skipped']} skipped) | "
+          f"Replay: {results['replay_seconds']}s | "
+          f"Wall: {results['wall_seconds']}s | {results['fps']} frames/sec")
+
+    print("\nPer-stage latency (ms):")
+    print(f"  {'stage':42s} {'count':>7s} {'p50':>9s} {'p90':>9s} {'p99':>9s} {'max':>9s}")
+    for stage, s in results["stages"].items():
+        print(f"  {stage:42s} {s['count']:7d} {s['p50_ms']:9.2f} {s['p90_ms']:9.2f} "
+              f"{s['p99_ms']:9.2f} {s['max_ms']:9.2f}")
+
+    d = results["decisions"]
+    print(f"\nAttempts: {d['attempts']} {d['outcomes']}")
+    ttd = d["time_to_decision"]
+    print(f"Time-to-decision: p50 {ttd['p50_ms'] / 1000:.2f}s | p90 {ttd['p90_ms'] / 1000:.2f}s | "
+          f"max {ttd['max_ms'] / 1000:.2f}s")
+    print(f"People/minute: {d['people_per_minute']} (replay time), "
+          f"{d['people_per_minute_wall']} (wall time)")
+    print("=" * 72)
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Replay a recorded session through AttendanceEngine")
+    parser.add_argument("source", help="Video file, image directory, or glob pattern")
+    parser.add_argument("--trace", help="Ultrasonic trace CSV (time,sensor1,sensor2)")
+    parser.add_argument("--fps", type=float, help="Override recorded frame rate")
+    parser.add_argument("--realtime", action="store_true", help="Pace frames at the recorded rate")
+    parser.add_argument("--max-frames", type=int, help="Stop after this many frames")
+    parser.add_argument("--db", default=DATABASE_PATH,
+                        help="Student database (copied, never modified)")
+    parser.add_argument("--threshold", type=float, default=FACE_RECOGNITION_THRESHOLD)
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    # Work on a copy so replays never mark attendance in the real database
+    with tempfile.TemporaryDirectory() as tmp:
+        db_copy = os.path.join(tmp, "attendance.db")
+        if os.path.exists(args.db):
+            shutil.copy(args.db, db_copy)
+        args.db = db_copy
+
+        results = run_replay(args)
+
+    print_report(results)
+    if args.json:
+        write_json(args.json, results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Cold-start benchmark for the attendance service and web manager
+Times module imports and model warmup in fresh interpreters, so deferred
+imports stay deferred and start-up does not regress
+
+Usage:
+    python -m benchmarks.startup                        # 5 cold starts per case
+    python -m benchmarks.startup --repeat 3 --no-model
+    python -m benchmarks.startup --save-baseline
+    python -m benchmarks.startup --compare              # fail on regressions vs baseline
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+from datetime import datetime
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.common import summarize_latencies, environment_info, write_json
+from benchmarks.micro import compare_to_baseline, RESULTS_DIR
+
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+PROJECT_DIR = os.path.dirname(BENCH_DIR)
+BASELINE_PATH = os.path.join(BENCH_DIR, "startup_baseline.json")
+
+RESULT_PREFIX = "STARTUP_RESULT "
+
+# Modules whose import time matters for a service's cold start
+IMPORT_CASES = (
+    "main_attendance",
+    "web_manager",
+    "attendance_engine",
+    "ai.face_recognition",
+    "database.db_manager",
+)
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print("{prefix}" + json.dumps({{"seconds": elapsed, "deepface": "deepface" in sys.modules}}))
+"""
+
+MODEL_SCRIPT = """
+import json
+from ai.face_recognition import FaceRecognizer
+from config import FACE_MODEL, FACE_DETECTION_BACKEND
+timings = FaceRecognizer(model_name=FACE_MODEL, backend=FACE_DETECTION_BACKEND).warmup()
+print("{prefix}" + json.dumps(timings))
+"""
+
+
+def run_fresh(script):
+    """
+    Run a script in a fresh interpreter from the project directory
+
+    Args:
+        script: Python source printing one RESULT_PREFIX line
+
+    Returns:
+        Parsed result dict
+
+    Raises:
+        RuntimeError: If the script failed
+    """
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE="1")
+    proc = subprocess.run([sys.executable, "-c", script], cwd=PROJECT_DIR, env=env,
+                          capture_output=True, text=True, timeout=600)
+
+    for line in reversed(proc.stdout.splitlines()):
+        if line.startswith(RESULT_PREFIX):
+            return json.loads(line[len(RESULT_PREFIX):])
+
+    error = (proc.stderr.strip().splitlines() or ["no output"])[-1]
+    raise RuntimeError(error)
+
+
+def bench_imports(repeat):
+    """
+    Cold import time of each service module
+
+    Args:
+        repeat: Fresh interpreters per module
+
+    Returns:
+        Dict mapping benchmark name to latency summary
+    """
+    results = {}
+    baseline = [run_fresh(IMPORT_SCRIPT.format(module="sys", prefix=RESULT_PREFIX))["seconds"]
+                for _ in range(repeat)]
+
+    for module in IMPORT_CASES:
+        name = f"startup.import[{module}]"
+        try:
+            runs = [run_fresh(IMPORT_SCRIPT.format(module=module, prefix=RESULT_PREFIX))
+                    for _ in range(repeat)]
+        except RuntimeError as e:
+            print(f"  {name:45s} skipped: {e}")
+            continue
+
+        results[name] = summarize_latencies([r["seconds"] for r in runs])
+        eager = " (imports DeepFace!)" if any(r["deepface"] for r in runs) else ""
+        print(f"  {name:45s} p50 {results[name]['p50_ms']:10.1f} ms{eager}")
+
+    results["startup.interpreter"] = summarize_latencies(baseline)
+    return results
+
+
+def bench_model(repeat):
+    """
+    Model warmup (DeepFace import, build, first inference) in fresh interpreters
+
+    Args:
+        repeat: Fresh interpreters
+
+    Returns:
+        Dict mapping benchmark name to latency summary
+    """
+    try:
+        runs = [run_fresh(MODEL_SCRIPT.format(prefix=RESULT_PREFIX)) for _ in range(repeat)]
+    except RuntimeError as e:
+        print(f"  startup.model skipped: {e}")
+        return {}
+
+    results = {}
+    for step in runs[0]:
+        name = f"startup.model_{step}"
+        results[name] = summarize_latencies([r[step] for r in runs])
+        print(f"  {name:45s} p50 {results[name]['p50_ms']:10.1f} ms")
+
+    results["startup.model_total"] = summarize_latencies([sum(r.values()) for r in runs])
+    return results
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Cold-start benchmark")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per case (default: 5)")
+    parser.add_argument("--no-model", action="store_true", help="Skip the model warmup case")
+    parser.add_argument("--output", help="Results JSON (default: benchmarks/results/startup-<time>.json)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline JSON path")
+    parser.add_argument("--save-baseline", action="store_true", help="Store results as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="Compare against the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="Allowed median slowdown before flagging (default: 0.25)")
+    parser.add_argument("--min-delta-ms", type=float, default=20.0,
+                        help="Ignore median changes smaller than this (default: 20 ms)")
+    args = parser.parse_args()
+
+    print("\n[Benchmark] Cold imports")
+    results = bench_imports(args.repeat)
+
+    if not args.no_model:
+        print("\n[Benchmark] Model warmup")
+        results.update(bench_model(args.repeat))
+
+    data = {"environment": environment_info(), "results": results}
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"startup-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    write_json(output, data)
+
+    if args.save_baseline:
+        write_json(args.baseline, data)
+
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"[Benchmark] No baseline at {args.baseline}; run with --save-baseline first")
+            sys.exit(2)
+
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+        regressions = compare_to_baseline(results, baseline, args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\n[Benchmark] {len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            sys.exit(1)
+        print("\n[Benchmark] No regressions")
+
+
+if __name__ == "__main__":
+    main()
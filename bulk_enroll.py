@@ -0,0 +1,75 @@
+"""
+Bulk Student Enrollment
+Enrolls a whole roster from a CSV (name, aruco_id[, photo]) and a folder or
+ZIP of photos, without the camera
+Run: python bulk_enroll.py roster.csv photos/   (or photos.zip)
+"""
+import argparse
+import os
+import sys
+from datetime import datetime
+
+from config import (DATABASE_PATH, FACE_MODEL, FACE_DETECTION_BACKEND, BULK_IMPORT_WORKERS,
+                    BULK_IMPORT_BATCH_SIZE, BULK_IMPORT_REPORT_DIR, EMBEDDING_RUNTIME,
+                    EMBEDDING_MODEL_PATH, EMBEDDING_THREADS)
+from database.db_manager import DatabaseManager
+from utils.bulk_import import PhotoSource, run_bulk_import, write_reject_report
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Enroll students from a CSV roster and photos")
+    parser.add_argument("roster", help="CSV with name, aruco_id and optional photo columns")
+    parser.add_argument("photos", help="Folder or ZIP of photos")
+    parser.add_argument("--workers", type=int, default=BULK_IMPORT_WORKERS,
+                        help="Worker processes (default: %(default)s)")
+    parser.add_argument("--batch-size", type=int, default=BULK_IMPORT_BATCH_SIZE,
+                        help="Photos per worker task (default: %(default)s)")
+    parser.add_argument("--report", help="Reject report path (default: import_reports/<timestamp>.csv)")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="Check and embed every photo, but don't save students")
+    args = parser.parse_args()
+
+    try:
+        photos = PhotoSource(args.photos)
+    except (FileNotFoundError, OSError) as e:
+        print(f"✗ {e}")
+        return 1
+
+    print(f"Found {len(photos)} photos in {args.photos}")
+
+    def progress(done, total):
+        print(f"\r  Processed {done}/{total}", end="", flush=True)
+
+    try:
+        result = run_bulk_import(DatabaseManager(DATABASE_PATH), args.roster, photos,
+                                 FACE_MODEL, FACE_DETECTION_BACKEND,
+                                 workers=args.workers, batch_size=args.batch_size,
+                                 progress=progress, dry_run=args.dry_run, runtime=EMBEDDING_RUNTIME,
+                                 model_path=EMBEDDING_MODEL_PATH, threads=EMBEDDING_THREADS)
+    except (ValueError, RuntimeError, OSError) as e:
+        print(f"\n✗ {e}")
+        return 1
+    finally:
+        photos.close()
+
+    print()
+    print("=" * 50)
+    verb = "Would enroll" if args.dry_run else "Enrolled"
+    print(f"{verb}: {len(result['enrolled'])} of {result['total']} students")
+    print(f"Rejected: {len(result['rejects'])}")
+
+    if result["rejects"]:
+        report = args.report or os.path.join(
+            BULK_IMPORT_REPORT_DIR, datetime.now().strftime("%Y%m%d_%H%M%S") + ".csv")
+        write_reject_report(result["rejects"], report)
+        print(f"Reject report: {report}")
+    print("=" * 50)
+
+    if result["enrolled"] and not args.dry_run:
+        print("Restart attendance.service to load the new students")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,85 @@
+"""
+Camera Broker Service
+Owns the camera and the face recognition model and shares them with the
+attendance service and the web manager over a Unix socket
+Run: python camera_broker.py (enable with CAMERA_BROKER_ENABLED in config.py)
+"""
+import signal
+import sys
+import threading
+
+from config import (HARDWARE_MODE, CAMERA_INDEX, CAMERA_WIDTH, CAMERA_HEIGHT,
+                    FACE_MODEL, FACE_DETECTION_BACKEND, CAMERA_BROKER_SOCKET,
+                    CAMERA_BROKER_HOLD_TIMEOUT, CAMERA_BROKER_METRICS_PATH,
+                    METRICS_SNAPSHOT_INTERVAL, INFERENCE_WORKERS, INFERENCE_TIMEOUT,
+                    INFERENCE_WARMUP_TIMEOUT, INFERENCE_LOAD_RESTARTS,
+                    EMBEDDING_RUNTIME, EMBEDDING_MODEL_PATH, EMBEDDING_THREADS)
+from ai.face_recognition import FaceRecognizer
+from ai.inference_pool import InferencePool, PoolRecognizer
+from hardware.broker import CameraBroker
+from hardware.camera import Camera
+from utils import metrics
+from utils.logger import get_logger
+from utils.startup import StartupProfiler, process_uptime
+
+
+log = get_logger("broker")
+
+
+def main():
+    """Main entry point"""
+    profiler = StartupProfiler("Camera broker")
+    profiler.record("imports", process_uptime())
+
+    with profiler.step("camera_init"):
+        camera = Camera(mode=HARDWARE_MODE, camera_index=CAMERA_INDEX,
+                        width=CAMERA_WIDTH, height=CAMERA_HEIGHT)
+    pool = None
+    if INFERENCE_WORKERS > 0:
+        # Requests from the attendance service and the web manager embed in parallel
+        pool = InferencePool(model_name=FACE_MODEL, backend=FACE_DETECTION_BACKEND,
+                             workers=INFERENCE_WORKERS, slot_bytes=CAMERA_WIDTH * CAMERA_HEIGHT * 3,
+                             runtime=EMBEDDING_RUNTIME, model_path=EMBEDDING_MODEL_PATH,
+                             threads=EMBEDDING_THREADS, load_restarts=INFERENCE_LOAD_RESTARTS)
+        recognizer = PoolRecognizer(pool, model_name=FACE_MODEL, backend=FACE_DETECTION_BACKEND,
+                                    timeout=INFERENCE_TIMEOUT, warmup_timeout=INFERENCE_WARMUP_TIMEOUT)
+    else:
+        recognizer = FaceRecognizer(model_name=FACE_MODEL, backend=FACE_DETECTION_BACKEND,
+                                    runtime=EMBEDDING_RUNTIME, model_path=EMBEDDING_MODEL_PATH,
+                                    threads=EMBEDDING_THREADS)
+    model_thread = recognizer.warmup_async()
+
+    broker = CameraBroker(CAMERA_BROKER_SOCKET, camera, recognizer,
+                          hold_timeout=CAMERA_BROKER_HOLD_TIMEOUT)
+    broker.start()
+
+    # Shared with the web manager (/metrics) like the attendance snapshot
+    metrics_writer = metrics.SnapshotWriter(CAMERA_BROKER_METRICS_PATH,
+                                            interval=METRICS_SNAPSHOT_INTERVAL)
+    metrics_writer.start()
+
+    model_thread.join()
+    for step, seconds in recognizer.warmup_timings.items():
+        profiler.record(f"model_{step}", seconds)
+    profiler.mark_ready()
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        log.info("Interrupted by user")
+    finally:
+        broker.stop()
+        if pool is not None:
+            pool.stop()
+        metrics_writer.stop()
+        camera.release()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        log.critical("Fatal error: %s", e, exc_info=True)
+        sys.exit(1)
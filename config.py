@@ -2,6 +2,7 @@
 Configuration file for the attendance system
 """
 import os
+import socket
 
 # Base directory
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -19,14 +20,51 @@ CAMERA_FPS = 30
 FACE_RECOGNITION_THRESHOLD = 0.6  # Cosine similarity threshold (0-1)
 FACE_MODEL = "Facenet"  # Options: "Facenet", "VGG-Face", "OpenFace"
 FACE_DETECTION_BACKEND = "opencv"  # Options: "opencv", "ssd", "dlib", "mtcnn", "retinaface"
+GALLERY_PRECISION = "float32"  # Gallery matrix storage: "float32", "float16" (2x smaller), "int8" (4x smaller)
+GALLERY_RERANK = 5  # Best candidates scored again at full precision (0 = off)
+RECOGNITION_TOP_K = 3  # Candidates considered per face
+RECOGNITION_MARGIN = 0.03  # Candidates closer than this to the best one are told apart by ArUco
+EMBEDDING_CACHE_ENABLED = True  # Reuse the embedding of a face crop that looks unchanged
+EMBEDDING_CACHE_SIZE = 32  # Embeddings kept
+EMBEDDING_CACHE_TTL = 10.0  # Seconds an embedding is reused at most
+EMBEDDING_CACHE_MAX_DISTANCE = 12  # Differing perceptual hash bits (of 256) still counted as the same crop
+
+# Embedding runtime
+# "deepface" runs FACE_MODEL's Keras model through DeepFace (TensorFlow); "onnx" and
+# "tflite" run FACE_MODEL exported by convert_model.py, several times faster on a Pi.
+# Students enrolled with one runtime are recognized by another only if their
+# embeddings agree: check with benchmarks/embedding_parity.py before switching
+EMBEDDING_RUNTIME = "deepface"  # Options: "deepface", "onnx", "tflite"
+EMBEDDING_MODEL_PATH = os.path.join(BASE_DIR, "models", "facenet.onnx")  # Exported model (onnx/tflite)
+EMBEDDING_THREADS = 0  # Inference threads for onnx/tflite (0 = one per core)
+
+# Inference pool (attendance service and camera broker)
+# Embeddings are generated by worker processes that each load the face model,
+# so TensorFlow doesn't hold the service's GIL; every worker adds the model's memory
+INFERENCE_WORKERS = 0  # Worker processes (0 = embed in the service's own process)
+INFERENCE_TIMEOUT = 30.0  # Seconds to wait for a worker's embedding
+INFERENCE_WARMUP_TIMEOUT = 300.0  # Seconds start-up waits for the workers to load the model
+INFERENCE_LOAD_RESTARTS = 3  # Restarts of a worker that dies loading the model (e.g. out of memory) before giving up
 
 # Face quality validation (lower = more lenient for poor lighting)
 MIN_BRIGHTNESS = 20  # Minimum average brightness (0-255, default: 20)
 MIN_CONTRAST = 10    # Minimum contrast/standard deviation (default: 10)
 MIN_SHARPNESS = 50   # Minimum sharpness/Laplacian variance (default: 50)
 
+# Face alignment (ai/face_aligner.py)
+# Detected faces are warped upright to a 160x160 crop from their eye positions
+# before embedding, so tilted heads match on the first attempt. Enrollment
+# aligns too: re-enroll students after turning it on for the best match scores
+FACE_ALIGNMENT = "none"  # Options: "none", "eyes" (Haar eye cascade), "yunet" (needs the model below)
+FACE_ALIGNMENT_MODEL_PATH = os.path.join(BASE_DIR, "models", "face_detection_yunet_2023mar.onnx")
+
 # ArUco configuration
-ARUCO_DICT = "DICT_4X4_50"  # ArUco dictionary type
+ARUCO_DICT = "DICT_4X4_50"  # ArUco dictionary type (e.g. "DICT_4X4_1000" for more than 50 students)
+MARKER_DIR = os.path.join(BASE_DIR, "aruco_markers")  # Generated markers and sheets
+MARKER_CACHE_DIR = os.path.join(MARKER_DIR, "cache")  # Rendered markers, reused across requests
+MARKER_SIZE_MM = 50  # Printed marker size on sheets
+MARKER_SHEET_DPI = 300  # Sheet resolution
+MARKER_WORKERS = 4  # Threads rendering markers and sheets
 
 # Ultrasonic sensor configuration (Raspberry Pi only)
 ULTRASONIC_ENABLED = False  # Set to True to enable ultrasonic sensors
@@ -52,7 +90,85 @@ HARDWARE_MODE = "PC"  # Options: "PC", "RASPBERRY_PI"
 
 # Attendance settings
 DUPLICATE_ATTENDANCE_WINDOW = 86400  # Seconds in a day (prevents duplicate attendance on same day)
+DEVICE_ID = socket.gethostname()  # Kiosk name stored with each attendance record
+
+# Write-behind attendance (main_attendance.py)
+# Marks are appended to a local journal and committed to SQLite in batches by a
+# background thread; the journal is replayed on the next start after a crash
+ATTENDANCE_WRITE_BEHIND = True
+ATTENDANCE_JOURNAL_PATH = os.path.join(BASE_DIR, "database", "attendance.journal")
+ATTENDANCE_BATCH_SIZE = 50  # Pending marks that trigger an early commit
+ATTENDANCE_FLUSH_INTERVAL = 1.0  # Seconds between commits
+ATTENDANCE_JOURNAL_FSYNC = False  # fsync every append (survives power loss, slower on SD cards)
 
 # Logging configuration
 LOG_LEVEL = "INFO"  # Options: "DEBUG", "INFO", "WARNING", "ERROR"
-LOG_FILE = os.path.join(BASE_DIR, "attendance.log")
+LOG_FILE = os.path.join(BASE_DIR, "attendance.log")  # Set to None to log to stdout/journald only
+LOG_FORMAT = "text"  # Options: "text", "json"
+LOG_TO_CONSOLE = True  # Also log to stdout (captured by journald when run as a service)
+LOG_MAX_BYTES = 5 * 1024 * 1024  # Rotate the log file at this size
+LOG_BACKUP_COUNT = 3  # Rotated log files to keep
+LOG_QUEUE_SIZE = 10000  # Buffered records before new ones are dropped (logging never blocks)
+LOG_RATE_LIMIT_INTERVAL = 10  # Seconds per rate-limit window
+LOG_RATE_LIMIT_BURST = 5  # Identical messages allowed per window (0 = no limit)
+
+# Metrics configuration
+METRICS_ENABLED = True  # Collect counters/latency histograms (near-zero cost when False)
+# Snapshot written by the attendance service and served by the web manager at /metrics
+# (/dev/shm is RAM-backed, so frequent snapshots don't wear the SD card)
+METRICS_SNAPSHOT_PATH = ("/dev/shm/attendance_metrics.json" if os.path.isdir("/dev/shm")
+                         else os.path.join(BASE_DIR, "attendance_metrics.json"))
+METRICS_SNAPSHOT_INTERVAL = 5  # Seconds between snapshots
+
+# Camera broker configuration
+# When enabled, camera_broker.py owns the camera and the face model and the
+# attendance service and web enrollment share them (no service restarts)
+CAMERA_BROKER_ENABLED = False
+CAMERA_BROKER_SOCKET = ("/dev/shm/attendance_camera.sock" if os.path.isdir("/dev/shm")
+                        else os.path.join(BASE_DIR, "attendance_camera.sock"))
+CAMERA_BROKER_METRICS_PATH = ("/dev/shm/attendance_broker_metrics.json" if os.path.isdir("/dev/shm")
+                              else os.path.join(BASE_DIR, "attendance_broker_metrics.json"))
+CAMERA_BROKER_HOLD_TIMEOUT = 120  # Seconds before an abandoned enrollment hold expires
+
+# Live preview configuration (web manager /stream)
+PREVIEW_ENABLED = True  # Publish annotated frames (only encoded while someone is watching)
+PREVIEW_PATH = ("/dev/shm/attendance_preview.jpg" if os.path.isdir("/dev/shm")
+                else os.path.join(BASE_DIR, "attendance_preview.jpg"))
+PREVIEW_MAX_FPS = 10  # Preview frames per second
+PREVIEW_QUALITY = 70  # JPEG quality (0-100)
+PREVIEW_WIDTH = 480  # Downscale preview frames to this width (None = full size)
+
+# Bulk enrollment configuration (bulk_enroll.py and the web upload)
+BULK_IMPORT_WORKERS = 2  # Worker processes embedding photos (each loads the model once)
+BULK_IMPORT_BATCH_SIZE = 16  # Photos per worker task
+BULK_IMPORT_REPORT_DIR = os.path.join(BASE_DIR, "import_reports")  # Reject reports (CSV)
+BULK_IMPORT_HOLD_TIMEOUT = 600  # Seconds the camera broker hold outlives the import's last progress
+
+# Web manager response cache (dashboard, lists and reports)
+# Pages are reused until the TTL runs out or any writer touches DATABASE_PATH + "-changed"
+WEB_CACHE_TTL = 30  # Seconds a cached page is served at most
+WEB_CACHE_MAX_ENTRIES = 256  # Cached pages kept (least recently used are dropped)
+
+# Web manager server (waitress; falls back to the Flask development server if not installed)
+WEB_HOST = "0.0.0.0"  # All interfaces, so phones on the hotspot can connect
+WEB_PORT = 4000
+WEB_THREADS = 8  # Requests handled at once (each open /stream or SSE viewer holds one)
+WEB_MAX_STREAMS = WEB_THREADS - 2  # Live view (/stream) viewers at once; more get 503 so pages still load
+WEB_CONNECTION_LIMIT = 64  # Open connections before new ones wait
+WEB_KEEPALIVE_TIMEOUT = 30  # Seconds an idle keep-alive connection stays open
+WEB_SHUTDOWN_TIMEOUT = 10  # Seconds in-flight requests and jobs get on SIGTERM
+WEB_STATIC_MAX_AGE = 7 * 24 * 3600  # Browser cache lifetime of static/ files (URLs carry a content hash)
+WEB_JOB_RETENTION_DAYS = 30  # Days finished jobs (and bulk import reject reports) are kept
+
+# Multi-kiosk sync (several doors, each a Pi with its own database)
+# Each kiosk's attendance service sends its attendance and student changes to the
+# aggregator (sync_aggregator.py) and receives the other kiosks'; students are
+# matched by ArUco ID, so every door needs a distinct DEVICE_ID and shared markers
+SYNC_ENABLED = False
+SYNC_SERVER = "10.42.0.1:4100"  # Aggregator address used by kiosks ("host:port" or a Unix socket path)
+SYNC_LISTEN = "0.0.0.0:4100"  # Address the aggregator listens on
+SYNC_TOKEN = ""  # Shared secret, the same on the aggregator and every kiosk ("" = none)
+SYNC_INTERVAL = 10  # Seconds between sync rounds
+SYNC_MAX_BACKOFF = 300  # Longest wait between attempts while the aggregator is unreachable
+SYNC_BATCH_SIZE = 500  # Attendance records or students per message
+SYNC_TIMEOUT = 10  # Seconds to connect and per request
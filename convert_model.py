@@ -0,0 +1,150 @@
+"""
+Face Model Export
+Exports a DeepFace model (with its downloaded weights) to ONNX or TensorFlow
+Lite for the onnx and tflite embedding runtimes (EMBEDDING_RUNTIME in
+config.py), optionally quantized to int8. Run it on a PC with TensorFlow
+(plus tf2onnx for ONNX) and copy the file to the Pi, which then only needs
+onnxruntime or tflite-runtime.
+
+Run: python convert_model.py --format onnx                  # models/facenet.onnx
+     python convert_model.py --format tflite --quantize int8 --calibration photos/
+Then check the export: python -m benchmarks.embedding_parity --model models/facenet.onnx
+"""
+import argparse
+import os
+import sys
+
+import cv2
+
+from config import BASE_DIR, FACE_MODEL
+from ai.embedding_runtime import preprocess
+
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def load_keras_model(model_name):
+    """
+    Keras model behind a DeepFace model name
+
+    Args:
+        model_name: DeepFace model ("Facenet", "Facenet512", "ArcFace", ...)
+
+    Returns:
+        tf.keras Model (weights are downloaded by DeepFace on first use)
+    """
+    from deepface import DeepFace
+
+    built = DeepFace.build_model(model_name)
+    # Newer DeepFace versions wrap the Keras model in a client object
+    return getattr(built, "model", built)
+
+
+def calibration_batches(folder, size, limit=200):
+    """
+    Face photos as model inputs, for int8 calibration
+
+    Args:
+        folder: Folder of face crops (e.g. the photos used for bulk enrollment)
+        size: Model input (height, width)
+        limit: Photos used at most
+
+    Yields:
+        Lists with one float32 batch of one image
+    """
+    names = sorted(n for n in os.listdir(folder) if n.lower().endswith(IMAGE_EXTENSIONS))[:limit]
+    for name in names:
+        image = cv2.imread(os.path.join(folder, name))
+        if image is not None:
+            yield [preprocess(image, size)[None]]
+
+
+def export_onnx(model, output, quantize):
+    """
+    Export to ONNX (int8: weights quantized, activations quantized per call)
+
+    Args:
+        model: Keras model
+        output: .onnx path
+        quantize: "int8" or None
+    """
+    import tensorflow as tf
+    import tf2onnx
+
+    height, width = model.input_shape[1:3]
+    spec = (tf.TensorSpec((None, height, width, 3), tf.float32, name="input"),)
+    target = output + ".float.onnx" if quantize else output
+    tf2onnx.convert.from_keras(model, input_signature=spec, opset=13, output_path=target)
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(target, output, weight_type=QuantType.QInt8)
+        os.remove(target)
+
+
+def export_tflite(model, output, quantize, calibration):
+    """
+    Convert to TensorFlow Lite
+
+    With int8 the weights are quantized; with calibration photos the
+    activations are too (a fully integer model, fastest on the Pi's CPU).
+
+    Args:
+        model: Keras model
+        output: .tflite path
+        quantize: "int8" or None
+        calibration: Folder of face photos, or None
+    """
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if quantize:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if calibration:
+            size = model.input_shape[1:3]
+            converter.representative_dataset = lambda: calibration_batches(calibration, size)
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+            converter.inference_input_type = tf.int8
+            converter.inference_output_type = tf.int8
+
+    with open(output, "wb") as f:
+        f.write(converter.convert())
+
+
+def main():
+    """Main entry point"""
+    parser = argparse.ArgumentParser(description="Export a DeepFace model for ONNX Runtime or TensorFlow Lite")
+    parser.add_argument("--model", default=FACE_MODEL, help="DeepFace model (default: %(default)s)")
+    parser.add_argument("--format", choices=("onnx", "tflite"), default="onnx",
+                        help="Export format (default: %(default)s)")
+    parser.add_argument("--quantize", choices=("int8",), help="Quantize the weights to int8")
+    parser.add_argument("--calibration", help="Folder of face photos for full int8 TFLite calibration")
+    parser.add_argument("--output", help="Output file (default: models/<model>[-int8].<format>)")
+    args = parser.parse_args()
+
+    if args.calibration and not (args.format == "tflite" and args.quantize):
+        parser.error("--calibration needs --format tflite --quantize int8")
+
+    output = args.output or os.path.join(
+        BASE_DIR, "models", f"{args.model.lower()}{'-int8' if args.quantize else ''}.{args.format}")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+
+    try:
+        model = load_keras_model(args.model)
+        print(f"Loaded {args.model}: input {model.input_shape}, output {model.output_shape}")
+        if args.format == "onnx":
+            export_onnx(model, output, args.quantize)
+        else:
+            export_tflite(model, output, args.quantize, args.calibration)
+    except ImportError as e:
+        print(f"✗ {e} (export needs tensorflow, plus tf2onnx for ONNX)")
+        return 1
+
+    print(f"✓ Wrote {output} ({os.path.getsize(output) / 1e6:.1f} MB)")
+    print(f"  Check it: python -m benchmarks.embedding_parity --runtime {args.format} --model {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
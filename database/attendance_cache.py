@@ -0,0 +1,114 @@
+"""
+"Already marked today" cache
+Keeps the IDs of the students with attendance today in memory, so the
+attendance loop can reject a repeat check-in right after recognition (no
+ArUco step, no SQLite query). The set is loaded once per day, rolls over at
+midnight, is updated on every successful mark, and is reloaded when another
+process removes attendance (the web reset pages, manage_students.py), which
+they signal through DatabaseManager.resets.
+
+With an AttendanceJournal (write-behind mode), a mark is confirmed once it
+is journaled; the set then also covers marks not committed yet.
+"""
+import threading
+from datetime import datetime
+
+from utils import metrics
+from utils.logger import get_logger
+
+
+log = get_logger("attendance")
+
+MARKED_CACHE_LOOKUPS = metrics.counter("marked_today_lookups_total", "Already-marked-today checks",
+                                       labels=("result",))
+
+
+def _today():
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+class MarkedTodayCache:
+    """In-memory set of the students marked today, in front of the attendance table"""
+
+    def __init__(self, db, today=None, journal=None):
+        """
+        Initialize cache (loads today's attendance)
+
+        Args:
+            db: DatabaseManager (get_marked_student_ids, mark_attendance, resets)
+            today: Function returning today's "YYYY-MM-DD" (default: local date)
+            journal: Optional AttendanceJournal to write marks behind
+        """
+        self.db = db
+        self.journal = journal
+        self.today = today or _today
+        self.lock = threading.Lock()
+        self.date = None
+        self.reset_version = None
+        self.student_ids = set()
+        self._refresh()
+
+    def _reload(self, date):
+        # Read the stamp first, so a reset during the query triggers another reload
+        self.reset_version = self.db.resets.version()
+        self.student_ids = self.db.get_marked_student_ids(date)
+        if self.journal is not None:
+            self.student_ids |= self.journal.pending_student_ids(date)
+        if date != self.date:
+            log.info("Attendance for %s: %d already marked", date, len(self.student_ids))
+        self.date = date
+
+    def _refresh(self):
+        """Reload on a new day or after a reset (a date check and a stat())"""
+        date = self.today()
+        if date != self.date or self.db.resets.version() != self.reset_version:
+            self._reload(date)
+
+    def is_marked(self, student_id):
+        """
+        Check if a student already has attendance today
+
+        Args:
+            student_id: Student ID
+
+        Returns:
+            True if already marked
+        """
+        with self.lock:
+            self._refresh()
+            marked = student_id in self.student_ids
+        MARKED_CACHE_LOOKUPS.labels("marked" if marked else "not_marked").inc()
+        return marked
+
+    def mark(self, student_id, status="Present"):
+        """
+        Mark attendance through the database (or the journal) and remember it
+
+        Args:
+            student_id: Student ID
+            status: Attendance status (default: "Present")
+
+        Returns:
+            True if marked now; False if it was already marked (check
+            is_marked()) or the write failed
+        """
+        with self.lock:
+            self._refresh()
+            if student_id in self.student_ids:
+                return False
+            if self.journal is not None:
+                self.journal.append(student_id, status)
+                self.student_ids.add(student_id)
+                return True
+            if self.db.mark_attendance(student_id, status):
+                self.student_ids.add(student_id)
+                return True
+            # Marked by another process since the load, or a database error
+            self._reload(self.date)
+            return False
+
+    def count(self):
+        """Number of students marked today"""
+        with self.lock:
+            self._refresh()
+            return len(self.student_ids)
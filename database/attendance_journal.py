@@ -0,0 +1,220 @@
+"""
+Write-behind attendance journal
+Marking attendance straight into SQLite costs a commit (and on an SD card,
+fsyncs) per student, which the person at the kiosk waits for. With the
+journal, a mark is appended as one JSON line to a local file and queued;
+a background thread commits the queue to SQLite in batches (one
+transaction, executemany) every flush interval or once a batch fills up,
+then empties the journal.
+
+The inserts use INSERT OR IGNORE on the attendance table's (student_id,
+date) constraint, so committing an event twice is harmless: after a crash
+the journal is simply replayed on the next start.
+
+Usage:
+    journal = AttendanceJournal(db, ATTENDANCE_JOURNAL_PATH)
+    journal.replay()          # before loading today's marks
+    journal.start()
+    journal.append(student_id)
+    ...
+    journal.stop()            # commits what is left
+"""
+import json
+import os
+import threading
+import time
+from datetime import datetime
+
+from utils import metrics
+from utils.logger import get_logger
+
+
+log = get_logger("attendance")
+
+JOURNAL_PENDING = metrics.gauge("attendance_journal_pending", "Journaled marks not yet committed")
+JOURNAL_BATCH_SIZE = metrics.histogram("attendance_journal_batch_size", "Marks committed per batch",
+                                       buckets=(1, 2, 5, 10, 20, 50, 100, 200))
+JOURNAL_COMMIT_SECONDS = metrics.histogram("attendance_journal_commit_seconds",
+                                           "Batch commit latency")
+JOURNAL_COMMIT_ERRORS = metrics.counter("attendance_journal_commit_errors_total",
+                                        "Batch commits that failed (retried)")
+
+
+class AttendanceJournal:
+    """Append-only attendance journal with a batching SQLite writer"""
+
+    def __init__(self, db, path, batch_size=50, flush_interval=1.0, fsync=False):
+        """
+        Initialize journal
+
+        Args:
+            db: DatabaseManager (mark_attendance_batch)
+            path: Journal file path
+            batch_size: Pending marks that trigger a commit before the interval
+            flush_interval: Seconds between commits
+            fsync: fsync every append (survives power loss, costs a disk flush
+                per mark); otherwise appends survive a crash of the process
+        """
+        self.db = db
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.lock = threading.Lock()
+        self.flush_lock = threading.Lock()
+        self.pending = []
+        self._file = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _open(self):
+        if self._file is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            self._file = open(self.path, "a", encoding="utf-8")
+        return self._file
+
+    def _truncate(self):
+        """Empty the journal (everything in it is committed)"""
+        self._open().truncate(0)
+
+    def replay(self):
+        """
+        Commit the events left in the journal by a previous run
+
+        Call before start(). A torn last line (crash mid-append) is skipped.
+
+        Returns:
+            Number of events newly written to the database, or None if the
+            commit failed (the journal is kept for the next attempt)
+        """
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return 0
+
+        events = []
+        for line in lines:
+            try:
+                event = json.loads(line)
+                events.append((event["student_id"], event["date"], event["time"], event["status"]))
+            except (ValueError, KeyError, TypeError):
+                log.warning("Skipping unreadable journal line: %r", line[:80])
+        if not events:
+            with self.lock:
+                self._truncate()
+            return 0
+
+        inserted = self.db.mark_attendance_batch(events)
+        if inserted is None:
+            log.error("Journal replay failed, keeping %d events in %s", len(events), self.path)
+            return None
+        with self.lock:
+            self._truncate()
+        log.info("Replayed attendance journal: %d events, %d not yet in the database",
+                 len(events), inserted)
+        return inserted
+
+    def start(self):
+        """Start the background writer"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="attendance-journal", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+    def append(self, student_id, status="Present"):
+        """
+        Record a mark (returns once it is in the journal, not the database)
+
+        Args:
+            student_id: Student ID
+            status: Attendance status (default: "Present")
+
+        Returns:
+            The event as a (student_id, date, time, status) tuple
+        """
+        now = datetime.now()
+        event = (student_id, now.strftime("%Y-%m-%d"), now.strftime("%H:%M:%S"), status)
+        line = json.dumps({"student_id": event[0], "date": event[1],
+                           "time": event[2], "status": event[3]})
+        with self.lock:
+            f = self._open()
+            f.write(line + "\n")
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+            self.pending.append(event)
+            pending = len(self.pending)
+        JOURNAL_PENDING.set(pending)
+        if pending >= self.batch_size:
+            self._wake.set()
+        return event
+
+    def pending_student_ids(self, date):
+        """
+        Students with a mark for a date that is not committed yet
+
+        Args:
+            date: Date string (YYYY-MM-DD)
+
+        Returns:
+            Set of student IDs
+        """
+        with self.lock:
+            return {event[0] for event in self.pending if event[1] == date}
+
+    def flush(self):
+        """
+        Commit the pending marks in one transaction
+
+        Returns:
+            True if nothing is left pending
+        """
+        with self.flush_lock:
+            with self.lock:
+                batch = list(self.pending)
+            if not batch:
+                return True
+
+            start = time.perf_counter()
+            inserted = self.db.mark_attendance_batch(batch)
+            if inserted is None:
+                JOURNAL_COMMIT_ERRORS.inc()
+                log.warning("Attendance batch of %d not committed, retrying in %.1fs",
+                            len(batch), self.flush_interval)
+                return False
+            JOURNAL_COMMIT_SECONDS.observe(time.perf_counter() - start)
+            JOURNAL_BATCH_SIZE.observe(len(batch))
+            if inserted < len(batch):
+                log.info("%d of %d journaled marks were already in the database",
+                         len(batch) - inserted, len(batch))
+
+            with self.lock:
+                del self.pending[:len(batch)]
+                remaining = len(self.pending)
+                # Only empty the file when it holds nothing uncommitted
+                if not remaining:
+                    self._truncate()
+            JOURNAL_PENDING.set(remaining)
+            return not remaining
+
+    def stop(self):
+        """Stop the writer and commit what is left (kept in the journal on failure)"""
+        if self._thread is not None:
+            self._stop.set()
+            self._wake.set()
+            self._thread.join(timeout=self.flush_interval + 5)
+            self._thread = None
+        self.flush()
+        with self.lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
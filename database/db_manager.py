@@ -8,54 +8,85 @@ from datetime import datetime
 import pickle
 import numpy as np
 
+from database.migrations import migrate, epoch_seconds
+from utils import metrics
+from utils.cache import ChangeStamp
+from utils.logger import get_logger
+
+
+log = get_logger("database")
+
+
+DB_CALL_SECONDS = metrics.histogram("db_call_seconds", "DatabaseManager call latency", labels=("method",))
+
+# Sortable columns for the paginated queries (name -> ORDER BY expression)
+STUDENT_SORTS = {
+    "name": "name COLLATE NOCASE",
+    "aruco_id": "aruco_id",
+    "created_at": "created_at",
+}
+ATTENDANCE_SORTS = {
+    "time": "a.time",
+    "name": "s.name COLLATE NOCASE",
+    "aruco_id": "s.aruco_id",
+}
+
+
+def _search_filter(query, name_column, aruco_column):
+    """
+    WHERE clause matching a name substring, or an exact ArUco ID for numbers
+    
+    Args:
+        query: Search text ("" matches everything)
+        name_column: Name column expression
+        aruco_column: ArUco ID column expression
+        
+    Returns:
+        Tuple: (SQL condition, parameters)
+    """
+    query = (query or "").strip()
+    if not query:
+        return "1", ()
+    pattern = "%" + query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    if query.isdigit():
+        return f"({name_column} LIKE ? ESCAPE '\\' OR {aruco_column} = ?)", (pattern, int(query))
+    return f"{name_column} LIKE ? ESCAPE '\\'", (pattern,)
+
 
 class DatabaseManager:
     """Manages SQLite database operations for students and attendance"""
     
-    def __init__(self, db_path):
+    def __init__(self, db_path, device=None):
         """
         Initialize database connection
         
         Args:
             db_path: Path to SQLite database file
+            device: Kiosk name stored with the attendance it marks (optional)
         """
         self.db_path = db_path
+        self.device = device
+        # Bumped after every write so caches (web manager) know the data changed
+        self.changes = ChangeStamp.for_database(db_path)
+        # Bumped when attendance or students are removed (resets, deletes) or
+        # arrive from another kiosk, so MarkedTodayCache reloads its in-memory set
+        self.resets = ChangeStamp.for_database(db_path, "reset")
+        # Bumped when students are added, changed or removed, so the attendance
+        # service reloads its gallery
+        self.roster = ChangeStamp.for_database(db_path, "students")
         self._ensure_database_exists()
         
     def _ensure_database_exists(self):
-        """Create database and tables if they don't exist"""
+        """Create the database, or upgrade its schema (database/migrations.py)"""
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        # Create students table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS students (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                aruco_id INTEGER UNIQUE NOT NULL,
-                face_embedding BLOB NOT NULL,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        """)
-        
-        # Create attendance table
-        cursor.execute("""
-            CREATE TABLE IF NOT EXISTS attendance (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                student_id INTEGER NOT NULL,
-                date TEXT NOT NULL,
-                time TEXT NOT NULL,
-                status TEXT NOT NULL,
-                FOREIGN KEY (student_id) REFERENCES students (id),
-                UNIQUE(student_id, date)
-            )
-        """)
-        
-        conn.commit()
-        conn.close()
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            self.schema_version = migrate(conn)
+        finally:
+            conn.close()
         
+    @metrics.timed(DB_CALL_SECONDS.labels("add_student"))
     def add_student(self, name, aruco_id, face_embedding):
         """
         Add a new student to the database (enrollment only)
@@ -83,16 +114,75 @@ class DatabaseManager:
             student_id = cursor.lastrowid
             conn.commit()
             conn.close()
+            self.changes.touch()
+            self.roster.touch()
             
             return student_id
             
         except sqlite3.IntegrityError:
-            print(f"Error: ArUco ID {aruco_id} already exists")
+            log.warning("ArUco ID %s already exists", aruco_id)
             return None
         except Exception as e:
-            print(f"Error adding student: {e}")
+            log.error("Error adding student: %s", e)
             return None
             
+    @metrics.timed(DB_CALL_SECONDS.labels("add_students_bulk"))
+    def add_students_bulk(self, students):
+        """
+        Add many students in a single transaction (bulk import)
+        
+        Either every student is added or none is.
+        
+        Args:
+            students: List of tuples (name, aruco_id, face_embedding)
+            
+        Returns:
+            List of new student IDs (in input order), or None on failure
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.cursor()
+            student_ids = []
+            
+            with conn:
+                for name, aruco_id, face_embedding in students:
+                    cursor.execute("""
+                        INSERT INTO students (name, aruco_id, face_embedding)
+                        VALUES (?, ?, ?)
+                    """, (name, aruco_id, pickle.dumps(face_embedding)))
+                    student_ids.append(cursor.lastrowid)
+            
+            self.changes.touch()
+            self.roster.touch()
+            return student_ids
+            
+        except sqlite3.IntegrityError as e:
+            log.warning("Bulk insert rolled back, duplicate ArUco ID: %s", e)
+            return None
+        except Exception as e:
+            log.error("Error adding students in bulk: %s", e)
+            return None
+        finally:
+            conn.close()
+            
+    @metrics.timed(DB_CALL_SECONDS.labels("get_enrolled_aruco_ids"))
+    def get_enrolled_aruco_ids(self):
+        """
+        Get the ArUco IDs already assigned to students
+        
+        Returns:
+            Set of ArUco IDs
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT aruco_id FROM students")
+        aruco_ids = {row[0] for row in cursor.fetchall()}
+        
+        conn.close()
+        return aruco_ids
+        
+    @metrics.timed(DB_CALL_SECONDS.labels("get_all_students"))
     def get_all_students(self):
         """
         Retrieve all students from database
@@ -116,6 +206,7 @@ class DatabaseManager:
             
         return students
         
+    @metrics.timed(DB_CALL_SECONDS.labels("get_student_by_id"))
     def get_student_by_id(self, student_id):
         """
         Retrieve a student by ID
@@ -144,6 +235,7 @@ class DatabaseManager:
             return (student_id, name, aruco_id, face_embedding)
         return None
         
+    @metrics.timed(DB_CALL_SECONDS.labels("get_student_by_aruco"))
     def get_student_by_aruco(self, aruco_id):
         """
         Retrieve a student by ArUco ID
@@ -172,6 +264,7 @@ class DatabaseManager:
             return (student_id, name, aruco_id, face_embedding)
         return None
         
+    @metrics.timed(DB_CALL_SECONDS.labels("mark_attendance"))
     def mark_attendance(self, student_id, status="Present"):
         """
         Mark attendance for a student
@@ -183,30 +276,71 @@ class DatabaseManager:
         Returns:
             True if successful, False otherwise
         """
+        conn = sqlite3.connect(self.db_path)
         try:
-            conn = sqlite3.connect(self.db_path)
             cursor = conn.cursor()
             
             now = datetime.now()
             date_str = now.strftime("%Y-%m-%d")
             time_str = now.strftime("%H:%M:%S")
             
+            # The attendance_daily summary is updated by a trigger in the same transaction
             cursor.execute("""
-                INSERT INTO attendance (student_id, date, time, status)
-                VALUES (?, ?, ?, ?)
-            """, (student_id, date_str, time_str, status))
+                INSERT INTO attendance (student_id, date, time, status, ts, device)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (student_id, date_str, time_str, status, int(now.timestamp()), self.device))
             
             conn.commit()
-            conn.close()
+            self.changes.touch()
             return True
             
         except sqlite3.IntegrityError:
             # Attendance already marked for today
             return False
         except Exception as e:
-            print(f"Error marking attendance: {e}")
+            log.error("Error marking attendance: %s", e)
             return False
+        finally:
+            # Always close: a failed insert leaves its transaction (and write lock) open
+            conn.close()
+            
+    @metrics.timed(DB_CALL_SECONDS.labels("mark_attendance_batch"))
+    def mark_attendance_batch(self, events):
+        """
+        Mark attendance for many students in a single transaction
+        
+        Used by the write-behind journal. Events already in the database
+        (same student and date) are skipped, so a batch can be committed again.
+        
+        Args:
+            events: List of tuples (student_id, date, time, status)
             
+        Returns:
+            Number of events inserted, or None on failure
+        """
+        conn = sqlite3.connect(self.db_path)
+        try:
+            rows = [(student_id, date_str, time_str, status,
+                     epoch_seconds(date_str, time_str), self.device)
+                    for student_id, date_str, time_str, status in events]
+            with conn:
+                cursor = conn.executemany("""
+                    INSERT OR IGNORE INTO attendance (student_id, date, time, status, ts, device)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                """, rows)
+                inserted = cursor.rowcount
+            
+            if inserted:
+                self.changes.touch()
+            return inserted
+            
+        except Exception as e:
+            log.error("Error marking attendance batch: %s", e)
+            return None
+        finally:
+            conn.close()
+            
+    @metrics.timed(DB_CALL_SECONDS.labels("check_attendance_today"))
     def check_attendance_today(self, student_id):
         """
         Check if attendance is already marked for today
@@ -232,6 +366,25 @@ class DatabaseManager:
         
         return result is not None
         
+    @metrics.timed(DB_CALL_SECONDS.labels("get_marked_student_ids"))
+    def get_marked_student_ids(self, date_str):
+        """
+        IDs of the students with attendance on a date
+        
+        Args:
+            date_str: Date string in format "YYYY-MM-DD"
+            
+        Returns:
+            Set of student IDs
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT student_id FROM attendance WHERE date = ?", (date_str,))
+        student_ids = {row[0] for row in cursor.fetchall()}
+        conn.close()
+        return student_ids
+        
+    @metrics.timed(DB_CALL_SECONDS.labels("get_attendance_by_date"))
     def get_attendance_by_date(self, date_str):
         """
         Get all attendance records for a specific date
@@ -258,6 +411,104 @@ class DatabaseManager:
         
         return rows
         
+    @metrics.timed(DB_CALL_SECONDS.labels("search_students"))
+    def search_students(self, query="", sort="name", descending=False, limit=50, offset=0):
+        """
+        Get one page of students, optionally filtered
+        
+        Args:
+            query: Name substring or ArUco ID ("" for all)
+            sort: Column to sort by (see STUDENT_SORTS)
+            descending: Sort descending
+            limit: Page size
+            offset: Rows to skip
+            
+        Returns:
+            Tuple: (list of (id, name, aruco_id, created_at), total matching)
+        """
+        order = STUDENT_SORTS.get(sort, STUDENT_SORTS["name"])
+        direction = "DESC" if descending else "ASC"
+        where, params = _search_filter(query, "name", "aruco_id")
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute(f"SELECT COUNT(*) FROM students WHERE {where}", params)
+        total = cursor.fetchone()[0]
+        cursor.execute(f"""
+            SELECT id, name, aruco_id, created_at FROM students
+            WHERE {where}
+            ORDER BY {order} {direction}, id {direction}
+            LIMIT ? OFFSET ?
+        """, params + (limit, offset))
+        rows = cursor.fetchall()
+        
+        conn.close()
+        return rows, total
+        
+    @metrics.timed(DB_CALL_SECONDS.labels("search_attendance"))
+    def search_attendance(self, date_str, query="", sort="time", descending=True, limit=50, offset=0):
+        """
+        Get one page of a day's attendance, optionally filtered
+        
+        Args:
+            date_str: Date string in format "YYYY-MM-DD"
+            query: Student name substring or ArUco ID ("" for all)
+            sort: Column to sort by (see ATTENDANCE_SORTS)
+            descending: Sort descending
+            limit: Page size
+            offset: Rows to skip
+            
+        Returns:
+            Tuple: (list of (student_id, name, aruco_id, time, status), total matching)
+        """
+        order = ATTENDANCE_SORTS.get(sort, ATTENDANCE_SORTS["time"])
+        direction = "DESC" if descending else "ASC"
+        where, params = _search_filter(query, "s.name", "s.aruco_id")
+        params = (date_str,) + params
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute(f"""
+            SELECT COUNT(*) FROM attendance a JOIN students s ON a.student_id = s.id
+            WHERE a.date = ? AND {where}
+        """, params)
+        total = cursor.fetchone()[0]
+        cursor.execute(f"""
+            SELECT s.id, s.name, s.aruco_id, a.time, a.status
+            FROM attendance a
+            JOIN students s ON a.student_id = s.id
+            WHERE a.date = ? AND {where}
+            ORDER BY {order} {direction}, a.id {direction}
+            LIMIT ? OFFSET ?
+        """, params + (limit, offset))
+        rows = cursor.fetchall()
+        
+        conn.close()
+        return rows, total
+        
+    @metrics.timed(DB_CALL_SECONDS.labels("get_attendance_count"))
+    def get_attendance_count(self, date_str):
+        """
+        Get the number of students marked on a date
+        
+        Args:
+            date_str: Date string in format "YYYY-MM-DD"
+            
+        Returns:
+            Number of attendance records
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        cursor.execute("SELECT COUNT(*) FROM attendance WHERE date = ?", (date_str,))
+        count = cursor.fetchone()[0]
+        
+        conn.close()
+        return count
+        
+    @metrics.timed(DB_CALL_SECONDS.labels("get_student_count"))
     def get_student_count(self):
         """
         Get total number of enrolled students
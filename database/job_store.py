@@ -0,0 +1,179 @@
+"""
+Job Store for background web jobs (enrollment, imports)
+Persists job status and progress in SQLite so jobs survive page reloads
+and web manager restarts
+"""
+import sqlite3
+import json
+import uuid
+from datetime import datetime
+
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+INTERRUPTED = "interrupted"
+
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED, INTERRUPTED)
+
+_COLUMNS = ("id", "kind", "status", "step", "progress", "message", "params",
+            "result", "created_at", "updated_at")
+
+
+class JobStore:
+    """Manages the jobs table"""
+
+    def __init__(self, db_path):
+        """
+        Initialize job store
+
+        Args:
+            db_path: Path to SQLite database file (jobs table created by
+                     DatabaseManager's migrations)
+        """
+        self.db_path = db_path
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def create_job(self, kind, params=None):
+        """
+        Create a queued job
+
+        Args:
+            kind: Job type (e.g. "enroll")
+            params: JSON-serializable job parameters
+
+        Returns:
+            New job ID
+        """
+        job_id = uuid.uuid4().hex
+        now = datetime.now().isoformat(timespec="seconds")
+
+        conn = self._connect()
+        conn.execute("""
+            INSERT INTO jobs (id, kind, status, step, progress, message, params, created_at, updated_at)
+            VALUES (?, ?, ?, ?, 0, '', ?, ?, ?)
+        """, (job_id, kind, QUEUED, QUEUED, json.dumps(params or {}), now, now))
+        conn.commit()
+        conn.close()
+
+        return job_id
+
+    def update_job(self, job_id, **fields):
+        """
+        Update job fields
+
+        Args:
+            job_id: Job ID
+            fields: Any of status, step, progress, message, result
+        """
+        if "result" in fields:
+            fields["result"] = json.dumps(fields["result"])
+        fields["updated_at"] = datetime.now().isoformat(timespec="seconds")
+
+        assignments = ", ".join(f"{name} = ?" for name in fields if name in _COLUMNS)
+        values = [value for name, value in fields.items() if name in _COLUMNS]
+
+        conn = self._connect()
+        conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", values + [job_id])
+        conn.commit()
+        conn.close()
+
+    def get_job(self, job_id):
+        """
+        Retrieve a job
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            Job dict or None
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,))
+        row = cursor.fetchone()
+        conn.close()
+
+        return self._to_dict(row) if row else None
+
+    def get_recent_jobs(self, kind=None, limit=20):
+        """
+        Retrieve the most recent jobs
+
+        Args:
+            kind: Only jobs of this type (default: all)
+            limit: Maximum number of jobs
+
+        Returns:
+            List of job dicts, newest first
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        if kind:
+            cursor.execute(f"""
+                SELECT {', '.join(_COLUMNS)} FROM jobs WHERE kind = ?
+                ORDER BY created_at DESC LIMIT ?
+            """, (kind, limit))
+        else:
+            cursor.execute(f"""
+                SELECT {', '.join(_COLUMNS)} FROM jobs ORDER BY created_at DESC LIMIT ?
+            """, (limit,))
+        rows = cursor.fetchall()
+        conn.close()
+
+        return [self._to_dict(row) for row in rows]
+
+    def mark_unfinished_interrupted(self):
+        """
+        Mark jobs left queued/running by a previous process as interrupted
+
+        Returns:
+            Number of jobs marked
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE jobs SET status = ?, message = 'Interrupted by a restart', updated_at = ?
+            WHERE status IN (?, ?)
+        """, (INTERRUPTED, datetime.now().isoformat(timespec="seconds"), QUEUED, RUNNING))
+        count = cursor.rowcount
+        conn.commit()
+        conn.close()
+
+        return count
+
+    def delete_finished_before(self, timestamp):
+        """
+        Delete finished jobs created before a timestamp
+
+        Args:
+            timestamp: ISO timestamp string
+
+        Returns:
+            List of the deleted job dicts (their results may name files to remove)
+        """
+        where = f"created_at < ? AND status IN ({', '.join('?' * len(FINISHED_STATUSES))})"
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE {where}",
+                               (timestamp,) + FINISHED_STATUSES)
+                jobs = [self._to_dict(row) for row in cursor.fetchall()]
+                cursor.execute(f"DELETE FROM jobs WHERE id IN ({', '.join('?' * len(jobs))})",
+                               [job["id"] for job in jobs])
+        finally:
+            conn.close()
+
+        return jobs
+
+    def _to_dict(self, row):
+        job = dict(zip(_COLUMNS, row))
+        job["params"] = json.loads(job["params"]) if job["params"] else {}
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
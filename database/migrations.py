@@ -0,0 +1,239 @@
+"""
+Schema migrations for the attendance database
+Each migration upgrades the schema by one version. The version applied last
+is kept in the database header (PRAGMA user_version), and DatabaseManager
+applies the pending ones when it opens the database. Every migration runs
+in its own write transaction that re-reads the version first, so the
+attendance service and the web manager starting together never apply one
+twice, and a failed migration leaves the previous schema untouched.
+
+To change the schema, append a function to MIGRATIONS; never edit one that
+has shipped.
+"""
+from datetime import datetime
+
+from utils.logger import get_logger
+
+
+log = get_logger("database")
+
+
+def epoch_seconds(date_str, time_str):
+    """
+    Local date and time strings as a Unix timestamp
+
+    Args:
+        date_str: Date string "YYYY-MM-DD"
+        time_str: Time string "HH:MM:SS"
+
+    Returns:
+        Seconds since the epoch (int)
+    """
+    return int(datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M:%S").timestamp())
+
+
+def _initial_schema(cursor):
+    """Students, attendance and the daily summary (the schema before versioning)"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS students (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            aruco_id INTEGER UNIQUE NOT NULL,
+            face_embedding BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS attendance (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            student_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            time TEXT NOT NULL,
+            status TEXT NOT NULL,
+            FOREIGN KEY (student_id) REFERENCES students (id),
+            UNIQUE(student_id, date)
+        )
+    """)
+
+    # Indexes for the paginated web views (sorted by name, by day and time)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_students_name ON students(name COLLATE NOCASE)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_attendance_date_time ON attendance(date, time)")
+
+    # Daily summary for reports, kept up to date by triggers on every
+    # attendance insert/delete (including the web manager's resets)
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'attendance_daily'")
+    summary_exists = cursor.fetchone() is not None
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS attendance_daily (
+            date TEXT PRIMARY KEY,
+            present INTEGER NOT NULL DEFAULT 0,
+            enrolled INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+    # enrolled: students on record at the day's first check-in
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_attendance_daily_insert AFTER INSERT ON attendance
+        BEGIN
+            INSERT INTO attendance_daily (date, present, enrolled)
+            VALUES (NEW.date, 1, (SELECT COUNT(*) FROM students))
+            ON CONFLICT(date) DO UPDATE SET present = present + 1;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_attendance_daily_delete AFTER DELETE ON attendance
+        BEGIN
+            UPDATE attendance_daily SET present = present - 1 WHERE date = OLD.date;
+        END
+    """)
+
+    if not summary_exists:
+        # Backfill history (enrollment at the time is unknown; use today's)
+        cursor.execute("""
+            INSERT INTO attendance_daily (date, present, enrolled)
+            SELECT date, COUNT(*), (SELECT COUNT(*) FROM students) FROM attendance GROUP BY date
+        """)
+
+
+def _timestamps_and_devices(cursor):
+    """Epoch timestamp and kiosk name per attendance record, covering per-date index"""
+    cursor.execute("ALTER TABLE attendance ADD COLUMN ts INTEGER")
+    cursor.execute("ALTER TABLE attendance ADD COLUMN device TEXT")
+
+    # Existing records: date and time are local time
+    cursor.execute("""
+        UPDATE attendance SET ts = CAST(strftime('%s', date || ' ' || time, 'utc') AS INTEGER)
+    """)
+
+    # A day's attendance (dashboard, attendance page, exports) is read from the
+    # index alone; per-student lookups already use the UNIQUE(student_id, date) index
+    cursor.execute("DROP INDEX IF EXISTS idx_attendance_date_time")
+    cursor.execute("CREATE INDEX idx_attendance_date ON attendance(date, time, student_id, status)")
+    # Time ranges by timestamp
+    cursor.execute("CREATE INDEX idx_attendance_ts ON attendance(ts)")
+
+
+def _sync_change_log(cursor):
+    """Student change log and cursors for multi-kiosk sync"""
+    # One row per student insert/update/delete, keyed by ArUco ID (the same on
+    # every kiosk); origin is the device a synced change came from (NULL: local)
+    cursor.execute("""
+        CREATE TABLE student_changes (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            aruco_id INTEGER NOT NULL,
+            origin TEXT
+        )
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_student_changes_insert AFTER INSERT ON students
+        BEGIN
+            INSERT INTO student_changes (aruco_id) VALUES (NEW.aruco_id);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_student_changes_update AFTER UPDATE OF name, aruco_id, face_embedding ON students
+        BEGIN
+            INSERT INTO student_changes (aruco_id) SELECT OLD.aruco_id WHERE OLD.aruco_id != NEW.aruco_id;
+            INSERT INTO student_changes (aruco_id) VALUES (NEW.aruco_id);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER trg_student_changes_delete AFTER DELETE ON students
+        BEGIN
+            INSERT INTO student_changes (aruco_id) VALUES (OLD.aruco_id);
+        END
+    """)
+    # Students enrolled before the upgrade are shared on the first sync
+    cursor.execute("INSERT INTO student_changes (aruco_id) SELECT aruco_id FROM students ORDER BY id")
+
+    cursor.execute("""
+        CREATE TABLE sync_state (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+    """)
+
+
+def _jobs(cursor):
+    """Background web jobs (enrollment, bulk imports) for database/job_store.py"""
+    # Databases the web manager opened before versioning the jobs table already have it
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            kind TEXT NOT NULL,
+            status TEXT NOT NULL,
+            step TEXT,
+            progress INTEGER DEFAULT 0,
+            message TEXT,
+            params TEXT,
+            result TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created_at)")
+
+
+# Version N is reached by applying MIGRATIONS[N - 1]
+MIGRATIONS = (
+    _initial_schema,
+    _timestamps_and_devices,
+    _sync_change_log,
+    _jobs,
+)
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+def schema_version(conn):
+    """
+    Schema version of a database
+
+    Args:
+        conn: sqlite3 connection
+
+    Returns:
+        Applied migrations (0 for a new or pre-versioning database)
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, target=SCHEMA_VERSION):
+    """
+    Apply the pending migrations
+
+    Args:
+        conn: sqlite3 connection (its transaction handling is switched to manual)
+        target: Version to upgrade to (default: the latest)
+
+    Returns:
+        Schema version after migrating
+
+    Raises:
+        RuntimeError: If the database is newer than this code
+    """
+    version = schema_version(conn)
+    if version > SCHEMA_VERSION:
+        raise RuntimeError(f"Database schema version {version} is newer than this program "
+                           f"supports ({SCHEMA_VERSION}); update the software")
+    if version >= target:
+        return version
+
+    conn.isolation_level = None
+    cursor = conn.cursor()
+    while True:
+        # Take the write lock before re-reading the version (another process may have migrated)
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            version = schema_version(conn)
+            if version >= target:
+                cursor.execute("COMMIT")
+                return version
+            migration = MIGRATIONS[version]
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {version + 1}")
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        log.info("Database schema version %d: %s", version + 1, migration.__doc__)
@@ -0,0 +1,160 @@
+"""
+Attendance Reports
+Date-range statistics read from the attendance_daily summary (maintained by
+triggers in DatabaseManager), per-student summaries, and row iterators that
+stream attendance records straight from a cursor for exports
+"""
+import sqlite3
+
+from utils import metrics
+from utils.logger import get_logger
+
+
+log = get_logger("reports")
+
+REPORT_SECONDS = metrics.histogram("report_seconds", "Report query latency", labels=("report",))
+
+# Column names of the iterators below (export headers)
+RECORD_COLUMNS = ("date", "time", "student_id", "name", "aruco_id", "status")
+DAILY_COLUMNS = ("date", "present", "enrolled", "rate")
+STUDENT_COLUMNS = ("student_id", "name", "aruco_id", "days_present", "school_days", "rate",
+                   "first_seen", "last_seen")
+
+
+def _rate(present, total):
+    return round(present / total, 4) if total else 0.0
+
+
+class AttendanceReports:
+    """Read-only attendance reports over a date range"""
+
+    def __init__(self, db_path):
+        """
+        Initialize reports
+
+        Args:
+            db_path: Path to SQLite database file (created by DatabaseManager)
+        """
+        self.db_path = db_path
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    @metrics.timed(REPORT_SECONDS.labels("daily"))
+    def daily_summary(self, start, end):
+        """
+        Attendance per day (from the summary table, no attendance scan)
+
+        Args:
+            start: First date "YYYY-MM-DD"
+            end: Last date "YYYY-MM-DD"
+
+        Returns:
+            List of (date, present, enrolled, rate), oldest first; days with
+            no check-ins are left out
+        """
+        conn = self._connect()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT date, present, enrolled FROM attendance_daily
+            WHERE date BETWEEN ? AND ? AND present > 0
+            ORDER BY date
+        """, (start, end))
+        rows = [(date, present, enrolled, _rate(present, enrolled))
+                for date, present, enrolled in cursor.fetchall()]
+        conn.close()
+        return rows
+
+    def range_totals(self, start, end):
+        """
+        Overall figures for a date range
+
+        Args:
+            start: First date "YYYY-MM-DD"
+            end: Last date "YYYY-MM-DD"
+
+        Returns:
+            Dict with school_days, check_ins and average_rate
+        """
+        days = self.daily_summary(start, end)
+        return {
+            "school_days": len(days),
+            "check_ins": sum(day[1] for day in days),
+            "average_rate": round(sum(day[3] for day in days) / len(days), 4) if days else 0.0,
+        }
+
+    def iter_student_summary(self, start, end, limit=-1, offset=0):
+        """
+        Attendance per student, streamed
+
+        Args:
+            start: First date "YYYY-MM-DD"
+            end: Last date "YYYY-MM-DD"
+            limit: Maximum students (-1 for all)
+            offset: Students to skip
+
+        Yields:
+            Tuples matching STUDENT_COLUMNS, students sorted by name
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT COUNT(*) FROM attendance_daily WHERE date BETWEEN ? AND ? AND present > 0
+            """, (start, end))
+            school_days = cursor.fetchone()[0]
+
+            cursor.execute("""
+                SELECT s.id, s.name, s.aruco_id, COUNT(a.id), MIN(a.date), MAX(a.date)
+                FROM students s
+                LEFT JOIN attendance a ON a.student_id = s.id AND a.date BETWEEN ? AND ?
+                GROUP BY s.id
+                ORDER BY s.name COLLATE NOCASE, s.id
+                LIMIT ? OFFSET ?
+            """, (start, end, limit, offset))
+            for student_id, name, aruco_id, days_present, first_seen, last_seen in cursor:
+                yield (student_id, name, aruco_id, days_present, school_days,
+                       _rate(days_present, school_days), first_seen, last_seen)
+        finally:
+            conn.close()
+
+    @metrics.timed(REPORT_SECONDS.labels("students"))
+    def student_summary(self, start, end, limit=50, offset=0):
+        """
+        One page of the per-student summary
+
+        Args:
+            start: First date "YYYY-MM-DD"
+            end: Last date "YYYY-MM-DD"
+            limit: Page size
+            offset: Students to skip
+
+        Returns:
+            List of tuples matching STUDENT_COLUMNS
+        """
+        return list(self.iter_student_summary(start, end, limit, offset))
+
+    def iter_records(self, start, end):
+        """
+        Every attendance record in a date range, streamed from the cursor
+
+        Args:
+            start: First date "YYYY-MM-DD"
+            end: Last date "YYYY-MM-DD"
+
+        Yields:
+            Tuples matching RECORD_COLUMNS, oldest first
+        """
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT a.date, a.time, s.id, s.name, s.aruco_id, a.status
+                FROM attendance a
+                JOIN students s ON a.student_id = s.id
+                WHERE a.date BETWEEN ? AND ?
+                ORDER BY a.date, a.time
+            """, (start, end))
+            yield from cursor
+        finally:
+            conn.close()
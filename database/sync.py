@@ -0,0 +1,401 @@
+"""
+Multi-kiosk sync
+Each kiosk (a Pi with its own attendance.db) ships its new attendance and
+student changes to one aggregator and pulls the other kiosks' back, so all
+doors share one gallery and one attendance record. The aggregator
+(sync_aggregator.py) keeps the combined database; its web manager shows
+every door.
+
+Every round a kiosk pushes, then pulls, in batches that each move a
+cursor kept in sync_state, so nothing is lost while the aggregator is
+unreachable: the next successful round sends everything queued after the
+last acknowledged cursor. Payloads are zlib-compressed JSON using the
+utils/wire.py framing over TCP ("host:port") or a Unix socket (a path, for
+tests and a single machine).
+
+Usage:
+    store = SyncStore(db)
+    sync = KioskSync(store, SyncClient("10.42.0.1:4100", device="door-1"))
+    sync.start()
+"""
+import hmac
+import json
+import os
+import socket
+import socketserver
+import threading
+import time
+import zlib
+
+from database.sync_store import STUDENTS_PUSHED, ATTENDANCE_PUSHED, STUDENTS_PULLED, ATTENDANCE_PULLED
+from utils import metrics
+from utils.logger import get_logger
+from utils.wire import send_message, recv_message, parse_address
+
+
+log = get_logger("sync")
+
+SYNC_REQUEST_SECONDS = metrics.histogram("sync_request_seconds", "Sync request latency", labels=("op",))
+SYNC_BYTES = metrics.counter("sync_bytes_total", "Compressed sync payload bytes", labels=("direction",))
+SYNC_ROUNDS = metrics.counter("sync_rounds_total", "Kiosk sync rounds", labels=("result",))
+SYNC_PENDING = metrics.gauge("sync_pending_events", "Local attendance records not sent to the aggregator")
+SYNC_LAST_SUCCESS = metrics.gauge("sync_last_success_timestamp", "Time of the last successful sync round")
+
+
+class SyncError(RuntimeError):
+    """Raised when the aggregator rejects a request"""
+
+
+def _encode(data):
+    return zlib.compress(json.dumps(data, separators=(",", ":")).encode(), 6)
+
+
+def _decode(payload):
+    return json.loads(zlib.decompress(payload)) if payload else []
+
+
+class _TCPServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+
+class SyncServer:
+    """Aggregator: receives kiosk changes and serves them to the other kiosks"""
+
+    def __init__(self, address, store, token=""):
+        """
+        Initialize server
+
+        Args:
+            address: "host:port" or Unix socket path to listen on
+            store: SyncStore over the aggregator database
+            token: Shared secret kiosks must send (empty: none)
+        """
+        self.family, self.address = parse_address(address)
+        self.store = store
+        self.token = token
+        self.lock = threading.Lock()
+        self.devices = {}
+        self.connections = set()
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        """Start serving in a background thread"""
+        aggregator = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                aggregator._serve_client(self.request)
+
+        if self.family == socket.AF_UNIX:
+            if os.path.exists(self.address):
+                os.unlink(self.address)
+            os.makedirs(os.path.dirname(self.address) or ".", exist_ok=True)
+            self.server = _UnixServer(self.address, Handler)
+        else:
+            self.server = _TCPServer(self.address, Handler)
+
+        self.thread = threading.Thread(target=self.server.serve_forever, name="sync-server", daemon=True)
+        self.thread.start()
+        log.info("Sync aggregator listening on %s", self.address)
+
+    def stop(self):
+        """Stop serving"""
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        # Handler threads outlive shutdown(); end their connections too
+        for sock in list(self.connections):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+        if self.family == socket.AF_UNIX and os.path.exists(self.address):
+            os.unlink(self.address)
+        log.info("Sync aggregator stopped")
+
+    def _serve_client(self, sock):
+        """Answer requests from one kiosk until it disconnects"""
+        self.connections.add(sock)
+        try:
+            self._answer(sock)
+        finally:
+            self.connections.discard(sock)
+
+    def _answer(self, sock):
+        while True:
+            try:
+                header, payload = recv_message(sock)
+            except (ConnectionError, OSError, ValueError):
+                break
+            SYNC_BYTES.labels("received").inc(len(payload))
+
+            op = header.get("op", "")
+            with SYNC_REQUEST_SECONDS.labels(op).time():
+                try:
+                    if self.token and not hmac.compare_digest(str(header.get("token", "")), self.token):
+                        raise PermissionError("Invalid sync token")
+                    response, response_payload = self._dispatch(op, header, payload)
+                    response["ok"] = True
+                except Exception as e:
+                    log.warning("Sync %s from %s failed: %s", op, header.get("device"), e)
+                    response, response_payload = {"ok": False, "error": str(e)}, b""
+            response["device"] = self.store.device
+
+            try:
+                send_message(sock, response, response_payload)
+            except OSError:
+                break
+            SYNC_BYTES.labels("sent").inc(len(response_payload))
+
+    def _dispatch(self, op, header, payload):
+        """
+        Handle one request
+
+        Returns:
+            Tuple: (response header dict, response payload)
+        """
+        if op == "status":
+            return {"devices": self.devices}, b""
+
+        device = header.get("device")
+        if not device:
+            raise ValueError("Missing device")
+        if device not in self.devices:
+            log.info("Kiosk %s connected", device)
+        self.devices[device] = {"last_seen": time.time()}
+        limit = int(header.get("limit", 500))
+
+        if op == "push_students":
+            with self.lock:
+                applied = self.store.apply_student_changes(_decode(payload), origin=device)
+            return {"applied": applied}, b""
+
+        if op == "push_attendance":
+            with self.lock:
+                inserted = self.store.apply_attendance(_decode(payload))
+            return {"inserted": inserted}, b""
+
+        if op == "pull_students":
+            changes, cursor = self.store.student_changes(header.get("after", 0), limit,
+                                                         exclude_origin=device)
+            return {"cursor": cursor, "count": len(changes), "more": len(changes) >= limit}, _encode(changes)
+
+        if op == "pull_attendance":
+            events, cursor = self.store.attendance_events(header.get("after", 0), limit,
+                                                          exclude_device=device)
+            return {"cursor": cursor, "count": len(events), "more": len(events) >= limit}, _encode(events)
+
+        raise ValueError(f"Unknown op: {op}")
+
+
+class SyncClient:
+    """Connection from a kiosk to the aggregator (reconnects on the next request)"""
+
+    def __init__(self, address, device, token="", timeout=10.0):
+        """
+        Initialize client
+
+        Args:
+            address: Aggregator "host:port" or Unix socket path
+            device: This kiosk's name (DEVICE_ID)
+            token: Shared secret (SYNC_TOKEN)
+            timeout: Seconds to connect and per request
+        """
+        self.family, self.address = parse_address(address)
+        self.device = device
+        self.token = token
+        self.timeout = timeout
+        self.sock = None
+        self.lock = threading.Lock()
+
+    def close(self):
+        """Close the connection"""
+        with self.lock:
+            if self.sock is not None:
+                self.sock.close()
+                self.sock = None
+
+    def request(self, header, payload=b""):
+        """
+        Send a request and wait for the response
+
+        Args:
+            header: Request dict with an "op" key
+            payload: Optional compressed payload
+
+        Returns:
+            Tuple: (response header dict, response payload)
+
+        Raises:
+            SyncError: If the aggregator rejected the request
+            ConnectionError: If the aggregator is unreachable
+        """
+        header = dict(header, device=self.device, token=self.token)
+        with self.lock:
+            try:
+                if self.sock is None:
+                    sock = socket.socket(self.family, socket.SOCK_STREAM)
+                    sock.settimeout(self.timeout)
+                    try:
+                        sock.connect(self.address)
+                    except OSError:
+                        sock.close()
+                        raise
+                    self.sock = sock
+                send_message(self.sock, header, payload)
+                response, response_payload = recv_message(self.sock)
+            except OSError as e:
+                if self.sock is not None:
+                    self.sock.close()
+                    self.sock = None
+                raise ConnectionError(f"Sync aggregator not reachable at {self.address}: {e}") from e
+
+        SYNC_BYTES.labels("sent").inc(len(payload))
+        SYNC_BYTES.labels("received").inc(len(response_payload))
+        if not response.get("ok"):
+            raise SyncError(response.get("error", "Sync request failed"))
+        return response, response_payload
+
+
+class KioskSync:
+    """Background thread syncing a kiosk database with the aggregator"""
+
+    def __init__(self, store, client, interval=10.0, batch_size=500, max_backoff=300.0):
+        """
+        Initialize kiosk sync
+
+        Args:
+            store: SyncStore over the kiosk database
+            client: SyncClient connected to the aggregator
+            interval: Seconds between rounds
+            batch_size: Records or students per message
+            max_backoff: Longest wait between rounds while the aggregator is unreachable
+        """
+        self.store = store
+        self.client = client
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_backoff = max_backoff
+        self.failures = 0
+        # Set when students changed on another kiosk (the gallery needs reloading)
+        self.students_changed = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start syncing in the background (the first round runs right away)"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="kiosk-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the thread (unsent records stay queued in the database)"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join(timeout=self.client.timeout + 1)
+            self._thread = None
+        self.client.close()
+
+    def _run(self):
+        delay = 0
+        while not self._stop.wait(delay):
+            try:
+                self.sync_once()
+                delay = self.interval
+            except (ConnectionError, SyncError) as e:
+                SYNC_ROUNDS.labels("failed").inc()
+                self.failures += 1
+                delay = min(self.interval * 2 ** min(self.failures, 10), self.max_backoff)
+                if self.failures == 1:
+                    log.warning("Sync failed, keeping changes queued: %s", e)
+                else:
+                    log.debug("Sync still failing (%d attempts, next in %.0fs): %s",
+                              self.failures, delay, e)
+            except Exception as e:
+                SYNC_ROUNDS.labels("error").inc()
+                log.error("Sync error: %s", e, exc_info=True)
+                delay = self.max_backoff
+
+    def _push(self, cursor_name, read, op):
+        """Send batches after a cursor until none are left; returns the number sent"""
+        sent = 0
+        after = self.store.get_cursor(cursor_name)
+        while True:
+            items, cursor = read(after, self.batch_size)
+            if not items:
+                return sent
+            self.client.request({"op": op, "count": len(items)}, _encode(items))
+            self.store.set_cursor(cursor_name, cursor)
+            sent += len(items)
+            after = cursor
+
+    def _pull(self, cursor_name, op, apply):
+        """Fetch and apply batches after a cursor until caught up; returns the number received"""
+        received = 0
+        after = self.store.get_cursor(cursor_name)
+        while True:
+            response, payload = self.client.request({"op": op, "after": after, "limit": self.batch_size})
+            items = _decode(payload)
+            if items:
+                apply(items, response)
+                received += len(items)
+            if response["cursor"] != after:
+                self.store.set_cursor(cursor_name, response["cursor"])
+                after = response["cursor"]
+            if not response.get("more"):
+                return received
+
+    def sync_once(self):
+        """
+        Run one round: push local changes, then pull the other kiosks'
+
+        Returns:
+            Dict with the students and records pushed and pulled
+
+        Raises:
+            ConnectionError: If the aggregator is unreachable (changes stay queued)
+            SyncError: If the aggregator rejected a request
+        """
+        store = self.store
+        store.check_attendance_cursor(ATTENDANCE_PUSHED)
+        SYNC_PENDING.set(store.pending_attendance(store.get_cursor(ATTENDANCE_PUSHED)))
+
+        # Students first, so the aggregator knows everyone the attendance refers to
+        result = {
+            "students_pushed": self._push(
+                STUDENTS_PUSHED, lambda after, limit: store.student_changes(after, limit, local_only=True),
+                "push_students"),
+            "attendance_pushed": self._push(
+                ATTENDANCE_PUSHED, lambda after, limit: store.attendance_events(after, limit, local_only=True),
+                "push_attendance"),
+            "students_pulled": self._pull(
+                STUDENTS_PULLED, "pull_students",
+                lambda changes, response: store.apply_student_changes(changes, origin=response["device"])),
+            "attendance_pulled": self._pull(
+                ATTENDANCE_PULLED, "pull_attendance",
+                lambda events, response: store.apply_attendance(events)),
+        }
+
+        SYNC_PENDING.set(0)
+        SYNC_LAST_SUCCESS.set(time.time())
+        SYNC_ROUNDS.labels("ok").inc()
+        if self.failures:
+            log.info("Sync reconnected after %d failed attempts", self.failures)
+            self.failures = 0
+        if result["students_pulled"]:
+            self.students_changed.set()
+        if any(result.values()):
+            log.info("Synced: %(students_pushed)d students and %(attendance_pushed)d records sent, "
+                     "%(students_pulled)d students and %(attendance_pulled)d records received", result)
+        return result
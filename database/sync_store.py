@@ -0,0 +1,308 @@
+"""
+Sync Store
+The SQL side of multi-kiosk sync, the same on a kiosk and on the aggregator:
+reading attendance and student changes after a cursor, applying the ones
+received from the other side, and keeping the cursors in sync_state.
+
+Students are matched by ArUco ID, which is the same on every kiosk (database
+IDs are not). Student changes come from the student_changes log filled by
+triggers (database/migrations.py); a change is sent as the student's current
+row, or as a deletion when the student is gone. Changes applied from another
+device are tagged with it as origin so they are not sent back.
+"""
+import base64
+import pickle
+import sqlite3
+
+import numpy as np
+
+from utils import metrics
+from utils.logger import get_logger
+
+
+log = get_logger("sync")
+
+SYNC_APPLIED = metrics.counter("sync_applied_total", "Changes applied from other devices",
+                               labels=("kind",))
+
+# sync_state names (kiosk)
+STUDENTS_PUSHED = "students_pushed"
+ATTENDANCE_PUSHED = "attendance_pushed"
+STUDENTS_PULLED = "students_pulled"
+ATTENDANCE_PULLED = "attendance_pulled"
+
+
+def encode_embedding(embedding):
+    """Embedding array as a JSON-safe dict (no pickle over the network)"""
+    embedding = np.asarray(embedding)
+    return {"dtype": str(embedding.dtype), "shape": list(embedding.shape),
+            "data": base64.b64encode(embedding.tobytes()).decode("ascii")}
+
+
+def decode_embedding(data):
+    """Inverse of encode_embedding"""
+    raw = base64.b64decode(data["data"])
+    return np.frombuffer(raw, dtype=data["dtype"]).reshape(data["shape"]).copy()
+
+
+class SyncStore:
+    """Sync cursors, outgoing changes and applying incoming ones"""
+
+    def __init__(self, db):
+        """
+        Initialize sync store
+
+        Args:
+            db: DatabaseManager (db_path, device, changes and resets stamps)
+        """
+        self.db = db
+        self.device = db.device
+
+    def _connect(self):
+        return sqlite3.connect(self.db.db_path, timeout=10)
+
+    def get_cursor(self, name):
+        """
+        Read a cursor
+
+        Args:
+            name: Cursor name
+
+        Returns:
+            Cursor value (0 if never set)
+        """
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT value FROM sync_state WHERE name = ?", (name,)).fetchone()
+            return row[0] if row else 0
+        finally:
+            conn.close()
+
+    def set_cursor(self, name, value):
+        """
+        Store a cursor
+
+        Args:
+            name: Cursor name
+            value: New value
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("""
+                    INSERT INTO sync_state (name, value) VALUES (?, ?)
+                    ON CONFLICT(name) DO UPDATE SET value = excluded.value
+                """, (name, value))
+        finally:
+            conn.close()
+
+    def check_attendance_cursor(self, name=ATTENDANCE_PUSHED):
+        """
+        Rewind a cursor over local attendance IDs after a reset
+
+        "Delete all students" also restarts the attendance IDs; a cursor past
+        the highest ID ever assigned would otherwise skip the new records
+        (the aggregator ignores the ones it already has).
+
+        Args:
+            name: Cursor name
+        """
+        cursor_value = self.get_cursor(name)
+        if not cursor_value:
+            return
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'attendance'").fetchone()
+        finally:
+            conn.close()
+        if (row[0] if row else 0) < cursor_value:
+            log.info("Attendance IDs were reset, sending local attendance again")
+            self.set_cursor(name, 0)
+
+    def student_changes(self, after, limit, local_only=False, exclude_origin=None):
+        """
+        Students changed after a cursor, latest state per student
+
+        Args:
+            after: Change log sequence already sent
+            limit: Most students to return
+            local_only: Only changes made on this device (kiosk push)
+            exclude_origin: Skip changes that came from this device (aggregator pull)
+
+        Returns:
+            Tuple: (list of change dicts, new cursor)
+        """
+        if local_only:
+            origin_filter, params = "origin IS NULL", (after, limit)
+        elif exclude_origin is not None:
+            origin_filter, params = "(origin IS NULL OR origin != ?)", (after, exclude_origin, limit)
+        else:
+            origin_filter, params = "1", (after, limit)
+
+        conn = self._connect()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT aruco_id, MAX(seq) AS last_seq FROM student_changes
+                WHERE seq > ? AND {origin_filter}
+                GROUP BY aruco_id
+                ORDER BY last_seq
+                LIMIT ?
+            """, params)
+            changed = cursor.fetchall()
+
+            changes = []
+            for aruco_id, _ in changed:
+                cursor.execute("SELECT name, face_embedding FROM students WHERE aruco_id = ?", (aruco_id,))
+                row = cursor.fetchone()
+                if row is None:
+                    changes.append({"aruco_id": aruco_id, "deleted": True})
+                else:
+                    changes.append({"aruco_id": aruco_id, "name": row[0],
+                                    "embedding": encode_embedding(pickle.loads(row[1]))})
+        finally:
+            conn.close()
+
+        return changes, (changed[-1][1] if changed else after)
+
+    def attendance_events(self, after, limit, local_only=False, exclude_device=None):
+        """
+        Attendance records after a cursor, oldest first
+
+        Args:
+            after: Attendance ID already sent
+            limit: Most records to return
+            local_only: Only records marked on this device (kiosk push)
+            exclude_device: Skip records from this device (aggregator pull)
+
+        Returns:
+            Tuple: (list of [aruco_id, date, time, status, ts, device], new cursor)
+        """
+        if local_only:
+            device_filter, params = "(a.device IS NULL OR a.device = ?)", (self.device,)
+        elif exclude_device is not None:
+            device_filter, params = "(a.device IS NULL OR a.device != ?)", (exclude_device,)
+        else:
+            device_filter, params = "1", ()
+
+        conn = self._connect()
+        try:
+            rows = conn.execute(f"""
+                SELECT a.id, s.aruco_id, a.date, a.time, a.status, a.ts, COALESCE(a.device, ?)
+                FROM attendance a
+                JOIN students s ON a.student_id = s.id
+                WHERE a.id > ? AND {device_filter}
+                ORDER BY a.id
+                LIMIT ?
+            """, (self.device, after) + params + (limit,)).fetchall()
+        finally:
+            conn.close()
+
+        return [list(row[1:]) for row in rows], (rows[-1][0] if rows else after)
+
+    def pending_attendance(self, after):
+        """
+        Number of local attendance records not sent yet
+
+        Args:
+            after: Attendance ID already sent
+
+        Returns:
+            Record count
+        """
+        conn = self._connect()
+        try:
+            return conn.execute("""
+                SELECT COUNT(*) FROM attendance WHERE id > ? AND (device IS NULL OR device = ?)
+            """, (after, self.device)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def apply_student_changes(self, changes, origin):
+        """
+        Apply student changes from another device in one transaction
+
+        A deletion also removes the student's attendance, like deleting a
+        student locally.
+
+        Args:
+            changes: Change dicts from student_changes()
+            origin: Device the changes came from
+
+        Returns:
+            Number of changes applied
+        """
+        if not changes:
+            return 0
+
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM student_changes")
+                last_seq = cursor.fetchone()[0]
+
+                deleted = 0
+                for change in changes:
+                    if change.get("deleted"):
+                        cursor.execute("""
+                            DELETE FROM attendance
+                            WHERE student_id IN (SELECT id FROM students WHERE aruco_id = ?)
+                        """, (change["aruco_id"],))
+                        cursor.execute("DELETE FROM students WHERE aruco_id = ?", (change["aruco_id"],))
+                        deleted += cursor.rowcount
+                    else:
+                        embedding = decode_embedding(change["embedding"])
+                        cursor.execute("""
+                            INSERT INTO students (name, aruco_id, face_embedding) VALUES (?, ?, ?)
+                            ON CONFLICT(aruco_id) DO UPDATE SET
+                                name = excluded.name, face_embedding = excluded.face_embedding
+                        """, (change["name"], change["aruco_id"], pickle.dumps(embedding)))
+
+                # The triggers logged these as local changes; don't send them back
+                cursor.execute("UPDATE student_changes SET origin = ? WHERE seq > ?", (origin, last_seq))
+        finally:
+            conn.close()
+
+        self.db.changes.touch()
+        self.db.roster.touch()
+        if deleted:
+            self.db.resets.touch()
+        SYNC_APPLIED.labels("student").inc(len(changes))
+        return len(changes)
+
+    def apply_attendance(self, events):
+        """
+        Insert attendance from another device in one transaction
+
+        Records for unknown students are skipped, and records already present
+        (same student and date) are ignored, so a batch can be applied again.
+
+        Args:
+            events: Lists from attendance_events()
+
+        Returns:
+            Number of records inserted
+        """
+        if not events:
+            return 0
+
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.executemany("""
+                    INSERT OR IGNORE INTO attendance (student_id, date, time, status, ts, device)
+                    SELECT id, ?, ?, ?, ?, ? FROM students WHERE aruco_id = ?
+                """, [(date_str, time_str, status, ts, device, aruco_id)
+                      for aruco_id, date_str, time_str, status, ts, device in events])
+                inserted = cursor.rowcount
+        finally:
+            conn.close()
+
+        if inserted:
+            self.db.changes.touch()
+            # MarkedTodayCache reloads on this stamp, so a student who checked in
+            # at another door is told they are already marked
+            self.db.resets.touch()
+        SYNC_APPLIED.labels("attendance").inc(inserted)
+        return inserted
@@ -6,6 +6,7 @@ import cv2
 import sys
 import os
 import time
+import shutil
 from datetime import datetime
 
 # Import configuration
@@ -19,6 +20,7 @@ from ai.aruco_detector import ArucoDetector
 from hardware.camera import Camera
 from hardware.lcd import LCDDisplay
 from hardware.buzzer import Buzzer
+from utils.markers import MarkerService
 
 
 class EnrollmentSystem:
@@ -67,7 +69,9 @@ class EnrollmentSystem:
         # Initialize AI modules
         print("[Init] Initializing AI modules...")
         self.face_detector = FaceDetector(backend=FACE_DETECTION_BACKEND)
-        self.face_recognizer = FaceRecognizer(model_name=FACE_MODEL, backend=FACE_DETECTION_BACKEND)
+        self.face_recognizer = FaceRecognizer(model_name=FACE_MODEL, backend=FACE_DETECTION_BACKEND,
+                                              runtime=EMBEDDING_RUNTIME, model_path=EMBEDDING_MODEL_PATH,
+                                              threads=EMBEDDING_THREADS)
         self.aruco_detector = ArucoDetector(dictionary=ARUCO_DICT)
         
         # Initialize database
@@ -405,17 +409,18 @@ class EnrollmentSystem:
         """
         print(f"\n[Generator] Generating {count} ArUco markers...")
         
-        output_dir = os.path.join(BASE_DIR, "aruco_markers")
-        os.makedirs(output_dir, exist_ok=True)
+        service = MarkerService(ARUCO_DICT, MARKER_CACHE_DIR, marker_mm=MARKER_SIZE_MM,
+                                dpi=MARKER_SHEET_DPI, workers=MARKER_WORKERS)
+        marker_ids = range(start_id, start_id + count)
         
-        for i in range(count):
-            marker_id = start_id + i
-            marker_img = self.aruco_detector.generate_marker(marker_id, size=200)
+        # Single PNGs plus printable A4 sheets labelled with enrolled names
+        service.export_markers(marker_ids, MARKER_DIR)
+        labels = {aruco_id: name for _, name, aruco_id, _ in self.db.get_all_students()}
+        sheet_path = os.path.join(MARKER_DIR, f"aruco_sheets_{start_id}-{start_id + count - 1}.pdf")
+        shutil.copyfile(service.sheet_pdf(marker_ids, labels), sheet_path)
             
-            filename = os.path.join(output_dir, f"aruco_marker_{marker_id}.png")
-            cv2.imwrite(filename, marker_img)
-            
-        print(f"[Generator] ✓ Generated {count} markers in: {output_dir}")
+        print(f"[Generator] ✓ Generated {count} markers in: {MARKER_DIR}")
+        print(f"[Generator] ✓ Printable sheets: {sheet_path}")
         print(f"[Generator] Print these markers for student enrollment")
         
     def cleanup(self):
@@ -0,0 +1,429 @@
+"""
+Camera Broker Module - One process owns the camera and the face model
+The broker serves frames and face embeddings over a local Unix socket, so
+the attendance loop and the web enrollment flow share the device and the
+loaded model instead of stopping each other
+
+Messages use the framing in utils/wire.py; the binary payload carries raw
+uint8 image bytes.
+"""
+import contextlib
+import os
+import socket
+import socketserver
+import threading
+import time
+
+import numpy as np
+
+from ai.face_recognition import FaceRecognizer
+from utils import metrics
+from utils.logger import get_logger
+from utils.wire import send_message, recv_message
+
+
+log = get_logger("broker")
+
+BROKER_REQUEST_SECONDS = metrics.histogram("broker_request_seconds", "Camera broker request latency",
+                                           labels=("op",))
+BROKER_CLIENTS = metrics.gauge("broker_clients", "Connected camera broker clients")
+
+
+class BrokerError(RuntimeError):
+    """Raised when the broker rejects a request"""
+
+
+def _image_header(image):
+    return {"shape": list(image.shape), "dtype": str(image.dtype)}
+
+
+def _image_from(header, payload):
+    return np.frombuffer(payload, dtype=header["dtype"]).reshape(header["shape"])
+
+
+class CameraBroker:
+    """Serves camera frames and face embeddings to local clients"""
+
+    def __init__(self, socket_path, camera, recognizer, hold_timeout=120.0):
+        """
+        Initialize broker
+
+        Args:
+            socket_path: Unix socket path to listen on
+            camera: Camera instance owned by the broker
+            recognizer: FaceRecognizer instance owned by the broker
+            hold_timeout: Seconds before an unreleased hold expires
+        """
+        self.socket_path = socket_path
+        self.camera = camera
+        self.recognizer = recognizer
+        self.hold_timeout = hold_timeout
+
+        self.frame = None
+        self.seq = 0
+        self.frame_cond = threading.Condition()
+        # Embeddings run one at a time unless the recognizer hands them to worker processes
+        self.model_lock = contextlib.nullcontext() if recognizer.concurrent else threading.Lock()
+        self.hold_owner = None
+        self.hold_expires = 0.0
+        self.running = False
+        self.server = None
+        self.threads = []
+
+    def start(self):
+        """Start the capture thread and the socket server"""
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        os.makedirs(os.path.dirname(self.socket_path) or ".", exist_ok=True)
+
+        broker = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                broker._serve_client(self.request)
+
+        self.server = socketserver.ThreadingUnixStreamServer(self.socket_path, Handler)
+        self.server.daemon_threads = True
+        os.chmod(self.socket_path, 0o660)
+
+        self.running = True
+        self.threads = [
+            threading.Thread(target=self._capture_loop, name="broker-capture", daemon=True),
+            threading.Thread(target=self.server.serve_forever, name="broker-server", daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+        log.info("Listening on %s", self.socket_path)
+
+    def stop(self):
+        """Stop serving and remove the socket"""
+        self.running = False
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        with self.frame_cond:
+            self.frame_cond.notify_all()
+        for thread in self.threads:
+            thread.join(timeout=2)
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        log.info("Stopped")
+
+    def _capture_loop(self):
+        """Keep the latest camera frame available to all clients"""
+        while self.running:
+            frame = self.camera.read_frame()
+            if frame is None:
+                time.sleep(0.05)
+                continue
+            with self.frame_cond:
+                self.frame = frame
+                self.seq += 1
+                self.frame_cond.notify_all()
+
+    def _current_hold(self):
+        if self.hold_owner is not None and time.time() > self.hold_expires:
+            log.warning("Hold by %s expired", self.hold_owner)
+            self.hold_owner = None
+        return self.hold_owner
+
+    def _serve_client(self, sock):
+        """Answer requests from one client until it disconnects"""
+        BROKER_CLIENTS.inc()
+        try:
+            while self.running:
+                try:
+                    header, payload = recv_message(sock)
+                except (ConnectionError, OSError):
+                    break
+
+                op = header.get("op", "")
+                with BROKER_REQUEST_SECONDS.labels(op).time():
+                    try:
+                        response, response_payload = self._dispatch(op, header, payload)
+                        response["ok"] = True
+                    except Exception as e:
+                        response, response_payload = {"ok": False, "error": str(e)}, b""
+                response["hold"] = self._current_hold()
+
+                try:
+                    send_message(sock, response, response_payload)
+                except OSError:
+                    break
+        finally:
+            BROKER_CLIENTS.dec()
+
+    def _dispatch(self, op, header, payload):
+        """
+        Handle one request
+
+        Returns:
+            Tuple: (response header dict, response payload)
+        """
+        if op == "frame":
+            # Wait for a frame newer than the one the client already has
+            after = header.get("after", 0)
+            with self.frame_cond:
+                self.frame_cond.wait_for(lambda: self.seq > after or not self.running,
+                                         timeout=header.get("timeout", 1.0))
+                frame, seq = self.frame, self.seq
+            if frame is None:
+                raise RuntimeError("No frame available")
+            return dict(_image_header(frame), seq=seq), frame.tobytes()
+
+        if op == "embed":
+            face_img = _image_from(header, payload)
+            with self.model_lock:
+                embedding = self.recognizer.generate_embedding(face_img)
+            return {"embedding": None if embedding is None else embedding.tolist()}, b""
+
+        if op == "status":
+            return {"model": self.recognizer.model_name,
+                    "model_ready": self.recognizer.ready.is_set(),
+                    "camera_mode": self.camera.mode,
+                    "width": self.camera.width,
+                    "height": self.camera.height,
+                    "seq": self.seq}, b""
+
+        if op == "hold":
+            owner = header["owner"]
+            current = self._current_hold()
+            if current is not None and current != owner:
+                raise RuntimeError(f"Camera held by {current}")
+            self.hold_owner = owner
+            self.hold_expires = time.time() + header.get("timeout", self.hold_timeout)
+            log.info("Hold acquired by %s", owner)
+            return {}, b""
+
+        if op == "release":
+            if self.hold_owner == header.get("owner"):
+                log.info("Hold released by %s", self.hold_owner)
+                self.hold_owner = None
+            return {}, b""
+
+        raise ValueError(f"Unknown op: {op}")
+
+
+class BrokerClient:
+    """Connection to the camera broker (thread-safe, reconnects on failure)"""
+
+    def __init__(self, socket_path, connect_timeout=30.0):
+        """
+        Initialize client
+
+        Args:
+            socket_path: Broker Unix socket path
+            connect_timeout: Seconds to keep retrying while the broker starts
+        """
+        self.socket_path = socket_path
+        self.connect_timeout = connect_timeout
+        self.sock = None
+        self.lock = threading.Lock()
+        self.hold = None
+
+    def _connect(self):
+        deadline = time.time() + self.connect_timeout
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                sock.connect(self.socket_path)
+                self.sock = sock
+                return
+            except OSError as e:
+                sock.close()
+                if time.time() >= deadline:
+                    raise ConnectionError(f"Camera broker not reachable at {self.socket_path}: {e}")
+                time.sleep(0.5)
+
+    def close(self):
+        """Close the connection"""
+        with self.lock:
+            if self.sock is not None:
+                self.sock.close()
+                self.sock = None
+
+    def request(self, header, payload=b""):
+        """
+        Send a request and wait for the response
+
+        Args:
+            header: Request dict with an "op" key
+            payload: Optional binary payload
+
+        Returns:
+            Tuple: (response header dict, response payload bytearray)
+
+        Raises:
+            BrokerError: If the broker rejected the request
+            ConnectionError: If the broker is unreachable
+        """
+        with self.lock:
+            for attempt in range(2):
+                if self.sock is None:
+                    self._connect()
+                try:
+                    send_message(self.sock, header, payload)
+                    response, response_payload = recv_message(self.sock)
+                    break
+                except OSError:
+                    self.sock.close()
+                    self.sock = None
+                    if attempt == 1:
+                        raise
+
+        self.hold = response.get("hold")
+        if not response.get("ok"):
+            raise BrokerError(response.get("error", "Broker request failed"))
+        return response, response_payload
+
+    def status(self):
+        """Broker status (model readiness, camera mode and size)"""
+        return self.request({"op": "status"})[0]
+
+    def acquire_hold(self, owner, timeout=None):
+        """
+        Mark the camera as held (other clients pause recognition)
+
+        Args:
+            owner: Holder name, e.g. "enrollment"
+            timeout: Seconds before the hold expires (default: broker setting)
+        """
+        header = {"op": "hold", "owner": owner}
+        if timeout is not None:
+            header["timeout"] = timeout
+        self.request(header)
+
+    def release_hold(self, owner):
+        """Release a hold acquired with acquire_hold"""
+        self.request({"op": "release", "owner": owner})
+
+
+class BrokerCamera:
+    """Camera interface backed by the camera broker"""
+
+    def __init__(self, client):
+        """
+        Initialize broker camera
+
+        Args:
+            client: BrokerClient
+        """
+        self.client = client
+        self.mode = "BROKER"
+        self.seq = 0
+        self.is_running = True
+
+        status = client.status()
+        self.width = status["width"]
+        self.height = status["height"]
+        log.info("Using broker camera (%s, %sx%s)", status["camera_mode"], self.width, self.height)
+
+    @property
+    def hold(self):
+        """Owner of the current camera hold, or None"""
+        return self.client.hold
+
+    def poll_hold(self):
+        """
+        Ask the broker for the current hold
+        
+        Returns:
+            Owner of the hold, or None (also when the broker is unreachable)
+        """
+        try:
+            self.client.status()
+        except (BrokerError, ConnectionError, OSError):
+            return None
+        return self.client.hold
+
+    def read_frame(self):
+        """
+        Read the next frame from the broker
+
+        Returns:
+            Numpy array (BGR format) or None if no frame
+        """
+        if not self.is_running:
+            return None
+        try:
+            header, payload = self.client.request({"op": "frame", "after": self.seq})
+        except (BrokerError, ConnectionError, OSError) as e:
+            log.warning("Broker frame request failed: %s", e)
+            return None
+        self.seq = header["seq"]
+        return _image_from(header, payload)
+
+    def stop(self):
+        """Stop reading frames (the broker keeps the device open)"""
+        self.is_running = False
+
+    def start(self):
+        """Resume reading frames"""
+        self.is_running = True
+
+    def release(self):
+        """Disconnect from the broker"""
+        self.is_running = False
+        self.client.close()
+
+    def is_opened(self):
+        """Check if frames can be read"""
+        return self.is_running
+
+
+class BrokerRecognizer(FaceRecognizer):
+    """FaceRecognizer whose embeddings are generated by the broker's model"""
+
+    def __init__(self, client, model_name="Facenet", backend="opencv", gallery_precision="float32", rerank=5,
+                 embedding_cache=None):
+        """
+        Initialize broker recognizer
+
+        Args:
+            client: BrokerClient
+            model_name: Model name (must match the broker's model)
+            backend: Detection backend (informational; the broker's is used)
+            gallery_precision: Gallery matrix storage (matching runs here, not on the broker)
+            rerank: Gallery candidates scored again at full precision
+            embedding_cache: Optional EmbeddingCache (saves a broker round trip and inference on a hit)
+        """
+        super().__init__(model_name=model_name, backend=backend,
+                         gallery_precision=gallery_precision, rerank=rerank,
+                         embedding_cache=embedding_cache)
+        self.client = client
+
+    def warmup(self):
+        """
+        Wait until the broker has loaded its model
+
+        Returns:
+            Dict with the wait time in seconds ("broker_wait")
+        """
+        start = time.perf_counter()
+        while not self.client.status()["model_ready"]:
+            time.sleep(0.5)
+        self.warmup_timings = {"broker_wait": time.perf_counter() - start}
+        self.ready.set()
+        return self.warmup_timings
+
+    def generate_embedding(self, face_img):
+        """
+        Generate face embedding on the broker
+
+        Args:
+            face_img: Face image (BGR or RGB)
+
+        Returns:
+            Numpy array of face embedding or None if failed
+        """
+        face_img = np.ascontiguousarray(face_img)
+        try:
+            header, _ = self.client.request(dict(_image_header(face_img), op="embed"),
+                                            face_img.tobytes())
+        except (BrokerError, ConnectionError, OSError) as e:
+            log.error("Broker embedding request failed: %s", e)
+            return None
+        if header["embedding"] is None:
+            return None
+        return np.array(header["embedding"])
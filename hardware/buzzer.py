@@ -3,6 +3,11 @@ Buzzer Module - Audio feedback for attendance system
 """
 import time
 
+from utils.logger import get_logger
+
+
+log = get_logger("buzzer")
+
 
 class Buzzer:
     """Buzzer for audio feedback"""
@@ -22,7 +27,7 @@ class Buzzer:
         if mode == "RASPBERRY_PI":
             self._init_gpio()
         else:
-            print(f"[Buzzer] PC simulation mode - using audio simulation")
+            log.info("PC simulation mode - using audio simulation")
             
     def _init_gpio(self):
         """Initialize GPIO for Raspberry Pi"""
@@ -34,10 +39,10 @@ class Buzzer:
             GPIO.setup(self.pin, GPIO.OUT)
             GPIO.output(self.pin, False)
             
-            print(f"[Buzzer] Raspberry Pi GPIO initialized (Pin: {self.pin})")
+            log.info("Raspberry Pi GPIO initialized (Pin: %s)", self.pin)
             
         except ImportError:
-            print("[Buzzer] Warning: RPi.GPIO not available, using simulation mode")
+            log.warning("RPi.GPIO not available, using simulation mode")
             self.mode = "PC"
             
     def beep(self, duration=0.2):
@@ -48,7 +53,7 @@ class Buzzer:
             duration: Beep duration in seconds
         """
         if self.mode == "PC":
-            print(f"[Buzzer] BEEP ({duration}s)")
+            log.debug("BEEP (%ss)", duration)
             time.sleep(duration)
             
         elif self.mode == "RASPBERRY_PI" and self.gpio:
@@ -57,23 +62,23 @@ class Buzzer:
                 time.sleep(duration)
                 self.gpio.output(self.pin, False)
             except Exception as e:
-                print(f"[Buzzer] Error: {e}")
+                log.error("Buzzer error: %s", e)
                 
     def success_tone(self):
         """Play success tone (2 short beeps)"""
-        print("[Buzzer] ✓ SUCCESS TONE")
+        log.debug("Success tone")
         self.beep(0.1)
         time.sleep(0.05)
         self.beep(0.1)
         
     def error_tone(self):
         """Play error tone (1 long beep)"""
-        print("[Buzzer] ✗ ERROR TONE")
+        log.debug("Error tone")
         self.beep(0.5)
         
     def warning_tone(self):
         """Play warning tone (3 quick beeps)"""
-        print("[Buzzer] ⚠ WARNING TONE")
+        log.debug("Warning tone")
         for _ in range(3):
             self.beep(0.08)
             time.sleep(0.05)
@@ -84,6 +89,6 @@ class Buzzer:
             try:
                 self.gpio.output(self.pin, False)
                 self.gpio.cleanup([self.pin])
-                print("[Buzzer] GPIO cleaned up")
+                log.info("GPIO cleaned up")
             except:
                 pass
@@ -4,6 +4,17 @@ Camera Module - Abstract interface for PC and Raspberry Pi cameras
 import cv2
 import numpy as np
 
+from utils import metrics
+from utils.logger import get_logger
+
+
+log = get_logger("camera")
+
+
+CAMERA_READ_SECONDS = metrics.histogram("camera_read_seconds", "Time to read one camera frame")
+CAMERA_FRAMES = metrics.counter("camera_frames_total", "Frames read from the camera")
+CAMERA_READ_FAILURES = metrics.counter("camera_read_failures_total", "Failed camera reads")
+
 
 class Camera:
     """Abstract camera interface supporting PC webcam and Raspberry Pi camera"""
@@ -41,7 +52,7 @@ class Camera:
             raise RuntimeError("Failed to open PC camera")
         
         self.is_running = True
-        print(f"[Camera] PC webcam initialized: {self.width}x{self.height}")
+        log.info("PC webcam initialized: %dx%d", self.width, self.height)
         
     def _init_pi_camera(self):
         """Initialize Raspberry Pi camera"""
@@ -60,13 +71,13 @@ class Camera:
             time.sleep(2)
             
             self.is_running = True
-            print(f"[Camera] Raspberry Pi camera initialized: {self.width}x{self.height}")
+            log.info("Raspberry Pi camera initialized: %dx%d", self.width, self.height)
             
         except ImportError:
-            print("[Camera] Warning: picamera2 not available, falling back to PC camera")
+            log.warning("picamera2 not available, falling back to PC camera")
             self._init_pc_camera(0)
         except Exception as e:
-            print(f"[Camera] Error initializing Pi camera: {e}")
+            log.error("Error initializing Pi camera: %s", e)
             raise
             
     def read_frame(self):
@@ -79,6 +90,17 @@ class Camera:
         if not self.is_running:
             return None
             
+        with CAMERA_READ_SECONDS.time():
+            frame = self._read_frame()
+        
+        if frame is None:
+            CAMERA_READ_FAILURES.inc()
+        else:
+            CAMERA_FRAMES.inc()
+        return frame
+        
+    def _read_frame(self):
+        """Read a frame from the underlying camera device"""
         if self.mode == "PC":
             ret, frame = self.camera.read()
             if ret:
@@ -93,7 +115,7 @@ class Camera:
                 frame_bgr = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
                 return frame_bgr
             except Exception as e:
-                print(f"[Camera] Error reading Pi camera: {e}")
+                log.error("Error reading Pi camera: %s", e)
                 return None
     
     def stop(self):
@@ -105,12 +127,12 @@ class Camera:
             try:
                 self.camera.stop()
                 self.is_running = False
-                print("[Camera] Camera stopped (standby)")
+                log.info("Camera stopped (standby)")
             except Exception as e:
-                print(f"[Camera] Error stopping: {e}")
+                log.error("Error stopping camera: %s", e)
         else:
             self.is_running = False
-            print("[Camera] Camera stopped (simulated)")
+            log.info("Camera stopped (simulated)")
     
     def start(self):
         """Start camera (wake from standby)"""
@@ -122,12 +144,12 @@ class Camera:
                 self.camera.start()
                 time.sleep(1)  # Brief warmup
                 self.is_running = True
-                print("[Camera] Camera started")
+                log.info("Camera started")
             except Exception as e:
-                print(f"[Camera] Error starting: {e}")
+                log.error("Error starting camera: %s", e)
         else:
             self.is_running = True
-            print("[Camera] Camera started (simulated)")
+            log.info("Camera started (simulated)")
                 
     def release(self):
         """Release camera resources"""
@@ -141,10 +163,10 @@ class Camera:
                     self.camera.stop()
                     self.camera.close()
                 except Exception as e:
-                    print(f"[Camera] Error releasing: {e}")
+                    log.error("Error releasing camera: %s", e)
         
         self.is_running = False
-        print("[Camera] Camera released")
+        log.info("Camera released")
         
     def is_opened(self):
         """Check if camera is opened"""
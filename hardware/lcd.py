@@ -3,6 +3,11 @@ LCD Display Module - Display messages and status
 """
 import time
 
+from utils.logger import get_logger
+
+
+log = get_logger("lcd")
+
 
 class LCDDisplay:
     """LCD display for showing attendance status and messages"""
@@ -22,11 +27,12 @@ class LCDDisplay:
         self.rows = rows
         self.cols = cols
         self.lcd = None
+        self.last_message = None
         
         if mode == "RASPBERRY_PI":
             self._init_lcd()
         else:
-            print(f"[LCD] PC simulation mode - displaying to terminal")
+            log.info("PC simulation mode - displaying to log")
             
     def _init_lcd(self):
         """Initialize LCD for Raspberry Pi"""
@@ -55,15 +61,15 @@ class LCDDisplay:
             self.lcd.clear()
             time.sleep(0.1)
             
-            print(f"[LCD] Raspberry Pi LCD initialized (Address: {hex(self.i2c_address)})")
+            log.info("Raspberry Pi LCD initialized (Address: %s)", hex(self.i2c_address))
             
         except ImportError as e:
-            print(f"[LCD] Warning: RPLCD not available ({e}), using simulation mode")
-            print("[LCD] Install with: pip install RPLCD")
+            log.warning("RPLCD not available (%s), using simulation mode. "
+                        "Install with: pip install RPLCD", e)
             self.mode = "PC"
         except Exception as e:
-            print(f"[LCD] Error initializing LCD: {e}")
-            print(f"[LCD] Check I2C address with: sudo i2cdetect -y 1")
+            log.error("Error initializing LCD: %s. "
+                      "Check I2C address with: sudo i2cdetect -y 1", e)
             self.mode = "PC"
             self.lcd = None
             
@@ -83,6 +89,9 @@ class LCDDisplay:
         """
         Display message on LCD
         
+        Repeating the message already on screen is skipped, so callers can
+        refresh the display every frame without rewriting the LCD.
+        
         Args:
             line1: First line text
             line2: Second line text (optional)
@@ -91,16 +100,14 @@ class LCDDisplay:
         line1 = self._sanitize_text(line1)
         line2 = self._sanitize_text(line2)
         
-        # Always print to terminal for debugging
-        print(f"[LCD Display] Line1: {line1} | Line2: {line2}")
+        if (line1, line2) == self.last_message:
+            return
+        self.last_message = (line1, line2)
         
         if self.mode == "PC" or self.lcd is None:
-            # Simulate LCD display in terminal
-            print("="*20)
-            print(f"| {line1[:self.cols].center(self.cols)} |")
-            if line2:
-                print(f"| {line2[:self.cols].center(self.cols)} |")
-            print("="*20)
+            # Simulate LCD display as one log line
+            log.info("| %s | %s |", line1[:self.cols].center(self.cols),
+                     line2[:self.cols].center(self.cols))
             
         elif self.mode == "RASPBERRY_PI" and self.lcd:
             try:
@@ -116,18 +123,20 @@ class LCDDisplay:
                 time.sleep(0.05)  # Small delay after write
                     
             except Exception as e:
-                print(f"[LCD] Error displaying message: {e}")
+                self.last_message = None
+                log.error("Error displaying message: %s", e)
                 
     def clear(self):
         """Clear LCD display"""
+        self.last_message = None
         if self.mode == "PC":
-            print("[LCD] Display cleared")
+            log.debug("Display cleared")
             
         elif self.mode == "RASPBERRY_PI" and self.lcd:
             try:
                 self.lcd.clear()
             except Exception as e:
-                print(f"[LCD] Error clearing display: {e}")
+                log.error("Error clearing display: %s", e)
                 
     def display_welcome(self):
         """Display welcome message"""
@@ -157,23 +166,24 @@ class LCDDisplay:
         if self.mode == "RASPBERRY_PI" and self.lcd:
             try:
                 self.lcd.backlight_enabled = True
-                print("[LCD] Backlight ON")
+                log.info("Backlight ON")
             except Exception as e:
-                print(f"[LCD] Error turning backlight on: {e}")
+                log.error("Error turning backlight on: %s", e)
         else:
-            print("[LCD] Backlight ON (simulated)")
+            log.info("Backlight ON (simulated)")
     
     def backlight_off(self):
         """Turn off LCD backlight"""
+        self.last_message = None
         if self.mode == "RASPBERRY_PI" and self.lcd:
             try:
                 self.lcd.clear()
                 self.lcd.backlight_enabled = False
-                print("[LCD] Backlight OFF")
+                log.info("Backlight OFF")
             except Exception as e:
-                print(f"[LCD] Error turning backlight off: {e}")
+                log.error("Error turning backlight off: %s", e)
         else:
-            print("[LCD] Backlight OFF (simulated)")
+            log.info("Backlight OFF (simulated)")
         
     def cleanup(self):
         """Clean up LCD resources"""
@@ -182,6 +192,6 @@ class LCDDisplay:
                 self.lcd.clear()
                 self.lcd.backlight_enabled = False
                 self.lcd.close()
-                print("[LCD] LCD cleaned up")
+                log.info("LCD cleaned up")
             except:
                 pass
@@ -0,0 +1,291 @@
+"""
+Replay Module - Recorded-session sources for offline testing
+Feeds recorded video files or image sequences (and simulated ultrasonic
+traces) through the same interfaces as the live Camera and UltrasonicSensor
+"""
+import bisect
+import csv
+import glob
+import math
+import os
+import time
+
+import cv2
+
+from utils.logger import get_logger
+
+
+log = get_logger("replay")
+
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+class ReplayClock:
+    """
+    Virtual clock driven by the replay position
+
+    Starts at the wall-clock time the replay was opened and advances by the
+    recorded frame timestamps, so time-based logic (stability timers, ArUco
+    timeouts) behaves the same whether the replay runs as fast as possible
+    or at real-time pace. sleep() advances it too, and the camera then skips
+    the frames recorded meanwhile, so the clock never runs backwards.
+    """
+
+    def __init__(self, start=None):
+        """
+        Initialize replay clock
+
+        Args:
+            start: Epoch time of the first frame (default: now)
+        """
+        self.start = time.time() if start is None else start
+        self.offset = 0.0
+
+    def time(self):
+        """Current replay time as epoch seconds (drop-in for time.time)"""
+        return self.start + self.offset
+
+    def sleep(self, seconds):
+        """Advance the clock instead of blocking (drop-in for time.sleep)"""
+        self.offset += seconds
+
+
+class ReplayCamera:
+    """Camera replacement that plays back a recorded video or image sequence"""
+
+    def __init__(self, source, fps=None, realtime=False, loop=False, clock=None):
+        """
+        Initialize replay camera
+
+        Args:
+            source: Video file, directory of images, or glob pattern
+            fps: Playback rate (default: from the video, or 30 for images)
+            realtime: If True, pace frames at the recorded rate
+            loop: If True, restart from the beginning when the source ends
+            clock: ReplayClock to drive (default: a new one)
+        """
+        self.mode = "REPLAY"
+        self.source = source
+        self.realtime = realtime
+        self.loop = loop
+        self.clock = clock or ReplayClock()
+        self.camera = None
+        self.image_paths = None
+        self.frame_index = 0
+        self.finished = False
+        self.is_running = False
+
+        if os.path.isdir(source) or any(ch in source for ch in "*?["):
+            self._init_image_sequence(source)
+            self.fps = fps or 30.0
+        else:
+            self._init_video(source)
+            self.fps = fps or self.camera.get(cv2.CAP_PROP_FPS) or 30.0
+
+        self.width = None
+        self.height = None
+        self.frames_skipped = 0
+        self._wall_start = None
+        self.is_running = True
+        log.info("Source opened: %s (%.1f fps, %s)", source, self.fps,
+                 "real-time" if realtime else "as fast as possible")
+
+    def _init_video(self, path):
+        """Open a recorded video file"""
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Replay source not found: {path}")
+
+        self.camera = cv2.VideoCapture(path)
+        if not self.camera.isOpened():
+            raise RuntimeError(f"Failed to open replay video: {path}")
+
+    def _init_image_sequence(self, source):
+        """Collect image files in playback (sorted filename) order"""
+        pattern = os.path.join(source, "*") if os.path.isdir(source) else source
+        self.image_paths = sorted(
+            p for p in glob.glob(pattern)
+            if p.lower().endswith(IMAGE_EXTENSIONS)
+        )
+        if not self.image_paths:
+            raise FileNotFoundError(f"No images found for replay source: {source}")
+
+    @property
+    def timestamp(self):
+        """Recorded timestamp of the next frame, in seconds from the start"""
+        return self.frame_index / self.fps
+
+    def _next_raw_frame(self):
+        """Read the next frame from the underlying source"""
+        if self.image_paths is not None:
+            if self.frame_index >= len(self.image_paths):
+                return None
+            return cv2.imread(self.image_paths[self.frame_index])
+
+        ret, frame = self.camera.read()
+        return frame if ret else None
+
+    def _rewind(self):
+        """Restart playback from the first frame"""
+        if self.camera is not None:
+            self.camera.set(cv2.CAP_PROP_POS_FRAMES, 0)
+        self.frame_index = 0
+
+    def _skip_to_clock(self):
+        """
+        Drop the frames recorded before the clock's position
+
+        When the engine sleeps (ReplayClock.sleep), a live camera keeps
+        capturing and the next frame it delivers is a later one; replay
+        does the same instead of handing over the frame after the last.
+        """
+        target = math.ceil(self.clock.offset * self.fps - 1e-6)
+        if self.image_paths is not None:
+            target = min(target, len(self.image_paths))
+            if target > self.frame_index:
+                self.frames_skipped += target - self.frame_index
+                self.frame_index = target
+            return
+
+        while self.frame_index < target and self.camera.grab():
+            self.frame_index += 1
+            self.frames_skipped += 1
+
+    def read_frame(self):
+        """
+        Read the next recorded frame
+
+        Returns:
+            Numpy array (BGR format) or None when the source is exhausted
+        """
+        if not self.is_running or self.finished:
+            return None
+
+        self._skip_to_clock()
+        frame = self._next_raw_frame()
+        if frame is None and self.loop and self.frame_index > 0:
+            # Keep the clock monotonic across loops (offsets restart with the recording)
+            duration = self.frame_index / self.fps
+            self.clock.start += duration
+            self.clock.offset = max(0.0, self.clock.offset - duration)
+            self._rewind()
+            self._skip_to_clock()
+            frame = self._next_raw_frame()
+
+        if frame is None:
+            self.finished = True
+            return None
+
+        self.clock.offset = max(self.clock.offset, self.timestamp)
+        if self.height is None:
+            self.height, self.width = frame.shape[:2]
+
+        if self.realtime:
+            if self._wall_start is None:
+                self._wall_start = time.perf_counter()
+            delay = self._wall_start + self.timestamp - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+        self.frame_index += 1
+        return frame
+
+    def stop(self):
+        """Pause playback (standby)"""
+        self.is_running = False
+
+    def start(self):
+        """Resume playback"""
+        self.is_running = True
+
+    def release(self):
+        """Release replay resources"""
+        if self.camera is not None:
+            self.camera.release()
+        self.is_running = False
+        log.info("Source released")
+
+    def is_opened(self):
+        """Check if the replay source still has frames"""
+        return self.is_running and not self.finished
+
+
+def load_ultrasonic_trace(path):
+    """
+    Load a recorded ultrasonic trace
+
+    The CSV has a header row with a ``time`` column (seconds from the start
+    of the recording) followed by one distance column per sensor (cm, empty
+    for a failed reading), e.g. ``time,sensor1,sensor2``.
+
+    Args:
+        path: Path to trace CSV
+
+    Returns:
+        Dict mapping column name to (times, distances) lists
+    """
+    with open(path, newline="") as f:
+        reader = csv.DictReader(f)
+        columns = [c for c in reader.fieldnames if c != "time"]
+        traces = {c: ([], []) for c in columns}
+
+        for row in reader:
+            t = float(row["time"])
+            for c in columns:
+                value = row[c].strip() if row[c] else ""
+                traces[c][0].append(t)
+                traces[c][1].append(float(value) if value else None)
+
+    return traces
+
+
+class SimulatedUltrasonicSensor:
+    """Ultrasonic sensor replacement that replays a recorded distance trace"""
+
+    def __init__(self, times, distances, clock):
+        """
+        Initialize simulated sensor
+
+        Args:
+            times: Sample times in seconds from the start of the recording
+            distances: Distance in cm (or None) for each sample
+            clock: ReplayClock shared with the ReplayCamera
+        """
+        self.mode = "REPLAY"
+        self.times = list(times)
+        self.distances = list(distances)
+        self.clock = clock
+
+    def measure_distance(self):
+        """
+        Distance recorded at the current replay time
+
+        Returns:
+            Distance in cm or None if no valid sample
+        """
+        index = bisect.bisect_right(self.times, self.clock.offset) - 1
+        if index < 0:
+            return None
+        return self.distances[index]
+
+    def check_presence(self, min_distance=30, max_distance=100):
+        """
+        Check if presence is detected within valid range
+
+        Args:
+            min_distance: Minimum valid distance (cm)
+            max_distance: Maximum valid distance (cm)
+
+        Returns:
+            True if presence detected within range, False otherwise
+        """
+        distance = self.measure_distance()
+
+        if distance is None:
+            return False
+
+        return min_distance <= distance <= max_distance
+
+    def cleanup(self):
+        """Nothing to release for a replayed trace"""
+        pass
@@ -3,6 +3,11 @@ Ultrasonic Sensor Module - Distance measurement for presence detection
 """
 import time
 
+from utils.logger import get_logger
+
+
+log = get_logger("ultrasonic")
+
 
 class UltrasonicSensor:
     """Ultrasonic sensor for distance measurement and presence detection"""
@@ -24,7 +29,7 @@ class UltrasonicSensor:
         if mode == "RASPBERRY_PI":
             self._init_gpio()
         else:
-            print(f"[Ultrasonic] PC simulation mode - returning simulated distances")
+            log.info("PC simulation mode - returning simulated distances")
             
     def _init_gpio(self):
         """Initialize GPIO for Raspberry Pi"""
@@ -40,10 +45,10 @@ class UltrasonicSensor:
             GPIO.output(self.trigger_pin, False)
             time.sleep(0.1)
             
-            print(f"[Ultrasonic] Raspberry Pi GPIO initialized (Trigger: {self.trigger_pin}, Echo: {self.echo_pin})")
+            log.info("Raspberry Pi GPIO initialized (Trigger: %s, Echo: %s)", self.trigger_pin, self.echo_pin)
             
         except ImportError:
-            print("[Ultrasonic] Warning: RPi.GPIO not available, using simulation mode")
+            log.warning("RPi.GPIO not available, using simulation mode")
             self.mode = "PC"
             
     def measure_distance(self):
@@ -91,7 +96,7 @@ class UltrasonicSensor:
                 return distance
                 
             except Exception as e:
-                print(f"[Ultrasonic] Error measuring distance: {e}")
+                log.error("Error measuring distance: %s", e)
                 return None
                 
     def check_presence(self, min_distance=30, max_distance=100):
@@ -119,6 +124,6 @@ class UltrasonicSensor:
         if self.mode == "RASPBERRY_PI" and self.gpio:
             try:
                 self.gpio.cleanup([self.trigger_pin, self.echo_pin])
-                print("[Ultrasonic] GPIO cleaned up")
+                log.info("GPIO cleaned up")
             except:
                 pass
@@ -86,6 +86,9 @@ if [ $? -ne 0 ]; then
     pip install -r requirements.txt --no-deps
 fi
 
+# Production web server for web_manager.py (falls back to Flask's dev server without it)
+pip install waitress
+
 echo ""
 echo "=================================================="
 echo "STEP 5: Configuring System Settings"
@@ -14,13 +14,42 @@ from config import *
 
 # Import modules
 from database.db_manager import DatabaseManager
+from database.attendance_cache import MarkedTodayCache
+from database.attendance_journal import AttendanceJournal
+from database.sync import KioskSync, SyncClient
+from database.sync_store import SyncStore
 from ai.face_detector import FaceDetector
-from ai.face_recognition import FaceRecognizer
+from ai.embedding_cache import EmbeddingCache
+from ai.face_recognition import FaceRecognizer, close_candidates
+from ai.inference_pool import InferencePool, PoolRecognizer
 from ai.aruco_detector import ArucoDetector
 from hardware.camera import Camera
 from hardware.ultrasonic import UltrasonicSensor
 from hardware.lcd import LCDDisplay
 from hardware.buzzer import Buzzer
+from hardware.broker import BrokerClient, BrokerCamera, BrokerRecognizer
+from utils import metrics
+from utils.logger import get_logger
+from utils.startup import StartupProfiler, process_uptime
+from utils.preview import PreviewPublisher
+
+
+log = get_logger("attendance")
+
+
+LOOP_STATE_SECONDS = metrics.histogram("attendance_loop_seconds",
+                                       "Main loop iteration latency per state", labels=("state",))
+ATTENDANCE_MARKED = metrics.counter("attendance_marked_total", "Attendance records marked")
+
+STATE_NAMES = {
+    -1: "STANDBY",
+    0: "WAITING",
+    1: "DETECTING_FACE",
+    2: "WAITING_ARUCO",
+    3: "DETECTING_ARUCO",
+    4: "SUCCESS",
+    5: "ERROR",
+}
 
 
 class AttendanceSystem:
@@ -28,82 +57,172 @@ class AttendanceSystem:
     
     def __init__(self):
         """Initialize all system components"""
-        print("="*50)
-        print("AI-POWERED ATTENDANCE SYSTEM")
-        print("="*50)
-        print(f"Hardware Mode: {HARDWARE_MODE}")
-        print(f"Starting at: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-        print("="*50)
-        
-        # Initialize hardware
-        print("\n[Init] Initializing hardware components...")
-        self.camera = Camera(
-            mode=HARDWARE_MODE,
-            camera_index=CAMERA_INDEX,
-            width=CAMERA_WIDTH,
-            height=CAMERA_HEIGHT
-        )
+        profiler = StartupProfiler("Attendance system")
+        profiler.record("imports", process_uptime())
+        log.info("AI-POWERED ATTENDANCE SYSTEM starting (hardware mode: %s)", HARDWARE_MODE)
         
-        # Camera warmup - critical for Raspberry Pi
-        print("[Init] Warming up camera...")
-        self.lcd = LCDDisplay(
-            mode=HARDWARE_MODE,
-            i2c_address=LCD_I2C_ADDRESS,
-            rows=LCD_ROWS,
-            cols=LCD_COLS
-        )
-        self.lcd.display_message("Starting...", "Camera warmup")
+        with profiler.step("lcd_init"):
+            self.lcd = LCDDisplay(
+                mode=HARDWARE_MODE,
+                i2c_address=LCD_I2C_ADDRESS,
+                rows=LCD_ROWS,
+                cols=LCD_COLS
+            )
+        self.lcd.display_message("Starting...", "Please wait")
         
-        for i in range(15):
-            frame = self.camera.read_frame()
-            if frame is not None:
-                print(f"[Init] Camera warmup frame {i+1}/15")
-            time.sleep(0.1)
-        print("[Init] Camera warmed up!")
-        
-        self.ultrasonic1 = UltrasonicSensor(
-            mode=HARDWARE_MODE,
-            trigger_pin=ULTRASONIC_SENSOR_1_TRIGGER,
-            echo_pin=ULTRASONIC_SENSOR_1_ECHO
-        )
+        # Initialize AI modules; the embedding model (TensorFlow import,
+        # model build, first inference) loads in the background while the
+        # camera warms up
+        log.info("Initializing AI modules...")
+        with profiler.step("ai_init"):
+            self.face_detector = FaceDetector(backend=FACE_DETECTION_BACKEND)
+            embedding_cache = None
+            self.inference_pool = None
+            if EMBEDDING_CACHE_ENABLED:
+                embedding_cache = EmbeddingCache(max_entries=EMBEDDING_CACHE_SIZE, ttl=EMBEDDING_CACHE_TTL,
+                                                 max_distance=EMBEDDING_CACHE_MAX_DISTANCE)
+            if CAMERA_BROKER_ENABLED:
+                # Camera and model are owned by camera_broker.py
+                self.broker = BrokerClient(CAMERA_BROKER_SOCKET)
+                self.face_recognizer = BrokerRecognizer(self.broker, model_name=FACE_MODEL,
+                                                        backend=FACE_DETECTION_BACKEND,
+                                                        gallery_precision=GALLERY_PRECISION,
+                                                        rerank=GALLERY_RERANK,
+                                                        embedding_cache=embedding_cache)
+            elif INFERENCE_WORKERS > 0:
+                # The model runs in worker processes, off this process's GIL
+                self.inference_pool = InferencePool(model_name=FACE_MODEL, backend=FACE_DETECTION_BACKEND,
+                                                    workers=INFERENCE_WORKERS,
+                                                    slot_bytes=CAMERA_WIDTH * CAMERA_HEIGHT * 3,
+                                                    runtime=EMBEDDING_RUNTIME,
+                                                    model_path=EMBEDDING_MODEL_PATH,
+                                                    threads=EMBEDDING_THREADS,
+                                                    load_restarts=INFERENCE_LOAD_RESTARTS)
+                self.face_recognizer = PoolRecognizer(self.inference_pool, model_name=FACE_MODEL,
+                                                      backend=FACE_DETECTION_BACKEND,
+                                                      gallery_precision=GALLERY_PRECISION,
+                                                      rerank=GALLERY_RERANK,
+                                                      embedding_cache=embedding_cache,
+                                                      timeout=INFERENCE_TIMEOUT,
+                                                      warmup_timeout=INFERENCE_WARMUP_TIMEOUT)
+            else:
+                self.face_recognizer = FaceRecognizer(model_name=FACE_MODEL, backend=FACE_DETECTION_BACKEND,
+                                                      gallery_precision=GALLERY_PRECISION,
+                                                      rerank=GALLERY_RERANK,
+                                                      embedding_cache=embedding_cache,
+                                                      runtime=EMBEDDING_RUNTIME,
+                                                      model_path=EMBEDDING_MODEL_PATH,
+                                                      threads=EMBEDDING_THREADS)
+            self.aruco_detector = ArucoDetector(dictionary=ARUCO_DICT)
+        model_thread = self.face_recognizer.warmup_async()
         
-        self.ultrasonic2 = UltrasonicSensor(
-            mode=HARDWARE_MODE,
-            trigger_pin=ULTRASONIC_SENSOR_2_TRIGGER,
-            echo_pin=ULTRASONIC_SENSOR_2_ECHO
-        )
+        # Initialize hardware
+        log.info("Initializing hardware components...")
+        with profiler.step("camera_init"):
+            if CAMERA_BROKER_ENABLED:
+                self.camera = BrokerCamera(self.broker)
+            else:
+                self.camera = Camera(
+                    mode=HARDWARE_MODE,
+                    camera_index=CAMERA_INDEX,
+                    width=CAMERA_WIDTH,
+                    height=CAMERA_HEIGHT
+                )
         
-        self.buzzer = Buzzer(
-            mode=HARDWARE_MODE,
-            pin=BUZZER_PIN
-        )
+        # Camera warmup - critical for Raspberry Pi (the broker's camera is already running)
+        if not CAMERA_BROKER_ENABLED:
+            log.info("Warming up camera...")
+            with profiler.step("camera_warmup"):
+                for i in range(15):
+                    frame = self.camera.read_frame()
+                    if frame is not None:
+                        log.debug("Camera warmup frame %d/15", i + 1)
+                    time.sleep(0.1)
+            log.info("Camera warmed up")
         
-        # Initialize AI modules
-        print("\n[Init] Initializing AI modules...")
-        self.lcd.display_message("Loading AI...", "Please wait")
-        self.face_detector = FaceDetector(backend=FACE_DETECTION_BACKEND)
-        self.face_recognizer = FaceRecognizer(model_name=FACE_MODEL, backend=FACE_DETECTION_BACKEND)
-        self.aruco_detector = ArucoDetector(dictionary=ARUCO_DICT)
+        with profiler.step("gpio_init"):
+            self.ultrasonic1 = UltrasonicSensor(
+                mode=HARDWARE_MODE,
+                trigger_pin=ULTRASONIC_SENSOR_1_TRIGGER,
+                echo_pin=ULTRASONIC_SENSOR_1_ECHO
+            )
+            
+            self.ultrasonic2 = UltrasonicSensor(
+                mode=HARDWARE_MODE,
+                trigger_pin=ULTRASONIC_SENSOR_2_TRIGGER,
+                echo_pin=ULTRASONIC_SENSOR_2_ECHO
+            )
+            
+            self.buzzer = Buzzer(
+                mode=HARDWARE_MODE,
+                pin=BUZZER_PIN
+            )
         
         # Initialize database
-        print("\n[Init] Connecting to database...")
-        self.db = DatabaseManager(DATABASE_PATH)
-        student_count = self.db.get_student_count()
-        print(f"[Init] Database loaded: {student_count} students enrolled")
-        
-        # Load all students for recognition
-        self.students_db = self.db.get_all_students()
-        print(f"[Init] Loaded {len(self.students_db)} students for recognition")
+        log.info("Connecting to database...")
+        with profiler.step("database"):
+            self.db = DatabaseManager(DATABASE_PATH, device=DEVICE_ID)
+            student_count = self.db.get_student_count()
+            
+            # Load all students for recognition
+            self.roster_version = self.db.roster.version()
+            self.students_db = self.face_recognizer.load_gallery(self.db.get_all_students())
+            
+            # Marks go to a journal and are committed in batches in the background
+            self.journal = None
+            if ATTENDANCE_WRITE_BEHIND:
+                self.journal = AttendanceJournal(self.db, ATTENDANCE_JOURNAL_PATH,
+                                                 batch_size=ATTENDANCE_BATCH_SIZE,
+                                                 flush_interval=ATTENDANCE_FLUSH_INTERVAL,
+                                                 fsync=ATTENDANCE_JOURNAL_FSYNC)
+                # Commit marks left by a crash before loading today's
+                self.journal.replay()
+                self.journal.start()
+            
+            # Students already marked today, checked in memory
+            self.marked_today = MarkedTodayCache(self.db, journal=self.journal)
+            
+            # Share attendance and students with the other kiosks
+            self.sync = None
+            if SYNC_ENABLED:
+                self.sync = KioskSync(SyncStore(self.db),
+                                      SyncClient(SYNC_SERVER, DEVICE_ID, token=SYNC_TOKEN,
+                                                 timeout=SYNC_TIMEOUT),
+                                      interval=SYNC_INTERVAL, batch_size=SYNC_BATCH_SIZE,
+                                      max_backoff=SYNC_MAX_BACKOFF)
+                self.sync.start()
+        log.info("Database loaded: %d students enrolled", student_count)
         
         if student_count == 0:
-            print("\n[Warning] No students enrolled! Please run enroll_students.py first.")
+            log.warning("No students enrolled! Please run enroll_students.py first.")
             self.lcd.display_message("No Students", "Enrolled!")
             self.buzzer.error_tone()
-            time.sleep(3)
         
-        print("\n[Init] System initialization complete!")
-        self.lcd.display_message("System Ready", "Show your face")
-        self.buzzer.success_tone()
+        # Annotated frames for the web manager's live preview (/stream)
+        self.preview = None
+        if PREVIEW_ENABLED:
+            self.preview = PreviewPublisher(PREVIEW_PATH, max_fps=PREVIEW_MAX_FPS,
+                                            quality=PREVIEW_QUALITY, width=PREVIEW_WIDTH)
+        
+        # Share metrics with the web manager (/metrics)
+        self.metrics_writer = metrics.SnapshotWriter(METRICS_SNAPSHOT_PATH,
+                                                     interval=METRICS_SNAPSHOT_INTERVAL)
+        self.metrics_writer.start()
+        
+        # The pipeline can serve once the model has finished loading
+        if not self.face_recognizer.ready.is_set():
+            self.lcd.display_message("Loading AI...", "Please wait")
+        with profiler.step("model_wait"):
+            model_thread.join()
+        for step, seconds in self.face_recognizer.warmup_timings.items():
+            profiler.record(f"model_{step}", seconds)
+        if not self.face_recognizer.ready.is_set():
+            log.warning("Model warmup failed; the model will load on first recognition")
+        
+        profiler.mark_ready()
+        if student_count > 0:
+            self.lcd.display_message("System Ready", "Show your face")
+            self.buzzer.success_tone()
         
     def capture_multi_frame(self, num_frames=15, max_retries=60):
         """
@@ -164,10 +283,7 @@ class AttendanceSystem:
     
     def run(self):
         """Main attendance checking loop - with ultrasonic presence detection"""
-        print("\n" + "="*50)
-        print("ATTENDANCE SYSTEM ACTIVE")
-        print("Press Ctrl+C to quit")
-        print("="*50 + "\n")
+        log.info("ATTENDANCE SYSTEM ACTIVE - press Ctrl+C to quit")
         
         # State machine
         STATE_STANDBY = -1      # System sleeping, waiting for presence
@@ -185,27 +301,38 @@ class AttendanceSystem:
             time.sleep(1)
             # Turn off LCD backlight only (camera stays running)
             self.lcd.backlight_off()
-            print("[System] Starting in STANDBY mode - LCD OFF, camera ready")
-            print("[System] Waiting for presence within 45cm...")
+            log.info("Starting in STANDBY mode - LCD OFF, camera ready; "
+                     "waiting for presence within 45cm")
         else:
             current_state = STATE_WAITING
             self.lcd.display_message("Ready", "Show your face")
-            print("[System] Ultrasonic disabled - system always active")
+            log.info("Ultrasonic disabled - system always active")
         
         recognized_student = None
+        face_track = 0  # Changes whenever the face is lost (scopes the embedding cache)
+        pending_embedding = None  # Future of the face being embedded (frames keep flowing meanwhile)
         state_start_time = time.time()
         last_presence_time = time.time()  # Track when presence was last detected
         no_presence_timeout = 25.0  # Seconds of no presence before going to standby
+        loop_state = None
+        iteration_start = time.perf_counter()
         
         try:
             while True:
                 current_time = time.time()
                 
+                # Record how long the previous iteration took in its state
+                now = time.perf_counter()
+                if loop_state is not None:
+                    LOOP_STATE_SECONDS.labels(STATE_NAMES[loop_state]).observe(now - iteration_start)
+                loop_state = current_state
+                iteration_start = now
+                
                 # ===== STATE: STANDBY (waiting for presence) =====
                 if current_state == STATE_STANDBY:
                     # Check for presence
                     if self.check_presence(max_distance=45):
-                        print("\n[System] Presence detected! Waking up...")
+                        log.info("Presence detected, waking up")
                         
                         # Turn on LCD backlight
                         self.lcd.backlight_on()
@@ -222,6 +349,33 @@ class AttendanceSystem:
                         time.sleep(0.5)  # Check presence every 0.5 seconds
                     continue
                 
+                # Pick up students enrolled, changed or removed elsewhere (web
+                # manager, bulk imports, other kiosks)
+                synced = self.sync is not None and self.sync.students_changed.is_set()
+                if synced or self.db.roster.version() != self.roster_version:
+                    if synced:
+                        self.sync.students_changed.clear()
+                    self.roster_version = self.db.roster.version()
+                    self.students_db = self.face_recognizer.load_gallery(self.db.get_all_students())
+                    log.info("Students changed, %d students loaded", len(self.students_db))
+                
+                # Pause while the web manager enrolls a student through the camera broker
+                if CAMERA_BROKER_ENABLED and self.camera.hold:
+                    log.info("Paused while %s uses the camera", self.camera.hold)
+                    self.lcd.display_message("Enrollment", "In progress...")
+                    while self.camera.poll_hold():
+                        time.sleep(0.5)
+                    
+                    # Pick up the newly enrolled student
+                    self.roster_version = self.db.roster.version()
+                    self.students_db = self.face_recognizer.load_gallery(self.db.get_all_students())
+                    log.info("Resumed, %d students loaded", len(self.students_db))
+                    self.lcd.display_message("Ready", "Show your face")
+                    current_state = STATE_WAITING
+                    recognized_student = None
+                    state_start_time = last_presence_time = time.time()
+                    continue
+                
                 # For all active states, check presence timeout
                 if ULTRASONIC_ENABLED:
                     if self.check_presence(max_distance=45):
@@ -230,13 +384,13 @@ class AttendanceSystem:
                         # No presence - check timeout
                         no_presence_duration = current_time - last_presence_time
                         if no_presence_duration >= no_presence_timeout:
-                            print(f"\n[System] No presence for {no_presence_timeout}s - going to STANDBY")
+                            log.info("No presence for %ss - going to STANDBY", no_presence_timeout)
                             self.lcd.display_message("Standby", "Mode")
                             time.sleep(1)
                             
                             # Turn off LCD backlight only (camera stays running)
                             self.lcd.backlight_off()
-                            print("[System] LCD turned OFF - standby mode")
+                            log.info("LCD turned OFF - standby mode")
                             
                             current_state = STATE_STANDBY
                             recognized_student = None
@@ -251,35 +405,40 @@ class AttendanceSystem:
                     # Capture best frame
                     frame = self.capture_multi_frame(num_frames=5)  # Reduced from 10 for speed
                     if frame is None:
-                        print("[Error] Failed to capture frame")
+                        log.warning("Failed to capture frame")
                         time.sleep(0.5)
                         continue
                     
-                    # Debug: Show frame was captured
-                    print(f"[Debug] Frame captured: {frame.shape if frame is not None else 'None'}")
+                    log.debug("Frame captured: %s", frame.shape)
                     
                     # Try to detect face
                     face_roi, face_bbox = self.face_detector.get_single_face(frame)
                     
                     if face_roi is not None:
                         x, y, w, h = face_bbox
-                        print(f"[Debug] Face detected at: x={x}, y={y}, w={w}, h={h}")
+                        log.debug("Face detected at: x=%d, y=%d, w=%d, h=%d", x, y, w, h)
                         cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
                         cv2.putText(frame, "Face detected!", (10, 30),
                                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
                         
-                        # Move to face detection state
+                        # Move to face detection state, embedding the face meanwhile.
+                        # Every attempt starts a new track: back in STATE_WAITING after a
+                        # mark or an error, the next person in the queue may already be
+                        # in frame, and must not reuse the previous one's embedding
                         current_state = STATE_DETECTING_FACE
                         state_start_time = current_time
-                        print("\n[Attendance] Face detected, starting recognition...")
+                        face_track += 1
+                        pending_embedding = self.face_recognizer.submit_embedding(face_roi, track_id=face_track)
+                        log.info("Face detected, starting recognition")
                         self.lcd.display_message("Face Found", "Recognizing...")
                         self.buzzer.beep(0.1)
                     else:
-                        # Debug: Print that no face was found
-                        print("[Debug] No face detected in frame")
+                        log.debug("No face detected in frame")
+                        face_track += 1
                         cv2.putText(frame, "Show your face to camera", (10, 30),
                                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 255), 2)
                     
+                    self.publish_preview(frame)
                     if HARDWARE_MODE == "PC":
                         cv2.imshow("Attendance System", frame)
                         key = cv2.waitKey(100) & 0xFF
@@ -304,10 +463,12 @@ class AttendanceSystem:
                     face_roi, face_bbox = self.face_detector.get_single_face(frame)
                     
                     if face_roi is None:
-                        # Face lost, go back to waiting
+                        # Face lost, go back to waiting (an embedding in progress was of the lost face)
+                        face_track += 1
+                        pending_embedding = None
                         elapsed = current_time - state_start_time
                         if elapsed > 5.0:
-                            print("[Attendance] Face lost, going back to waiting")
+                            log.info("Face lost, going back to waiting")
                             self.lcd.display_message("Face Lost", "Try again")
                             self.buzzer.error_tone()
                             current_state = STATE_WAITING
@@ -318,37 +479,82 @@ class AttendanceSystem:
                     x, y, w, h = face_bbox
                     cv2.rectangle(frame, (x, y), (x+w, y+h), (0, 255, 0), 2)
                     
-                    # Recognize face
-                    print("[Attendance] Recognizing face...")
-                    student_id, name, aruco_id, similarity = self.face_recognizer.recognize_face(
-                        face_roi, self.students_db, FACE_RECOGNITION_THRESHOLD
-                    )
+                    if pending_embedding is None:
+                        log.debug("Recognizing face...")
+                        pending_embedding = self.face_recognizer.submit_embedding(face_roi, track_id=face_track)
                     
-                    if student_id is not None:
+                    # Recognize face once its embedding is ready: the best candidates,
+                    # and those too close to the best to tell apart by face alone
+                    candidates = None
+                    if pending_embedding.done():
+                        future, pending_embedding = pending_embedding, None
+                        try:
+                            embedding = future.result()
+                        except Exception as e:
+                            log.error("Embedding failed: %s", e)
+                            embedding = None
+                        candidates = close_candidates(
+                            self.face_recognizer.match_topk(embedding, self.students_db, RECOGNITION_TOP_K,
+                                                            FACE_RECOGNITION_THRESHOLD),
+                            RECOGNITION_MARGIN
+                        )
+                    student_id, name, aruco_id, similarity = candidates[0] if candidates else (None, None, None, 0.0)
+                    
+                    if candidates is None:
+                        # Still embedding: keep capturing and showing frames
+                        cv2.putText(frame, "Recognizing...", (x, y-10),
+                                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
+                        
+                        if current_time - state_start_time > INFERENCE_TIMEOUT:
+                            log.warning("Embedding not ready after %.0fs, starting over", INFERENCE_TIMEOUT)
+                            pending_embedding = None
+                            current_state = STATE_WAITING
+                    elif student_id is not None and all(self.marked_today.is_marked(c[0]) for c in candidates):
+                        # Already checked in today: skip the ArUco step
+                        log.info("%s already marked today", name)
+                        cv2.putText(frame, f"{name}: already marked", (x, y-10),
+                                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 0, 0), 2)
+                        self.publish_preview(frame)
+                        self.lcd.display_message("Already", "Marked Today!")
+                        self.buzzer.warning_tone()
+                        current_state = STATE_WAITING
+                        time.sleep(3)
+                    elif student_id is not None:
                         # Face recognized!
                         recognized_student = {
                             'id': student_id,
                             'name': name,
                             'aruco_id': aruco_id,
-                            'similarity': similarity
+                            'similarity': similarity,
+                            'candidates': candidates,
+                            'codes': "/".join(str(c[2]) for c in candidates)
                         }
-                        print(f"[Attendance] Recognized: {name} (similarity: {similarity:.2f})")
-                        cv2.putText(frame, f"Hello, {name}!", (x, y-10),
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-                        
-                        # Show Hello message first
-                        self.lcd.display_message(f"Hello", f"{name[:16]}")
-                        self.buzzer.success_tone()
-                        time.sleep(2)  # Show Hello for 2 seconds
+                        if len(candidates) == 1:
+                            log.info("Recognized: %s", name,
+                                     extra={"data": {"student_id": student_id, "similarity": round(similarity, 3)}})
+                            cv2.putText(frame, f"Hello, {name}!", (x, y-10),
+                                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+                            
+                            # Show Hello message first
+                            self.lcd.display_message(f"Hello", f"{name[:16]}")
+                            self.buzzer.success_tone()
+                            time.sleep(2)  # Show Hello for 2 seconds
+                        else:
+                            # Too close to call: the ArUco marker decides
+                            log.info("Ambiguous face: %s", ", ".join(c[1] for c in candidates),
+                                     extra={"data": {"student_ids": [c[0] for c in candidates],
+                                                     "similarities": [round(c[3], 3) for c in candidates]}})
+                            cv2.putText(frame, "Show ArUco to confirm", (x, y-10),
+                                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 255), 2)
                         
                         # Then show ArUco instruction
-                        self.lcd.display_message("Show ArUco", f"Code: {aruco_id}")
+                        self.lcd.display_message("Show ArUco", f"Code: {recognized_student['codes']}")
                         
                         current_state = STATE_WAITING_ARUCO
                         state_start_time = current_time
                     else:
                         # Face not recognized
-                        print("[Attendance] Face not recognized")
+                        log.info("Face not recognized")
                         cv2.putText(frame, "Not recognized", (x, y-10),
                                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 255), 2)
                         
@@ -359,6 +565,7 @@ class AttendanceSystem:
                             current_state = STATE_WAITING
                             time.sleep(2)
                     
+                    self.publish_preview(frame)
                     if HARDWARE_MODE == "PC":
                         cv2.imshow("Attendance System", frame)
                         key = cv2.waitKey(100) & 0xFF
@@ -370,17 +577,19 @@ class AttendanceSystem:
                     elapsed = current_time - state_start_time
                     remaining = max(0, 3 - int(elapsed))
                     
-                    self.lcd.display_message("Show ArUco", f"Code: {recognized_student['aruco_id']}")
+                    self.lcd.display_message("Show ArUco", f"Code: {recognized_student['codes']}")
                     
                     frame = self.capture_multi_frame(num_frames=5)
                     if frame is not None:
-                        cv2.putText(frame, f"Hello {recognized_student['name']}!", (10, 30),
-                                   cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
-                        cv2.putText(frame, f"Show ArUco marker (ID: {recognized_student['aruco_id']})", (10, 60),
+                        if len(recognized_student['candidates']) == 1:
+                            cv2.putText(frame, f"Hello {recognized_student['name']}!", (10, 30),
+                                       cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 255, 0), 2)
+                        cv2.putText(frame, f"Show ArUco marker (ID: {recognized_student['codes']})", (10, 60),
                                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (255, 255, 0), 2)
                         cv2.putText(frame, f"Starting in {remaining}s...", (10, 90),
                                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 2)
                         
+                        self.publish_preview(frame)
                         if HARDWARE_MODE == "PC":
                             cv2.imshow("Attendance System", frame)
                             key = cv2.waitKey(100) & 0xFF
@@ -390,7 +599,7 @@ class AttendanceSystem:
                     if elapsed >= 3.0:
                         current_state = STATE_DETECTING_ARUCO
                         state_start_time = current_time
-                        print("[Attendance] Starting ArUco detection...")
+                        log.info("Starting ArUco detection")
                         self.lcd.display_message("Detecting", "ArUco...")
                 
                 # ===== STATE: DETECTING ARUCO =====
@@ -412,28 +621,31 @@ class AttendanceSystem:
                         cv2.putText(frame, f"Detected: {marker_ids}", (10, 30),
                                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 255, 0), 2)
                         
-                        # Check if expected ArUco detected
-                        expected_id = recognized_student['aruco_id']
+                        # Check if an expected ArUco (one per close candidate) was detected
+                        candidate = next((c for c in recognized_student['candidates'] if c[2] in marker_ids), None)
                         
-                        if expected_id in marker_ids:
-                            # ArUco matches! Check if already marked today
-                            if self.db.check_attendance_today(recognized_student['id']):
-                                print(f"[Attendance] {recognized_student['name']} already marked today!")
+                        if candidate is not None:
+                            # ArUco matches! It also tells close candidates apart
+                            recognized_student.update(id=candidate[0], name=candidate[1],
+                                                      aruco_id=candidate[2], similarity=candidate[3])
+                            expected_id = candidate[2]
+                            
+                            # Mark attendance (unless marked meanwhile)
+                            success = self.marked_today.mark(recognized_student['id'])
+                            
+                            if not success and self.marked_today.is_marked(recognized_student['id']):
+                                log.info("%s already marked today", recognized_student['name'])
                                 self.lcd.display_message("Already", "Marked Today!")
                                 self.buzzer.warning_tone()
                                 current_state = STATE_WAITING
                                 time.sleep(3)
                                 continue
                             
-                            # Mark attendance
-                            success = self.db.mark_attendance(recognized_student['id'])
-                            
                             if success:
-                                print(f"\n{'='*50}")
-                                print(f"✓ ATTENDANCE MARKED: {recognized_student['name']}")
-                                print(f"  ArUco ID: {expected_id}")
-                                print(f"  Time: {datetime.now().strftime('%H:%M:%S')}")
-                                print(f"{'='*50}\n")
+                                ATTENDANCE_MARKED.inc()
+                                log.info("ATTENDANCE MARKED: %s", recognized_student['name'],
+                                         extra={"data": {"student_id": recognized_student['id'],
+                                                         "aruco_id": expected_id}})
                                 
                                 # Play success tone immediately
                                 self.lcd.display_message("ATTENDANCE", "MARKED!")
@@ -442,14 +654,15 @@ class AttendanceSystem:
                                 current_state = STATE_SUCCESS
                                 state_start_time = current_time
                             else:
-                                print("[Attendance] Database error!")
+                                log.error("Database error while marking attendance")
                                 self.lcd.display_message("Database", "Error!")
                                 self.buzzer.error_tone()
                                 current_state = STATE_WAITING
                                 time.sleep(2)
                         else:
                             # Wrong ArUco
-                            print(f"[Attendance] Wrong ArUco! Expected {expected_id}, got {marker_ids}")
+                            expected_id = recognized_student['codes']
+                            log.info("Wrong ArUco! Expected %s, got %s", expected_id, marker_ids)
                             cv2.putText(frame, f"Wrong ArUco! Expected: {expected_id}", (10, 60),
                                        cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 255), 2)
                             self.lcd.display_message("ArUco Wrong!", f"Need: {expected_id}")
@@ -457,18 +670,19 @@ class AttendanceSystem:
                     else:
                         cv2.putText(frame, "Show ArUco marker to camera", (10, 30),
                                    cv2.FONT_HERSHEY_SIMPLEX, 0.7, (255, 255, 0), 2)
-                        cv2.putText(frame, f"Expected ID: {recognized_student['aruco_id']}", (10, 60),
+                        cv2.putText(frame, f"Expected ID: {recognized_student['codes']}", (10, 60),
                                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (200, 200, 200), 2)
                     
                     # Timeout after 10 seconds
                     if elapsed > 10.0:
-                        print("[Attendance] ArUco timeout")
+                        log.info("ArUco timeout")
                         self.lcd.display_message("ArUco", "Timeout!")
                         self.buzzer.error_tone()
                         current_state = STATE_WAITING
                         recognized_student = None
                         time.sleep(2)
                     
+                    self.publish_preview(frame)
                     if HARDWARE_MODE == "PC":
                         cv2.imshow("Attendance System", frame)
                         key = cv2.waitKey(100) & 0xFF
@@ -488,12 +702,13 @@ class AttendanceSystem:
                         cv2.putText(frame, f"ArUco ID: {recognized_student['aruco_id']}", (10, 150),
                                    cv2.FONT_HERSHEY_SIMPLEX, 0.8, (255, 255, 255), 2)
                         
+                        self.publish_preview(frame)
                         if HARDWARE_MODE == "PC":
                             cv2.imshow("Attendance System", frame)
                             cv2.waitKey(100)
                     
                     if elapsed >= 5.0:
-                        print("[Attendance] Ready for next student")
+                        log.info("Ready for next student")
                         self.lcd.display_message("Ready", "Next student")
                         current_state = STATE_WAITING
                         recognized_student = None
@@ -512,11 +727,16 @@ class AttendanceSystem:
                         time.sleep(0.5)
                     
         except KeyboardInterrupt:
-            print("\n[Exit] Interrupted by user")
+            log.info("Interrupted by user")
             
         finally:
             self.cleanup()
             
+    def publish_preview(self, frame):
+        """Offer an annotated frame to the web preview (encoded off the loop)"""
+        if self.preview is not None:
+            self.preview.publish(frame)
+            
     def show_statistics(self):
         """Display attendance statistics"""
         today = datetime.now().strftime("%Y-%m-%d")
@@ -539,10 +759,19 @@ class AttendanceSystem:
         
     def cleanup(self):
         """Clean up all resources"""
-        print("\n[Cleanup] Releasing resources...")
+        log.info("Releasing resources...")
         
         try:
+            if self.journal is not None:
+                self.journal.stop()
+            if self.sync is not None:
+                self.sync.stop()
+            self.metrics_writer.stop()
+            if self.preview is not None:
+                self.preview.stop()
             self.camera.release()
+            if self.inference_pool is not None:
+                self.inference_pool.stop()
             self.ultrasonic1.cleanup()
             self.ultrasonic2.cleanup()
             self.lcd.cleanup()
@@ -552,9 +781,9 @@ class AttendanceSystem:
                 cv2.destroyAllWindows()
                 
         except Exception as e:
-            print(f"[Cleanup] Error during cleanup: {e}")
+            log.error("Error during cleanup: %s", e)
             
-        print("[Cleanup] System shutdown complete")
+        log.info("System shutdown complete")
 
 
 def main():
@@ -564,9 +793,7 @@ def main():
         system.run()
         
     except Exception as e:
-        print(f"\n[FATAL ERROR] {e}")
-        import traceback
-        traceback.print_exc()
+        log.critical("Fatal error: %s", e, exc_info=True)
         sys.exit(1)
 
 
@@ -66,6 +66,9 @@ def delete_student(db):
             cursor.execute("DELETE FROM students WHERE id = ?", (student_id,))
             cursor.execute("DELETE FROM attendance WHERE student_id = ?", (student_id,))
             conn.commit()
+            db.changes.touch()
+            db.resets.touch()
+            db.roster.touch()
             conn.close()
             
             print(f"\n✓ Student {student[1]} deleted successfully")
@@ -97,6 +100,9 @@ def delete_all_students(db):
         cursor.execute("DELETE FROM sqlite_sequence WHERE name='students'")
         cursor.execute("DELETE FROM sqlite_sequence WHERE name='attendance'")
         conn.commit()
+        db.changes.touch()
+        db.resets.touch()
+        db.roster.touch()
         conn.close()
         
         print(f"\n✓ All students deleted (IDs reset to start from 1)")
@@ -188,6 +194,8 @@ def reset_student_attendance(db):
                 (student_id, today)
             )
             conn.commit()
+            db.changes.touch()
+            db.resets.touch()
             print(f"\n✓ Attendance reset for {student[1]} - they can take attendance again today")
         else:
             print("Cancelled")
@@ -226,6 +234,8 @@ def reset_all_attendance_today(db):
             (today,)
         )
         conn.commit()
+        db.changes.touch()
+        db.resets.touch()
         print(f"\n✓ All attendance for today has been reset - all students can take attendance again")
     else:
         print("Cancelled")
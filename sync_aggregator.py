@@ -0,0 +1,43 @@
+"""
+Sync Aggregator Service
+Collects attendance and student changes from every kiosk into this
+machine's database and serves them to the other kiosks (database/sync.py)
+Run: python sync_aggregator.py (kiosks point SYNC_SERVER at SYNC_LISTEN)
+"""
+import signal
+import sys
+import threading
+
+from config import DATABASE_PATH, DEVICE_ID, SYNC_LISTEN, SYNC_TOKEN
+from database.db_manager import DatabaseManager
+from database.sync import SyncServer
+from database.sync_store import SyncStore
+from utils.logger import get_logger
+
+
+log = get_logger("sync")
+
+
+def main():
+    """Main entry point"""
+    db = DatabaseManager(DATABASE_PATH, device=DEVICE_ID)
+    server = SyncServer(SYNC_LISTEN, SyncStore(db), token=SYNC_TOKEN)
+    server.start()
+    log.info("Aggregating into %s (%d students)", DATABASE_PATH, db.get_student_count())
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    try:
+        stop.wait()
+    except KeyboardInterrupt:
+        log.info("Interrupted by user")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as e:
+        log.critical("Fatal error: %s", e, exc_info=True)
+        sys.exit(1)
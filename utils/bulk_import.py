@@ -0,0 +1,323 @@
+"""
+Bulk enrollment from a CSV roster and a folder or ZIP of photos
+Faces are detected, quality-checked and embedded in batches on a process
+pool (each worker loads the model once), then all accepted students are
+written in a single database transaction. Rows that cannot be enrolled are
+returned as rejects with a reason.
+
+Roster CSV columns: name, aruco_id and optionally photo (file name inside
+the folder/ZIP). Without a photo column, a photo is matched by file name:
+the ArUco ID ("17.jpg") or the student name ("Jane Doe.jpg" / "jane_doe.jpg").
+"""
+import csv
+import multiprocessing
+import os
+import re
+import sys
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.logger import get_logger
+
+
+log = get_logger("bulk_import")
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def _photo_key(text):
+    """Normalize a name or file stem for matching ("Jane  Doe" -> "jane_doe")"""
+    return re.sub(r"[^a-z0-9]+", "_", str(text).strip().lower()).strip("_")
+
+
+def load_roster(source):
+    """
+    Read and validate a roster CSV
+
+    Args:
+        source: CSV path or text file object
+
+    Returns:
+        Tuple: (rows, rejects); rows are dicts with name, aruco_id, photo,
+        line; rejects are dicts with the same keys plus reason
+    """
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, newline="", encoding="utf-8-sig") as f:
+            return load_roster(f)
+
+    reader = csv.DictReader(source)
+    fields = {(f or "").strip().lower(): f for f in reader.fieldnames or []}
+    if "name" not in fields or "aruco_id" not in fields:
+        raise ValueError("Roster needs 'name' and 'aruco_id' columns")
+
+    rows, rejects = [], []
+    seen_aruco = set()
+
+    for line, record in enumerate(reader, start=2):
+        row = {
+            "line": line,
+            "name": (record.get(fields["name"]) or "").strip(),
+            "aruco_id": (record.get(fields["aruco_id"]) or "").strip(),
+            "photo": (record.get(fields["photo"]) or "").strip() if "photo" in fields else "",
+        }
+
+        if not row["name"]:
+            rejects.append(dict(row, reason="Missing name"))
+            continue
+        try:
+            row["aruco_id"] = int(row["aruco_id"])
+        except ValueError:
+            rejects.append(dict(row, reason="Invalid ArUco ID"))
+            continue
+        if row["aruco_id"] in seen_aruco:
+            rejects.append(dict(row, reason="Duplicate ArUco ID in roster"))
+            continue
+
+        seen_aruco.add(row["aruco_id"])
+        rows.append(row)
+
+    return rows, rejects
+
+
+class PhotoSource:
+    """Photos in a directory or ZIP archive, looked up by file name or stem"""
+
+    def __init__(self, path):
+        """
+        Index photos
+
+        Args:
+            path: Directory or .zip file
+        """
+        self.path = path
+        self.zip = None
+        self.by_name = {}
+        self.by_stem = {}
+
+        if zipfile.is_zipfile(path):
+            self.zip = zipfile.ZipFile(path)
+            names = [n for n in self.zip.namelist() if not n.endswith("/")]
+        elif os.path.isdir(path):
+            names = [os.path.relpath(os.path.join(root, f), path)
+                     for root, _, files in os.walk(path) for f in files]
+        else:
+            raise FileNotFoundError(f"Photo source must be a directory or ZIP: {path}")
+
+        for name in names:
+            base = os.path.basename(name)
+            if base.startswith(".") or not base.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            self.by_name[base.lower()] = name
+            self.by_stem.setdefault(_photo_key(os.path.splitext(base)[0]), name)
+
+    def __len__(self):
+        return len(self.by_name)
+
+    def find(self, row):
+        """
+        Find the photo for a roster row
+
+        Args:
+            row: Roster row dict
+
+        Returns:
+            Photo name inside the source, or None
+        """
+        if row["photo"]:
+            return self.by_name.get(os.path.basename(row["photo"]).lower())
+        return (self.by_stem.get(str(row["aruco_id"]))
+                or self.by_stem.get(_photo_key(row["name"])))
+
+    def read(self, name):
+        """Raw bytes of a photo"""
+        if self.zip is not None:
+            return self.zip.read(name)
+        with open(os.path.join(self.path, name), "rb") as f:
+            return f.read()
+
+    def close(self):
+        if self.zip is not None:
+            self.zip.close()
+
+
+# ----- Worker process -----
+
+_worker = {}
+
+
+def _init_worker(model_name, backend, runtime):
+    """Load the detector and model once per worker process"""
+    from ai.face_detector import FaceDetector
+    from ai.face_recognition import FaceRecognizer
+
+    _worker["detector"] = FaceDetector(backend=backend)
+    _worker["recognizer"] = FaceRecognizer(model_name=model_name, backend=backend, **runtime)
+
+
+def _embed_batch(batch):
+    """
+    Detect, quality-check and embed a batch of photos (runs in a worker)
+
+    Args:
+        batch: List of (index, image bytes)
+
+    Returns:
+        List of (index, embedding or None, reject reason or None)
+    """
+    import cv2
+    import numpy as np
+
+    detector = _worker["detector"]
+    recognizer = _worker["recognizer"]
+    results = []
+
+    for index, data in batch:
+        image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            results.append((index, None, "Unreadable image"))
+            continue
+
+        face_roi, _ = detector.get_single_face(image)
+        if face_roi is None:
+            # Detect again only on the reject path, to say why
+            faces = detector.detect_faces(image)
+            reason = ("No face detected" if len(faces) == 0 else
+                      "Multiple faces" if len(faces) > 1 else "Face too small")
+            results.append((index, None, reason))
+            continue
+        if not detector.validate_face_quality(face_roi):
+            results.append((index, None, "Low quality (too dark, flat or blurry)"))
+            continue
+
+        embedding = recognizer.generate_embedding(face_roi)
+        if embedding is None:
+            results.append((index, None, "Embedding failed"))
+            continue
+
+        results.append((index, embedding, None))
+
+    return results
+
+
+# ----- Import -----
+
+def run_bulk_import(db, roster, photos, model_name, backend, workers=2, batch_size=16,
+                    progress=None, dry_run=False, runtime="deepface", model_path=None, threads=0):
+    """
+    Enroll every student in a roster
+
+    Args:
+        db: DatabaseManager
+        roster: Roster CSV path or text file object
+        photos: PhotoSource
+        model_name: Face model name
+        backend: Detection backend
+        workers: Worker processes
+        batch_size: Photos per worker task
+        progress: Optional callback progress(done, total); may raise to abort
+        dry_run: Check and embed, but don't write to the database
+        runtime: Embedding runtime ("deepface", "onnx", "tflite")
+        model_path: Exported model file for the onnx and tflite runtimes
+        threads: Inference threads per worker for onnx and tflite
+
+    Returns:
+        Dict with enrolled (list of dicts with student_id, name, aruco_id),
+        rejects (list of dicts with name, aruco_id, photo, line, reason)
+        and total
+    """
+    rows, rejects = load_roster(roster)
+    total = len(rows) + len(rejects)
+    enrolled_aruco = db.get_enrolled_aruco_ids()
+
+    # Match photos; reject rows that can't be embedded before doing any work
+    pending = []
+    for row in rows:
+        if row["aruco_id"] in enrolled_aruco:
+            rejects.append(dict(row, reason="ArUco ID already enrolled"))
+            continue
+        photo = photos.find(row)
+        if photo is None:
+            rejects.append(dict(row, reason="Photo not found"))
+            continue
+        row["photo"] = photo
+        pending.append(row)
+
+    log.info("Bulk import: %d rows, %d photos to embed, %d rejected up front",
+             total, len(pending), len(rejects))
+
+    embeddings = {}
+    done = total - len(pending)
+    if progress:
+        progress(done, total)
+
+    if pending:
+        starts = list(range(0, len(pending), batch_size))
+        # spawn: the web manager is multi-threaded, and forking it is unsafe
+        executor = ProcessPoolExecutor(max_workers=max(1, min(workers, len(starts))),
+                                       mp_context=multiprocessing.get_context("spawn"),
+                                       initializer=_init_worker,
+                                       initargs=(model_name, backend,
+                                                 {"runtime": runtime, "model_path": model_path,
+                                                  "threads": threads}))
+        in_flight = set()
+        try:
+            # Read photos lazily, keeping two batches per worker queued, so a
+            # large intake never sits in memory at once
+            while starts or in_flight:
+                while starts and len(in_flight) < 2 * workers:
+                    start = starts.pop(0)
+                    batch = [(i, photos.read(row["photo"]))
+                             for i, row in enumerate(pending[start:start + batch_size], start)]
+                    in_flight.add(executor.submit(_embed_batch, batch))
+
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    for index, embedding, reason in future.result():
+                        if embedding is None:
+                            rejects.append(dict(pending[index], reason=reason))
+                        else:
+                            embeddings[index] = embedding
+                        done += 1
+                if progress:
+                    progress(done, total)
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    accepted = [pending[i] for i in sorted(embeddings)]
+    enrolled = []
+
+    if accepted and not dry_run:
+        student_ids = db.add_students_bulk(
+            [(pending[i]["name"], pending[i]["aruco_id"], embeddings[i]) for i in sorted(embeddings)])
+        if student_ids is None:
+            raise RuntimeError("Database write failed; no students were added")
+        enrolled = [{"student_id": sid, "name": row["name"], "aruco_id": row["aruco_id"]}
+                    for sid, row in zip(student_ids, accepted)]
+    elif dry_run:
+        enrolled = [{"student_id": None, "name": row["name"], "aruco_id": row["aruco_id"]}
+                    for row in accepted]
+
+    rejects.sort(key=lambda r: r["line"])
+    log.info("Bulk import: %d enrolled, %d rejected", len(enrolled), len(rejects))
+    return {"total": total, "enrolled": enrolled, "rejects": rejects}
+
+
+def write_reject_report(rejects, destination):
+    """
+    Write rejects as CSV
+
+    Args:
+        rejects: Reject dicts from run_bulk_import
+        destination: Path or text file object
+    """
+    if isinstance(destination, (str, os.PathLike)):
+        os.makedirs(os.path.dirname(os.path.abspath(destination)), exist_ok=True)
+        with open(destination, "w", newline="", encoding="utf-8") as f:
+            return write_reject_report(rejects, f)
+
+    writer = csv.writer(destination)
+    writer.writerow(["line", "name", "aruco_id", "photo", "reason"])
+    for reject in rejects:
+        writer.writerow([reject["line"], reject["name"], reject["aruco_id"],
+                         reject.get("photo", ""), reject["reason"]])
@@ -0,0 +1,168 @@
+"""
+Response cache for the web manager
+A small in-process TTL cache whose entries are also tied to a data version.
+The version comes from a ChangeStamp: a file whose modification time every
+writer (the attendance service, the web manager, the CLI tools) bumps after
+committing. Checking it is a stat() call, so a cached page stays valid,
+without touching the database, until the data really changes or the TTL
+runs out.
+
+Usage:
+    stamp = ChangeStamp.for_database(DATABASE_PATH)
+    cache = TTLCache(ttl=30, stamp=stamp)
+
+    entry = cache.get(key)
+    if entry is None:
+        version = stamp.version()          # read before loading the data
+        entry = cache.set(key, render(), version)
+"""
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import metrics
+
+
+CACHE_REQUESTS = metrics.counter("web_cache_requests_total", "Response cache lookups", labels=("result",))
+
+
+class ChangeStamp:
+    """Cross-process "data changed" marker (writers touch, readers stat)"""
+
+    def __init__(self, path):
+        """
+        Initialize change stamp
+
+        Args:
+            path: Stamp file path (created on the first touch)
+        """
+        self.path = path
+
+    @classmethod
+    def for_database(cls, db_path, kind="changed"):
+        """Stamp next to a SQLite database ("attendance.db-changed", "attendance.db-reset")"""
+        return cls(f"{db_path}-{kind}")
+
+    def touch(self):
+        """Record that the data changed (call after committing)"""
+        try:
+            previous = os.stat(self.path).st_mtime_ns
+        except OSError:
+            previous = 0
+            try:
+                open(self.path, "a").close()
+            except OSError:
+                return
+        # File timestamps are only a few ms precise; always move forward
+        stamp = max(time.time_ns(), previous + 1)
+        try:
+            os.utime(self.path, ns=(stamp, stamp))
+        except OSError:
+            pass
+
+    def version(self):
+        """
+        Current data version
+
+        Returns:
+            Time of the last change in nanoseconds since the epoch (0 if never)
+        """
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return 0
+
+
+class CacheEntry:
+    """Cached value with its data version and expiry"""
+
+    __slots__ = ("value", "version", "expires")
+
+    def __init__(self, value, version, expires):
+        self.value = value
+        self.version = version
+        self.expires = expires
+
+    @property
+    def last_modified(self):
+        """Time of the data change this entry reflects (seconds since the epoch, or None)"""
+        return self.version / 1e9 if self.version else None
+
+
+class TTLCache:
+    """Thread-safe LRU cache with a TTL and data-version invalidation"""
+
+    def __init__(self, ttl=30, stamp=None, max_entries=256):
+        """
+        Initialize cache
+
+        Args:
+            ttl: Seconds an entry is served at most
+            stamp: Optional ChangeStamp; entries from an older version are stale
+            max_entries: Entries kept (least recently used are evicted)
+        """
+        self.ttl = ttl
+        self.stamp = stamp
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Get a fresh entry
+
+        Args:
+            key: Cache key
+
+        Returns:
+            CacheEntry, or None if missing, expired or out of date
+        """
+        version = self.stamp.version() if self.stamp else 0
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry.expires > time.monotonic() and entry.version == version:
+                self.entries.move_to_end(key)
+                CACHE_REQUESTS.labels("hit").inc()
+                return entry
+            if entry is not None:
+                del self.entries[key]
+        CACHE_REQUESTS.labels("miss").inc()
+        return None
+
+    def set(self, key, value, version=0, ttl=None):
+        """
+        Store a value
+
+        Args:
+            key: Cache key
+            value: Value
+            version: Data version read before the value was built
+            ttl: Seconds to keep it (default: the cache TTL)
+
+        Returns:
+            The new CacheEntry
+        """
+        entry = CacheEntry(value, version, time.monotonic() + (self.ttl if ttl is None else ttl))
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, prefix=None):
+        """
+        Drop entries
+
+        Args:
+            prefix: Only keys starting with this (default: all)
+        """
+        with self.lock:
+            if prefix is None:
+                self.entries.clear()
+            else:
+                for key in [key for key in self.entries if key.startswith(prefix)]:
+                    del self.entries[key]
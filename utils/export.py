@@ -0,0 +1,203 @@
+"""
+Streaming exports (CSV, JSON, XLSX)
+Each exporter turns an iterator of row tuples into an iterator of byte
+chunks, so a web response can send a large export while holding only a
+batch of rows in memory. XLSX is written directly as a minimal OOXML zip
+(inline strings, no shared-string table), so no spreadsheet library is
+needed.
+
+Usage:
+    chunks = export_rows("csv", ("date", "name"), reports.iter_records(start, end))
+    return Response(chunks, mimetype=EXPORT_FORMATS["csv"])
+"""
+import csv
+import io
+import json
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+
+EXPORT_FORMATS = {
+    "csv": "text/csv",
+    "json": "application/json",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+BATCH_ROWS = 500  # Rows written between yielded chunks
+
+# Characters XML 1.0 does not allow (Excel rejects the file if they appear)
+_INVALID_XML = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
+def export_rows(fmt, columns, rows, sheet_name="Sheet1"):
+    """
+    Stream rows in an export format
+
+    Args:
+        fmt: "csv", "json" or "xlsx"
+        columns: Column names
+        rows: Iterable of tuples
+        sheet_name: Worksheet name (XLSX only)
+
+    Returns:
+        Iterator of bytes chunks
+    """
+    if fmt == "csv":
+        return csv_chunks(columns, rows)
+    if fmt == "json":
+        return json_chunks(columns, rows)
+    if fmt == "xlsx":
+        return xlsx_chunks(columns, rows, sheet_name)
+    raise ValueError(f"Unknown export format: {fmt}")
+
+
+def csv_chunks(columns, rows):
+    """CSV with a header row"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow(row)
+        if count % BATCH_ROWS == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def json_chunks(columns, rows):
+    """JSON array of objects keyed by column name"""
+    parts = ["["]
+    for count, row in enumerate(rows):
+        parts.append(("," if count else "") + json.dumps(dict(zip(columns, row))))
+        if len(parts) >= BATCH_ROWS:
+            yield "".join(parts).encode("utf-8")
+            parts = []
+    parts.append("]")
+    yield "".join(parts).encode("utf-8")
+
+
+class _ChunkWriter:
+    """Write-only, unseekable file collecting bytes for the generator to yield"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data, self.chunks = b"".join(self.chunks), []
+        return data
+
+
+def _column_letter(index):
+    letters = ""
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _cell(ref, value):
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return f'<c r="{ref}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{ref}"><v>{value}</v></c>'
+    text = escape(_INVALID_XML.sub("", str(value)))
+    return f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>'
+
+
+_XLSX_STATIC = {
+    "[Content_Types].xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        '</Types>'),
+    "_rels/.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'),
+    "xl/_rels/workbook.xml.rels": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '<Relationship Id="rId2" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+        'Target="styles.xml"/>'
+        '</Relationships>'),
+    "xl/styles.xml": (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+        '<fonts count="2"><font><sz val="11"/><name val="Calibri"/></font>'
+        '<font><b/><sz val="11"/><name val="Calibri"/></font></fonts>'
+        '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+        '<fill><patternFill patternType="gray125"/></fill></fills>'
+        '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+        '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        '<cellXfs count="2"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+        '<xf numFmtId="0" fontId="1" fillId="0" borderId="0" xfId="0" applyFont="1"/></cellXfs>'
+        '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        '</styleSheet>'),
+}
+
+
+def xlsx_chunks(columns, rows, sheet_name="Sheet1"):
+    """Single-sheet XLSX workbook with a bold header row"""
+    sheet_name = escape(re.sub(r"[\[\]:*?/\\]", "-", _INVALID_XML.sub("", sheet_name))[:31])
+    out = _ChunkWriter()
+
+    with zipfile.ZipFile(out, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in _XLSX_STATIC.items():
+            archive.writestr(name, content)
+        archive.writestr("xl/workbook.xml", (
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets><sheet name="{sheet_name}" sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'))
+        yield out.take()
+
+        letters = [_column_letter(i) for i in range(len(columns))]
+        with archive.open("xl/worksheets/sheet1.xml", "w", force_zip64=True) as sheet:
+            header = "".join(
+                f'<c r="{letter}1" t="inlineStr" s="1"><is><t>{escape(str(column))}</t></is></c>'
+                for letter, column in zip(letters, columns))
+            sheet.write((
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                f'<sheetData><row r="1">{header}</row>').encode("utf-8"))
+
+            parts = []
+            for number, row in enumerate(rows, start=2):
+                cells = "".join(_cell(f"{letter}{number}", value) for letter, value in zip(letters, row))
+                parts.append(f'<row r="{number}">{cells}</row>')
+                if len(parts) >= BATCH_ROWS:
+                    sheet.write("".join(parts).encode("utf-8"))
+                    parts = []
+                    yield out.take()
+
+            parts.append("</sheetData></worksheet>")
+            sheet.write("".join(parts).encode("utf-8"))
+
+    yield out.take()
@@ -0,0 +1,295 @@
+"""
+Background jobs for the web manager
+Runs long tasks (enrollment, imports) on a worker pool instead of inside
+request threads. Progress is persisted through a JobStore and pushed to
+waiting requests (long-poll or server-sent events) as it changes.
+
+Usage:
+    manager = JobManager(JobStore(DATABASE_PATH), max_workers=1)
+    job_id = manager.submit("enroll", enroll_func, {"name": "Ana"})
+
+    def enroll_func(job, name):
+        job.update(step="capturing_face", progress=30, message="Look at the camera")
+        job.sleep(2)                         # returns early (raises) on cancel
+        return {"student_id": 7}             # stored as the job result
+"""
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from database.job_store import RUNNING, SUCCEEDED, FAILED, CANCELLED, FINISHED_STATUSES
+from utils import metrics
+from utils.logger import get_logger
+
+
+log = get_logger("jobs")
+
+JOB_SECONDS = metrics.histogram("job_seconds", "Background job run time", labels=("kind", "status"),
+                                buckets=(0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300))
+JOBS_ACTIVE = metrics.gauge("jobs_active", "Queued or running background jobs")
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it has been cancelled"""
+
+
+class JobFailed(Exception):
+    """Raised by a job to fail with a user-facing message"""
+
+
+class JobContext:
+    """Handle passed to a running job for progress updates and cancellation"""
+
+    def __init__(self, manager, job_id):
+        self.manager = manager
+        self.job_id = job_id
+        self.cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        """True once cancellation was requested"""
+        return self.cancel_event.is_set()
+
+    def check_cancelled(self):
+        """Raise JobCancelled if cancellation was requested"""
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def sleep(self, seconds):
+        """Sleep, waking up (and raising JobCancelled) on cancellation"""
+        if self.cancel_event.wait(seconds):
+            raise JobCancelled()
+
+    def update(self, **fields):
+        """
+        Report progress
+
+        Args:
+            fields: Any of step, progress (0-100), message
+        """
+        self.check_cancelled()
+        self.manager._update(self.job_id, **fields)
+
+
+class JobManager:
+    """Worker pool running jobs and publishing their state"""
+
+    def __init__(self, store, max_workers=1, retention_days=None, report_dir=None):
+        """
+        Initialize job manager
+
+        Args:
+            store: JobStore persisting job state
+            max_workers: Jobs run at the same time (1 serializes camera jobs)
+            retention_days: Days finished jobs are kept (None: forever)
+            report_dir: Directory of the files named by job results' "report"
+                        (deleted with their jobs)
+        """
+        self.store = store
+        self.retention_days = retention_days
+        self.report_dir = report_dir
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self.contexts = {}
+        self.versions = {}
+        self.closing = False
+        self.cond = threading.Condition()
+
+    def recover_interrupted(self):
+        """
+        Mark jobs a previous process left queued/running as interrupted
+
+        Call once at server start-up (not on import, so tools importing the
+        web module don't touch a running server's jobs).
+        """
+        interrupted = self.store.mark_unfinished_interrupted()
+        if interrupted:
+            log.warning("Marked %d unfinished job(s) from a previous run as interrupted", interrupted)
+        self.prune()
+
+    def prune(self):
+        """
+        Delete finished jobs older than the retention period
+
+        Runs at start-up and after every job, so the table and the reports
+        of its jobs (bulk import rejects) stay bounded on a long-running server.
+
+        Returns:
+            Number of jobs deleted
+        """
+        if self.retention_days is None:
+            return 0
+        cutoff = datetime.now() - timedelta(days=self.retention_days)
+        jobs = self.store.delete_finished_before(cutoff.isoformat(timespec="seconds"))
+        for job in jobs:
+            result = job["result"]
+            report = result.get("report") if isinstance(result, dict) else None
+            if report and self.report_dir:
+                try:
+                    os.remove(os.path.join(self.report_dir, os.path.basename(report)))
+                except FileNotFoundError:
+                    pass
+                except OSError as e:
+                    log.warning("Cannot delete report %s: %s", report, e)
+        if jobs:
+            log.info("Deleted %d finished job(s) older than %g days", len(jobs), self.retention_days)
+        return len(jobs)
+
+    def submit(self, kind, func, params):
+        """
+        Queue a job
+
+        Args:
+            kind: Job type (e.g. "enroll")
+            func: Callable func(job, **params); its return value is the result
+            params: JSON-serializable keyword arguments for func
+
+        Returns:
+            Job ID
+        """
+        job_id = self.store.create_job(kind, params)
+        context = JobContext(self, job_id)
+        with self.cond:
+            self.contexts[job_id] = context
+            self.versions[job_id] = 1
+        JOBS_ACTIVE.inc()
+
+        self.executor.submit(self._run, kind, func, params, context)
+        log.info("Queued %s job %s", kind, job_id)
+        return job_id
+
+    def cancel(self, job_id):
+        """
+        Request cancellation of a queued or running job
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            True if the job was still active
+        """
+        with self.cond:
+            context = self.contexts.get(job_id)
+        if context is None:
+            return False
+        context.cancel_event.set()
+        self._publish(job_id)
+        return True
+
+    def get(self, job_id):
+        """
+        Current job state
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            Job dict (with a "version" counter) or None
+        """
+        job = self.store.get_job(job_id)
+        if job is not None:
+            with self.cond:
+                job["version"] = self.versions.get(job_id, 0)
+                context = self.contexts.get(job_id)
+            job["cancelling"] = context is not None and context.cancelled
+        return job
+
+    def wait(self, job_id, since=0, timeout=25.0):
+        """
+        Wait until a job changes (long-poll)
+
+        Args:
+            job_id: Job ID
+            since: Version the caller already has
+            timeout: Maximum seconds to wait
+
+        Returns:
+            Job dict (possibly unchanged after the timeout) or None
+        """
+        with self.cond:
+            self.cond.wait_for(lambda: self.versions.get(job_id, 0) != since
+                               or job_id not in self.contexts or self.closing, timeout=timeout)
+        return self.get(job_id)
+
+    def events(self, job_id, timeout=25.0):
+        """
+        Yield the job state on every change until it finishes
+
+        Args:
+            job_id: Job ID
+            timeout: Seconds between keep-alive repeats
+
+        Yields:
+            Job dicts
+        """
+        version = None
+        while True:
+            job = self.wait(job_id, since=version, timeout=timeout)
+            if job is None:
+                return
+            version = job["version"]
+            yield job
+            if job["status"] in FINISHED_STATUSES or self.closing:
+                return
+
+    def shutdown(self, timeout=10.0):
+        """
+        Cancel queued and running jobs and release waiting requests (server shutdown)
+
+        Args:
+            timeout: Seconds to wait for running jobs to stop
+        """
+        with self.cond:
+            self.closing = True
+            contexts = list(self.contexts.values())
+            self.cond.notify_all()
+        for context in contexts:
+            context.cancel_event.set()
+        self.executor.shutdown(wait=False)
+
+        with self.cond:
+            if not self.cond.wait_for(lambda: not self.contexts, timeout=timeout):
+                log.warning("%d job(s) still running at shutdown", len(self.contexts))
+
+    def _update(self, job_id, **fields):
+        self.store.update_job(job_id, **fields)
+        self._publish(job_id)
+
+    def _publish(self, job_id):
+        with self.cond:
+            self.versions[job_id] = self.versions.get(job_id, 0) + 1
+            self.cond.notify_all()
+
+    def _run(self, kind, func, params, context):
+        job_id = context.job_id
+        start = time.perf_counter()
+        status = FAILED
+
+        try:
+            context.check_cancelled()
+            self._update(job_id, status=RUNNING, step=RUNNING)
+            result = func(context, **params)
+            status = SUCCEEDED
+            self._update(job_id, status=status, step="complete", progress=100, result=result)
+        except JobCancelled:
+            status = CANCELLED
+            self._update(job_id, status=status, step=status, message="Cancelled")
+        except JobFailed as e:
+            self._update(job_id, status=status, step=status, message=str(e))
+        except Exception as e:
+            log.error("%s job %s failed: %s", kind, job_id, e, exc_info=True)
+            self._update(job_id, status=status, step=status, message=f"Unexpected error: {e}")
+        finally:
+            JOB_SECONDS.labels(kind, status).observe(time.perf_counter() - start)
+            JOBS_ACTIVE.dec()
+            with self.cond:
+                self.contexts.pop(job_id, None)
+                self.cond.notify_all()
+            log.info("%s job %s %s", kind, job_id, status)
+            try:
+                self.prune()
+            except Exception as e:
+                log.warning("Could not prune old jobs: %s", e)
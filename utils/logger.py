@@ -0,0 +1,229 @@
+"""
+Structured logging for the attendance system
+Leveled loggers with rate-limiting of repetitive messages and a queue-based
+handler, so log formatting and console/file I/O happen on a background
+thread instead of in the frame loop
+
+Usage:
+    from utils.logger import get_logger
+    log = get_logger("engine")
+    log.info("Face recognized", extra={"data": {"name": name, "similarity": 0.83}})
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import config
+
+
+ROOT_LOGGER = "attendance"
+
+_setup_lock = threading.Lock()
+_listener = None
+_TRACEBACK_FORMATTER = logging.Formatter()
+
+
+class StructuredFormatter(logging.Formatter):
+    """
+    Formats records as one line of text or JSON
+
+    Structured fields passed as ``extra={"data": {...}}`` are appended as
+    key=value pairs (text) or merged into the object (JSON).
+    """
+
+    def __init__(self, fmt="text"):
+        super().__init__()
+        self.fmt = fmt
+
+    def format(self, record):
+        timestamp = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(record.created))
+        timestamp = f"{timestamp}.{int(record.msecs):03d}"
+        component = record.name.split(".", 1)[-1]
+        message = record.getMessage()
+        data = getattr(record, "data", None) or {}
+
+        # Queued records carry the traceback already rendered (DroppingQueueHandler.prepare)
+        exc = record.exc_text
+        if record.exc_info and not exc:
+            exc = self.formatException(record.exc_info)
+
+        if self.fmt == "json":
+            entry = {"ts": timestamp, "level": record.levelname,
+                     "component": component, "msg": message}
+            entry.update(data)
+            if exc:
+                entry["exc"] = exc
+            return json.dumps(entry, default=str)
+
+        line = f"{timestamp} {record.levelname:<7s} [{component}] {message}"
+        if data:
+            line += " " + " ".join(f"{k}={v}" for k, v in data.items())
+        if exc:
+            line += "\n" + exc
+        return line
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Drops repetitive messages
+
+    Records are grouped by logger, level and message template (before
+    argument substitution), so "Face detected at x=%d" counts as one message
+    whatever the coordinates. Each group may log ``burst`` records per
+    ``interval`` seconds; the next record after a suppressed run reports how
+    many were dropped. Warnings and above always pass.
+    """
+
+    def __init__(self, interval=10.0, burst=5):
+        super().__init__()
+        self.interval = interval
+        self.burst = burst
+        self.windows = {}
+        self.lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.burst <= 0:
+            return True
+
+        key = (record.name, record.levelno, record.msg)
+        now = record.created
+
+        with self.lock:
+            window_start, count, suppressed = self.windows.get(key, (now, 0, 0))
+            if now - window_start >= self.interval:
+                window_start, count = now, 0
+
+            if count >= self.burst:
+                self.windows[key] = (window_start, count, suppressed + 1)
+                return False
+
+            self.windows[key] = (window_start, count + 1, 0)
+
+        if suppressed:
+            record.data = dict(getattr(record, "data", None) or {}, suppressed=suppressed)
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Queue handler that never blocks: drops records when the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        """
+        Copy of the record that is safe to hand to the listener thread
+
+        QueueHandler.prepare formats the whole record here, folding the
+        traceback into the message; that leaves StructuredFormatter nothing
+        to put in its "exc" field. Only the arguments are merged instead,
+        and the traceback is rendered to exc_text (the frames it references
+        must not outlive the call).
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _TRACEBACK_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level=None, log_file=None, log_format=None, console=None):
+    """
+    Configure the attendance loggers (called automatically by get_logger)
+
+    Args:
+        level: Level name (default: config.LOG_LEVEL)
+        log_file: Log file path, or None to skip (default: config.LOG_FILE)
+        log_format: "text" or "json" (default: config.LOG_FORMAT)
+        console: Also log to stdout (default: config.LOG_TO_CONSOLE)
+    """
+    global _listener
+
+    with _setup_lock:
+        if _listener is not None:
+            return
+
+        level = level or config.LOG_LEVEL
+        log_file = config.LOG_FILE if log_file is None else log_file
+        log_format = log_format or config.LOG_FORMAT
+        console = config.LOG_TO_CONSOLE if console is None else console
+
+        formatter = StructuredFormatter(log_format)
+        handlers = []
+
+        if console:
+            stream = logging.StreamHandler(sys.stdout)
+            stream.setFormatter(formatter)
+            handlers.append(stream)
+
+        if log_file:
+            try:
+                os.makedirs(os.path.dirname(log_file) or ".", exist_ok=True)
+                file_handler = logging.handlers.RotatingFileHandler(
+                    log_file, maxBytes=config.LOG_MAX_BYTES, backupCount=config.LOG_BACKUP_COUNT)
+                file_handler.setFormatter(formatter)
+                handlers.append(file_handler)
+            except OSError as e:
+                print(f"[Logging] Cannot open log file {log_file}: {e}")
+
+        log_queue = queue.Queue(maxsize=config.LOG_QUEUE_SIZE)
+        queue_handler = DroppingQueueHandler(log_queue)
+        queue_handler.addFilter(RateLimitFilter(config.LOG_RATE_LIMIT_INTERVAL,
+                                                config.LOG_RATE_LIMIT_BURST))
+
+        root = logging.getLogger(ROOT_LOGGER)
+        root.setLevel(getattr(logging, str(level).upper(), logging.INFO))
+        root.addHandler(queue_handler)
+        root.propagate = False
+
+        _listener = logging.handlers.QueueListener(log_queue, *handlers,
+                                                   respect_handler_level=True)
+        _listener.start()
+        atexit.register(shutdown_logging)
+
+
+def shutdown_logging():
+    """Flush queued records and stop the background thread"""
+    global _listener
+
+    with _setup_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+
+        root = logging.getLogger(ROOT_LOGGER)
+        for handler in list(root.handlers):
+            root.removeHandler(handler)
+
+
+def get_logger(component):
+    """
+    Get a component logger
+
+    Args:
+        component: Component name (e.g. "engine", "camera")
+
+    Returns:
+        logging.Logger under the attendance root logger
+    """
+    if _listener is None:
+        setup_logging()
+    return logging.getLogger(f"{ROOT_LOGGER}.{component}")
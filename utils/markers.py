@@ -0,0 +1,319 @@
+"""
+ArUco marker service
+Renders printable A4 sheets of markers (PNG pages or a PDF) with each
+student's name and marker ID under the marker. Rendered markers are cached
+on disk by dictionary/size/ID and finished sheets by their content, so
+repeated requests only read files. Markers and pages are rendered on a
+thread pool (OpenCV and zlib release the GIL), which keeps a few thousand
+markers for a new intake to seconds.
+
+Usage:
+    service = MarkerService("DICT_4X4_1000", MARKER_CACHE_DIR)
+    pdf_path = service.sheet_pdf(range(0, 120), labels={0: "Jane Doe"})
+"""
+import hashlib
+import json
+import math
+import os
+import sys
+import threading
+import unicodedata
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from ai.aruco_detector import get_aruco_dictionary
+from utils import metrics
+from utils.logger import get_logger
+
+
+log = get_logger("markers")
+
+MARKER_CACHE = metrics.counter("marker_cache_total", "Marker renders by cache result", labels=("result",))
+MARKER_SHEET_SECONDS = metrics.histogram("marker_sheet_seconds", "Marker sheet generation time",
+                                         labels=("format",), buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60))
+
+A4_MM = (210, 297)
+SHEET_LAYOUT_VERSION = 1  # Bump when the sheet layout changes, to invalidate cached sheets
+
+
+def _ascii(text):
+    """OpenCV's fonts are ASCII only; drop accents ("José" -> "Jose")"""
+    return unicodedata.normalize("NFKD", str(text)).encode("ascii", "ignore").decode("ascii")
+
+
+class MarkerService:
+    """Renders and caches ArUco markers and printable marker sheets"""
+
+    def __init__(self, dictionary, cache_dir, marker_mm=40, dpi=300, workers=4):
+        """
+        Initialize marker service
+
+        Args:
+            dictionary: ArUco dictionary name (e.g. "DICT_4X4_50")
+            cache_dir: Directory for rendered markers and sheets
+            marker_mm: Printed marker size in millimetres
+            dpi: Sheet resolution
+            workers: Rendering threads
+        """
+        self.dictionary_name = dictionary
+        self.dictionary = get_aruco_dictionary(dictionary)
+        self.marker_count = self.dictionary.bytesList.shape[0]
+        self.dpi = dpi
+        self.workers = workers
+        self.marker_px = self._px(marker_mm)
+
+        self.marker_dir = os.path.join(cache_dir, dictionary, str(self.marker_px))
+        self.sheet_dir = os.path.join(cache_dir, "sheets")
+        os.makedirs(self.marker_dir, exist_ok=True)
+        os.makedirs(self.sheet_dir, exist_ok=True)
+
+        # Sheet layout (pixels): quiet zone around each marker, two label lines below
+        self.page_w, self.page_h = self._px(A4_MM[0]), self._px(A4_MM[1])
+        self.margin = self._px(10)
+        self.quiet = self._px(5)
+        self.label_h = self._px(12)
+        self.tile_w = self.marker_px + 2 * self.quiet
+        self.tile_h = self.marker_px + 2 * self.quiet + self.label_h
+        self.cols = max(1, (self.page_w - 2 * self.margin) // self.tile_w)
+        self.rows = max(1, (self.page_h - 2 * self.margin) // self.tile_h)
+        self.per_page = self.cols * self.rows
+
+    def _px(self, mm):
+        return int(round(mm * self.dpi / 25.4))
+
+    def _check_ids(self, marker_ids):
+        marker_ids = [int(marker_id) for marker_id in marker_ids]
+        invalid = [marker_id for marker_id in marker_ids if not 0 <= marker_id < self.marker_count]
+        if invalid:
+            raise ValueError(f"{self.dictionary_name} has marker IDs 0-{self.marker_count - 1}, "
+                             f"got {invalid[0]}")
+        return marker_ids
+
+    # ----- Markers -----
+
+    def marker_path(self, marker_id):
+        """Cached marker PNG path (the file may not exist yet)"""
+        return os.path.join(self.marker_dir, f"{marker_id}.png")
+
+    def marker(self, marker_id):
+        """
+        Get a rendered marker, from the cache when possible
+
+        Args:
+            marker_id: Marker ID
+
+        Returns:
+            Grayscale marker image (marker_px x marker_px)
+        """
+        path = self.marker_path(marker_id)
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE) if os.path.exists(path) else None
+        if image is not None:
+            MARKER_CACHE.labels("hit").inc()
+            return image
+
+        MARKER_CACHE.labels("miss").inc()
+        image = cv2.aruco.generateImageMarker(self.dictionary, marker_id, self.marker_px)
+        # Unique temp name: other threads/processes may render the same marker
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.png"
+        cv2.imwrite(tmp_path, image)
+        os.replace(tmp_path, path)
+        return image
+
+    def markers(self, marker_ids):
+        """
+        Render (or load) many markers in parallel
+
+        Args:
+            marker_ids: Iterable of marker IDs
+
+        Returns:
+            Dict of marker ID -> grayscale image
+        """
+        marker_ids = self._check_ids(marker_ids)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return dict(zip(marker_ids, executor.map(self.marker, marker_ids)))
+
+    def export_markers(self, marker_ids, output_dir):
+        """
+        Write one PNG per marker (aruco_marker_<id>.png)
+
+        Args:
+            marker_ids: Iterable of marker IDs
+            output_dir: Destination directory
+
+        Returns:
+            Number of markers written
+        """
+        marker_ids = self._check_ids(marker_ids)
+        self.markers(marker_ids)  # Render any missing ones in parallel
+        os.makedirs(output_dir, exist_ok=True)
+        for marker_id in marker_ids:
+            with open(self.marker_path(marker_id), "rb") as src, \
+                    open(os.path.join(output_dir, f"aruco_marker_{marker_id}.png"), "wb") as dst:
+                dst.write(src.read())
+        return len(marker_ids)
+
+    # ----- Sheets -----
+
+    def _fit_text(self, text, max_width, height):
+        """Font scale for text of a given pixel height, shrunk to fit max_width"""
+        (width, text_h), _ = cv2.getTextSize(text, cv2.FONT_HERSHEY_SIMPLEX, 1.0, 2)
+        return min(height / text_h, max_width / max(width, 1))
+
+    def _draw_tile(self, page, x, y, marker_id, marker_img, label):
+        # Light cutting guide around the tile
+        cv2.rectangle(page, (x, y), (x + self.tile_w - 1, y + self.tile_h - 1), 200, 1)
+        page[y + self.quiet:y + self.quiet + self.marker_px,
+             x + self.quiet:x + self.quiet + self.marker_px] = marker_img
+
+        lines = [_ascii(label), f"ID {marker_id}"] if label else [f"ID {marker_id}"]
+        line_h = self.label_h // 2
+        text_y = y + 2 * self.quiet + self.marker_px - self.quiet // 2
+        for line in lines:
+            scale = self._fit_text(line, self.tile_w - 2 * self.quiet, int(line_h * 0.6))
+            (width, text_h), _ = cv2.getTextSize(line, cv2.FONT_HERSHEY_SIMPLEX, scale, 2)
+            cv2.putText(page, line, (x + (self.tile_w - width) // 2, text_y + text_h),
+                        cv2.FONT_HERSHEY_SIMPLEX, scale, 0, 2, cv2.LINE_AA)
+            text_y += line_h
+
+    def _render_page(self, page_ids, marker_imgs, labels):
+        page = np.full((self.page_h, self.page_w), 255, dtype=np.uint8)
+        left = (self.page_w - self.cols * self.tile_w) // 2
+        for i, marker_id in enumerate(page_ids):
+            row, col = divmod(i, self.cols)
+            self._draw_tile(page, left + col * self.tile_w, self.margin + row * self.tile_h,
+                            marker_id, marker_imgs[marker_id], labels.get(marker_id))
+        return page
+
+    def render_sheets(self, marker_ids, labels=None):
+        """
+        Lay markers out on A4 pages
+
+        Args:
+            marker_ids: Iterable of marker IDs
+            labels: Optional dict of marker ID -> student name
+
+        Returns:
+            List of grayscale page images
+        """
+        marker_ids = self._check_ids(marker_ids)
+        labels = labels or {}
+        marker_imgs = self.markers(marker_ids)
+        chunks = [marker_ids[i:i + self.per_page] for i in range(0, len(marker_ids), self.per_page)]
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            return list(executor.map(lambda chunk: self._render_page(chunk, marker_imgs, labels), chunks))
+
+    def _sheet_key(self, marker_ids, labels, fmt):
+        spec = [SHEET_LAYOUT_VERSION, self.dictionary_name, self.marker_px, self.dpi, fmt,
+                [[marker_id, labels.get(marker_id, "")] for marker_id in marker_ids]]
+        return hashlib.sha1(json.dumps(spec).encode()).hexdigest()[:16]
+
+    def sheet_pdf(self, marker_ids, labels=None):
+        """
+        Printable PDF of marker sheets (cached by content)
+
+        Args:
+            marker_ids: Iterable of marker IDs
+            labels: Optional dict of marker ID -> student name
+
+        Returns:
+            PDF path
+        """
+        marker_ids = self._check_ids(marker_ids)
+        labels = labels or {}
+        path = os.path.join(self.sheet_dir, f"markers_{self._sheet_key(marker_ids, labels, 'pdf')}.pdf")
+        if os.path.exists(path):
+            return path
+
+        with MARKER_SHEET_SECONDS.labels("pdf").time():
+            pages = self.render_sheets(marker_ids, labels)
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                streams = list(executor.map(lambda page: zlib.compress(page.tobytes(), 6), pages))
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            _write_pdf(tmp_path, [(page.shape[1], page.shape[0], stream)
+                                  for page, stream in zip(pages, streams)], self.dpi)
+            os.replace(tmp_path, path)
+
+        log.info("Rendered %d markers on %d PDF pages", len(marker_ids), len(pages))
+        return path
+
+    def sheet_pngs(self, marker_ids, labels=None):
+        """
+        Marker sheets as one PNG per page (cached by content)
+
+        Args:
+            marker_ids: Iterable of marker IDs
+            labels: Optional dict of marker ID -> student name
+
+        Returns:
+            List of PNG paths
+        """
+        marker_ids = self._check_ids(marker_ids)
+        labels = labels or {}
+        key = self._sheet_key(marker_ids, labels, "png")
+        page_count = math.ceil(len(marker_ids) / self.per_page)
+        paths = [os.path.join(self.sheet_dir, f"markers_{key}_{n + 1}.png") for n in range(page_count)]
+        if all(os.path.exists(path) for path in paths):
+            return paths
+
+        with MARKER_SHEET_SECONDS.labels("png").time():
+            pages = self.render_sheets(marker_ids, labels)
+
+            def write(item):
+                path, page = item
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.png"
+                cv2.imwrite(tmp_path, page)
+                os.replace(tmp_path, path)
+
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                list(executor.map(write, zip(paths, pages)))
+
+        log.info("Rendered %d markers on %d PNG pages", len(marker_ids), len(pages))
+        return paths
+
+
+def _write_pdf(path, images, dpi):
+    """
+    Write a minimal PDF with one full-page grayscale image per page
+
+    Args:
+        path: Output path
+        images: List of (width, height, zlib-compressed 8-bit gray pixels)
+        dpi: Image resolution (sets the page size)
+    """
+    objects = []  # Object bodies; object number = index + 1
+    page_refs = []
+
+    for width, height, stream in images:
+        w_pt, h_pt = width * 72 / dpi, height * 72 / dpi
+        page_num = len(objects) + 3  # After catalog (1) and page tree (2)
+        page_refs.append(f"{page_num} 0 R")
+        content = f"q {w_pt:.2f} 0 0 {h_pt:.2f} 0 0 cm /Im0 Do Q".encode()
+        objects.append((f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {w_pt:.2f} {h_pt:.2f}] "
+                        f"/Resources << /XObject << /Im0 {page_num + 2} 0 R >> >> "
+                        f"/Contents {page_num + 1} 0 R >>").encode())
+        objects.append(f"<< /Length {len(content)} >>\nstream\n".encode() + content + b"\nendstream")
+        objects.append((f"<< /Type /XObject /Subtype /Image /Width {width} /Height {height} "
+                        f"/ColorSpace /DeviceGray /BitsPerComponent 8 /Filter /FlateDecode "
+                        f"/Length {len(stream)} >>\nstream\n").encode() + stream + b"\nendstream")
+
+    objects.insert(0, b"<< /Type /Catalog /Pages 2 0 R >>")
+    objects.insert(1, f"<< /Type /Pages /Kids [{' '.join(page_refs)}] /Count {len(images)} >>".encode())
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for number, body in enumerate(objects, start=1):
+            offsets.append(f.tell())
+            f.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+
+        xref = f.tell()
+        f.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+        for offset in offsets:
+            f.write(f"{offset:010d} 00000 n \n".encode())
+        f.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+                f"startxref\n{xref}\n%%EOF\n".encode())
@@ -0,0 +1,413 @@
+"""
+Lightweight metrics for the attendance pipeline
+Counters, gauges and fixed-bucket latency histograms with Prometheus text
+output and file snapshots for sharing metrics between processes
+
+When metrics are disabled, timers and increments return immediately, so
+instrumented hot paths pay only an attribute check.
+"""
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import METRICS_ENABLED
+from utils.logger import get_logger
+
+
+# Latency buckets in seconds (upper bounds), sized for frame-rate work
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_enabled = METRICS_ENABLED
+
+
+def set_enabled(enabled):
+    """Enable or disable metric collection globally"""
+    global _enabled
+    _enabled = bool(enabled)
+
+
+def is_enabled():
+    """Check if metric collection is enabled"""
+    return _enabled
+
+
+class _NullTimer:
+    """Timer used while metrics are disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    """Context manager observing elapsed time into a histogram"""
+
+    __slots__ = ("histogram", "start")
+
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start)
+        return False
+
+
+class _CounterChild:
+    """Single counter time series"""
+
+    def __init__(self):
+        self.value = 0.0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        """Increment the counter"""
+        if not _enabled:
+            return
+        with self.lock:
+            self.value += amount
+
+    def sample(self):
+        return {"value": self.value}
+
+
+class _GaugeChild:
+    """Single gauge time series"""
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value):
+        """Set the gauge value"""
+        if _enabled:
+            self.value = value
+
+    def inc(self, amount=1):
+        """Increase the gauge value"""
+        if _enabled:
+            self.value += amount
+
+    def dec(self, amount=1):
+        """Decrease the gauge value"""
+        if _enabled:
+            self.value -= amount
+
+    def sample(self):
+        return {"value": self.value}
+
+
+class _HistogramChild:
+    """Single histogram time series with fixed buckets"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        """Record one observation"""
+        if not _enabled:
+            return
+        index = bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """
+        Time a block of code
+
+        Returns:
+            Context manager observing the block's duration in seconds
+        """
+        if not _enabled:
+            return _NULL_TIMER
+        return _Timer(self)
+
+    def sample(self):
+        return {"buckets": list(self.buckets), "counts": list(self.counts),
+                "sum": self.sum, "count": self.count}
+
+
+class Metric:
+    """
+    A named metric family, optionally split by labels
+
+    Unlabeled metrics proxy inc/set/observe/time to their single series;
+    labeled metrics hand out one series per label-value combination via
+    ``labels()``.
+    """
+
+    def __init__(self, kind, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.kind = kind
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self.children = {}
+        self.lock = threading.Lock()
+        if not self.labelnames:
+            self._default = self._new_child()
+            self.children[()] = self._default
+
+    def _new_child(self):
+        if self.kind == "counter":
+            return _CounterChild()
+        if self.kind == "gauge":
+            return _GaugeChild()
+        return _HistogramChild(self.buckets)
+
+    def labels(self, *values):
+        """
+        Get the series for a label-value combination
+
+        Args:
+            values: One value per label name, in order
+
+        Returns:
+            Series object with the metric's methods
+        """
+        key = tuple(str(v) for v in values)
+        child = self.children.get(key)
+        if child is None:
+            with self.lock:
+                child = self.children.setdefault(key, self._new_child())
+        return child
+
+    def inc(self, amount=1):
+        self._default.inc(amount)
+
+    def dec(self, amount=1):
+        self._default.dec(amount)
+
+    def set(self, value):
+        self._default.set(value)
+
+    def observe(self, value):
+        self._default.observe(value)
+
+    def time(self):
+        return self._default.time()
+
+    def snapshot(self):
+        """Serializable view of this metric"""
+        return {
+            "name": self.name,
+            "type": self.kind,
+            "help": self.documentation,
+            "series": [dict(child.sample(), labels=dict(zip(self.labelnames, key)))
+                       for key, child in list(self.children.items())],
+        }
+
+
+class Registry:
+    """Collection of metrics owned by one process"""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def _register(self, kind, name, documentation, labelnames, buckets=DEFAULT_BUCKETS):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = Metric(kind, name, documentation, labelnames, buckets)
+                self.metrics[name] = metric
+            return metric
+
+    def snapshot(self):
+        """
+        Serializable view of all metrics
+
+        Returns:
+            Dict with a timestamp and a list of metric snapshots
+        """
+        return {"timestamp": time.time(),
+                "metrics": [m.snapshot() for m in list(self.metrics.values())]}
+
+
+REGISTRY = Registry()
+
+
+def counter(name, documentation, labels=()):
+    """Create (or get) a counter in the process registry"""
+    return REGISTRY._register("counter", name, documentation, labels)
+
+
+def gauge(name, documentation, labels=()):
+    """Create (or get) a gauge in the process registry"""
+    return REGISTRY._register("gauge", name, documentation, labels)
+
+
+def histogram(name, documentation, labels=(), buckets=DEFAULT_BUCKETS):
+    """Create (or get) a latency histogram in the process registry"""
+    return REGISTRY._register("histogram", name, documentation, labels, buckets)
+
+
+def timed(metric):
+    """
+    Decorator timing every call of a function into a histogram
+
+    Args:
+        metric: Histogram (or labeled histogram series)
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                metric.observe(time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    body = ",".join('{}="{}"'.format(k, str(v).replace("\\", "\\\\").replace('"', '\\"'))
+                    for k, v in labels.items())
+    return "{" + body + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render_prometheus(sources):
+    """
+    Render snapshots in the Prometheus text exposition format
+
+    Args:
+        sources: List of (snapshot, extra_labels) tuples; extra labels (e.g.
+                 the process name) are added to every series of the snapshot
+
+    Returns:
+        Exposition text
+    """
+    families = {}
+    for snapshot, extra_labels in sources:
+        for metric in snapshot["metrics"]:
+            family = families.setdefault(metric["name"], (metric, []))
+            for series in metric["series"]:
+                family[1].append((dict(extra_labels, **series["labels"]), series))
+
+    lines = []
+    for name, (metric, series_list) in sorted(families.items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+
+        for labels, series in series_list:
+            if metric["type"] != "histogram":
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(series['value'])}")
+                continue
+
+            cumulative = 0
+            bounds = list(series["buckets"]) + [float("inf")]
+            for bound, count in zip(bounds, series["counts"]):
+                cumulative += count
+                bucket_labels = dict(labels, le=_format_value(bound))
+                lines.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+            lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(series['sum'])}")
+            lines.append(f"{name}_count{_format_labels(labels)} {series['count']}")
+
+    return "\n".join(lines) + "\n"
+
+
+def write_snapshot(path, registry=REGISTRY):
+    """
+    Atomically write a registry snapshot as JSON
+
+    Args:
+        path: Snapshot file path (e.g. under /dev/shm)
+        registry: Registry to snapshot
+    """
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(registry.snapshot(), f)
+    os.replace(tmp_path, path)
+
+
+def read_snapshot(path):
+    """
+    Read a snapshot written by another process
+
+    Args:
+        path: Snapshot file path
+
+    Returns:
+        Snapshot dict or None if missing/unreadable
+    """
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class SnapshotWriter:
+    """Background thread periodically writing the registry to a file"""
+
+    def __init__(self, path, interval=5.0, registry=REGISTRY):
+        """
+        Initialize snapshot writer
+
+        Args:
+            path: Snapshot file path
+            interval: Seconds between snapshots
+            registry: Registry to snapshot
+        """
+        self.path = path
+        self.interval = interval
+        self.registry = registry
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start writing snapshots (no-op when metrics are disabled)"""
+        if not _enabled or self._thread is not None:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="metrics-snapshot", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._write()
+
+    def _write(self):
+        try:
+            write_snapshot(self.path, self.registry)
+        except OSError as e:
+            get_logger("metrics").error("Error writing snapshot: %s", e)
+
+    def stop(self):
+        """Stop the thread and write a final snapshot"""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=self.interval)
+        self._thread = None
+        self._write()
@@ -0,0 +1,308 @@
+"""
+Live camera preview
+The attendance process publishes annotated frames; a background thread
+JPEG-encodes the latest one and writes it atomically to a shared file. The
+web manager reads that file on a single producer thread and fans each frame
+out to every MJPEG viewer, dropping frames for viewers that fall behind.
+
+Nothing is encoded unless a viewer is connected: the web side touches a
+demand file while it has viewers, and the publisher checks its age.
+"""
+import os
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import metrics
+from utils.logger import get_logger
+
+
+log = get_logger("preview")
+
+PREVIEW_ENCODE_SECONDS = metrics.histogram("preview_encode_seconds", "Preview JPEG encode and write latency")
+PREVIEW_DROPPED = metrics.counter("preview_frames_dropped_total",
+                                  "Published preview frames replaced before they were encoded")
+
+DEMAND_TIMEOUT = 3.0  # Seconds a demand touch keeps the publisher encoding
+
+
+def _demand_path(path):
+    return path + ".viewers"
+
+
+class PreviewPublisher:
+    """Encodes published frames to a shared JPEG file on a background thread"""
+
+    def __init__(self, path, max_fps=10, quality=70, width=None):
+        """
+        Initialize publisher
+
+        Args:
+            path: Shared JPEG path (e.g. under /dev/shm)
+            max_fps: Maximum frames encoded per second
+            quality: JPEG quality (0-100)
+            width: Resize frames to this width before encoding (None = as is)
+        """
+        self.path = path
+        self.interval = 1.0 / max_fps
+        self.quality = quality
+        self.width = width
+
+        self.pending = None
+        self.last_publish = 0.0
+        self.demand_checked = 0.0
+        self.has_demand = False
+        self.cond = threading.Condition()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="preview-encoder", daemon=True)
+        self.thread.start()
+
+    def _viewers_waiting(self, now):
+        """Check (at most once a second) whether the web side has viewers"""
+        if now - self.demand_checked >= 1.0:
+            self.demand_checked = now
+            try:
+                self.has_demand = time.time() - os.path.getmtime(_demand_path(self.path)) < DEMAND_TIMEOUT
+            except OSError:
+                self.has_demand = False
+        return self.has_demand
+
+    def publish(self, frame):
+        """
+        Offer a frame for the preview (never blocks on encoding)
+
+        The frame is encoded later on the publisher thread, so it must not be
+        modified after it is published.
+
+        Args:
+            frame: BGR frame
+        """
+        if frame is None:
+            return
+        now = time.monotonic()
+        if now - self.last_publish < self.interval or not self._viewers_waiting(now):
+            return
+        self.last_publish = now
+
+        with self.cond:
+            if self.pending is not None:
+                PREVIEW_DROPPED.inc()
+            self.pending = frame
+            self.cond.notify()
+
+    def _run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending is not None or not self.running)
+                if not self.running:
+                    return
+                frame, self.pending = self.pending, None
+
+            try:
+                with PREVIEW_ENCODE_SECONDS.time():
+                    self._write(frame)
+            except (cv2.error, OSError) as e:
+                log.warning("Error writing preview frame: %s", e)
+
+    def _write(self, frame):
+        if self.width and frame.shape[1] > self.width:
+            height = int(frame.shape[0] * self.width / frame.shape[1])
+            frame = cv2.resize(frame, (self.width, height), interpolation=cv2.INTER_AREA)
+
+        ok, jpeg = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return
+
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(jpeg.tobytes())
+        os.replace(tmp_path, self.path)
+
+    def stop(self):
+        """Stop the encoder thread"""
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        self.thread.join(timeout=2)
+
+
+class _ViewerSlot:
+    """Latest frame for one viewer; older undelivered frames are dropped"""
+
+    def __init__(self):
+        self.frame = None
+        self.seq = 0
+        self.closed = False
+        self.cond = threading.Condition()
+
+    def put(self, frame, seq):
+        with self.cond:
+            self.frame = frame
+            self.seq = seq
+            self.cond.notify()
+
+    def get(self, after, timeout):
+        with self.cond:
+            self.cond.wait_for(lambda: self.seq > after or self.closed, timeout=timeout)
+            return self.frame, self.seq
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+
+
+class _Stream:
+    """
+    One viewer's stream (a WSGI response body)
+
+    The viewer is subscribed before the response starts, so close(), which
+    the server always calls, frees its place even if no frame was sent.
+    """
+
+    def __init__(self, hub, slot):
+        self.hub = hub
+        self.slot = slot
+        self.chunks = hub._frames(slot)
+
+    def __iter__(self):
+        return self.chunks
+
+    def close(self):
+        self.chunks.close()
+        self.hub._unsubscribe(self.slot)
+
+
+_placeholder = None
+
+
+def _placeholder_jpeg():
+    """JPEG shown until the attendance service publishes a frame"""
+    global _placeholder
+    if _placeholder is None:
+        image = np.zeros((240, 320, 3), dtype=np.uint8)
+        cv2.putText(image, "No preview yet", (60, 125), cv2.FONT_HERSHEY_SIMPLEX,
+                    0.7, (200, 200, 200), 2)
+        _placeholder = cv2.imencode(".jpg", image)[1].tobytes()
+    return _placeholder
+
+
+class PreviewHub:
+    """Fans the shared preview file out to MJPEG viewers"""
+
+    BOUNDARY = "frame"
+
+    def __init__(self, path, max_fps=10, max_viewers=None):
+        """
+        Initialize hub
+
+        Args:
+            path: Shared JPEG path written by PreviewPublisher
+            max_fps: Maximum frames per second sent to viewers
+            max_viewers: Streams open at once (None = no limit); each holds
+                         a server thread while it is open
+        """
+        self.path = path
+        self.interval = 1.0 / max_fps
+        self.max_viewers = max_viewers
+        self.viewers = set()
+        self.lock = threading.Lock()
+        self.thread = None
+        self.closed = False
+
+    def _subscribe(self):
+        slot = _ViewerSlot()
+        with self.lock:
+            if self.closed:
+                slot.close()
+                return slot
+            if self.max_viewers is not None and len(self.viewers) >= self.max_viewers:
+                return None
+            self.viewers.add(slot)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="preview-hub", daemon=True)
+                self.thread.start()
+        return slot
+
+    def _unsubscribe(self, slot):
+        with self.lock:
+            self.viewers.discard(slot)
+
+    def _run(self):
+        """Single producer: read each new preview frame once for all viewers"""
+        last_mtime = None
+        last_touch = 0.0
+        seq = 0
+
+        while True:
+            with self.lock:
+                viewers = list(self.viewers)
+                if not viewers:
+                    self.thread = None
+                    return
+
+            now = time.time()
+            if now - last_touch >= 1.0:
+                last_touch = now
+                try:
+                    with open(_demand_path(self.path), "a"):
+                        pass
+                    os.utime(_demand_path(self.path))
+                except OSError as e:
+                    log.warning("Cannot signal preview demand: %s", e)
+
+            try:
+                mtime = os.stat(self.path).st_mtime_ns
+                if mtime != last_mtime:
+                    with open(self.path, "rb") as f:
+                        jpeg = f.read()
+                    last_mtime = mtime
+                    seq += 1
+                    for slot in viewers:
+                        slot.put(jpeg, seq)
+            except OSError:
+                pass  # No preview published yet
+
+            time.sleep(self.interval)
+
+    def close(self):
+        """End every open stream (server shutdown) and refuse new viewers"""
+        with self.lock:
+            self.closed = True
+            viewers = list(self.viewers)
+        for slot in viewers:
+            slot.close()
+
+    def stream(self):
+        """
+        Open a multipart MJPEG stream for one viewer
+
+        Returns:
+            Iterable of multipart chunks (boundary, headers and JPEG bytes),
+            or None if max_viewers streams are already open
+        """
+        slot = self._subscribe()
+        if slot is None:
+            return None
+        return _Stream(self, slot)
+
+    def _frames(self, slot):
+        """Multipart chunks for a subscribed viewer"""
+        seq = 0
+        try:
+            while True:
+                jpeg, seq = slot.get(seq, timeout=5.0)
+                if slot.closed:
+                    return
+                # Without new frames, resend the last one (or a placeholder)
+                # every few seconds so disconnected viewers are noticed
+                jpeg = jpeg or _placeholder_jpeg()
+                yield (b"--" + self.BOUNDARY.encode() + b"\r\n"
+                       b"Content-Type: image/jpeg\r\n"
+                       b"Content-Length: " + str(len(jpeg)).encode() + b"\r\n\r\n" + jpeg + b"\r\n")
+        finally:
+            self._unsubscribe(slot)
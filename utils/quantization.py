@@ -0,0 +1,116 @@
+"""
+Embedding quantization
+Compact storage for a gallery of embeddings, scored without expanding the
+whole matrix:
+
+- float32: the reference (half of the float64 DeepFace returns)
+- float16: 2x smaller than float32, about 3 significant digits
+- int8: 4x smaller than float32 (8x than float64); each vector is scaled by
+  max(|x|) / 127, so it uses the full int8 range, and its scale is kept
+
+Scores are computed block by block: a block of rows is expanded to float32
+into a small reused buffer and multiplied by the query with BLAS. NumPy has
+no int8 matrix product, and multiplying int8 directly with int32
+accumulation measured ~2.5x slower than this; a block that stays in cache
+makes the expanded product about as fast as float32 while the gallery
+itself stays small.
+"""
+import numpy as np
+
+
+PRECISIONS = ("float32", "float16", "int8")
+
+# Rows expanded per block (1024 x 512-dim float32 = 2 MB, fits in the Pi's L2)
+BLOCK_ROWS = 1024
+
+
+def quantize(vectors, precision="int8"):
+    """
+    Quantize a matrix of row vectors
+
+    Args:
+        vectors: Array (N, D)
+        precision: "float32", "float16" or "int8"
+
+    Returns:
+        Tuple: (codes array (N, D), per-row float32 scales (N,) or None)
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if precision == "float32":
+        return np.ascontiguousarray(vectors), None
+    if precision == "float16":
+        return vectors.astype(np.float16), None
+    if precision == "int8":
+        peaks = np.abs(vectors).max(axis=1) if vectors.size else np.zeros(len(vectors), np.float32)
+        scales = np.where(peaks > 0, peaks / 127.0, 1.0).astype(np.float32)
+        codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+        return codes, scales
+    raise ValueError(f"Unknown precision: {precision} (choose from {', '.join(PRECISIONS)})")
+
+
+def dequantize(codes, scales=None):
+    """
+    Expand quantized rows back to float32
+
+    Args:
+        codes: Array (N, D) from quantize()
+        scales: Per-row scales from quantize() (None for float precisions)
+
+    Returns:
+        float32 array (N, D)
+    """
+    values = codes.astype(np.float32)
+    if scales is not None:
+        values *= scales[:, None]
+    return values
+
+
+class QuantizedMatrix:
+    """Row vectors in a compact precision, scored against float32 queries"""
+
+    def __init__(self, vectors, precision="int8", block_rows=BLOCK_ROWS):
+        """
+        Initialize matrix
+
+        Args:
+            vectors: Array (N, D)
+            precision: "float32", "float16" or "int8"
+            block_rows: Rows expanded to float32 at a time
+        """
+        self.precision = precision
+        self.codes, self.scales = quantize(vectors, precision)
+        self.block_rows = block_rows
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        """Memory used by the codes and scales"""
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def dot(self, query):
+        """
+        Dot product of every row with a query
+
+        Args:
+            query: Vector (D,)
+
+        Returns:
+            float32 array (N,)
+        """
+        query = np.asarray(query, dtype=np.float32)
+        if self.precision == "float32":
+            return self.codes @ query
+
+        rows, dim = self.codes.shape
+        out = np.empty(rows, dtype=np.float32)
+        buffer = np.empty((min(self.block_rows, rows), dim), dtype=np.float32)
+        for start in range(0, rows, self.block_rows):
+            block = self.codes[start:start + self.block_rows]
+            expanded = buffer[:len(block)]
+            expanded[...] = block
+            np.dot(expanded, query, out=out[start:start + len(block)])
+        if self.scales is not None:
+            out *= self.scales
+        return out
@@ -0,0 +1,90 @@
+"""
+Production WSGI serving
+Runs the web manager under waitress, a pure-Python multi-threaded WSGI
+server that works on the Pi: a bounded pool of request threads, a
+connection limit and HTTP/1.1 keep-alive. SIGTERM (systemctl stop) and
+Ctrl+C shut it down gracefully: no new connections are accepted,
+long-lived streams are told to end, and in-flight requests get a few
+seconds to finish.
+
+Falls back to the Flask development server when waitress is not installed.
+
+Usage:
+    serve(app, "0.0.0.0", 4000, threads=8, on_shutdown=[preview_hub.close])
+"""
+import os
+import signal
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.logger import get_logger
+
+
+log = get_logger("web")
+
+
+def _wait_flushed(server, timeout):
+    """Wait until finished responses have been written to their sockets"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if not any(channel.total_outbufs_len for channel in list(server.active_channels.values())):
+            return
+        time.sleep(0.05)
+
+
+def serve(app, host, port, threads=8, connection_limit=64, keepalive_timeout=30,
+          shutdown_timeout=10, on_shutdown=()):
+    """
+    Serve a WSGI app until SIGTERM or Ctrl+C
+
+    Args:
+        app: WSGI application
+        host: Interface to listen on
+        port: TCP port
+        threads: Request threads (open MJPEG/SSE streams hold one each)
+        connection_limit: Open connections before new ones wait in the backlog
+        keepalive_timeout: Seconds an idle keep-alive connection stays open
+        shutdown_timeout: Seconds in-flight requests get to finish on shutdown
+        on_shutdown: Callables run when shutdown starts (end streams, cancel jobs)
+    """
+    try:
+        from waitress.server import create_server
+    except ImportError:
+        log.warning("waitress is not installed, using the Flask development server "
+                    "(pip install waitress)")
+        try:
+            app.run(host=host, port=port, debug=False, threaded=True)
+        finally:
+            for hook in on_shutdown:
+                hook()
+        return
+
+    server = create_server(app, host=host, port=port, threads=threads,
+                           connection_limit=connection_limit, channel_timeout=keepalive_timeout,
+                           ident="attendance-web")
+    loop = threading.Thread(target=server.run, name="wsgi-loop", daemon=True)
+    loop.start()
+    log.info("Serving on http://%s:%d (waitress, %d threads, %d connections)",
+             host, port, threads, connection_limit)
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    try:
+        while loop.is_alive() and not stop.wait(1.0):
+            pass
+    except KeyboardInterrupt:
+        pass
+
+    log.info("Shutting down (waiting up to %ds for requests)", shutdown_timeout)
+    server.accepting = False
+    for hook in on_shutdown:
+        try:
+            hook()
+        except Exception as e:
+            log.warning("Shutdown hook %s failed: %s", getattr(hook, "__name__", hook), e)
+    server.task_dispatcher.shutdown(timeout=shutdown_timeout)
+    _wait_flushed(server, timeout=1.0)
+    server.close()
+    log.info("Web manager stopped")
@@ -0,0 +1,106 @@
+"""
+Startup profiling
+Measures how long each import and initialization step takes and when the
+service becomes ready, so cold-start regressions are visible in the log,
+the metrics and the startup benchmark
+"""
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils import metrics
+from utils.logger import get_logger
+
+
+log = get_logger("startup")
+
+STARTUP_STEP_SECONDS = metrics.gauge("startup_step_seconds", "Duration of each startup step",
+                                     labels=("step",))
+STARTUP_READY_SECONDS = metrics.gauge("startup_ready_seconds",
+                                      "Seconds from process start until the service was ready")
+
+
+def process_uptime():
+    """
+    Seconds since this process was started
+
+    Uses the kernel start time on Linux so interpreter start-up and module
+    imports before this module was loaded are included; elsewhere it falls
+    back to the time since this module was imported.
+
+    Returns:
+        Uptime in seconds
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        start_ticks = int(fields[19])  # field 22 of /proc/<pid>/stat
+        with open("/proc/uptime") as f:
+            system_uptime = float(f.read().split()[0])
+        return system_uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.perf_counter() - _MODULE_LOADED
+
+
+_MODULE_LOADED = time.perf_counter()
+
+
+class StartupProfiler:
+    """Records named startup steps, possibly running on several threads"""
+
+    def __init__(self, name):
+        """
+        Initialize profiler
+
+        Args:
+            name: Service name used in the ready report
+        """
+        self.name = name
+        self.steps = {}
+        self.lock = threading.Lock()
+        self.ready_at = None
+
+    @contextmanager
+    def step(self, step_name):
+        """
+        Time a startup step
+
+        Args:
+            step_name: Step name (e.g. "camera_warmup")
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(step_name, time.perf_counter() - start)
+
+    def record(self, step_name, seconds):
+        """
+        Record a step measured elsewhere
+
+        Args:
+            step_name: Step name
+            seconds: Duration in seconds
+        """
+        with self.lock:
+            self.steps[step_name] = seconds
+        STARTUP_STEP_SECONDS.labels(step_name).set(seconds)
+        log.debug("%s: %.3fs", step_name, seconds)
+
+    def mark_ready(self):
+        """
+        Mark the service as ready and log the startup breakdown
+
+        Returns:
+            Seconds from process start until ready
+        """
+        self.ready_at = process_uptime()
+        STARTUP_READY_SECONDS.set(self.ready_at)
+
+        with self.lock:
+            breakdown = {k: round(v, 3) for k, v in self.steps.items()}
+        log.info("%s ready in %.2fs", self.name, self.ready_at, extra={"data": breakdown})
+        return self.ready_at
@@ -0,0 +1,72 @@
+"""
+Message framing for the local services' sockets (camera broker, sync)
+
+Wire format (both directions): 8-byte header "!II" (json_len, payload_len),
+a JSON object, then an optional binary payload.
+"""
+import json
+import socket
+import struct
+
+
+_HEADER = struct.Struct("!II")
+
+
+def _recv_exact(sock, size):
+    """Read exactly size bytes into a (writable) bytearray"""
+    buffer = bytearray(size)
+    view = memoryview(buffer)
+    received = 0
+    while received < size:
+        n = sock.recv_into(view[received:], size - received)
+        if n == 0:
+            raise ConnectionError("Connection closed")
+        received += n
+    return buffer
+
+
+def send_message(sock, header, payload=b""):
+    """
+    Send one message
+
+    Args:
+        sock: Connected socket
+        header: JSON-serializable dict
+        payload: Optional bytes-like payload
+    """
+    body = json.dumps(header).encode()
+    sock.sendall(_HEADER.pack(len(body), len(payload)) + body)
+    if payload:
+        sock.sendall(payload)
+
+
+def recv_message(sock):
+    """
+    Receive one message
+
+    Args:
+        sock: Connected socket
+
+    Returns:
+        Tuple: (header dict, payload bytearray)
+    """
+    header_len, payload_len = _HEADER.unpack(_recv_exact(sock, _HEADER.size))
+    header = json.loads(_recv_exact(sock, header_len).decode())
+    payload = _recv_exact(sock, payload_len) if payload_len else bytearray()
+    return header, payload
+
+
+def parse_address(address):
+    """
+    Socket family and address from a config string
+
+    Args:
+        address: "host:port" for TCP, or a filesystem path for a Unix socket
+
+    Returns:
+        Tuple: (socket family, address for connect()/bind())
+    """
+    if "/" in address or ":" not in address:
+        return socket.AF_UNIX, address
+    host, port = address.rsplit(":", 1)
+    return socket.AF_INET, (host, int(port))
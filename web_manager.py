@@ -4,608 +4,143 @@ Access from any device - works as WiFi hotspot on Raspberry Pi
 Run: python web_manager.py
 Access: http://192.168.4.1:5000 (hotspot) or http://<raspberry-pi-ip>:5000
 """
-from flask import Flask, render_template_string, request, redirect, url_for, jsonify, Response
+from flask import (Flask, render_template, request, redirect, url_for, jsonify, Response, g,
+                   send_file)
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import threading
 import time
 import os
+import json
 import subprocess
-from config import DATABASE_PATH, HARDWARE_MODE, BASE_DIR
+import functools
+import hashlib
+import io
+import shutil
+import tempfile
+import zipfile
+from config import (DATABASE_PATH, HARDWARE_MODE, BASE_DIR, METRICS_SNAPSHOT_PATH,
+                    CAMERA_BROKER_ENABLED, CAMERA_BROKER_SOCKET, CAMERA_BROKER_METRICS_PATH,
+                    PREVIEW_ENABLED, PREVIEW_PATH, PREVIEW_MAX_FPS, WEB_CACHE_TTL, WEB_CACHE_MAX_ENTRIES,
+                    WEB_HOST, WEB_PORT, WEB_THREADS, WEB_CONNECTION_LIMIT, WEB_KEEPALIVE_TIMEOUT,
+                    WEB_MAX_STREAMS, WEB_SHUTDOWN_TIMEOUT, WEB_STATIC_MAX_AGE, WEB_JOB_RETENTION_DAYS,
+                    BULK_IMPORT_REPORT_DIR)
+from utils import metrics
+from utils.startup import StartupProfiler, process_uptime
+from utils.preview import PreviewHub
+from utils.jobs import JobManager, JobFailed
+from database.job_store import JobStore, QUEUED, RUNNING
+from database.db_manager import DatabaseManager, STUDENT_SORTS, ATTENDANCE_SORTS
+from database.reports import AttendanceReports, RECORD_COLUMNS, DAILY_COLUMNS, STUDENT_COLUMNS
+from utils.export import EXPORT_FORMATS, export_rows
+from utils.cache import TTLCache, ChangeStamp
+from utils.serving import serve
 
 app = Flask(__name__)
 
-# Global enrollment state
-enrollment_state = {
-    'active': False,
-    'step': 'idle',  # idle, name_entered, capturing_face, capturing_aruco, complete, error
-    'message': '',
-    'student_name': '',
-    'progress': 0
-}
-
-# HTML Template with modern smooth UI
-HTML_TEMPLATE = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0, maximum-scale=1.0, user-scalable=no">
-    <title>Attendance System</title>
-    <link rel="preconnect" href="https://fonts.googleapis.com">
-    <style>
-        :root {
-            --primary: #6366f1;
-            --primary-dark: #4f46e5;
-            --secondary: #8b5cf6;
-            --success: #10b981;
-            --warning: #f59e0b;
-            --danger: #ef4444;
-            --dark: #1e293b;
-            --light: #f8fafc;
-            --gray: #64748b;
-        }
-        
-        * {
-            box-sizing: border-box;
-            margin: 0;
-            padding: 0;
-        }
-        
-        body {
-            font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            background: linear-gradient(135deg, #0f172a 0%, #1e293b 50%, #334155 100%);
-            min-height: 100vh;
-            color: var(--light);
-            padding: 16px;
-            padding-bottom: 100px;
-        }
-        
-        .container {
-            max-width: 480px;
-            margin: 0 auto;
-        }
-        
-        /* Header */
-        .header {
-            text-align: center;
-            padding: 20px 0;
-            margin-bottom: 20px;
-        }
-        
-        .header h1 {
-            font-size: 28px;
-            font-weight: 700;
-            background: linear-gradient(135deg, #6366f1, #a855f7, #ec4899);
-            -webkit-background-clip: text;
-            -webkit-text-fill-color: transparent;
-            background-clip: text;
-            margin-bottom: 8px;
-        }
-        
-        .header .subtitle {
-            color: var(--gray);
-            font-size: 14px;
-        }
-        
-        .time-badge {
-            display: inline-block;
-            background: rgba(99, 102, 241, 0.2);
-            border: 1px solid rgba(99, 102, 241, 0.3);
-            padding: 6px 16px;
-            border-radius: 20px;
-            font-size: 13px;
-            color: #a5b4fc;
-            margin-top: 12px;
-        }
-        
-        /* Cards */
-        .card {
-            background: rgba(30, 41, 59, 0.8);
-            backdrop-filter: blur(10px);
-            border: 1px solid rgba(255, 255, 255, 0.1);
-            border-radius: 20px;
-            padding: 24px;
-            margin-bottom: 16px;
-            transition: transform 0.2s, box-shadow 0.2s;
-        }
-        
-        .card:hover {
-            transform: translateY(-2px);
-            box-shadow: 0 20px 40px rgba(0, 0, 0, 0.3);
-        }
-        
-        .card h2 {
-            font-size: 18px;
-            font-weight: 600;
-            margin-bottom: 16px;
-            display: flex;
-            align-items: center;
-            gap: 10px;
-        }
-        
-        .card h2 .icon {
-            font-size: 24px;
-        }
-        
-        /* Stats Grid */
-        .stats-grid {
-            display: grid;
-            grid-template-columns: 1fr 1fr;
-            gap: 12px;
-            margin-bottom: 20px;
-        }
-        
-        .stat-card {
-            background: linear-gradient(135deg, var(--primary) 0%, var(--secondary) 100%);
-            border-radius: 16px;
-            padding: 20px;
-            text-align: center;
-            position: relative;
-            overflow: hidden;
-        }
-        
-        .stat-card::before {
-            content: '';
-            position: absolute;
-            top: -50%;
-            right: -50%;
-            width: 100%;
-            height: 100%;
-            background: rgba(255, 255, 255, 0.1);
-            border-radius: 50%;
-        }
-        
-        .stat-card.green {
-            background: linear-gradient(135deg, #059669 0%, #10b981 100%);
-        }
-        
-        .stat-number {
-            font-size: 42px;
-            font-weight: 700;
-            line-height: 1;
-            margin-bottom: 4px;
-        }
-        
-        .stat-label {
-            font-size: 12px;
-            opacity: 0.9;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-        }
-        
-        /* Navigation Grid */
-        .nav-grid {
-            display: grid;
-            grid-template-columns: 1fr 1fr;
-            gap: 12px;
-        }
-        
-        .nav-btn {
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            justify-content: center;
-            gap: 8px;
-            padding: 24px 16px;
-            border-radius: 16px;
-            text-decoration: none;
-            color: white;
-            font-weight: 600;
-            font-size: 14px;
-            transition: all 0.3s ease;
-            border: none;
-            cursor: pointer;
-            position: relative;
-            overflow: hidden;
-        }
-        
-        .nav-btn::before {
-            content: '';
-            position: absolute;
-            inset: 0;
-            background: linear-gradient(180deg, rgba(255,255,255,0.1) 0%, transparent 100%);
-        }
-        
-        .nav-btn:active {
-            transform: scale(0.95);
-        }
-        
-        .nav-btn .icon {
-            font-size: 32px;
-        }
-        
-        .nav-btn.students {
-            background: linear-gradient(135deg, #059669, #10b981);
-        }
-        
-        .nav-btn.attendance {
-            background: linear-gradient(135deg, #0284c7, #0ea5e9);
-        }
-        
-        .nav-btn.enroll {
-            background: linear-gradient(135deg, #7c3aed, #a855f7);
-            grid-column: span 2;
-        }
-        
-        .nav-btn.reset {
-            background: linear-gradient(135deg, #ea580c, #f97316);
-        }
-        
-        .nav-btn.settings {
-            background: linear-gradient(135deg, #4b5563, #6b7280);
-        }
-        
-        /* Buttons */
-        .btn {
-            display: inline-flex;
-            align-items: center;
-            justify-content: center;
-            gap: 8px;
-            padding: 12px 20px;
-            border-radius: 12px;
-            font-size: 14px;
-            font-weight: 600;
-            cursor: pointer;
-            border: none;
-            transition: all 0.2s;
-            text-decoration: none;
-            color: white;
-        }
-        
-        .btn:active {
-            transform: scale(0.95);
-        }
-        
-        .btn-primary {
-            background: linear-gradient(135deg, var(--primary), var(--secondary));
-        }
-        
-        .btn-success {
-            background: linear-gradient(135deg, #059669, #10b981);
-        }
-        
-        .btn-danger {
-            background: linear-gradient(135deg, #dc2626, #ef4444);
-        }
-        
-        .btn-warning {
-            background: linear-gradient(135deg, #d97706, #f59e0b);
-        }
-        
-        .btn-dark {
-            background: rgba(255, 255, 255, 0.1);
-            border: 1px solid rgba(255, 255, 255, 0.2);
-        }
-        
-        .btn-block {
-            width: 100%;
-            padding: 16px;
-            font-size: 16px;
-        }
-        
-        .btn-sm {
-            padding: 8px 12px;
-            font-size: 12px;
-        }
-        
-        /* Forms */
-        .form-group {
-            margin-bottom: 16px;
-        }
-        
-        .form-label {
-            display: block;
-            font-size: 14px;
-            font-weight: 500;
-            margin-bottom: 8px;
-            color: var(--gray);
-        }
-        
-        .form-input {
-            width: 100%;
-            padding: 14px 16px;
-            background: rgba(255, 255, 255, 0.05);
-            border: 1px solid rgba(255, 255, 255, 0.1);
-            border-radius: 12px;
-            font-size: 16px;
-            color: white;
-            transition: border-color 0.2s;
-        }
-        
-        .form-input:focus {
-            outline: none;
-            border-color: var(--primary);
-            background: rgba(255, 255, 255, 0.08);
-        }
-        
-        .form-input::placeholder {
-            color: var(--gray);
-        }
-        
-        /* Alerts */
-        .alert {
-            padding: 16px;
-            border-radius: 12px;
-            margin-bottom: 16px;
-            display: flex;
-            align-items: center;
-            gap: 12px;
-            font-size: 14px;
-        }
-        
-        .alert-success {
-            background: rgba(16, 185, 129, 0.2);
-            border: 1px solid rgba(16, 185, 129, 0.3);
-            color: #6ee7b7;
-        }
-        
-        .alert-danger {
-            background: rgba(239, 68, 68, 0.2);
-            border: 1px solid rgba(239, 68, 68, 0.3);
-            color: #fca5a5;
-        }
-        
-        .alert-info {
-            background: rgba(99, 102, 241, 0.2);
-            border: 1px solid rgba(99, 102, 241, 0.3);
-            color: #a5b4fc;
-        }
-        
-        .alert-warning {
-            background: rgba(245, 158, 11, 0.2);
-            border: 1px solid rgba(245, 158, 11, 0.3);
-            color: #fcd34d;
-        }
-        
-        /* Table */
-        .table-wrapper {
-            overflow-x: auto;
-            margin: 0 -24px;
-            padding: 0 24px;
-        }
-        
-        table {
-            width: 100%;
-            border-collapse: collapse;
-        }
-        
-        th, td {
-            padding: 14px 12px;
-            text-align: left;
-            border-bottom: 1px solid rgba(255, 255, 255, 0.1);
-        }
-        
-        th {
-            font-size: 12px;
-            text-transform: uppercase;
-            letter-spacing: 0.5px;
-            color: var(--gray);
-            font-weight: 600;
-        }
-        
-        td {
-            font-size: 14px;
-        }
-        
-        tr:last-child td {
-            border-bottom: none;
-        }
-        
-        /* Badge */
-        .badge {
-            display: inline-block;
-            padding: 4px 10px;
-            border-radius: 20px;
-            font-size: 11px;
-            font-weight: 600;
-            text-transform: uppercase;
-        }
-        
-        .badge-success {
-            background: rgba(16, 185, 129, 0.2);
-            color: #6ee7b7;
-        }
-        
-        .badge-warning {
-            background: rgba(245, 158, 11, 0.2);
-            color: #fcd34d;
-        }
-        
-        /* Empty State */
-        .empty-state {
-            text-align: center;
-            padding: 40px 20px;
-            color: var(--gray);
-        }
-        
-        .empty-state .icon {
-            font-size: 48px;
-            margin-bottom: 16px;
-            opacity: 0.5;
-        }
-        
-        /* Progress */
-        .progress-bar {
-            height: 8px;
-            background: rgba(255, 255, 255, 0.1);
-            border-radius: 4px;
-            overflow: hidden;
-            margin: 16px 0;
-        }
-        
-        .progress-fill {
-            height: 100%;
-            background: linear-gradient(90deg, var(--primary), var(--secondary));
-            border-radius: 4px;
-            transition: width 0.3s;
-        }
-        
-        /* Status Indicator */
-        .status-dot {
-            width: 8px;
-            height: 8px;
-            border-radius: 50%;
-            display: inline-block;
-            margin-right: 8px;
-        }
-        
-        .status-dot.online {
-            background: #10b981;
-            box-shadow: 0 0 8px #10b981;
-        }
-        
-        .status-dot.offline {
-            background: #ef4444;
-        }
-        
-        /* Enrollment Steps */
-        .enroll-step {
-            display: flex;
-            align-items: center;
-            gap: 16px;
-            padding: 16px;
-            background: rgba(255, 255, 255, 0.03);
-            border-radius: 12px;
-            margin-bottom: 12px;
-        }
-        
-        .step-number {
-            width: 36px;
-            height: 36px;
-            border-radius: 50%;
-            background: rgba(99, 102, 241, 0.2);
-            display: flex;
-            align-items: center;
-            justify-content: center;
-            font-weight: 700;
-            font-size: 14px;
-            color: var(--primary);
-        }
-        
-        .step-number.active {
-            background: var(--primary);
-            color: white;
-        }
-        
-        .step-number.complete {
-            background: var(--success);
-            color: white;
-        }
-        
-        .step-content h4 {
-            font-size: 14px;
-            margin-bottom: 4px;
-        }
-        
-        .step-content p {
-            font-size: 12px;
-            color: var(--gray);
-        }
-        
-        /* Loading Spinner */
-        .spinner {
-            width: 40px;
-            height: 40px;
-            border: 3px solid rgba(255, 255, 255, 0.1);
-            border-top-color: var(--primary);
-            border-radius: 50%;
-            animation: spin 1s linear infinite;
-            margin: 20px auto;
-        }
-        
-        @keyframes spin {
-            to { transform: rotate(360deg); }
-        }
-        
-        /* Pulse Animation */
-        @keyframes pulse {
-            0%, 100% { opacity: 1; }
-            50% { opacity: 0.5; }
-        }
-        
-        .pulse {
-            animation: pulse 2s ease-in-out infinite;
-        }
-        
-        /* Bottom Nav */
-        .bottom-nav {
-            position: fixed;
-            bottom: 0;
-            left: 0;
-            right: 0;
-            background: rgba(15, 23, 42, 0.95);
-            backdrop-filter: blur(10px);
-            border-top: 1px solid rgba(255, 255, 255, 0.1);
-            padding: 12px 16px;
-            padding-bottom: max(12px, env(safe-area-inset-bottom));
-            display: flex;
-            justify-content: space-around;
-            z-index: 100;
-        }
-        
-        .bottom-nav a {
-            display: flex;
-            flex-direction: column;
-            align-items: center;
-            gap: 4px;
-            color: var(--gray);
-            text-decoration: none;
-            font-size: 11px;
-            transition: color 0.2s;
-        }
-        
-        .bottom-nav a.active,
-        .bottom-nav a:hover {
-            color: var(--primary);
-        }
-        
-        .bottom-nav .icon {
-            font-size: 24px;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <div class="header">
-            <h1>📋 Smart Attendance</h1>
-            <p class="subtitle">Raspberry Pi Attendance System</p>
-            <div class="time-badge">
-                <span class="status-dot online"></span>
-                {{ current_time }}
-            </div>
-        </div>
-        
-        {% if message %}
-        <div class="alert alert-{{ message_type }}">
-            {{ message }}
-        </div>
-        {% endif %}
+WEB_REQUEST_SECONDS = metrics.histogram("web_request_seconds", "Web request latency per endpoint",
+                                        labels=("endpoint",))
+SNAPSHOT_AGE = metrics.gauge("attendance_snapshot_age_seconds",
+                             "Seconds since the attendance service wrote its metrics snapshot")
+
+# Live preview shared by all /stream viewers
+preview_hub = PreviewHub(PREVIEW_PATH, max_fps=PREVIEW_MAX_FPS, max_viewers=WEB_MAX_STREAMS)
+
+# Report queries (read-only; opening the database is left to init_services)
+reports = AttendanceReports(DATABASE_PATH)
+
+# Rendered pages/API responses, reused until the data changes (any process
+# writing through DatabaseManager bumps its changes stamp) or the TTL ends
+response_cache = TTLCache(ttl=WEB_CACHE_TTL, stamp=ChangeStamp.for_database(DATABASE_PATH),
+                          max_entries=WEB_CACHE_MAX_ENTRIES)
+PAGE_SIZE = 50  # Rows per page in the student and attendance lists
+MAX_PAGE_SIZE = 500  # Largest per_page the list APIs accept
+
+# Students/attendance queries for the list pages and APIs, and the background
+# jobs (enrollment, bulk imports; one worker so camera jobs never overlap).
+# Created by init_services() at start-up or on the first request, so that
+# importing this module never migrates or writes the database.
+db_manager = None
+job_store = None
+job_manager = None
+_services_lock = threading.Lock()
+
+def init_services():
+    """
+    Open the database (applying pending migrations) and create the job manager
+    
+    Safe to call more than once and from several request threads.
+    """
+    global db_manager, job_store, job_manager
+    with _services_lock:
+        if job_manager is not None:
+            return
+        db_manager = DatabaseManager(DATABASE_PATH)
+        job_store = JobStore(DATABASE_PATH)
+        job_manager = JobManager(job_store, max_workers=1, retention_days=WEB_JOB_RETENTION_DAYS,
+                                 report_dir=BULK_IMPORT_REPORT_DIR)
+
+# Pages are Jinja templates in templates/ (compiled once and cached by Flask);
+# the stylesheet is static/style.css, served with a long cache lifetime
+app.config['SEND_FILE_MAX_AGE_DEFAULT'] = WEB_STATIC_MAX_AGE
+
+@functools.lru_cache(maxsize=None)
+def _static_version(filename):
+    """Content hash of a static file (changes the URL when the file changes)"""
+    with open(os.path.join(app.static_folder, filename), 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()[:10]
+
+@app.template_global()
+def static_url(filename):
+    """Versioned static file URL, safe to cache for WEB_STATIC_MAX_AGE"""
+    return url_for('static', filename=filename, v=_static_version(filename))
+
+def precompile_templates():
+    """
+    Compile every page template up front (Flask keeps them cached)
+    
+    Returns:
+        Number of templates compiled
+    """
+    names = app.jinja_env.list_templates(extensions=['html'])
+    for name in names:
+        app.jinja_env.get_template(name)
+    return len(names)
+
+def render_page(template, page, **context):
+    """
+    Render a page template in the base layout
+    
+    Args:
+        template: Template file name
+        page: Active bottom navigation item
+        **context: Template variables (message/message_type default to the query)
         
-        {{ content | safe }}
-    </div>
-    
-    <nav class="bottom-nav">
-        <a href="/" class="{{ 'active' if page == 'home' else '' }}">
-            <span class="icon">🏠</span>
-            Home
-        </a>
-        <a href="/students" class="{{ 'active' if page == 'students' else '' }}">
-            <span class="icon">👥</span>
-            Students
-        </a>
-        <a href="/enroll" class="{{ 'active' if page == 'enroll' else '' }}">
-            <span class="icon">➕</span>
-            Enroll
-        </a>
-        <a href="/attendance" class="{{ 'active' if page == 'attendance' else '' }}">
-            <span class="icon">✅</span>
-            Attendance
-        </a>
-    </nav>
-</body>
-</html>
-"""
+    Returns:
+        Rendered HTML
+    """
+    context.setdefault('message', request.args.get('message'))
+    context.setdefault('message_type', request.args.get('type', 'info'))
+    return render_template(template, page=page, **context)
+
+@app.before_request
+def ensure_services():
+    """Create the database-backed services before the first request uses them"""
+    if job_manager is None:
+        init_services()
+
+@app.before_request
+def start_request_timer():
+    """Remember when the request started (for web_request_seconds)"""
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_time(response):
+    """Record request latency per endpoint"""
+    start = g.pop('request_start', None)
+    if start is not None and request.endpoint:
+        WEB_REQUEST_SECONDS.labels(request.endpoint).observe(time.perf_counter() - start)
+    return response
 
 def get_db():
     """Get database connection"""
@@ -625,7 +160,37 @@ def get_local_ip():
     except:
         return "192.168.4.1"
 
+def cached_response(view):
+    """
+    Serve a GET view from response_cache, with ETag/Last-Modified validation
+    
+    Phones polling the dashboard get the cached body (or a 304) without any
+    database query until something is written.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.full_path
+        entry = response_cache.get(key)
+        if entry is None:
+            version = response_cache.stamp.version()  # Before reading, so later writes invalidate
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            body = response.get_data()
+            entry = response_cache.set(key, (body, response.mimetype, hashlib.sha1(body).hexdigest()[:20]),
+                                       version)
+        
+        body, mimetype, etag = entry.value
+        response = Response(body, mimetype=mimetype)
+        response.set_etag(etag)
+        if entry.last_modified:
+            response.last_modified = datetime.fromtimestamp(entry.last_modified, tz=timezone.utc)
+        response.headers['Cache-Control'] = 'no-cache'  # Always revalidate (cheap with the ETag)
+        return response.make_conditional(request)
+    return wrapper
+
 @app.route('/')
+@cached_response
 def home():
     """Home page with stats and navigation"""
     conn = get_db()
@@ -636,124 +201,87 @@ def home():
     student_count = cursor.fetchone()[0]
     
     today = datetime.now().strftime("%Y-%m-%d")
-    cursor.execute("SELECT COUNT(*) FROM attendance WHERE date = ?", (today,))
-    attendance_count = cursor.fetchone()[0]
+    cursor.execute("SELECT present FROM attendance_daily WHERE date = ?", (today,))
+    row = cursor.fetchone()
+    attendance_count = row[0] if row else 0
     
     conn.close()
     
-    content = f"""
-    <div class="stats-grid">
-        <div class="stat-card">
-            <div class="stat-number">{student_count}</div>
-            <div class="stat-label">Students Enrolled</div>
-        </div>
-        <div class="stat-card green">
-            <div class="stat-number">{attendance_count}</div>
-            <div class="stat-label">Present Today</div>
-        </div>
-    </div>
-    
-    <div class="card">
-        <h2><span class="icon">⚡</span> Quick Actions</h2>
-        <div class="nav-grid">
-            <a href="/students" class="nav-btn students">
-                <span class="icon">👥</span>
-                Students
-            </a>
-            <a href="/attendance" class="nav-btn attendance">
-                <span class="icon">✅</span>
-                Attendance
-            </a>
-            <a href="/enroll" class="nav-btn enroll">
-                <span class="icon">➕</span>
-                Enroll New Student
-            </a>
-            <a href="/reset" class="nav-btn reset">
-                <span class="icon">🔄</span>
-                Reset
-            </a>
-            <a href="/settings" class="nav-btn settings">
-                <span class="icon">⚙️</span>
-                Settings
-            </a>
-        </div>
-    </div>
+    return render_page('home.html', 'home', student_count=student_count,
+                       attendance_count=attendance_count, preview_enabled=PREVIEW_ENABLED)
+
+def _list_args(sorts, default_sort, default_descending):
     """
+    Parse search, sort and pagination query parameters
     
-    return render_template_string(HTML_TEMPLATE, 
-                                  content=content,
-                                  current_time=datetime.now().strftime("%A, %B %d • %H:%M"),
-                                  message=request.args.get('message'),
-                                  message_type=request.args.get('type', 'info'),
-                                  page='home')
+    Args:
+        sorts: Allowed sort columns
+        default_sort: Sort column when none (or an unknown one) is given
+        default_descending: Default sort direction
+        
+    Returns:
+        Dict with q, sort, descending, page, per_page
+    """
+    sort = request.args.get('sort', default_sort)
+    order = request.args.get('order')
+    return {
+        'q': request.args.get('q', '').strip(),
+        'sort': sort if sort in sorts else default_sort,
+        'descending': order == 'desc' if order in ('asc', 'desc') else default_descending,
+        'page': max(1, request.args.get('page', 1, type=int)),
+        'per_page': min(MAX_PAGE_SIZE, max(1, request.args.get('per_page', PAGE_SIZE, type=int))),
+    }
+
+@app.template_global('page_count')
+def _page_count(total, per_page):
+    return max(1, (total + per_page - 1) // per_page)
+
+@app.template_global('list_url')
+def _list_url(endpoint, args, **changes):
+    """URL of a list page with some parameters changed (others kept)"""
+    params = {name: request.args[name] for name in ('date', 'start', 'end', 'per_page') if name in request.args}
+    params.update(q=args['q'], sort=args['sort'], order='desc' if args['descending'] else 'asc',
+                  page=args['page'])
+    params.update(changes)
+    return url_for(endpoint, **{k: v for k, v in params.items() if v not in ('', None)})
+
+def _list_response(items, total, args):
+    """JSON body for the paginated list APIs"""
+    return jsonify({
+        'items': items,
+        'total': total,
+        'page': args['page'],
+        'per_page': args['per_page'],
+        'pages': _page_count(total, args['per_page']),
+    })
 
 @app.route('/students')
+@cached_response
 def students():
-    """List all students"""
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name, aruco_id FROM students ORDER BY name")
-    students = cursor.fetchall()
-    conn.close()
+    """List students (searchable, sortable, paginated)"""
+    args = _list_args(STUDENT_SORTS, 'name', False)
+    rows, total = db_manager.search_students(args['q'], args['sort'], args['descending'],
+                                             limit=args['per_page'],
+                                             offset=(args['page'] - 1) * args['per_page'])
     
-    if not students:
-        content = """
-        <div class="card">
-            <h2><span class="icon">👥</span> Enrolled Students</h2>
-            <div class="empty-state">
-                <div class="icon">📭</div>
-                <p>No students enrolled yet</p>
-                <a href="/enroll" class="btn btn-primary" style="margin-top: 16px;">
-                    ➕ Enroll First Student
-                </a>
-            </div>
-        </div>
-        """
-    else:
-        rows = ""
-        for s in students:
-            rows += f"""
-            <tr>
-                <td><strong>{s['name']}</strong></td>
-                <td><span class="badge badge-success">#{s['aruco_id']}</span></td>
-                <td>
-                    <form action="/delete_student/{s['id']}" method="POST" style="display:inline;" 
-                          onsubmit="return confirm('Delete {s['name']}?');">
-                        <button type="submit" class="btn btn-danger btn-sm">🗑️</button>
-                    </form>
-                </td>
-            </tr>
-            """
-        
-        content = f"""
-        <div class="card">
-            <h2><span class="icon">👥</span> Students ({len(students)})</h2>
-            <div class="table-wrapper">
-                <table>
-                    <tr>
-                        <th>Name</th>
-                        <th>ArUco ID</th>
-                        <th>Action</th>
-                    </tr>
-                    {rows}
-                </table>
-            </div>
-        </div>
-        <div class="card">
-            <a href="/enroll" class="btn btn-success btn-block">➕ Enroll New Student</a>
-            <form action="/delete_all_students" method="POST" style="margin-top: 12px;"
-                  onsubmit="return confirm('⚠️ DELETE ALL STUDENTS? This cannot be undone!');">
-                <button type="submit" class="btn btn-danger btn-block">🗑️ Delete All Students</button>
-            </form>
-        </div>
-        """
-    
-    return render_template_string(HTML_TEMPLATE, 
-                                  content=content,
-                                  current_time=datetime.now().strftime("%A, %B %d • %H:%M"),
-                                  message=request.args.get('message'),
-                                  message_type=request.args.get('type', 'info'),
-                                  page='students')
+    return render_page('students.html', 'students', args=args, rows=rows, total=total)
+
+@app.route('/api/students')
+@cached_response
+def api_students():
+    """
+    Students as JSON
+    
+    Query: q (name substring or ArUco ID), sort (name, aruco_id, created_at),
+    order (asc/desc), page, per_page
+    """
+    args = _list_args(STUDENT_SORTS, 'name', False)
+    rows, total = db_manager.search_students(args['q'], args['sort'], args['descending'],
+                                             limit=args['per_page'],
+                                             offset=(args['page'] - 1) * args['per_page'])
+    items = [{'id': student_id, 'name': name, 'aruco_id': aruco_id, 'created_at': created_at}
+             for student_id, name, aruco_id, created_at in rows]
+    return _list_response(items, total, args)
 
 @app.route('/delete_student/<int:student_id>', methods=['POST'])
 def delete_student(student_id):
@@ -769,6 +297,9 @@ def delete_student(student_id):
         cursor.execute("DELETE FROM students WHERE id = ?", (student_id,))
         cursor.execute("DELETE FROM attendance WHERE student_id = ?", (student_id,))
         conn.commit()
+        db_manager.changes.touch()
+        db_manager.resets.touch()
+        db_manager.roster.touch()
         message = f"✓ Deleted: {student['name']}"
         msg_type = "success"
     else:
@@ -789,87 +320,136 @@ def delete_all_students():
     cursor.execute("DELETE FROM sqlite_sequence WHERE name='attendance'")
     conn.commit()
     conn.close()
+    db_manager.changes.touch()
+    db_manager.resets.touch()
+    db_manager.roster.touch()
     
     return redirect(url_for('students', message="✓ All students deleted", type="success"))
 
+def _attendance_date():
+    """Date from the query (YYYY-MM-DD), default today"""
+    date_str = request.args.get('date', '')
+    try:
+        return datetime.strptime(date_str, "%Y-%m-%d").strftime("%Y-%m-%d")
+    except ValueError:
+        return datetime.now().strftime("%Y-%m-%d")
+
 @app.route('/attendance')
+@cached_response
 def attendance():
-    """View today's attendance"""
-    today = datetime.now().strftime("%Y-%m-%d")
+    """View a day's attendance (today by default; searchable, sortable, paginated)"""
+    date_str = _attendance_date()
+    day = datetime.strptime(date_str, "%Y-%m-%d")
+    is_today = date_str == datetime.now().strftime("%Y-%m-%d")
+    args = _list_args(ATTENDANCE_SORTS, 'time', True)
     
-    conn = get_db()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT s.id, s.name, a.time, a.status 
-        FROM attendance a 
-        JOIN students s ON a.student_id = s.id 
-        WHERE a.date = ?
-        ORDER BY a.time DESC
-    """, (today,))
-    records = cursor.fetchall()
+    records, matching = db_manager.search_attendance(date_str, args['q'], args['sort'], args['descending'],
+                                                     limit=args['per_page'],
+                                                     offset=(args['page'] - 1) * args['per_page'])
+    present = matching if not args['q'] else db_manager.get_attendance_count(date_str)
+    total_students = db_manager.get_student_count()
     
-    cursor.execute("SELECT COUNT(*) FROM students")
-    total_students = cursor.fetchone()[0]
-    conn.close()
+    attendance_rate = int((present / total_students * 100)) if total_students > 0 else 0
+    return render_page('attendance.html', 'attendance', args=args, date_str=date_str, day=day,
+                       is_today=is_today, records=records, matching=matching, present=present,
+                       total_students=total_students, attendance_rate=attendance_rate)
+
+@app.route('/api/attendance')
+@cached_response
+def api_attendance():
+    """
+    A day's attendance as JSON
     
-    attendance_rate = int((len(records) / total_students * 100)) if total_students > 0 else 0
-    
-    if not records:
-        content = f"""
-        <div class="card">
-            <h2><span class="icon">✅</span> Today's Attendance</h2>
-            <p style="color: var(--gray); margin-bottom: 16px;">{datetime.now().strftime("%A, %B %d, %Y")}</p>
-            <div class="empty-state">
-                <div class="icon">📋</div>
-                <p>No attendance recorded today</p>
-                <p style="font-size: 12px; margin-top: 8px;">Start the attendance system to begin tracking</p>
-            </div>
-        </div>
-        """
-    else:
-        rows = ""
-        for r in records:
-            rows += f"""
-            <tr>
-                <td><strong>{r['name']}</strong></td>
-                <td>{r['time']}</td>
-                <td><span class="badge badge-success">✓ {r['status']}</span></td>
-            </tr>
-            """
-        
-        content = f"""
-        <div class="stats-grid">
-            <div class="stat-card green">
-                <div class="stat-number">{len(records)}/{total_students}</div>
-                <div class="stat-label">Present Today</div>
-            </div>
-            <div class="stat-card">
-                <div class="stat-number">{attendance_rate}%</div>
-                <div class="stat-label">Attendance Rate</div>
-            </div>
-        </div>
-        
-        <div class="card">
-            <h2><span class="icon">✅</span> Attendance Log</h2>
-            <div class="table-wrapper">
-                <table>
-                    <tr>
-                        <th>Student</th>
-                        <th>Time</th>
-                        <th>Status</th>
-                    </tr>
-                    {rows}
-                </table>
-            </div>
-        </div>
-        """
-    
-    return render_template_string(HTML_TEMPLATE, 
-                                  content=content,
-                                  current_time=datetime.now().strftime("%A, %B %d • %H:%M"),
-                                  message=request.args.get('message'),
-                                  message_type=request.args.get('type', 'info'),
-                                  page='attendance')
+    Query: date (YYYY-MM-DD, default today), q (name substring or ArUco ID),
+    sort (time, name, aruco_id), order (asc/desc), page, per_page
+    """
+    date_str = _attendance_date()
+    args = _list_args(ATTENDANCE_SORTS, 'time', True)
+    rows, total = db_manager.search_attendance(date_str, args['q'], args['sort'], args['descending'],
+                                               limit=args['per_page'],
+                                               offset=(args['page'] - 1) * args['per_page'])
+    items = [{'student_id': student_id, 'name': name, 'aruco_id': aruco_id, 'date': date_str,
+              'time': time_str, 'status': status}
+             for student_id, name, aruco_id, time_str, status in rows]
+    return _list_response(items, total, args)
+
+# ============================================================
+# REPORTS AND EXPORT
+# ============================================================
+
+REPORT_DEFAULT_DAYS = 30  # Range shown when no dates are given
+
+def _report_range():
+    """Start and end dates from the query (YYYY-MM-DD), default the last 30 days"""
+    today = datetime.now()
+    dates = []
+    for name, default in (('start', today - timedelta(days=REPORT_DEFAULT_DAYS - 1)), ('end', today)):
+        try:
+            dates.append(datetime.strptime(request.args.get(name, ''), "%Y-%m-%d"))
+        except ValueError:
+            dates.append(default)
+    start, end = sorted(dates)
+    return start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+
+@app.route('/reports')
+@cached_response
+def reports_page():
+    """Attendance report for a date range (per day and per student)"""
+    start, end = _report_range()
+    args = _list_args(('name',), 'name', False)
+    totals = reports.range_totals(start, end)
+    days = reports.daily_summary(start, end)
+    students_rows = reports.student_summary(start, end, limit=args['per_page'],
+                                            offset=(args['page'] - 1) * args['per_page'])
+    student_total = db_manager.get_student_count()
+    
+    return render_page('reports.html', 'reports', args=args, start=start, end=end, totals=totals,
+                       days=days, student_rows=students_rows, student_total=student_total)
+
+@app.route('/api/reports/daily')
+@cached_response
+def api_reports_daily():
+    """Attendance per day as JSON. Query: start, end (YYYY-MM-DD, default last 30 days)"""
+    start, end = _report_range()
+    return jsonify({
+        'start': start,
+        'end': end,
+        **reports.range_totals(start, end),
+        'days': [dict(zip(DAILY_COLUMNS, row)) for row in reports.daily_summary(start, end)],
+    })
+
+@app.route('/api/reports/students')
+@cached_response
+def api_reports_students():
+    """Attendance per student as JSON. Query: start, end, page, per_page"""
+    start, end = _report_range()
+    args = _list_args(('name',), 'name', False)
+    rows = reports.student_summary(start, end, limit=args['per_page'],
+                                   offset=(args['page'] - 1) * args['per_page'])
+    return _list_response([dict(zip(STUDENT_COLUMNS, row)) for row in rows],
+                          db_manager.get_student_count(), args)
+
+@app.route('/export/<report>.<fmt>')
+def export_report(report, fmt):
+    """
+    Stream a report as CSV, XLSX or JSON
+    
+    report: attendance (every record), daily or students; query: start, end
+    """
+    exports = {
+        'attendance': (RECORD_COLUMNS, reports.iter_records),
+        'daily': (DAILY_COLUMNS, reports.daily_summary),
+        'students': (STUDENT_COLUMNS, reports.iter_student_summary),
+    }
+    if report not in exports or fmt not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'error': 'Unknown report or format'}), 404
+    
+    start, end = _report_range()
+    columns, rows = exports[report]
+    filename = f"{report}_{start}_{end}.{fmt}"
+    return Response(export_rows(fmt, columns, rows(start, end), sheet_name=report),
+                    mimetype=EXPORT_FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
 
 @app.route('/reset')
 def reset_page():
@@ -890,61 +470,7 @@ def reset_page():
     records = cursor.fetchall()
     conn.close()
     
-    if not records:
-        content = f"""
-        <div class="card">
-            <h2><span class="icon">🔄</span> Reset Attendance</h2>
-            <p style="color: var(--gray); margin-bottom: 16px;">{datetime.now().strftime("%A, %B %d, %Y")}</p>
-            <div class="empty-state">
-                <div class="icon">✨</div>
-                <p>No attendance to reset</p>
-            </div>
-        </div>
-        """
-    else:
-        rows = ""
-        for r in records:
-            rows += f"""
-            <tr>
-                <td><strong>{r['name']}</strong></td>
-                <td>{r['time']}</td>
-                <td>
-                    <form action="/reset_student/{r['id']}" method="POST" style="display:inline;">
-                        <button type="submit" class="btn btn-warning btn-sm">Reset</button>
-                    </form>
-                </td>
-            </tr>
-            """
-        
-        content = f"""
-        <div class="card">
-            <h2><span class="icon">🔄</span> Reset Attendance</h2>
-            <p style="color: var(--gray); margin-bottom: 16px;">Reset a student so they can check in again</p>
-            <div class="table-wrapper">
-                <table>
-                    <tr>
-                        <th>Student</th>
-                        <th>Time</th>
-                        <th>Action</th>
-                    </tr>
-                    {rows}
-                </table>
-            </div>
-        </div>
-        <div class="card">
-            <form action="/reset_all" method="POST" 
-                  onsubmit="return confirm('Reset ALL attendance for today?');">
-                <button type="submit" class="btn btn-danger btn-block">🔄 Reset All Today</button>
-            </form>
-        </div>
-        """
-    
-    return render_template_string(HTML_TEMPLATE, 
-                                  content=content,
-                                  current_time=datetime.now().strftime("%A, %B %d • %H:%M"),
-                                  message=request.args.get('message'),
-                                  message_type=request.args.get('type', 'info'),
-                                  page='reset')
+    return render_page('reset.html', 'reset', records=records, day=datetime.now())
 
 @app.route('/reset_student/<int:student_id>', methods=['POST'])
 def reset_student(student_id):
@@ -961,6 +487,8 @@ def reset_student(student_id):
         cursor.execute("DELETE FROM attendance WHERE student_id = ? AND date = ?", 
                       (student_id, today))
         conn.commit()
+        db_manager.changes.touch()
+        db_manager.resets.touch()
         message = f"✓ Reset: {student['name']}"
         msg_type = "success"
     else:
@@ -980,6 +508,8 @@ def reset_all():
     cursor.execute("DELETE FROM attendance WHERE date = ?", (today,))
     conn.commit()
     conn.close()
+    db_manager.changes.touch()
+    db_manager.resets.touch()
     
     return redirect(url_for('reset_page', message="✓ All attendance reset for today", type="success"))
 
@@ -990,100 +520,7 @@ def reset_all():
 @app.route('/enroll')
 def enroll_page():
     """Enrollment page with web-based enrollment"""
-    content = """
-    <div class="card">
-        <h2><span class="icon">➕</span> Enroll New Student</h2>
-        <p style="color: var(--gray); margin-bottom: 20px;">
-            Add a new student to the attendance system
-        </p>
-        
-        <form action="/enroll/start" method="POST" id="enrollForm">
-            <div class="form-group">
-                <label class="form-label">Student Name</label>
-                <input type="text" name="student_name" class="form-input" 
-                       placeholder="Enter student's full name" required
-                       pattern="[A-Za-z ]{2,50}" title="Name should be 2-50 letters">
-            </div>
-            
-            <div class="form-group">
-                <label class="form-label">ArUco Marker ID</label>
-                <input type="number" name="aruco_id" class="form-input" 
-                       placeholder="Enter marker ID (0-249)" required
-                       min="0" max="249">
-                <p style="font-size: 12px; color: var(--gray); margin-top: 8px;">
-                    Each student needs a unique ArUco marker ID
-                </p>
-            </div>
-            
-            <button type="submit" class="btn btn-success btn-block">
-                🚀 Start Enrollment
-            </button>
-        </form>
-    </div>
-    
-    <div class="card">
-        <h2><span class="icon">📋</span> Enrollment Steps</h2>
-        
-        <div class="enroll-step">
-            <div class="step-number">1</div>
-            <div class="step-content">
-                <h4>Enter Details</h4>
-                <p>Enter student name and ArUco marker ID</p>
-            </div>
-        </div>
-        
-        <div class="enroll-step">
-            <div class="step-number">2</div>
-            <div class="step-content">
-                <h4>Face Capture</h4>
-                <p>Student positions face in front of camera</p>
-            </div>
-        </div>
-        
-        <div class="enroll-step">
-            <div class="step-number">3</div>
-            <div class="step-content">
-                <h4>ArUco Scan</h4>
-                <p>Show ArUco marker to camera</p>
-            </div>
-        </div>
-        
-        <div class="enroll-step">
-            <div class="step-number">4</div>
-            <div class="step-content">
-                <h4>Complete</h4>
-                <p>Student is enrolled and ready for attendance</p>
-            </div>
-        </div>
-    </div>
-    
-    <div class="card">
-        <h2><span class="icon">🖨️</span> Generate ArUco Markers</h2>
-        <p style="color: var(--gray); margin-bottom: 16px;">
-            Print ArUco markers for students
-        </p>
-        <form action="/enroll/generate_markers" method="POST">
-            <div class="form-group">
-                <label class="form-label">Start ID</label>
-                <input type="number" name="start_id" class="form-input" value="0" min="0">
-            </div>
-            <div class="form-group">
-                <label class="form-label">Count</label>
-                <input type="number" name="count" class="form-input" value="30" min="1" max="100">
-            </div>
-            <button type="submit" class="btn btn-primary btn-block">
-                🖨️ Generate Markers
-            </button>
-        </form>
-    </div>
-    """
-    
-    return render_template_string(HTML_TEMPLATE, 
-                                  content=content,
-                                  current_time=datetime.now().strftime("%A, %B %d • %H:%M"),
-                                  message=request.args.get('message'),
-                                  message_type=request.args.get('type', 'info'),
-                                  page='enroll')
+    return render_page('enroll.html', 'enroll')
 
 @app.route('/enroll/start', methods=['POST'])
 def enroll_start():
@@ -1119,198 +556,112 @@ def enroll_process():
     """Enrollment process page with live status"""
     student_name = request.args.get('name', '')
     aruco_id = request.args.get('aruco_id', '')
+    return render_page('enroll_process.html', 'enroll', student_name=student_name, aruco_id=aruco_id,
+                       message=None)
+
+def _stop_attendance_service():
+    """Stop the attendance service to free the camera (Raspberry Pi, no broker)"""
+    if HARDWARE_MODE == "RASPBERRY_PI" and not CAMERA_BROKER_ENABLED:
+        try:
+            subprocess.run(['sudo', 'systemctl', 'stop', 'attendance.service'], 
+                         check=False, timeout=10)
+            time.sleep(2)  # Wait for service to fully stop
+        except:
+            pass  # Service might not be running
+
+def _start_attendance_service():
+    """Restart the attendance service stopped by _stop_attendance_service"""
+    if HARDWARE_MODE == "RASPBERRY_PI" and not CAMERA_BROKER_ENABLED:
+        try:
+            subprocess.run(['sudo', 'systemctl', 'start', 'attendance.service'], check=False)
+        except:
+            pass
+
+def _open_enrollment_components():
+    """
+    Get a camera and face recognizer for enrollment
     
-    content = f"""
-    <div class="card">
-        <h2><span class="icon">📸</span> Enrolling: {student_name}</h2>
-        <p style="color: var(--gray);">ArUco Marker: #{aruco_id}</p>
-        
-        <div id="enrollment-status">
-            <div class="alert alert-info">
-                <span class="pulse">⏳</span> Preparing enrollment...
-            </div>
-            
-            <div class="progress-bar">
-                <div class="progress-fill" id="progress" style="width: 0%"></div>
-            </div>
-            
-            <div id="step-status" style="margin-top: 16px;">
-                <div class="enroll-step">
-                    <div class="step-number active" id="step1">1</div>
-                    <div class="step-content">
-                        <h4>Face Capture</h4>
-                        <p id="step1-text">Position face in front of camera</p>
-                    </div>
-                </div>
-                
-                <div class="enroll-step">
-                    <div class="step-number" id="step2">2</div>
-                    <div class="step-content">
-                        <h4>ArUco Verification</h4>
-                        <p id="step2-text">Waiting...</p>
-                    </div>
-                </div>
-                
-                <div class="enroll-step">
-                    <div class="step-number" id="step3">3</div>
-                    <div class="step-content">
-                        <h4>Save to Database</h4>
-                        <p id="step3-text">Waiting...</p>
-                    </div>
-                </div>
-            </div>
-        </div>
-        
-        <div id="result" style="display: none; margin-top: 20px;"></div>
-    </div>
+    With the camera broker, the broker's camera and loaded model are shared
+    and the attendance service keeps running (it pauses while the hold is
+    active). Otherwise the attendance service is stopped and the camera and
+    model are opened in this process.
     
-    <script>
-        // Start enrollment process
-        const studentName = "{student_name}";
-        const arucoId = "{aruco_id}";
-        
-        async function startEnrollment() {{
-            try {{
-                const response = await fetch('/api/enroll', {{
-                    method: 'POST',
-                    headers: {{ 'Content-Type': 'application/json' }},
-                    body: JSON.stringify({{ name: studentName, aruco_id: parseInt(arucoId) }})
-                }});
-                
-                const data = await response.json();
-                
-                if (data.success) {{
-                    document.getElementById('progress').style.width = '100%';
-                    document.getElementById('step1').className = 'step-number complete';
-                    document.getElementById('step2').className = 'step-number complete';
-                    document.getElementById('step3').className = 'step-number complete';
-                    document.getElementById('step1-text').textContent = '✓ Face captured';
-                    document.getElementById('step2-text').textContent = '✓ Marker verified';
-                    document.getElementById('step3-text').textContent = '✓ Saved successfully';
-                    
-                    document.getElementById('result').innerHTML = `
-                        <div class="alert alert-success">
-                            ✅ <strong>${{studentName}}</strong> enrolled successfully!
-                        </div>
-                        <a href="/enroll" class="btn btn-success btn-block">➕ Enroll Another</a>
-                        <a href="/students" class="btn btn-dark btn-block" style="margin-top: 8px;">👥 View Students</a>
-                    `;
-                    document.getElementById('result').style.display = 'block';
-                }} else {{
-                    document.getElementById('result').innerHTML = `
-                        <div class="alert alert-danger">
-                            ❌ Enrollment failed: ${{data.error}}
-                        </div>
-                        <a href="/enroll" class="btn btn-warning btn-block">🔄 Try Again</a>
-                    `;
-                    document.getElementById('result').style.display = 'block';
-                }}
-            }} catch (error) {{
-                document.getElementById('result').innerHTML = `
-                    <div class="alert alert-danger">
-                        ❌ Error: ${{error.message}}
-                    </div>
-                    <a href="/enroll" class="btn btn-warning btn-block">🔄 Try Again</a>
-                `;
-                document.getElementById('result').style.display = 'block';
-            }}
-        }}
-        
-        // Check enrollment status
-        async function checkStatus() {{
-            try {{
-                const response = await fetch('/api/enroll/status');
-                const data = await response.json();
-                
-                if (data.step === 'capturing_face') {{
-                    document.getElementById('progress').style.width = '33%';
-                    document.getElementById('step1-text').textContent = 'Capturing face...';
-                }} else if (data.step === 'capturing_aruco') {{
-                    document.getElementById('progress').style.width = '66%';
-                    document.getElementById('step1').className = 'step-number complete';
-                    document.getElementById('step1-text').textContent = '✓ Face captured';
-                    document.getElementById('step2').className = 'step-number active';
-                    document.getElementById('step2-text').textContent = 'Scanning marker...';
-                }} else if (data.step === 'saving') {{
-                    document.getElementById('progress').style.width = '90%';
-                    document.getElementById('step2').className = 'step-number complete';
-                    document.getElementById('step2-text').textContent = '✓ Marker verified';
-                    document.getElementById('step3').className = 'step-number active';
-                    document.getElementById('step3-text').textContent = 'Saving...';
-                }}
-                
-                if (data.active) {{
-                    setTimeout(checkStatus, 500);
-                }}
-            }} catch (e) {{}}
-        }}
-        
-        // Start after page load
-        setTimeout(() => {{
-            startEnrollment();
-            checkStatus();
-        }}, 1000);
-    </script>
+    Returns:
+        Tuple: (camera, face_recognizer, broker_client or None)
     """
+    from config import (FACE_DETECTION_BACKEND, FACE_MODEL,
+                      CAMERA_INDEX, CAMERA_WIDTH, CAMERA_HEIGHT,
+                      EMBEDDING_RUNTIME, EMBEDDING_MODEL_PATH, EMBEDDING_THREADS)
     
-    return render_template_string(HTML_TEMPLATE, 
-                                  content=content,
-                                  current_time=datetime.now().strftime("%A, %B %d • %H:%M"),
-                                  message=None,
-                                  message_type='info',
-                                  page='enroll')
-
-@app.route('/api/enroll', methods=['POST'])
-def api_enroll():
-    """API endpoint for enrollment - runs the actual enrollment"""
-    global enrollment_state
+    if CAMERA_BROKER_ENABLED:
+        from hardware.broker import BrokerClient, BrokerCamera, BrokerRecognizer
+        client = BrokerClient(CAMERA_BROKER_SOCKET, connect_timeout=5)
+        client.acquire_hold('enrollment')
+        return (BrokerCamera(client),
+                BrokerRecognizer(client, model_name=FACE_MODEL, backend=FACE_DETECTION_BACKEND),
+                client)
     
-    data = request.get_json()
-    student_name = data.get('name', '')
-    aruco_id = data.get('aruco_id', 0)
+    from ai.face_recognition import FaceRecognizer
+    from hardware.camera import Camera
     
-    enrollment_state['active'] = True
-    enrollment_state['student_name'] = student_name
-    enrollment_state['step'] = 'starting'
+    _stop_attendance_service()
+    camera = Camera(mode=HARDWARE_MODE, camera_index=CAMERA_INDEX,
+                   width=CAMERA_WIDTH, height=CAMERA_HEIGHT)
+    face_recognizer = FaceRecognizer(model_name=FACE_MODEL, backend=FACE_DETECTION_BACKEND,
+                                     runtime=EMBEDDING_RUNTIME, model_path=EMBEDDING_MODEL_PATH,
+                                     threads=EMBEDDING_THREADS)
+    return camera, face_recognizer, None
+
+def _close_enrollment_components(camera, broker_client):
+    """Release what _open_enrollment_components acquired"""
+    if broker_client is not None:
+        try:
+            broker_client.release_hold('enrollment')
+        except Exception:
+            pass  # The hold expires on its own
+    if camera is not None:
+        camera.release()
+    _start_attendance_service()
+
+def _enroll_job(job, name, aruco_id):
+    """
+    Enrollment job: capture a face embedding, verify the ArUco marker, save
     
-    try:
-        # Stop attendance service to free the camera (Raspberry Pi only)
-        if HARDWARE_MODE == "RASPBERRY_PI":
-            try:
-                subprocess.run(['sudo', 'systemctl', 'stop', 'attendance.service'], 
-                             check=False, timeout=10)
-                time.sleep(2)  # Wait for service to fully stop
-            except:
-                pass  # Service might not be running
-        
-        # Import enrollment modules
-        from ai.face_detector import FaceDetector
-        from ai.face_recognition import FaceRecognizer
-        from ai.aruco_detector import ArucoDetector
-        from hardware.camera import Camera
-        from database.db_manager import DatabaseManager
-        from config import (FACE_DETECTION_BACKEND, FACE_MODEL, ARUCO_DICT,
-                          CAMERA_INDEX, CAMERA_WIDTH, CAMERA_HEIGHT)
+    Args:
+        job: JobContext for progress and cancellation
+        name: Student name
+        aruco_id: ArUco marker ID
         
+    Returns:
+        Dict with the new student ID
+    """
+    from ai.face_detector import FaceDetector
+    from ai.aruco_detector import ArucoDetector
+    from database.db_manager import DatabaseManager
+    from config import FACE_DETECTION_BACKEND, ARUCO_DICT
+    
+    camera = None
+    broker_client = None
+    try:
         # Initialize components
-        camera = Camera(mode=HARDWARE_MODE, camera_index=CAMERA_INDEX,
-                       width=CAMERA_WIDTH, height=CAMERA_HEIGHT)
+        job.update(step='starting', progress=5, message='Opening camera...')
+        camera, face_recognizer, broker_client = _open_enrollment_components()
         face_detector = FaceDetector(backend=FACE_DETECTION_BACKEND)
-        face_recognizer = FaceRecognizer(model_name=FACE_MODEL, backend=FACE_DETECTION_BACKEND)
         aruco_detector = ArucoDetector(dictionary=ARUCO_DICT)
         db = DatabaseManager(DATABASE_PATH)
         
         # Warm up camera
         for _ in range(5):
             camera.read_frame()
-            time.sleep(0.1)
+            job.sleep(0.1)
         
         # Step 1: Capture face
-        enrollment_state['step'] = 'capturing_face'
-        time.sleep(2)  # Give user time to position
+        job.update(step='capturing_face', progress=20, message='Position face in front of camera')
+        job.sleep(2)  # Give user time to position
         
         face_embedding = None
         for attempt in range(30):
+            job.check_cancelled()
             frame = camera.read_frame()
             if frame is None:
                 continue
@@ -1322,25 +673,18 @@ def api_enroll():
                     face_embedding = face_recognizer.generate_embedding(face_roi)
                     if face_embedding is not None:
                         break
-            time.sleep(0.2)
+            job.sleep(0.2)
         
         if face_embedding is None:
-            camera.release()
-            enrollment_state['active'] = False
-            # Restart attendance service
-            if HARDWARE_MODE == "RASPBERRY_PI":
-                try:
-                    subprocess.run(['sudo', 'systemctl', 'start', 'attendance.service'], check=False)
-                except:
-                    pass
-            return jsonify({'success': False, 'error': 'Could not capture face. Please try again.'})
+            raise JobFailed('Could not capture face. Please try again.')
         
         # Step 2: Verify ArUco marker
-        enrollment_state['step'] = 'capturing_aruco'
-        time.sleep(2)
+        job.update(step='capturing_aruco', progress=60, message=f'Show ArUco marker #{aruco_id}')
+        job.sleep(2)
         
         detected_aruco = None
         for attempt in range(30):
+            job.check_cancelled()
             frame = camera.read_frame()
             if frame is None:
                 continue
@@ -1349,78 +693,256 @@ def api_enroll():
             if aruco_id in marker_ids:
                 detected_aruco = aruco_id
                 break
-            time.sleep(0.2)
-        
-        camera.release()
+            job.sleep(0.2)
         
         if detected_aruco is None:
-            enrollment_state['active'] = False
-            # Restart attendance service
-            if HARDWARE_MODE == "RASPBERRY_PI":
-                try:
-                    subprocess.run(['sudo', 'systemctl', 'start', 'attendance.service'], check=False)
-                except:
-                    pass
-            return jsonify({'success': False, 'error': f'ArUco marker #{aruco_id} not detected. Show the marker to camera.'})
+            raise JobFailed(f'ArUco marker #{aruco_id} not detected. Show the marker to camera.')
         
         # Step 3: Save to database
-        enrollment_state['step'] = 'saving'
-        student_id = db.add_student(student_name, aruco_id, face_embedding)
-        
-        enrollment_state['active'] = False
-        enrollment_state['step'] = 'complete'
+        job.update(step='saving', progress=90, message='Saving...')
+        student_id = db.add_student(name, aruco_id, face_embedding)
+        if not student_id:
+            raise JobFailed('Failed to save student. ArUco ID may already exist.')
         
-        # Restart attendance service after enrollment
-        if HARDWARE_MODE == "RASPBERRY_PI":
+        return {'student_id': student_id}
+    
+    finally:
+        # Release the camera and restart the attendance service (or release the broker hold)
+        _close_enrollment_components(camera, broker_client)
+
+def _job_response(job):
+    """Job dict for the API, with the fields the old status endpoint had"""
+    job = dict(job)
+    job['active'] = job['status'] in (QUEUED, RUNNING)
+    job['student_name'] = job['params'].get('name', '')
+    return job
+
+@app.route('/api/enroll', methods=['POST'])
+def api_enroll():
+    """Queue an enrollment job; progress via /api/enroll/status or /api/enroll/events"""
+    data = request.get_json(silent=True) or {}
+    student_name = str(data.get('name', '')).strip()
+    
+    try:
+        aruco_id = int(data.get('aruco_id', 0))
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'Invalid ArUco ID'}), 400
+    
+    if not student_name:
+        return jsonify({'success': False, 'error': 'Student name is required'}), 400
+    
+    job_id = job_manager.submit('enroll', _enroll_job, {'name': student_name, 'aruco_id': aruco_id})
+    return jsonify({'success': True, 'job_id': job_id}), 202
+
+@app.route('/api/enroll/status')
+def api_enroll_status():
+    """
+    Get enrollment job status (long-poll)
+    
+    Query: job_id (default: most recent enrollment), since (version the
+    client already has; waits up to 25 s for a newer one)
+    """
+    job_id = request.args.get('job_id')
+    if not job_id:
+        recent = job_store.get_recent_jobs(kind='enroll', limit=1)
+        if not recent:
+            return jsonify({'active': False, 'step': 'idle', 'status': 'idle'})
+        job_id = recent[0]['id']
+    
+    since = request.args.get('since', type=int)
+    job = job_manager.wait(job_id, since, timeout=25) if since is not None else job_manager.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Unknown job'}), 404
+    return jsonify(_job_response(job))
+
+@app.route('/api/enroll/events/<job_id>')
+def api_enroll_events(job_id):
+    """Server-sent events with the enrollment job state on every change"""
+    def generate():
+        for job in job_manager.events(job_id, timeout=15):
+            yield f"data: {json.dumps(_job_response(job))}\n\n"
+    
+    return Response(generate(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/enroll/<job_id>/cancel', methods=['POST'])
+def api_enroll_cancel(job_id):
+    """Cancel a queued or running enrollment job"""
+    return jsonify({'success': job_manager.cancel(job_id)})
+
+def _bulk_enroll_job(job, upload_dir, roster, photos):
+    """
+    Bulk enrollment job: embed uploaded photos and save the whole roster
+    
+    Args:
+        job: JobContext for progress and cancellation
+        upload_dir: Temporary directory holding the uploads (removed afterwards)
+        roster: Roster CSV path
+        photos: Photo ZIP path
+        
+    Returns:
+        Dict with enrolled/rejected counts and the reject report file name
+    """
+    from database.db_manager import DatabaseManager
+    from utils.bulk_import import PhotoSource, run_bulk_import, write_reject_report
+    from config import (FACE_DETECTION_BACKEND, FACE_MODEL, BULK_IMPORT_WORKERS,
+                        BULK_IMPORT_BATCH_SIZE, BULK_IMPORT_HOLD_TIMEOUT,
+                        EMBEDDING_RUNTIME, EMBEDDING_MODEL_PATH, EMBEDDING_THREADS)
+    
+    def progress(done, total):
+        job.update(step='embedding', progress=5 + int(90 * done / max(total, 1)),
+                   message=f'Processed {done} of {total} students')
+        if broker_client is not None:
+            # Renew the hold: an intake outlasts its timeout, and attendance
+            # must not resume before the students are written
             try:
-                subprocess.run(['sudo', 'systemctl', 'start', 'attendance.service'], check=False)
-            except:
-                pass
-        
-        if student_id:
-            return jsonify({'success': True, 'student_id': student_id})
+                broker_client.acquire_hold('bulk_import', timeout=BULK_IMPORT_HOLD_TIMEOUT)
+            except Exception:
+                pass  # Keep importing; attendance reloads the students once they're written
+    
+    broker_client = None
+    photo_source = None
+    try:
+        job.update(step='starting', progress=2, message='Reading photos...')
+        try:
+            photo_source = PhotoSource(photos)
+        except (FileNotFoundError, OSError) as e:
+            raise JobFailed(f'Cannot read photos: {e}')
+        
+        # Pause attendance while the workers use the CPU; it reloads the
+        # students when it resumes
+        if CAMERA_BROKER_ENABLED:
+            from hardware.broker import BrokerClient
+            broker_client = BrokerClient(CAMERA_BROKER_SOCKET, connect_timeout=5)
+            broker_client.acquire_hold('bulk_import', timeout=BULK_IMPORT_HOLD_TIMEOUT)
         else:
-            return jsonify({'success': False, 'error': 'Failed to save student. ArUco ID may already exist.'})
-            
-    except Exception as e:
-        enrollment_state['active'] = False
-        # Restart attendance service on error
-        if HARDWARE_MODE == "RASPBERRY_PI":
+            _stop_attendance_service()
+        
+        try:
+            result = run_bulk_import(DatabaseManager(DATABASE_PATH), roster, photo_source,
+                                     FACE_MODEL, FACE_DETECTION_BACKEND,
+                                     workers=BULK_IMPORT_WORKERS, batch_size=BULK_IMPORT_BATCH_SIZE,
+                                     progress=progress, runtime=EMBEDDING_RUNTIME,
+                                     model_path=EMBEDDING_MODEL_PATH, threads=EMBEDDING_THREADS)
+        except (ValueError, RuntimeError) as e:
+            raise JobFailed(str(e))
+        
+        report = None
+        if result['rejects']:
+            report = f"{job.job_id}.csv"
+            write_reject_report(result['rejects'], os.path.join(BULK_IMPORT_REPORT_DIR, report))
+        
+        return {'total': result['total'], 'enrolled': len(result['enrolled']),
+                'rejected': len(result['rejects']), 'report': report}
+    
+    finally:
+        if photo_source is not None:
+            photo_source.close()
+        if broker_client is not None:
             try:
-                subprocess.run(['sudo', 'systemctl', 'start', 'attendance.service'], check=False)
-            except:
-                pass
-        return jsonify({'success': False, 'error': str(e)})
+                broker_client.release_hold('bulk_import')
+            except Exception:
+                pass  # The hold expires on its own
+        else:
+            _start_attendance_service()
+        shutil.rmtree(upload_dir, ignore_errors=True)
 
-@app.route('/api/enroll/status')
-def api_enroll_status():
-    """Get enrollment status"""
-    return jsonify(enrollment_state)
+@app.route('/enroll/bulk', methods=['POST'])
+def enroll_bulk():
+    """Save the uploaded roster and photos and queue a bulk enrollment job"""
+    roster = request.files.get('roster')
+    photos = request.files.get('photos')
+    if not roster or not roster.filename or not photos or not photos.filename:
+        return redirect(url_for('enroll_page', message="Please choose a roster and a photo ZIP", type="danger"))
+    
+    upload_dir = tempfile.mkdtemp(prefix='bulk_enroll_')
+    roster_path = os.path.join(upload_dir, 'roster.csv')
+    photos_path = os.path.join(upload_dir, 'photos.zip')
+    roster.save(roster_path)
+    photos.save(photos_path)
+    
+    if not zipfile.is_zipfile(photos_path):
+        shutil.rmtree(upload_dir, ignore_errors=True)
+        return redirect(url_for('enroll_page', message="Photos must be a ZIP file", type="danger"))
+    
+    job_id = job_manager.submit('bulk_enroll', _bulk_enroll_job,
+                                {'upload_dir': upload_dir, 'roster': roster_path, 'photos': photos_path})
+    return redirect(url_for('enroll_bulk_progress', job_id=job_id))
+
+@app.route('/enroll/bulk/<job_id>')
+def enroll_bulk_progress(job_id):
+    """Bulk enrollment progress page"""
+    return render_page('enroll_bulk.html', 'enroll', job_id=job_id, message=None)
+
+@app.route('/enroll/bulk/<job_id>/report')
+def enroll_bulk_report(job_id):
+    """Download the reject report of a bulk enrollment job"""
+    job = job_store.get_job(job_id)
+    report = (job.get('result') or {}).get('report') if job else None
+    if not report:
+        return redirect(url_for('enroll_page', message="No reject report for this import", type="info"))
+    
+    try:
+        with open(os.path.join(BULK_IMPORT_REPORT_DIR, report), encoding='utf-8') as f:
+            content = f.read()
+    except OSError:
+        return redirect(url_for('enroll_page', message="The reject report is no longer available", type="warning"))
+    
+    return Response(content, mimetype='text/csv',
+                    headers={'Content-Disposition': f'attachment; filename=rejects_{report}'})
+
+_marker_service = None
+
+def get_marker_service():
+    """Shared marker service (created on first use)"""
+    global _marker_service
+    if _marker_service is None:
+        from utils.markers import MarkerService
+        from config import ARUCO_DICT, MARKER_CACHE_DIR, MARKER_SIZE_MM, MARKER_SHEET_DPI, MARKER_WORKERS
+        _marker_service = MarkerService(ARUCO_DICT, MARKER_CACHE_DIR, marker_mm=MARKER_SIZE_MM,
+                                        dpi=MARKER_SHEET_DPI, workers=MARKER_WORKERS)
+    return _marker_service
 
 @app.route('/enroll/generate_markers', methods=['POST'])
 def generate_markers():
-    """Generate ArUco markers"""
+    """Generate printable ArUco marker sheets (or single marker PNGs)"""
     try:
-        from ai.aruco_detector import ArucoDetector
-        from config import ARUCO_DICT
-        import cv2
-        
-        start_id = int(request.form.get('start_id', 0))
-        count = int(request.form.get('count', 30))
-        
-        detector = ArucoDetector(dictionary=ARUCO_DICT)
-        output_dir = os.path.join(BASE_DIR, "aruco_markers")
-        os.makedirs(output_dir, exist_ok=True)
-        
-        for i in range(count):
-            marker_id = start_id + i
-            marker_img = detector.generate_marker(marker_id, size=200)
-            filename = os.path.join(output_dir, f"aruco_marker_{marker_id}.png")
-            cv2.imwrite(filename, marker_img)
-        
-        return redirect(url_for('enroll_page', 
-                                message=f"✓ Generated {count} markers in aruco_markers folder", 
-                                type="success"))
+        from config import MARKER_DIR
+        
+        service = get_marker_service()
+        output_format = request.form.get('format', 'pdf')
+        
+        if request.form.get('source') == 'enrolled':
+            conn = get_db()
+            rows = conn.execute('SELECT aruco_id, name FROM students ORDER BY aruco_id').fetchall()
+            conn.close()
+            labels = {row['aruco_id']: row['name'] for row in rows}
+            marker_ids = list(labels)
+            if not marker_ids:
+                return redirect(url_for('enroll_page', message="No students enrolled yet", type="info"))
+        else:
+            start_id = int(request.form.get('start_id', 0))
+            count = int(request.form.get('count', 30))
+            labels = {}
+            marker_ids = list(range(start_id, start_id + count))
+        
+        if output_format == 'png':
+            count = service.export_markers(marker_ids, MARKER_DIR)
+            return redirect(url_for('enroll_page', 
+                                    message=f"✓ Generated {count} markers in aruco_markers folder", 
+                                    type="success"))
+        
+        if output_format == 'png_sheets':
+            buffer = io.BytesIO()
+            with zipfile.ZipFile(buffer, 'w') as archive:
+                for number, path in enumerate(service.sheet_pngs(marker_ids, labels), start=1):
+                    archive.write(path, f"aruco_sheet_{number}.png")
+            buffer.seek(0)
+            return send_file(buffer, mimetype='application/zip', as_attachment=True,
+                             download_name='aruco_sheets.zip')
+        
+        return send_file(service.sheet_pdf(marker_ids, labels), mimetype='application/pdf',
+                         as_attachment=True, download_name='aruco_markers.pdf')
     except Exception as e:
         return redirect(url_for('enroll_page', message=f"Error: {str(e)}", type="danger"))
 
@@ -1431,190 +953,13 @@ def generate_markers():
 @app.route('/settings')
 def settings_page():
     """Settings and system information"""
-    local_ip = get_local_ip()
-    
-    content = f"""
-    <div class="card">
-        <h2><span class="icon">📡</span> Network Access</h2>
-        <p style="color: var(--gray); margin-bottom: 16px;">Connect to this system from any device</p>
-        
-        <div class="alert alert-info">
-            <strong>Web UI Address:</strong><br>
-            http://{local_ip}:5000
-        </div>
-        
-        <p style="font-size: 13px; color: var(--gray); margin-top: 12px;">
-            Connect your phone to the same WiFi network or the Pi's hotspot, 
-            then open the address above in your browser.
-        </p>
-    </div>
-    
-    <div class="card">
-        <h2><span class="icon">📶</span> WiFi Hotspot Setup</h2>
-        <p style="color: var(--gray); margin-bottom: 16px;">
-            Make your Raspberry Pi a WiFi hotspot for direct phone connection
-        </p>
-        
-        <div class="alert alert-warning">
-            <strong>Setup Commands (run on Pi):</strong>
-        </div>
-        
-        <pre style="background: rgba(0,0,0,0.3); padding: 12px; border-radius: 8px; 
-                    font-size: 12px; overflow-x: auto; color: #a5b4fc;">
-# Install hostapd and dnsmasq
-sudo apt install hostapd dnsmasq -y
-
-# Create hotspot config
-sudo nmcli device wifi hotspot \\
-  ssid "AttendancePi" \\
-  password "attendance123"
-
-# The Pi will broadcast:
-# SSID: AttendancePi
-# Password: attendance123
-# Access UI at: http://192.168.4.1:5000
-        </pre>
-        
-        <a href="/settings/hotspot_guide" class="btn btn-primary btn-block" style="margin-top: 12px;">
-            📖 Full Hotspot Guide
-        </a>
-    </div>
-    
-    <div class="card">
-        <h2><span class="icon">⚙️</span> System Info</h2>
-        <table>
-            <tr>
-                <td style="color: var(--gray);">Hardware Mode</td>
-                <td><strong>{HARDWARE_MODE}</strong></td>
-            </tr>
-            <tr>
-                <td style="color: var(--gray);">Database</td>
-                <td><strong>{os.path.basename(DATABASE_PATH)}</strong></td>
-            </tr>
-            <tr>
-                <td style="color: var(--gray);">Local IP</td>
-                <td><strong>{local_ip}</strong></td>
-            </tr>
-        </table>
-    </div>
-    
-    <div class="card">
-        <h2><span class="icon">🔧</span> Service Control</h2>
-        <p style="color: var(--gray); margin-bottom: 16px;">Manage attendance service</p>
-        
-        <form action="/settings/service" method="POST" style="display: flex; gap: 8px;">
-            <button type="submit" name="action" value="restart" class="btn btn-warning" style="flex: 1;">
-                🔄 Restart
-            </button>
-            <button type="submit" name="action" value="stop" class="btn btn-danger" style="flex: 1;">
-                ⏹️ Stop
-            </button>
-            <button type="submit" name="action" value="start" class="btn btn-success" style="flex: 1;">
-                ▶️ Start
-            </button>
-        </form>
-    </div>
-    """
-    
-    return render_template_string(HTML_TEMPLATE, 
-                                  content=content,
-                                  current_time=datetime.now().strftime("%A, %B %d • %H:%M"),
-                                  message=request.args.get('message'),
-                                  message_type=request.args.get('type', 'info'),
-                                  page='settings')
+    return render_page('settings.html', 'settings', local_ip=get_local_ip(), web_port=WEB_PORT,
+                       hardware_mode=HARDWARE_MODE, database_name=os.path.basename(DATABASE_PATH))
 
 @app.route('/settings/hotspot_guide')
 def hotspot_guide():
     """Complete hotspot setup guide"""
-    content = """
-    <div class="card">
-        <h2><span class="icon">📶</span> WiFi Hotspot Setup Guide</h2>
-        <p style="color: var(--gray); margin-bottom: 20px;">
-            Turn your Raspberry Pi into a WiFi hotspot so you can connect directly 
-            from your phone without needing an external router.
-        </p>
-        
-        <h3 style="font-size: 16px; margin: 20px 0 12px;">Method 1: Using nmcli (Easiest)</h3>
-        <pre style="background: rgba(0,0,0,0.3); padding: 12px; border-radius: 8px; 
-                    font-size: 11px; overflow-x: auto; color: #a5b4fc;">
-# Create hotspot (one command!)
-sudo nmcli device wifi hotspot ssid "AttendancePi" password "attendance123"
-
-# To make it permanent (start on boot):
-sudo nmcli connection modify Hotspot connection.autoconnect yes
-        </pre>
-        
-        <h3 style="font-size: 16px; margin: 20px 0 12px;">Method 2: Using hostapd (Advanced)</h3>
-        <pre style="background: rgba(0,0,0,0.3); padding: 12px; border-radius: 8px; 
-                    font-size: 11px; overflow-x: auto; color: #a5b4fc;">
-# 1. Install required packages
-sudo apt update
-sudo apt install hostapd dnsmasq -y
-
-# 2. Stop services for configuration
-sudo systemctl stop hostapd
-sudo systemctl stop dnsmasq
-
-# 3. Configure static IP for wlan0
-sudo nano /etc/dhcpcd.conf
-# Add at the end:
-interface wlan0
-    static ip_address=192.168.4.1/24
-    nohook wpa_supplicant
-
-# 4. Configure DHCP server
-sudo mv /etc/dnsmasq.conf /etc/dnsmasq.conf.orig
-sudo nano /etc/dnsmasq.conf
-# Add:
-interface=wlan0
-dhcp-range=192.168.4.2,192.168.4.20,255.255.255.0,24h
-
-# 5. Configure access point
-sudo nano /etc/hostapd/hostapd.conf
-# Add:
-interface=wlan0
-driver=nl80211
-ssid=AttendancePi
-hw_mode=g
-channel=7
-wmm_enabled=0
-macaddr_acl=0
-auth_algs=1
-ignore_broadcast_ssid=0
-wpa=2
-wpa_passphrase=attendance123
-wpa_key_mgmt=WPA-PSK
-rsn_pairwise=CCMP
-
-# 6. Point hostapd to config
-sudo nano /etc/default/hostapd
-# Set: DAEMON_CONF="/etc/hostapd/hostapd.conf"
-
-# 7. Enable and start services
-sudo systemctl unmask hostapd
-sudo systemctl enable hostapd
-sudo systemctl enable dnsmasq
-sudo reboot
-        </pre>
-        
-        <h3 style="font-size: 16px; margin: 20px 0 12px;">After Setup</h3>
-        <div class="alert alert-success">
-            <strong>Connect from your phone:</strong><br>
-            1. WiFi: <strong>AttendancePi</strong><br>
-            2. Password: <strong>attendance123</strong><br>
-            3. Open browser: <strong>http://192.168.4.1:5000</strong>
-        </div>
-    </div>
-    
-    <a href="/settings" class="btn btn-dark btn-block">← Back to Settings</a>
-    """
-    
-    return render_template_string(HTML_TEMPLATE, 
-                                  content=content,
-                                  current_time=datetime.now().strftime("%A, %B %d • %H:%M"),
-                                  message=None,
-                                  message_type='info',
-                                  page='settings')
+    return render_page('hotspot_guide.html', 'settings', web_port=WEB_PORT, message=None)
 
 @app.route('/settings/service', methods=['POST'])
 def service_control():
@@ -1644,6 +989,49 @@ def service_control():
     
     return redirect(url_for('settings_page', message=message, type=msg_type))
 
+# ============================================================
+# LIVE PREVIEW - MJPEG stream of the attendance camera
+# ============================================================
+
+@app.route('/stream')
+def stream():
+    """MJPEG live preview of the attendance camera (annotated frames)"""
+    if not PREVIEW_ENABLED:
+        return Response('Preview disabled', status=404, mimetype='text/plain')
+    
+    # Each open stream holds a server thread: refuse viewers past the cap
+    # rather than let them take every thread
+    frames = preview_hub.stream()
+    if frames is None:
+        return Response('Too many live viewers, try again later', status=503, mimetype='text/plain',
+                        headers={'Retry-After': '30'})
+    
+    return Response(frames,
+                    mimetype=f'multipart/x-mixed-replace; boundary={PreviewHub.BOUNDARY}',
+                    headers={'Cache-Control': 'no-cache, no-store'})
+
+# ============================================================
+# METRICS - Prometheus text endpoint
+# ============================================================
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Metrics from this process and the attendance service/broker snapshots"""
+    snapshot = metrics.read_snapshot(METRICS_SNAPSHOT_PATH)
+    if snapshot is not None:
+        SNAPSHOT_AGE.set(time.time() - snapshot['timestamp'])
+    
+    sources = [(metrics.REGISTRY.snapshot(), {'process': 'web'})]
+    if snapshot is not None:
+        sources.append((snapshot, {'process': 'attendance'}))
+    if CAMERA_BROKER_ENABLED:
+        broker_snapshot = metrics.read_snapshot(CAMERA_BROKER_METRICS_PATH)
+        if broker_snapshot is not None:
+            sources.append((broker_snapshot, {'process': 'broker'}))
+    
+    return Response(metrics.render_prometheus(sources),
+                    mimetype='text/plain; version=0.0.4')
+
 if __name__ == '__main__':
     local_ip = get_local_ip()
     
@@ -1653,11 +1041,11 @@ if __name__ == '__main__':
     print()
     print("  Access the Web UI from any device:")
     print()
-    print(f"     http://{local_ip}:4000")
+    print(f"     http://{local_ip}:{WEB_PORT}")
     print()
     print("  If using WiFi Hotspot mode:")
     print()
-    print("     http://192.168.4.1:4000")
+    print(f"     http://192.168.4.1:{WEB_PORT}")
     print()
     print("  To setup WiFi Hotspot on Raspberry Pi:")
     print()
@@ -1667,5 +1055,16 @@ if __name__ == '__main__':
     print("  Press Ctrl+C to stop the server")
     print("=" * 60)
     
+    startup = StartupProfiler("Web manager")
+    startup.record("imports", process_uptime())
+    with startup.step("database"):
+        init_services()
+        job_manager.recover_interrupted()
+    with startup.step("templates"):
+        precompile_templates()
+    startup.mark_ready()
+    
     # Run on all interfaces so it's accessible from other devices
-    app.run(host='0.0.0.0', port=4000, debug=False, threaded=True)
+    serve(app, WEB_HOST, WEB_PORT, threads=WEB_THREADS, connection_limit=WEB_CONNECTION_LIMIT,
+          keepalive_timeout=WEB_KEEPALIVE_TIMEOUT, shutdown_timeout=WEB_SHUTDOWN_TIMEOUT,
+          on_shutdown=[preview_hub.close, lambda: job_manager.shutdown(timeout=WEB_SHUTDOWN_TIMEOUT)])